@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+量測監控記錄的記憶體用量與 check_alerts 吞吐量
+
+用法：python benchmarks/bench_alert_records.py [監控數量]
+"""
+import gc
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.alert_manager import AlertManager  # noqa: E402
+from src.utils import generate_alert_id, save_json  # noqa: E402
+
+
+def rss_mb() -> float:
+    """目前進程的常駐記憶體（MB）"""
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def write_watchlist(path: str, count: int, symbols: int):
+    """產生測試用監控清單檔案"""
+    rng = random.Random(42)
+    now = datetime.now().isoformat()
+    alerts = [
+        {
+            "id": generate_alert_id(),
+            "user_id": rng.randrange(100_000, 10_000_000),
+            "symbol": f"SYM{rng.randrange(symbols)}",
+            "target_price": round(rng.uniform(50, 150), 2),
+            "condition": rng.choice(["above", "below"]),
+            "created_at": now,
+            "notified": False,
+            "last_notified_at": None,
+            "enabled": True
+        }
+        for _ in range(count)
+    ]
+    save_json(path, {"alerts": alerts, "last_check": None})
+
+
+def run(count: int, symbols: int = 2000, cycles: int = 3):
+    """執行量測並輸出結果"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "watchlist.json")
+        write_watchlist(path, count, symbols)
+        gc.collect()
+
+        before = rss_mb()
+        start = time.perf_counter()
+        manager = AlertManager(path, save_latency=3600)
+        load_seconds = time.perf_counter() - start
+        gc.collect()
+        after = rss_mb()
+
+        rng = random.Random(7)
+        timings = []
+        for _ in range(cycles):
+            prices = {
+                f"SYM{i}": {"price": rng.uniform(40, 160), "currency": "USD", "success": True}
+                for i in range(symbols)
+            }
+            start = time.perf_counter()
+            manager.check_alerts(prices)
+            timings.append(time.perf_counter() - start)
+
+    best = min(timings)
+    print(f"監控數量: {count:,}")
+    print(f"  載入耗時: {load_seconds:.2f} s")
+    print(f"  RSS 增加: {after - before:.1f} MB ({(after - before) * 1024 * 1024 / count:.0f} bytes/監控)")
+    print(f"  check_alerts: {best:.3f} s/週期 ({count / best / 1e6:.2f} M 監控/秒)")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
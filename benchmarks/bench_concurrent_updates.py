@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+比較逐一處理與並行處理 Telegram 更新時各指令的排隊延遲
+
+更新以 Poisson 分佈到達，隨機分配給多個聊天；/add 需要等待資料來源驗證（慢），
+/list 只讀取監控清單（快）。更新經由 ChatOrderedUpdateProcessor 處理，與 Bot 的
+Application 相同：每個更新一個 task，依到達順序進入處理器。輸出各指令的排隊延遲
+與同一聊天內順序錯亂的次數（應為 0）。
+
+用法：python benchmarks/bench_concurrent_updates.py [每秒更新數] [秒數]
+"""
+import asyncio
+import logging
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from telegram import Update  # noqa: E402
+
+from benchmarks.bench_webhook import arrivals  # noqa: E402
+from src.updates import ChatOrderedUpdateProcessor  # noqa: E402
+
+CHATS = 50
+
+# 指令與處理時間（秒）：/add 等待資料來源驗證，其他指令只讀取本機資料
+COMMANDS = [("/add", 1.5, 0.1), ("/list", 0.005, 0.6), ("/price", 0.2, 0.3)]
+
+
+def make_update(update_id: int, chat_id: int, text: str) -> Update:
+    """建立私訊指令更新"""
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "text": text,
+        },
+    }, None)
+
+
+async def measure(concurrency: int, rate: float, seconds: float) -> dict:
+    """以指定並行數量處理一段時間的更新"""
+    rng = random.Random(5)
+    processor = ChatOrderedUpdateProcessor(concurrency)
+    last_seen = {}
+    out_of_order = 0
+
+    async def handle(chat_id: int, update_id: int, duration: float):
+        nonlocal out_of_order
+        if last_seen.get(chat_id, 0) > update_id:
+            out_of_order += 1
+        last_seen[chat_id] = update_id
+        await asyncio.sleep(duration)
+
+    tasks = []
+    async for update_id, _ in arrivals(rate, seconds, rng):
+        command, duration, _ = rng.choices(COMMANDS, weights=[w for *_, w in COMMANDS])[0]
+        chat_id = rng.randrange(CHATS)
+        tasks.append(asyncio.create_task(processor.process_update(
+            make_update(update_id, chat_id, command), handle(chat_id, update_id, duration)
+        )))
+    await asyncio.gather(*tasks)
+    stats = processor.stats()
+    stats["out_of_order"] = out_of_order
+    return stats
+
+
+def run(rate: float, seconds: float):
+    """執行比較並輸出結果"""
+    print(f"每秒 {rate:g} 個更新、{CHATS} 個聊天，每種設定 {seconds:g} 秒")
+    for concurrency in (1, 2, 8):
+        stats = asyncio.run(measure(concurrency, rate, seconds))
+        delays = " | ".join(
+            f"{kind} {d['avg'] * 1000:6.0f} / {d['p95'] * 1000:6.0f} ms"
+            for kind, d in sorted(stats["delays"].items())
+        )
+        print(f"  並行 {concurrency:2} | 排隊延遲 平均/p95: {delays} | 順序錯亂 {stats['out_of_order']}")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    run(
+        float(sys.argv[1]) if len(sys.argv) > 1 else 8.0,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 20.0
+    )
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+量測檢查週期進行時，聊天指令（讀取與新增）的延遲
+
+用法：python benchmarks/bench_contention.py [監控數量]
+"""
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.bench_alert_records import write_watchlist  # noqa: E402
+from src.alert_manager import AlertManager  # noqa: E402
+
+
+def percentile(samples: list, pct: float) -> float:
+    """取百分位數（毫秒）"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] * 1000
+
+
+def run(count: int, symbols: int = 2000, seconds: float = 10.0):
+    """在背景持續執行 check_alerts，同時量測聊天指令延遲"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "watchlist.json")
+        write_watchlist(path, count, symbols)
+        manager = AlertManager(path, save_latency=3600)
+        users = [alert.user_id for alert in manager.view().alerts[:1000]]
+
+        stop = threading.Event()
+        cycles = []
+
+        def scheduler():
+            rng = random.Random(7)
+            while not stop.is_set():
+                prices = {
+                    f"SYM{i}": {"price": rng.uniform(40, 160), "currency": "USD", "success": True}
+                    for i in range(symbols)
+                }
+                start = time.perf_counter()
+                manager.check_alerts(prices)
+                cycles.append(time.perf_counter() - start)
+
+        checker = threading.Thread(target=scheduler)
+        checker.start()
+
+        reads, writes = [], []
+        rng = random.Random(1)
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            manager.list_alerts(rng.choice(users))
+            manager.get_all_symbols()
+            reads.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            manager.add_alert(rng.choice(users), "NEW", rng.uniform(1, 1000), "above")
+            writes.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+        stop.set()
+        checker.join()
+        manager.close()
+
+    print(f"監控數量: {count:,}（檢查週期 {len(cycles)} 次，"
+          f"平均 {sum(cycles) / max(1, len(cycles)):.2f} s）")
+    for name, samples in (("讀取 list+symbols", reads), ("add_alert", writes)):
+        print(f"  {name:<18} p50 {percentile(samples, 0.5):8.3f} ms  "
+              f"p99 {percentile(samples, 0.99):8.3f} ms  max {max(samples) * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+以模擬的隨機漫步價格比較固定頻率與自適應查詢
+
+每個股票有一個上方門檻（距離 1%~20%），價格以每分鐘一步的幾何隨機漫步模擬一個交易日。
+統計兩種排程的查詢次數、價格越過門檻到被查詢到的延遲，以及查詢前就跌回門檻下的漏失次數。
+
+用法：python benchmarks/bench_polling.py [股票數量]
+"""
+import math
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.polling import AdaptivePoller  # noqa: E402
+from src.utils import percentile  # noqa: E402
+
+STEP = 60            # 模擬的時間步長（秒）
+SESSION = 6.5 * 3600  # 一個交易日（秒）
+DAILY_VOLATILITY = 0.02
+BASE_INTERVAL = 300   # 固定頻率（秒）
+
+
+def simulate(symbols: int, seed: int = 11):
+    """產生每個股票的價格路徑與門檻"""
+    rng = random.Random(seed)
+    sigma = DAILY_VOLATILITY * math.sqrt(STEP / SESSION)
+    steps = int(SESSION / STEP)
+    paths, targets = [], []
+    for _ in range(symbols):
+        price = rng.uniform(20, 500)
+        path = [price]
+        for _ in range(steps):
+            price *= math.exp(rng.gauss(0, sigma))
+            path.append(price)
+        paths.append(path)
+        targets.append(path[0] * (1 + rng.uniform(0.01, 0.20)))
+    return paths, targets
+
+
+def run_schedule(paths, targets, poller):
+    """依排程查詢價格，返回（查詢次數, 排序後的觸發延遲, 漏失的越過次數）"""
+    steps = len(paths[0])
+    next_due = [0.0] * len(paths)
+    crossed_at = [None] * len(paths)
+    detected = [False] * len(paths)
+    calls = 0
+    missed = 0
+    delays = []
+    for step in range(steps):
+        now = step * STEP
+        for i, path in enumerate(paths):
+            price = path[step]
+            if detected[i]:
+                continue
+            if price >= targets[i]:
+                if crossed_at[i] is None:
+                    crossed_at[i] = now
+            elif crossed_at[i] is not None:
+                missed += 1  # 查詢前就跌回門檻下
+                crossed_at[i] = None
+            if now < next_due[i]:
+                continue
+            calls += 1
+            if price >= targets[i]:
+                detected[i] = True
+                delays.append(now - crossed_at[i])
+                continue
+            if poller is None:
+                next_due[i] = now + BASE_INTERVAL
+            else:
+                distance = abs(targets[i] - price) / price
+                next_due[i] = now + poller.observe(f"S{i}", price, distance, now)
+    return calls, sorted(delays), missed
+
+
+def run(symbols: int):
+    """執行比較並輸出結果"""
+    paths, targets = simulate(symbols)
+    adaptive = AdaptivePoller(min_interval=60, max_interval=1800, base_interval=BASE_INTERVAL)
+    print(f"股票數量: {symbols:,}，交易日 {SESSION / 3600:g} 小時，固定間隔 {BASE_INTERVAL} 秒")
+    for label, poller in (("固定頻率", None), ("自適應", adaptive)):
+        calls, delays, missed = run_schedule(paths, targets, poller)
+        print(
+            f"  [{label}] 查詢 {calls:7,} 次，觸發 {len(delays)} 個，"
+            f"延遲 p50 {percentile(delays, 0.5):5.0f} 秒 / p90 {percentile(delays, 0.9):5.0f} 秒 / "
+            f"最大 {delays[-1] if delays else 0:5.0f} 秒，漏失 {missed} 次"
+        )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
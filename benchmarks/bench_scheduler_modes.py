@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+比較 thread 與 asyncio 兩種排程器模式的通知時間、執行緒數量與事件迴圈延遲
+
+模擬的價格查詢每次耗時固定毫秒數，約一半的監控會在週期中觸發；通知以假的 Bot
+在事件迴圈上送達（每批耗時 20 ms）。thread 模式由 APScheduler 的背景執行緒執行
+check_all_stocks，asyncio 模式在 Bot 的事件迴圈上執行週期協程。
+
+用法：python benchmarks/bench_scheduler_modes.py [股票數量] [每次查詢毫秒數]
+"""
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.alert_manager import AlertManager  # noqa: E402
+from src.scheduler import AsyncStockMonitorScheduler, StockMonitorScheduler  # noqa: E402
+from src.utils import percentile  # noqa: E402
+
+ALERTS_PER_SYMBOL = 20
+
+
+class SimulatedFetcher:
+    """每次查詢耗時固定時間的假查詢器"""
+
+    def __init__(self, latency: float, seed: int):
+        self.latency = latency
+        self.rng = random.Random(seed)
+
+    def iter_prices(self, symbols):
+        for symbol in symbols:
+            time.sleep(self.latency)
+            yield symbol, {"price": self.rng.uniform(90, 110), "currency": "USD", "success": True}
+
+
+class SimulatedBot:
+    """在事件迴圈上送達通知的假 Bot"""
+
+    def __init__(self):
+        self.notifications = None
+        self.loop = None
+        self.hooks = []
+
+    def add_lifecycle_hooks(self, on_started, on_stopped):
+        self.hooks.append((on_started, on_stopped))
+
+    def submit_alerts(self, triggered_alerts):
+        return asyncio.run_coroutine_threadsafe(self.send_alerts(triggered_alerts), self.loop)
+
+    async def send_alerts(self, triggered_alerts):
+        await asyncio.sleep(0.02)
+        return [True] * len(triggered_alerts)
+
+
+def build_manager(path: str, symbols: int) -> AlertManager:
+    """建立監控：每個股票的門檻分布在 90~110 之間"""
+    manager = AlertManager(path, save_latency=3600)
+    rng = random.Random(3)
+    manager.add_alerts([
+        {
+            "user_id": user_id,
+            "symbol": f"SYM{i}",
+            "target_price": round(rng.uniform(90, 110), 2),
+            "condition": rng.choice(["above", "below"]),
+        }
+        for i in range(symbols)
+        for user_id in range(ALERTS_PER_SYMBOL)
+    ])
+    return manager
+
+
+async def watch_loop(stop: asyncio.Event, lags: list, threads: list):
+    """量測事件迴圈延遲（預定 5 ms 後喚醒的誤差）與執行緒數量"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + 0.005
+        await asyncio.sleep(0.005)
+        lags.append(loop.time() - expected)
+        threads.append(threading.active_count())
+
+
+def measure(mode: str, symbols: int, latency: float) -> dict:
+    """執行一個檢查週期並收集統計"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        manager = build_manager(os.path.join(temp_dir, "watchlist.json"), symbols)
+        bot = SimulatedBot()
+        scheduler_class = AsyncStockMonitorScheduler if mode == "asyncio" else StockMonitorScheduler
+        scheduler = scheduler_class(manager, SimulatedFetcher(latency, seed=5), bot)
+        latencies = []
+        scheduler._log_cycle = lambda cycle: latencies.extend(cycle.latencies)
+
+        lags, threads = [], []
+
+        async def main():
+            bot.loop = asyncio.get_running_loop()
+            stop = asyncio.Event()
+            watcher = asyncio.create_task(watch_loop(stop, lags, threads))
+            start = time.perf_counter()
+            if mode == "asyncio":
+                scheduler.start()
+                (on_started, on_stopped), = bot.hooks
+                await on_started()
+                await scheduler.check_all_stocks_async()
+            else:
+                # 與正式運行相同：APScheduler 的背景執行緒執行一次檢查
+                scheduler.scheduler.add_job(scheduler.check_all_stocks)
+                scheduler.scheduler.start()
+            while len(latencies) == 0 and time.perf_counter() - start < 60:
+                await asyncio.sleep(0.01)
+            elapsed = time.perf_counter() - start
+            if mode == "asyncio":
+                await on_stopped()
+            else:
+                await bot.loop.run_in_executor(None, scheduler.stop)
+            stop.set()
+            await watcher
+            return elapsed
+
+        elapsed = asyncio.run(main())
+        manager.close()
+
+    latencies.sort()
+    lags.sort()
+    return {
+        "elapsed": elapsed,
+        "notified": len(latencies),
+        "p50": percentile(latencies, 0.5),
+        "p90": percentile(latencies, 0.9),
+        "threads": max(threads) if threads else threading.active_count(),
+        "lag_p99": percentile(lags, 0.99) * 1000,
+    }
+
+
+def run(symbols: int, latency_ms: float):
+    """執行比較並輸出結果"""
+    print(
+        f"股票數量: {symbols:,}，監控 {symbols * ALERTS_PER_SYMBOL:,} 個，"
+        f"每次查詢 {latency_ms:g} ms"
+    )
+    for mode in ("thread", "asyncio"):
+        stats = measure(mode, symbols, latency_ms / 1000)
+        print(
+            f"  [{mode:7}] 週期 {stats['elapsed']:6.2f} s | 通知 {stats['notified']:6,} 則 | "
+            f"通知時間 p50 {stats['p50']:5.2f}s / p90 {stats['p90']:5.2f}s | "
+            f"最多 {stats['threads']} 條執行緒 | 事件迴圈延遲 p99 {stats['lag_p99']:5.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 500,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    )
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+量測分片評估在 1、2、4、8 個工作程序下的 check_alerts 週期時間
+
+兩種價格情境：每週期重新抽樣（大量監控觸發或重置，主程序需發布大量狀態變更）
+與隨機漫步（每週期 ±0.5%，接近實際盤中的少量變更）。
+
+用法：python benchmarks/bench_sharding.py [監控數量] [週期數]
+"""
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.bench_alert_records import write_watchlist  # noqa: E402
+from src.alert_manager import AlertManager  # noqa: E402
+from src.sharding import ShardedAlertManager  # noqa: E402
+
+WORKER_COUNTS = (1, 2, 4, 8)
+
+
+def measure(manager: AlertManager, symbols: int, cycles: int, walk: bool) -> float:
+    """執行多個檢查週期，返回最佳週期時間（第一個週期包含初次同步，不計入）"""
+    rng = random.Random(7)
+    levels = [rng.uniform(40, 160) for _ in range(symbols)]
+    timings = []
+    for _ in range(cycles + 1):
+        if walk:
+            levels = [price * (1 + rng.uniform(-0.005, 0.005)) for price in levels]
+        else:
+            levels = [rng.uniform(40, 160) for _ in range(symbols)]
+        prices = {
+            f"SYM{i}": {"price": price, "currency": "USD", "success": True}
+            for i, price in enumerate(levels)
+        }
+        start = time.perf_counter()
+        manager.check_alerts(prices)
+        timings.append(time.perf_counter() - start)
+    return min(timings[1:])
+
+
+def run(count: int, cycles: int = 3, symbols: int = 2000):
+    """執行量測並輸出結果"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "watchlist.json")
+        write_watchlist(path, count, symbols)
+
+        print(f"監控數量: {count:,}（CPU 核心 {os.cpu_count()}）")
+        for walk, label in ((False, "重新抽樣"), (True, "隨機漫步")):
+            manager = AlertManager(path, save_latency=3600)
+            baseline = measure(manager, symbols, cycles, walk)
+            manager.close()
+
+            print(f"  [{label}] 單一程序      {baseline:7.3f} s/週期")
+            for workers in WORKER_COUNTS:
+                manager = ShardedAlertManager(path, workers, save_latency=3600)
+                best = measure(manager, symbols, cycles, walk)
+                manager.close()
+                print(f"  [{label}] {workers} 個工作程序  {best:7.3f} s/週期（{baseline / best:.2f}x）")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    )
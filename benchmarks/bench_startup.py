@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+比較 JSON 與二進位快照的啟動載入時間
+
+用法：python benchmarks/bench_startup.py [監控數量]
+"""
+import logging
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_alert_records import write_watchlist  # noqa: E402
+from src.alert_manager import AlertManager  # noqa: E402
+from src.snapshot import WatchlistSnapshot, json_to_snapshot  # noqa: E402
+
+
+def run(count: int):
+    """執行量測並輸出結果"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        json_file = os.path.join(temp_dir, "watchlist.json")
+        snap_file = os.path.join(temp_dir, "watchlist.snap")
+        write_watchlist(json_file, count, 2000)
+        json_to_snapshot(json_file, snap_file)
+
+        start = time.perf_counter()
+        AlertManager(json_file)
+        json_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with WatchlistSnapshot(snap_file) as snapshot:
+            snapshot.record(count - 1)
+        map_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        AlertManager(json_file, snapshot_mode="only")
+        snapshot_seconds = time.perf_counter() - start
+
+        print(f"監控數量: {count:,}")
+        print(f"  JSON 檔案 {os.path.getsize(json_file) / 1e6:.1f} MB，"
+              f"快照 {os.path.getsize(snap_file) / 1e6:.1f} MB")
+        print(f"  JSON 載入:        {json_seconds:.3f} s")
+        print(f"  快照 mmap + 校驗: {map_seconds:.3f} s")
+        print(f"  快照完整載入:     {snapshot_seconds:.3f} s")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
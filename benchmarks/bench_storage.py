@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+比較 JSON 與 SQLite 監控儲存後端的效能
+
+用法：python benchmarks/bench_storage.py [監控數量]
+"""
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.alert_manager import AlertManager  # noqa: E402
+from src.sqlite_alert_manager import SQLiteAlertManager  # noqa: E402
+from src.utils import generate_alert_id, save_json  # noqa: E402
+
+
+def build_alerts(count: int, symbols: int = 500, users: int = 5000) -> list:
+    """產生測試用監控資料"""
+    rng = random.Random(42)
+    now = datetime.now().isoformat()
+    return [
+        {
+            "id": generate_alert_id(),
+            "user_id": rng.randrange(users),
+            "symbol": f"SYM{rng.randrange(symbols)}",
+            "target_price": round(rng.uniform(50, 150), 2),
+            "condition": rng.choice(["above", "below"]),
+            "created_at": now,
+            "notified": False,
+            "last_notified_at": None,
+            "enabled": True
+        }
+        for _ in range(count)
+    ]
+
+
+def timed(func, repeat: int = 1) -> float:
+    """執行並回傳平均耗時（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def run(count: int):
+    """執行基準測試並輸出結果表"""
+    alerts = build_alerts(count)
+    prices = {
+        f"SYM{i}": {"price": 100.0, "currency": "USD", "success": True}
+        for i in range(0, 500, 50)
+    }
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        json_file = os.path.join(temp_dir, "watchlist.json")
+        db_file = os.path.join(temp_dir, "watchlist.db")
+
+        save_json(json_file, {"alerts": alerts, "last_check": None})
+        seeder = SQLiteAlertManager(db_file)
+        seeder.import_alerts(alerts)
+        seeder.close()
+
+        results = {}
+        for name, factory, path in (
+            ("json", AlertManager, json_file),
+            ("sqlite", SQLiteAlertManager, db_file),
+        ):
+            row = {"startup": timed(lambda: factory(path))}
+            manager = factory(path)
+            row["add_alert"] = timed(
+                lambda: manager.add_alert(999999, "SYM1", random.uniform(1, 1000), "above"),
+                repeat=20
+            )
+            row["list_alerts"] = timed(lambda: manager.list_alerts(42), repeat=50)
+            row["get_all_symbols"] = timed(manager.get_all_symbols, repeat=20)
+            row["check_alerts(10 sym)"] = timed(lambda: manager.check_alerts(prices), repeat=5)
+            results[name] = row
+            if hasattr(manager, "close"):
+                manager.close()
+
+    print(f"\n監控數量: {count:,}（單位：毫秒/次）")
+    print(f"{'操作':<22}{'JSON':>12}{'SQLite':>12}")
+    for op in results["json"]:
+        print(f"{op:<22}{results['json'][op]:>12.3f}{results['sqlite'][op]:>12.3f}")
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+    for size in sizes:
+        run(size)
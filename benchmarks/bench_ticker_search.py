@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+量測股票代碼目錄的建立時間與 inline 搜尋延遲
+
+以與完整清單相同規模的合成目錄（台股上市櫃約 1,800 檔、美股約 11,000 檔）建立
+TickerIndex，隨機以代碼開頭、名稱開頭與中文名稱片段搜尋。
+
+用法：python benchmarks/bench_ticker_search.py [搜尋次數]
+"""
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.tickers import Ticker, TickerIndex  # noqa: E402
+from src.utils import percentile  # noqa: E402
+
+TW_COUNT = 1800
+US_COUNT = 11000
+HANZI = "台積電聯發科鴻海華碩廣達中鋼長榮國泰富邦兆豐玉山元大統一南亞光寶緯創英業達智邦瑞昱"
+WORDS = ["Global", "Holdings", "Technologies", "Capital", "Energy", "Pharma", "Systems", "Bank",
+         "Group", "Therapeutics", "Acquisition", "Industries", "Resources", "Networks", "Foods"]
+
+
+def synthetic_tickers(rng: random.Random) -> list:
+    """產生合成的台股與美股目錄"""
+    tickers = []
+    for code in rng.sample(range(1101, 9999), TW_COUNT):
+        name = "".join(rng.choices(HANZI, k=rng.randint(2, 4)))
+        suffix = ".TW" if code % 3 else ".TWO"
+        tickers.append(Ticker(f"{code}{suffix}", name, "TW"))
+    symbols = set()
+    while len(symbols) < US_COUNT:
+        symbols.add("".join(rng.choices(string.ascii_uppercase, k=rng.randint(1, 5))))
+    for symbol in sorted(symbols):
+        name = " ".join(rng.sample(WORDS, rng.randint(1, 3))) + " Inc."
+        tickers.append(Ticker(symbol, name, "US"))
+    return tickers
+
+
+def queries(tickers: list, count: int, rng: random.Random) -> list:
+    """隨機的搜尋字串：代碼開頭、名稱開頭、名稱中的單字與中文名稱片段"""
+    result = []
+    for _ in range(count):
+        ticker = rng.choice(tickers)
+        kind = rng.randrange(3)
+        if kind == 0:
+            result.append(ticker.symbol[:rng.randint(1, 4)].lower())
+        elif ticker.market == "TW":
+            start = rng.randrange(len(ticker.name) - 1)
+            result.append(ticker.name[start:start + 2])
+        else:
+            result.append(rng.choice(ticker.name.split())[:rng.randint(2, 6)].lower())
+    return result
+
+
+def run(count: int):
+    """執行量測並輸出結果"""
+    rng = random.Random(3)
+    tickers = synthetic_tickers(rng)
+
+    started = time.perf_counter()
+    index = TickerIndex(tickers)
+    build = time.perf_counter() - started
+    print(f"目錄 {len(index):,} 檔股票，建立索引 {build * 1000:.0f} ms")
+
+    latencies = []
+    for query in queries(tickers, count, rng):
+        started = time.perf_counter()
+        index.search(query, 10)
+        latencies.append(time.perf_counter() - started)
+    latencies.sort()
+    print(
+        f"  搜尋 {count:,} 次 | p50 {percentile(latencies, 0.5) * 1000:.3f} ms / "
+        f"p99 {percentile(latencies, 0.99) * 1000:.3f} ms / 最大 {latencies[-1] * 1000:.3f} ms"
+    )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+比較更新送達 Bot 的延遲：長輪詢與 webhook
+
+模擬 Telegram 與 Bot 之間的單程網路延遲，更新以 Poisson 分佈到達 Telegram。
+長輪詢依 PTB 預設（poll_interval=0）在回應後立即送出下一個 getUpdates，回應在路上
+時到達的更新要等下一輪請求抵達 Telegram 才能送出；webhook 由 Telegram 在更新到達
+時直接推送到內建的 HTTP 伺服器（實際經過本機 HTTP 連線、secret token 驗證與 JSON 解析）。
+延遲從更新到達 Telegram 算起，到 Bot 收到更新為止。
+
+用法：python benchmarks/bench_webhook.py [單程延遲毫秒] [秒數]
+"""
+import asyncio
+import json
+import logging
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils import percentile  # noqa: E402
+from src.webhook import SECRET_HEADER, WebhookServer  # noqa: E402
+
+SECRET = "bench-secret"
+
+# Telegram setWebhook 的 max_connections 預設值
+MAX_CONNECTIONS = 40
+
+
+async def arrivals(rate: float, seconds: float, rng: random.Random):
+    """依 Poisson 分佈產生更新到達的時間點（事件迴圈時間）"""
+    loop = asyncio.get_running_loop()
+    now = loop.time()
+    deadline = now + seconds
+    update_id = 0
+    while True:
+        now += rng.expovariate(rate)
+        if now >= deadline:
+            return
+        await asyncio.sleep(max(0.0, now - loop.time()))
+        update_id += 1
+        yield update_id, loop.time()
+
+
+async def measure_polling(rate: float, seconds: float, delay: float) -> list:
+    """長輪詢：Bot 持續送出 getUpdates，Telegram 有更新時回應全部待送更新"""
+    loop = asyncio.get_running_loop()
+    pending = []
+    available = asyncio.Event()
+    latencies = []
+    done = False
+
+    async def bot():
+        while not done or pending:
+            await asyncio.sleep(delay)  # getUpdates 請求送達 Telegram
+            while not pending:
+                available.clear()
+                try:
+                    await asyncio.wait_for(available.wait(), 0.5)
+                except asyncio.TimeoutError:
+                    if done:
+                        return
+            batch = pending[:]
+            pending.clear()
+            await asyncio.sleep(delay)  # 回應送回 Bot
+            received = loop.time()
+            latencies.extend(received - arrived for _, arrived in batch)
+
+    task = asyncio.create_task(bot())
+    async for update_id, arrived in arrivals(rate, seconds, random.Random(11)):
+        pending.append((update_id, arrived))
+        available.set()
+    done = True
+    await task
+    return latencies
+
+
+async def measure_webhook(rate: float, seconds: float, delay: float) -> list:
+    """webhook：Telegram 在更新到達時透過連線池推送到內建 HTTP 伺服器"""
+    loop = asyncio.get_running_loop()
+    arrived_at = {}
+    latencies = []
+
+    async def handler(update):
+        latencies.append(loop.time() - arrived_at[update["update_id"]])
+
+    server = WebhookServer(handler, SECRET, path="/hook", port=0)
+    await server.start()
+    pool: asyncio.Queue = asyncio.Queue()
+    for _ in range(MAX_CONNECTIONS):
+        pool.put_nowait(await asyncio.open_connection("127.0.0.1", server.port))
+
+    async def push(update_id: int):
+        await asyncio.sleep(delay)  # 推送送達 Bot
+        reader, writer = await pool.get()
+        body = json.dumps({"update_id": update_id, "message": {"text": "/help"}}).encode()
+        writer.write(
+            f"POST /hook HTTP/1.1\r\nHost: bot\r\n{SECRET_HEADER}: {SECRET}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode()
+            + body
+        )
+        await writer.drain()
+        await reader.readuntil(b"\r\n\r\n")
+        pool.put_nowait((reader, writer))
+
+    pushes = []
+    async for update_id, arrived in arrivals(rate, seconds, random.Random(11)):
+        arrived_at[update_id] = arrived
+        pushes.append(asyncio.create_task(push(update_id)))
+    await asyncio.gather(*pushes)
+
+    while not pool.empty():
+        _, writer = pool.get_nowait()
+        writer.close()
+    await server.stop()
+    return latencies
+
+
+def run(delay_ms: float, seconds: float):
+    """執行比較並輸出結果"""
+    delay = delay_ms / 1000
+    print(f"單程網路延遲 {delay_ms:g} ms，每種情境 {seconds:g} 秒")
+    for rate in (1, 20, 200):
+        for mode, measure in (("polling", measure_polling), ("webhook", measure_webhook)):
+            latencies = sorted(asyncio.run(measure(rate, seconds, delay)))
+            print(
+                f"  {rate:4} 個/秒 [{mode:7}] 更新 {len(latencies):5} 個 | 延遲 p50 "
+                f"{percentile(latencies, 0.5) * 1000:6.1f} ms / p99 "
+                f"{percentile(latencies, 0.99) * 1000:6.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    run(
+        float(sys.argv[1]) if len(sys.argv) > 1 else 40.0,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+    )
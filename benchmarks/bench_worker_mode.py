@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+量測檢查週期進行中 Bot 前端的反應時間：inline 與 worker 兩種監控模式
+
+背景持續執行 check_alerts（每週期重新抽樣價格）並同步寫入監控清單，前端的事件
+迴圈每 20 ms 以 list_alerts 模擬一個聊天指令，記錄指令的回覆時間與事件迴圈延遲。
+inline 模式的負載與 Bot 在同一個程序（共用 GIL），worker 模式在工作程序執行，
+前端透過管道呼叫。
+
+用法：python benchmarks/bench_worker_mode.py [監控數量] [秒數]
+"""
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.bench_alert_records import write_watchlist  # noqa: E402
+from src.alert_manager import AlertManager  # noqa: E402
+from src.utils import percentile  # noqa: E402
+from src.worker import MonitorWorkerLink, MonitorWorkerProcess, RemoteAlertManager  # noqa: E402
+
+SYMBOLS = 2000
+USER_ID = 1
+
+
+def heavy_cycles(manager: AlertManager, stop: threading.Event):
+    """持續執行檢查週期與寫入，直到 stop 被設定"""
+    rng = random.Random(7)
+    while not stop.is_set():
+        prices = {
+            f"SYM{i}": {"price": rng.uniform(40, 160), "currency": "USD", "success": True}
+            for i in range(SYMBOLS)
+        }
+        manager.check_alerts(prices)
+        manager.save()
+
+
+def worker_main(conn, path: str):
+    """工作程序入口：載入監控清單，背景執行檢查週期並處理前端的呼叫"""
+    logging.disable(logging.CRITICAL)
+    manager = AlertManager(path, save_latency=None)
+    stop = threading.Event()
+    thread = threading.Thread(target=heavy_cycles, args=(manager, stop), daemon=True)
+    thread.start()
+    try:
+        MonitorWorkerLink(conn).serve({"alerts": manager})
+    finally:
+        stop.set()
+        thread.join()
+        manager.close()
+
+
+async def chat_load(alerts, seconds: float) -> dict:
+    """每 20 ms 送出一個 list_alerts 指令，記錄回覆時間與事件迴圈延遲"""
+    loop = asyncio.get_running_loop()
+    replies, lags = [], []
+    deadline = loop.time() + seconds
+    while loop.time() < deadline:
+        expected = loop.time() + 0.02
+        await asyncio.sleep(0.02)
+        lags.append(loop.time() - expected)
+        # 回覆時間從指令到達（預定喚醒時間）算起，包含等待事件迴圈的時間
+        await asyncio.to_thread(alerts.list_alerts, USER_ID)
+        replies.append(loop.time() - expected)
+    replies.sort()
+    lags.sort()
+    return {
+        "commands": len(replies),
+        "p50": percentile(replies, 0.5) * 1000,
+        "p99": percentile(replies, 0.99) * 1000,
+        "lag_p99": percentile(lags, 0.99) * 1000,
+    }
+
+
+def measure(mode: str, path: str, seconds: float) -> dict:
+    """在指定模式下執行負載並量測前端"""
+    if mode == "inline":
+        manager = AlertManager(path, save_latency=None)
+        stop = threading.Event()
+        thread = threading.Thread(target=heavy_cycles, args=(manager, stop), daemon=True)
+        thread.start()
+        try:
+            stats = asyncio.run(chat_load(manager, seconds))
+        finally:
+            stop.set()
+            thread.join()
+            manager.close()
+        return stats
+
+    worker = MonitorWorkerProcess(worker_main, args=(path,))
+    worker.start(lambda triggered: None)
+    try:
+        alerts = RemoteAlertManager(worker)
+        alerts.list_alerts(USER_ID)  # 等待工作程序載入監控清單
+        return asyncio.run(chat_load(alerts, seconds))
+    finally:
+        worker.stop()
+
+
+def run(count: int, seconds: float):
+    """執行比較並輸出結果"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "watchlist.json")
+        write_watchlist(path, count, SYMBOLS)
+        manager = AlertManager(path, save_latency=None)
+        manager.add_alerts([
+            {"user_id": USER_ID, "symbol": f"SYM{i}", "target_price": 100 + i, "condition": "above"}
+            for i in range(20)
+        ])
+        manager.close()
+
+        print(f"監控數量: {count:,}，每種模式 {seconds:g} 秒")
+        for mode in ("inline", "worker"):
+            stats = measure(mode, path, seconds)
+            print(
+                f"  [{mode:6}] 指令 {stats['commands']:4} 個 | 回覆時間 p50 {stats['p50']:7.1f} ms / "
+                f"p99 {stats['p99']:7.1f} ms | 事件迴圈延遲 p99 {stats['lag_p99']:6.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    logging.disable(logging.CRITICAL)
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200_000,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+    )
@@ -13,24 +13,45 @@ from dotenv import load_dotenv
 # 將 src 目錄加入 Python 路徑
 sys.path.insert(0, str(Path(__file__).parent))
 
-from src.alert_manager import AlertManager
-from src.scheduler import StockMonitorScheduler
+from src.alert_manager import create_alert_manager
+from src.checkpoint import CheckpointStore
+from src.polling import AdaptivePoller
+from src.ratelimit import CommandRateLimiter
+from src.scheduler import AsyncStockMonitorScheduler, StockMonitorScheduler
 from src.stock_fetcher import StockFetcher
 from src.telegram_bot import TelegramBotHandler
+from src.tickers import load_tickers
 from src.utils import setup_logging
+from src.worker import (
+    MonitorWorkerLink,
+    MonitorWorkerProcess,
+    RemoteAlertManager,
+    RemoteStockFetcher,
+)
 
 
 class StockItchingApp:
     """股票監控應用程式"""
 
-    def __init__(self):
-        """初始化應用程式"""
+    def __init__(self, worker: bool = False):
+        """
+        初始化應用程式
+
+        Args:
+            worker: 是否以監控工作程序運行（由 MONITOR_MODE=worker 的前端程序啟動）
+        """
+        self.worker = worker
+
         # 載入環境變數
         load_dotenv()
 
         # 取得環境變數
         self.telegram_token = os.getenv("TELEGRAM_BOT_TOKEN")
         self.watchlist_file = os.getenv("WATCHLIST_FILE", "config/watchlist.json")
+        # 儲存後端：json 或 sqlite（未設定時依 WATCHLIST_FILE 副檔名判斷）
+        self.watchlist_backend = os.getenv("WATCHLIST_BACKEND", "")
+        # 二進位快照：off、alongside（與 JSON 並存）或 only（僅快照）
+        self.watchlist_snapshot = os.getenv("WATCHLIST_SNAPSHOT", "off").strip().lower()
         self.log_level = os.getenv("LOG_LEVEL", "INFO")
         self.log_dir = os.getenv("LOG_DIR", "logs")
 
@@ -41,6 +62,110 @@ class StockItchingApp:
             self.check_interval = 5
             print("⚠️ CHECK_INTERVAL_MINUTES 無效，使用預設值 5")
 
+        # 背景寫入合併窗口（毫秒），負數表示每次異動同步寫入
+        try:
+            self.save_latency_ms = int(os.getenv("SAVE_LATENCY_MS", "500"))
+        except ValueError:
+            self.save_latency_ms = 500
+            print("⚠️ SAVE_LATENCY_MS 無效，使用預設值 500")
+
+        # 分片評估的工作程序數量，0 表示在主程序評估
+        try:
+            self.eval_workers = max(0, int(os.getenv("EVAL_WORKERS", "0")))
+        except ValueError:
+            self.eval_workers = 0
+            print("⚠️ EVAL_WORKERS 無效，使用預設值 0")
+
+        # 自適應查詢：依距離觸發門檻的遠近與波動度決定每個股票的查詢間隔
+        self.adaptive_polling = os.getenv("ADAPTIVE_POLLING", "false").strip().lower() in (
+            "1", "true", "yes", "on"
+        )
+        try:
+            self.poll_min_seconds = max(1, int(os.getenv("POLL_MIN_SECONDS", "60")))
+        except ValueError:
+            self.poll_min_seconds = 60
+            print("⚠️ POLL_MIN_SECONDS 無效，使用預設值 60")
+
+        try:
+            self.poll_max_minutes = max(1, int(os.getenv("POLL_MAX_MINUTES", "30")))
+        except ValueError:
+            self.poll_max_minutes = 30
+            print("⚠️ POLL_MAX_MINUTES 無效，使用預設值 30")
+
+        # 排程器模式：thread（APScheduler 背景執行緒）或 asyncio（在 Bot 的事件迴圈上執行）
+        self.scheduler_mode = os.getenv("SCHEDULER_MODE", "thread").strip().lower()
+        if self.scheduler_mode not in ("thread", "asyncio"):
+            print(f"⚠️ SCHEDULER_MODE 無效: {self.scheduler_mode}，使用預設值 thread")
+            self.scheduler_mode = "thread"
+
+        # 監控模式：inline（與 Bot 同一程序）或 worker（查詢與評估在獨立的工作程序）
+        self.monitor_mode = os.getenv("MONITOR_MODE", "inline").strip().lower()
+        if self.monitor_mode not in ("inline", "worker"):
+            print(f"⚠️ MONITOR_MODE 無效: {self.monitor_mode}，使用預設值 inline")
+            self.monitor_mode = "inline"
+        if self.monitor_mode == "worker" and self.scheduler_mode == "asyncio":
+            print("⚠️ MONITOR_MODE=worker 時工作程序沒有 Bot 的事件迴圈，排程器使用 thread 模式")
+            self.scheduler_mode = "thread"
+
+        # 週期預算：0 表示預設（時間為檢查間隔的 80%，請求數不限制）
+        try:
+            self.cycle_budget_seconds = max(0, int(os.getenv("CYCLE_BUDGET_SECONDS", "0")))
+        except ValueError:
+            self.cycle_budget_seconds = 0
+            print("⚠️ CYCLE_BUDGET_SECONDS 無效，使用預設值 0")
+
+        try:
+            self.cycle_max_requests = max(0, int(os.getenv("CYCLE_MAX_REQUESTS", "0")))
+        except ValueError:
+            self.cycle_max_requests = 0
+            print("⚠️ CYCLE_MAX_REQUESTS 無效，使用預設值 0")
+
+        # 檢查點：定期保存最近報價與排程狀態，重啟後熱啟動（留空則停用）
+        self.checkpoint_file = os.getenv("CHECKPOINT_FILE", "config/checkpoint.json").strip()
+
+        try:
+            self.checkpoint_seconds = max(1, int(os.getenv("CHECKPOINT_SECONDS", "60")))
+        except ValueError:
+            self.checkpoint_seconds = 60
+            print("⚠️ CHECKPOINT_SECONDS 無效，使用預設值 60")
+
+        # Webhook：設定公開 HTTPS 網址時由內建 HTTP 伺服器接收更新，留空則使用長輪詢
+        self.webhook_url = os.getenv("WEBHOOK_URL", "").strip()
+        self.webhook_listen = os.getenv("WEBHOOK_LISTEN", "127.0.0.1").strip() or "127.0.0.1"
+        self.webhook_secret = os.getenv("WEBHOOK_SECRET", "").strip()
+
+        try:
+            self.webhook_port = int(os.getenv("WEBHOOK_PORT", "8443"))
+        except ValueError:
+            self.webhook_port = 8443
+            print("⚠️ WEBHOOK_PORT 無效，使用預設值 8443")
+        if self.webhook_url and not self.webhook_url.startswith("https://"):
+            print("⚠️ WEBHOOK_URL 必須是 https:// 網址，改用長輪詢")
+            self.webhook_url = ""
+
+        # 同時處理的更新數量（不同聊天並行，同一聊天依序）
+        try:
+            self.update_concurrency = max(1, int(os.getenv("UPDATE_CONCURRENCY", "8")))
+        except ValueError:
+            self.update_concurrency = 8
+            print("⚠️ UPDATE_CONCURRENCY 無效，使用預設值 8")
+
+        # 指令查詢限流（每分鐘次數，0 表示不限制）：每位用戶與所有用戶合計，其餘額度保留給定時檢查
+        try:
+            self.user_query_limit = max(0, int(os.getenv("USER_QUERY_LIMIT", "10")))
+        except ValueError:
+            self.user_query_limit = 10
+            print("⚠️ USER_QUERY_LIMIT 無效，使用預設值 10")
+
+        try:
+            self.bot_query_limit = max(0, int(os.getenv("BOT_QUERY_LIMIT", "30")))
+        except ValueError:
+            self.bot_query_limit = 30
+            print("⚠️ BOT_QUERY_LIMIT 無效，使用預設值 30")
+
+        # inline 查詢自動完成使用的股票代碼目錄（留空則停用）
+        self.ticker_file = os.getenv("TICKER_FILE", "config/tickers.csv").strip()
+
         try:
             self.retry_attempts = int(os.getenv("RETRY_ATTEMPTS", "3"))
         except ValueError:
@@ -59,13 +184,13 @@ class StockItchingApp:
             print("請複製 .env.example 為 .env 並填入你的 Telegram Bot Token")
             sys.exit(1)
 
-        # 設定日誌系統
-        setup_logging(self.log_dir, self.log_level)
+        # 設定日誌系統（工作程序寫入獨立的日誌目錄，避免兩個程序輪替同一個檔案）
+        setup_logging(os.path.join(self.log_dir, "worker") if worker else self.log_dir, self.log_level)
 
         import logging
         self.logger = logging.getLogger(__name__)
         self.logger.info("=" * 60)
-        self.logger.info("Stock Itching 股票監控系統啟動")
+        self.logger.info("Stock Itching 監控工作程序啟動" if worker else "Stock Itching 股票監控系統啟動")
         self.logger.info("=" * 60)
 
         # 初始化模組
@@ -73,13 +198,66 @@ class StockItchingApp:
         self.stock_fetcher = None
         self.telegram_handler = None
         self.scheduler = None
+        self.checkpoint = None
+        self.worker_process = None
 
     def initialize_modules(self):
         """初始化各個模組"""
         self.logger.info("初始化模組...")
 
+        if self.monitor_mode == "worker":
+            # 查詢、評估與監控清單都在工作程序，Bot 的監控異動與查詢透過管道轉送
+            self.worker_process = MonitorWorkerProcess(monitor_worker_main)
+            self.telegram_handler = self._create_telegram_handler(
+                RemoteAlertManager(self.worker_process),
+                RemoteStockFetcher(self.worker_process)
+            )
+        else:
+            self._initialize_monitor()
+
+            # 初始化 Telegram Bot
+            self.telegram_handler = self._create_telegram_handler(
+                self.alert_manager, self.stock_fetcher
+            )
+
+            self._initialize_scheduler(self.telegram_handler)
+
+        self.logger.info("模組初始化完成")
+
+    def _create_telegram_handler(self, alert_manager, stock_fetcher) -> TelegramBotHandler:
+        """建立 Telegram Bot 處理器（套用 webhook、並行、限流與代碼目錄設定）"""
+        rate_limiter = None
+        if self.user_query_limit:
+            rate_limiter = CommandRateLimiter(
+                user_per_minute=self.user_query_limit,
+                shared_per_minute=self.bot_query_limit or None
+            )
+        return TelegramBotHandler(
+            token=self.telegram_token,
+            alert_manager=alert_manager,
+            stock_fetcher=stock_fetcher,
+            webhook_url=self.webhook_url or None,
+            webhook_listen=self.webhook_listen,
+            webhook_port=self.webhook_port,
+            webhook_secret=self.webhook_secret or None,
+            max_concurrent_updates=self.update_concurrency,
+            rate_limiter=rate_limiter,
+            ticker_index=load_tickers(self.ticker_file) if self.ticker_file else None
+        )
+
+    def _initialize_monitor(self):
+        """初始化監控管理器與股票查詢器"""
         # 初始化監控管理器
-        self.alert_manager = AlertManager(self.watchlist_file)
+        save_latency = (
+            self.save_latency_ms / 1000 if self.save_latency_ms >= 0 else None
+        )
+        self.alert_manager = create_alert_manager(
+            self.watchlist_file,
+            self.watchlist_backend,
+            save_latency=save_latency,
+            snapshot_mode=self.watchlist_snapshot,
+            eval_workers=self.eval_workers
+        )
 
         # 初始化股票查詢器
         self.stock_fetcher = StockFetcher(
@@ -87,22 +265,47 @@ class StockItchingApp:
             retry_delay=self.retry_delay
         )
 
-        # 初始化 Telegram Bot
-        self.telegram_handler = TelegramBotHandler(
-            token=self.telegram_token,
-            alert_manager=self.alert_manager,
-            stock_fetcher=self.stock_fetcher
-        )
+    def _initialize_scheduler(self, notifier):
+        """
+        初始化排程器與檢查點
+
+        Args:
+            notifier: 發送觸發通知的物件（Bot，或工作程序中轉送到前端的管道）
+        """
+        # 初始化自適應查詢排程（固定間隔為 CHECK_INTERVAL_MINUTES）
+        poller = None
+        if self.adaptive_polling:
+            base_interval = self.check_interval * 60
+            poller = AdaptivePoller(
+                min_interval=min(self.poll_min_seconds, base_interval),
+                max_interval=max(self.poll_max_minutes * 60, base_interval),
+                base_interval=base_interval
+            )
+
+        # 初始化檢查點
+        if self.checkpoint_file:
+            self.checkpoint = CheckpointStore(self.checkpoint_file, interval=self.checkpoint_seconds)
 
         # 初始化排程器
-        self.scheduler = StockMonitorScheduler(
+        scheduler_class = (
+            AsyncStockMonitorScheduler if self.scheduler_mode == "asyncio" else StockMonitorScheduler
+        )
+        self.scheduler = scheduler_class(
             alert_manager=self.alert_manager,
             stock_fetcher=self.stock_fetcher,
-            telegram_handler=self.telegram_handler,
-            check_interval_minutes=self.check_interval
+            telegram_handler=notifier,
+            check_interval_minutes=self.check_interval,
+            poller=poller,
+            cycle_budget_seconds=self.cycle_budget_seconds or None,
+            cycle_max_requests=self.cycle_max_requests or None,
+            checkpoint=self.checkpoint
         )
 
-        self.logger.info("模組初始化完成")
+        # 恢復上次的報價快取與排程狀態
+        if self.checkpoint:
+            self.checkpoint.register("fetcher", self.stock_fetcher)
+            self.checkpoint.register("scheduler", self.scheduler)
+            self.checkpoint.restore()
 
     def setup_signal_handlers(self):
         """設定信號處理器用於優雅關閉"""
@@ -125,12 +328,16 @@ class StockItchingApp:
             # 設定信號處理器
             self.setup_signal_handlers()
 
-            # 啟動排程器
-            self.scheduler.start()
+            # 啟動排程器（worker 模式由工作程序執行）
+            if self.worker_process:
+                self.worker_process.start(self.telegram_handler.submit_alerts)
+            else:
+                self.scheduler.start()
 
             # 顯示啟動資訊
-            next_check = self.scheduler.get_next_run_time()
+            next_check = self.scheduler.get_next_run_time() if self.scheduler else None
             self.logger.info("系統啟動成功！")
+            self.logger.info(f"監控模式: {self.monitor_mode}")
             self.logger.info(f"監控清單檔案: {self.watchlist_file}")
             self.logger.info(f"檢查間隔: {self.check_interval} 分鐘")
             if next_check:
@@ -151,17 +358,28 @@ class StockItchingApp:
         self.logger.info("正在關閉應用程式...")
 
         try:
+            # 停止監控工作程序（工作程序自行寫入檢查點與監控清單）
+            if self.worker_process:
+                self.worker_process.stop()
+
             # 停止排程器
             if self.scheduler:
                 self.scheduler.stop()
 
+            # 寫入最後的檢查點
+            if self.checkpoint:
+                self.checkpoint.save()
+
             # 停止 Telegram Bot
             if self.telegram_handler:
                 self.telegram_handler.stop()
 
-            # 儲存監控清單
+            # 儲存監控清單，並等待背景寫入完成
             if self.alert_manager:
                 self.alert_manager.save()
+                if not self.alert_manager.flush():
+                    self.logger.error("監控清單寫入未完成，部分異動可能遺失")
+                self.alert_manager.close()
 
             self.logger.info("應用程式已安全關閉")
 
@@ -169,6 +387,35 @@ class StockItchingApp:
             self.logger.error(f"關閉過程發生錯誤: {e}", exc_info=True)
 
 
+    def run_worker(self, conn):
+        """
+        以監控工作程序運行，直到前端要求停止或關閉管道
+
+        Args:
+            conn: 與前端程序連接的管道
+        """
+        # Ctrl+C 由前端程序處理，再以停止要求通知工作程序
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        link = MonitorWorkerLink(conn)
+        try:
+            self._initialize_monitor()
+            self._initialize_scheduler(link)
+            self.scheduler.start()
+            self.logger.info("監控工作程序已就緒")
+            link.serve({"alerts": self.alert_manager, "fetcher": self.stock_fetcher})
+        except Exception as e:
+            self.logger.error(f"監控工作程序錯誤: {e}", exc_info=True)
+            sys.exit(1)
+        finally:
+            self.shutdown()
+            conn.close()
+
+
+def monitor_worker_main(conn):
+    """監控工作程序入口（MONITOR_MODE=worker 時由前端程序啟動）"""
+    StockItchingApp(worker=True).run_worker(conn)
+
+
 def main():
     """主函數"""
     app = StockItchingApp()
@@ -0,0 +1,129 @@
+"""監控匯入/匯出格式模組 - 每行一筆「代碼,[指標] 條件,目標[,到期]」"""
+import csv
+import io
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .alert_record import to_epoch
+from .expiry import format_expiry, parse_expiry
+from .indicators import parse_alert_condition, split_condition
+
+# 匯出檔案的標題列（匯入時會自動略過）
+EXPORT_HEADER = ("symbol", "condition", "target_price", "expiry")
+
+# 有分隔符號時使用 csv 解析（支援引號），否則以空白分隔
+_DELIMITERS = (",", ";", "\t")
+
+
+def _split_fields(line: str) -> List[str]:
+    """拆分單行欄位"""
+    for delimiter in _DELIMITERS:
+        if delimiter in line:
+            row = next(csv.reader([line], delimiter=delimiter, skipinitialspace=True))
+            return [field.strip() for field in row]
+    return line.split()
+
+
+def parse_alert_lines(
+    text: str,
+    now: Optional[float] = None
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    解析匯入內容
+
+    每行一筆監控，欄位可用逗號、分號、Tab 或空白分隔，條件前可加上指標、目標
+    可以是另一個指標（格式同 parse_alert_condition），最後一欄為選用的到期設定
+    （格式同 parse_expiry），例如：
+        2330.TW,above,600
+        AAPL below 140 7d
+        MSFT,above,450,trigger+3d
+        TSLA,rsi(14) above,70
+        NVDA ema(12) cross_above ema(26)
+        2330.TW,between,580 620
+    空行、# 開頭的註解與標題列會被略過。
+
+    Args:
+        text: 多行文字或 CSV 內容
+        now: 計算相對到期時間的基準（epoch 秒數），預設為 time.time()
+
+    Returns:
+        (監控列表, 錯誤訊息列表)；每筆監控包含 symbol、condition、target_price、
+        upper_price、expires_at、expire_after、line
+    """
+    now = time.time() if now is None else now
+    entries: List[Dict[str, Any]] = []
+    errors: List[str] = []
+
+    for line_no, raw_line in enumerate(text.splitlines(), 1):
+        line = raw_line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        fields = _split_fields(line)
+        lowered = tuple(field.lower() for field in fields)
+        if lowered and lowered == EXPORT_HEADER[:len(lowered)]:
+            continue
+
+        symbol = fields[0]
+        if not symbol:
+            errors.append(f"第 {line_no} 行：缺少股票代碼")
+            continue
+
+        # 條件欄位可能含空白（例如「rsi(14) above」），攤平後再解析；匯出的空白
+        # 到期欄位不會留下任何 token，視為不會到期
+        tokens = [token for field in fields[1:] for token in field.split()]
+        try:
+            condition, target_price, upper_price, rest = parse_alert_condition(tokens)
+        except ValueError as e:
+            errors.append(f"第 {line_no} 行：{e}")
+            continue
+        if len(rest) > 1:
+            errors.append(f"第 {line_no} 行：欄位過多（代碼, [指標] 條件, 目標[, 到期]）")
+            continue
+
+        expires_at = expire_after = None
+        if rest:
+            try:
+                expires_at, expire_after = parse_expiry(rest[0], now)
+            except ValueError as e:
+                errors.append(f"第 {line_no} 行：{e}")
+                continue
+
+        entries.append({
+            "symbol": symbol,
+            "condition": condition,
+            "target_price": target_price,
+            "upper_price": upper_price,
+            "expires_at": expires_at,
+            "expire_after": expire_after,
+            "line": line_no
+        })
+
+    return entries, errors
+
+
+def format_alert_lines(alerts: Iterable[Any]) -> str:
+    """
+    將監控匯出為 CSV（可直接用於匯入）
+
+    Args:
+        alerts: 監控記錄（AlertRecord 或 JSON 格式字典）
+
+    Returns:
+        含標題列的 CSV 文字
+    """
+    output = io.StringIO()
+    writer = csv.writer(output, lineterminator="\n")
+    writer.writerow(EXPORT_HEADER)
+    for alert in alerts:
+        condition, target = split_condition(
+            alert["condition"], alert["target_price"], alert.get("upper_price")
+        )
+        writer.writerow((
+            alert["symbol"],
+            condition,
+            target,
+            format_expiry(to_epoch(alert.get("expires_at")), alert.get("expire_after"))
+        ))
+    return output.getvalue()
+
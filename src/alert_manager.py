@@ -1,112 +1,396 @@
 """監控警報管理模組"""
 import logging
+import math
+import os
 import threading
+import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
-from .utils import generate_alert_id, load_json, save_json
+from .alert_record import AlertRecord
+from .alert_view import AlertView
+from .bands import BAND_CONDITIONS, band_signals, price_buffer
+from .bands import BUFFER_PERCENTAGE, MIN_BUFFER_VALUE  # noqa: F401 緩衝區常數（保留既有匯入路徑）
+from .expiry import ExpiryQueue
+from .indicators import THRESHOLD_CONDITIONS, IndicatorEngine, parse_condition
+from .trailing import TRAILING_CONDITIONS, trailing_signals
+from .persistence import BackgroundWriter
+from .polling import alert_distance
+from .snapshot import SnapshotError, read_snapshot, snapshot_path_for, write_snapshot
+from .utils import gc_paused, generate_alert_id, load_json, save_json
 
-# 定義緩衝區比例常數
-BUFFER_PERCENTAGE = 0.02  # 2% 緩衝區
-MIN_BUFFER_VALUE = 0.5  # 最小緩衝值
+# 樂觀發布衝突時的重試次數（之後改為在鎖內產生新版本）
+_COMMIT_RETRIES = 3
+
+# 二進位快照模式：off（僅 JSON）、alongside（JSON + 快照）、only（僅快照）
+SNAPSHOT_MODES = ("off", "alongside", "only")
+
+
+def _alert_object_hook(obj: Dict[str, Any]) -> Any:
+    """json.load 的 object_hook：將監控字典轉換為 AlertRecord"""
+    if "id" in obj and "condition" in obj and "symbol" in obj:
+        return AlertRecord.from_dict(obj)
+    return obj
 
 
 class AlertManager:
     """監控清單管理類別"""
 
-    def __init__(self, watchlist_file: str):
+    def __init__(
+        self,
+        watchlist_file: str,
+        save_latency: Optional[float] = None,
+        snapshot_mode: str = "off"
+    ):
         """
         初始化監控管理器
 
         Args:
             watchlist_file: 監控清單 JSON 檔案路徑
+            save_latency: 背景寫入的合併窗口秒數，None 表示每次異動同步寫入
+            snapshot_mode: 二進位快照模式（'off'、'alongside' 或 'only'）
         """
+        if snapshot_mode not in SNAPSHOT_MODES:
+            raise ValueError(
+                f"無效的快照模式: {snapshot_mode}，必須是 {', '.join(SNAPSHOT_MODES)}"
+            )
+
         self.watchlist_file = watchlist_file
+        self.snapshot_mode = snapshot_mode
+        self.snapshot_file = snapshot_path_for(watchlist_file)
         self.logger = logging.getLogger(__name__)
-        self._lock = threading.RLock()  # 可重入鎖，避免死鎖
-        self.data = self._load_data()
+        self._lock = threading.RLock()  # 只保護版本指派與同步寫入，讀取端不加鎖
+
+        # 目前發布的不可變版本：寫入端在鎖內產生新版本後以單一指派發布
+        data = self._load_data()
+        self._view = AlertView(0, data["alerts"])
+        self._last_check: Optional[str] = data.get("last_check")
+
+        # 到期排程：清除成本為 O(到期數量)，不需掃描整份清單
+        self._expiry = ExpiryQueue(
+            (alert.expires_at, alert.id) for alert in data["alerts"]
+            if alert.expires_at is not None
+        )
+
+        # 技術指標狀態：每個 (股票, 指標) 一份，由所有引用的監控共用
+        self._indicators = IndicatorEngine()
+
+        # 區間監控上次評估時的 {symbol: (端點索引, 價格)}
+        self._band_marks: Dict[str, Tuple[Any, float]] = {}
+
+        # 背景寫入器：異動只設定髒標記，由專屬線程合併寫入
+        self._writer: Optional[BackgroundWriter] = None
+        if save_latency is not None:
+            self._writer = BackgroundWriter(
+                self._write_to_disk,
+                latency=save_latency,
+                name="watchlist-writer"
+            )
 
     def _load_data(self) -> Dict:
-        """載入監控清單資料"""
+        """載入監控清單資料（啟用快照時優先使用快照）"""
+        if self.snapshot_mode != "off":
+            data = self._load_snapshot()
+            if data is not None:
+                return data
+
         default_data = {
             "alerts": [],
             "last_check": None
         }
-        data = load_json(self.watchlist_file, default_data)
-        self.logger.info(f"載入監控清單: {len(data.get('alerts', []))} 個監控")
+        if self.watchlist_file == self.snapshot_file:
+            return default_data
+
+        # 持久化邊界：解析時直接將每筆監控轉換為精簡記錄，避免同時保留兩份資料
+        data = load_json(self.watchlist_file, default_data, object_hook=_alert_object_hook)
+        data["alerts"] = [
+            alert if isinstance(alert, AlertRecord) else AlertRecord.from_dict(alert)
+            for alert in data.get("alerts", [])
+        ]
+        self.logger.info(f"載入監控清單: {len(data['alerts'])} 個監控")
         return data
 
+    def _load_snapshot(self) -> Optional[Dict]:
+        """
+        從二進位快照載入監控
+
+        Returns:
+            監控清單資料，快照不存在、過期或損毀時返回 None（改用 JSON）
+        """
+        if not os.path.exists(self.snapshot_file):
+            return None
+
+        # JSON 較新（例如被手動編輯過）時以 JSON 為準
+        if (self.snapshot_mode == "alongside" and
+                self.watchlist_file != self.snapshot_file and
+                os.path.exists(self.watchlist_file) and
+                os.path.getmtime(self.watchlist_file) > os.path.getmtime(self.snapshot_file)):
+            self.logger.info("JSON 監控清單比快照新，改用 JSON 載入")
+            return None
+
+        try:
+            alerts, last_check = read_snapshot(self.snapshot_file)
+        except (OSError, SnapshotError) as e:
+            self.logger.warning(f"快照無法使用，改用 JSON 載入 ({self.snapshot_file}): {e}")
+            return None
+
+        self.logger.info(f"從快照載入監控清單: {len(alerts)} 個監控")
+        return {"alerts": alerts, "last_check": last_check}
+
+    def view(self) -> AlertView:
+        """
+        取得目前的監控清單版本（不加鎖）
+
+        同一個視圖內的多次查詢保證看到一致的資料，不受之後的異動影響。
+
+        Returns:
+            不可變的監控視圖
+        """
+        return self._view
+
+    def _commit(self, build: Callable[[AlertView], AlertView]) -> Tuple[AlertView, AlertView]:
+        """
+        以樂觀並行方式發布新版本
+
+        在鎖外由目前版本產生新版本（可能是 O(n) 的複製），鎖內只比對基底版本是否
+        仍為最新並指派；期間有其他寫入時以新的基底重新產生。build 必須是純函數。
+
+        Args:
+            build: 由基底版本產生新版本的函數，無異動時返回基底版本本身
+
+        Returns:
+            (基底版本, 發布的版本)
+        """
+        for _ in range(_COMMIT_RETRIES):
+            base = self._view
+            view = build(base)
+            with self._lock:
+                if self._view is base:
+                    self._view = view
+                    return base, view
+
+        # 持續衝突時改在鎖內產生，保證完成
+        with self._lock:
+            base = self._view
+            view = build(base)
+            self._view = view
+            return base, view
+
     def save(self) -> bool:
-        """儲存監控清單到檔案（線程安全）"""
+        """
+        儲存監控清單到檔案（線程安全）
+
+        啟用背景寫入時只標記髒資料並立即返回，實際寫入由寫入線程合併執行。
+        """
         with self._lock:
-            self.data["last_check"] = datetime.now().isoformat()
-            success = save_json(self.watchlist_file, self.data)
-            if success:
-                self.logger.debug("監控清單已儲存")
-            return success
+            self._last_check = datetime.now().isoformat()
+            if self._writer is not None:
+                self._writer.mark_dirty()
+                return True
+            return self._write_to_disk()
+
+    def _write_to_disk(self) -> bool:
+        """序列化目前發布的版本並原子寫入（JSON 及/或快照），全程不持有鎖"""
+        write_json = self.snapshot_mode != "only"
+        alerts = self._view.alerts
+        last_check = self._last_check
+        if write_json:
+            payload = {
+                "alerts": [alert.to_dict() for alert in alerts],
+                "last_check": last_check
+            }
+
+        success = True
+        if write_json:
+            success = save_json(self.watchlist_file, payload)
+        if self.snapshot_mode != "off":
+            success = write_snapshot(self.snapshot_file, alerts, last_check) and success
+
+        if success:
+            self.logger.debug("監控清單已儲存")
+        return success
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """
+        將尚未寫入的異動立即寫入磁碟
+
+        Args:
+            timeout: 最長等待秒數
+
+        Returns:
+            是否寫入成功
+        """
+        if self._writer is None:
+            return True
+        return self._writer.flush(timeout)
+
+    def close(self):
+        """寫入剩餘異動並停止背景寫入線程"""
+        if self._writer is not None:
+            self._writer.close()
 
     def add_alert(
         self,
         user_id: int,
         symbol: str,
         target_price: float,
-        condition: str
-    ) -> Optional[Dict[str, Any]]:
+        condition: str,
+        expires_at: Optional[float] = None,
+        expire_after: Optional[float] = None,
+        upper_price: Optional[float] = None,
+        peak_price: Optional[float] = None
+    ) -> Optional[AlertRecord]:
         """
         新增監控（自動檢查重複）
 
         Args:
             user_id: Telegram 用戶 ID
             symbol: 股票代碼
-            target_price: 目標價格
-            condition: 條件 ('above' 或 'below')
+            target_price: 目標價格（區間條件為下限）
+            condition: 條件，例如 'above'、'below'、'rsi(14) above'、
+                'cross_above sma(20)'、'between'（格式見 indicators.parse_condition）
+            expires_at: 到期時間（epoch 秒數），None 表示不會到期
+            expire_after: 觸發後經過多少秒到期，None 表示不會因觸發而到期
+            upper_price: 區間上限（只用於 between/outside）
+            peak_price: 移動停損的起始最高價（通常是新增時的價格），None 表示
+                從第一次檢查的價格開始追蹤
 
         Returns:
             新增的監控資訊，如果已存在相同監控則返回 None
         """
-        if condition not in ["above", "below"]:
-            raise ValueError(f"無效的條件: {condition}，必須是 'above' 或 'below'")
+        condition = self._normalize_condition(condition, target_price, upper_price)
+
+        # 建立新監控
+        alert = AlertRecord(
+            id=generate_alert_id(),
+            user_id=user_id,
+            symbol=symbol,
+            target_price=target_price,
+            condition=condition,
+            expires_at=expires_at,
+            expire_after=expire_after,
+            upper_price=upper_price,
+            peak_price=peak_price if condition in TRAILING_CONDITIONS else None
+        )
+        duplicate: Optional[AlertRecord] = None
+
+        def build(view: AlertView) -> AlertView:
+            nonlocal duplicate
+            duplicate = self._find_duplicate(view.for_user(user_id), alert)
+            return view if duplicate is not None else view.added(alert)
+
+        self._commit(build)
+
+        if duplicate is not None:
+            self.logger.warning(
+                f"⚠️  忽略重複監控: 用戶 {user_id} | {alert.symbol} | "
+                f"{condition} {alert.target_price} (已存在 ID: {duplicate.id})"
+            )
+            return None
 
-        with self._lock:
-            symbol_upper = symbol.upper()
-            target_price_float = float(target_price)
-
-            # 檢查是否已存在相同的監控
-            for existing_alert in self.data["alerts"]:
-                if (existing_alert["user_id"] == user_id and
-                    existing_alert["symbol"] == symbol_upper and
-                    existing_alert["condition"] == condition and
-                    abs(existing_alert["target_price"] - target_price_float) < 0.01 and
-                    existing_alert["enabled"]):
-
-                    self.logger.warning(
-                        f"⚠️  忽略重複監控: 用戶 {user_id} | {symbol_upper} | "
-                        f"{condition} {target_price_float} (已存在 ID: {existing_alert['id']})"
-                    )
-                    return None
-
-            # 建立新監控
-            alert = {
-                "id": generate_alert_id(),
-                "user_id": user_id,
-                "symbol": symbol_upper,
-                "target_price": target_price_float,
-                "condition": condition,
-                "created_at": datetime.now().isoformat(),
-                "notified": False,
-                "last_notified_at": None,
-                "enabled": True
-            }
+        self._schedule_expiry([alert])
+        self.save()
 
-            self.data["alerts"].append(alert)
+        self.logger.info(
+            f"新增監控: 用戶 {user_id} | {alert.symbol} | "
+            f"{condition} {alert.target_price} | ID: {alert.id}"
+        )
+
+        return alert
+
+    def add_alerts(self, alerts: Iterable[Dict[str, Any]]) -> List[Optional[AlertRecord]]:
+        """
+        批次新增監控（一次驗證、去重並只發布與儲存一次）
+
+        Args:
+            alerts: 監控列表，每筆包含 user_id、symbol、target_price、condition，
+                可選 expires_at、expire_after、upper_price、peak_price
+
+        Returns:
+            與輸入順序對應的結果，重複（已存在或批次內重複）的項目為 None
+        """
+        records = self._new_records(alerts)
+
+        results: List[Optional[AlertRecord]] = []
+
+        def build(view: AlertView) -> AlertView:
+            nonlocal results
+            results = []
+            accepted: Dict[int, List[AlertRecord]] = {}
+            for alert in records:
+                pending = accepted.get(alert.user_id, ())
+                if (self._find_duplicate(view.for_user(alert.user_id), alert) is not None or
+                        self._find_duplicate(pending, alert) is not None):
+                    results.append(None)
+                    continue
+                accepted.setdefault(alert.user_id, []).append(alert)
+                results.append(alert)
+            return view.extended(alert for alert in results if alert is not None)
+
+        base, view = self._commit(build)
+        added = len(view) - len(base)
+
+        if added:
+            self._schedule_expiry(alert for alert in results if alert is not None)
             self.save()
+        self.logger.info(f"批次新增監控: {added}/{len(records)} 筆（{len(records) - added} 筆重複）")
 
-            self.logger.info(
-                f"新增監控: 用戶 {user_id} | {symbol_upper} | "
-                f"{condition} {target_price_float} | ID: {alert['id']}"
+        return results
+
+    @staticmethod
+    def _new_records(alerts: Iterable[Dict[str, Any]]) -> List[AlertRecord]:
+        """驗證整批輸入並建立監控記錄（任一筆條件無效時整批拒絕）"""
+        records = []
+        for item in alerts:
+            condition = AlertManager._normalize_condition(
+                item["condition"], item["target_price"], item.get("upper_price")
             )
+            records.append(AlertRecord(
+                id=generate_alert_id(),
+                user_id=int(item["user_id"]),
+                symbol=item["symbol"],
+                target_price=item["target_price"],
+                condition=condition,
+                expires_at=item.get("expires_at"),
+                expire_after=item.get("expire_after"),
+                upper_price=item.get("upper_price"),
+                peak_price=(
+                    item.get("peak_price") if condition in TRAILING_CONDITIONS else None
+                )
+            ))
+        return records
 
-            return alert
+    @staticmethod
+    def _normalize_condition(
+        condition: str,
+        target_price: float,
+        upper_price: Optional[float]
+    ) -> str:
+        """驗證條件與區間上限，返回標準格式的條件"""
+        condition = parse_condition(condition).text
+        if condition in BAND_CONDITIONS:
+            if upper_price is None or not float(target_price) < float(upper_price):
+                raise ValueError(f"區間條件 {condition} 需要大於下限的區間上限")
+        elif upper_price is not None:
+            raise ValueError("只有 between/outside 條件可以設定區間上限")
+        return condition
+
+    @staticmethod
+    def _find_duplicate(
+        candidates: Iterable[AlertRecord],
+        alert: AlertRecord
+    ) -> Optional[AlertRecord]:
+        """在候選監控（通常是同一用戶的監控）中尋找相同的監控"""
+        for existing_alert in candidates:
+            if (existing_alert.user_id == alert.user_id and
+                existing_alert.symbol == alert.symbol and
+                existing_alert.condition == alert.condition and
+                abs(existing_alert.target_price - alert.target_price) < 0.01 and
+                (alert.upper_price is None or
+                 abs(existing_alert.upper_price - alert.upper_price) < 0.01) and
+                existing_alert.enabled):
+                return existing_alert
+        return None
 
     def remove_alert(self, user_id: int, alert_id: str) -> bool:
         """
@@ -119,26 +403,25 @@ class AlertManager:
         Returns:
             是否移除成功
         """
-        with self._lock:
-            original_count = len(self.data["alerts"])
-
+        def build(view: AlertView) -> AlertView:
+            alert = view.get(alert_id)
             # 只能移除自己的監控
-            self.data["alerts"] = [
-                alert for alert in self.data["alerts"]
-                if not (alert["id"] == alert_id and alert["user_id"] == user_id)
-            ]
+            if alert is None or alert.user_id != user_id:
+                return view
+            return view.removed([alert_id])
 
-            removed = len(self.data["alerts"]) < original_count
+        base, view = self._commit(build)
+        removed = view is not base
 
-            if removed:
-                self.save()
-                self.logger.info(f"移除監控: 用戶 {user_id} | ID: {alert_id}")
-            else:
-                self.logger.warning(f"找不到監控或無權限: 用戶 {user_id} | ID: {alert_id}")
+        if removed:
+            self.save()
+            self.logger.info(f"移除監控: 用戶 {user_id} | ID: {alert_id}")
+        else:
+            self.logger.warning(f"找不到監控或無權限: 用戶 {user_id} | ID: {alert_id}")
 
-            return removed
+        return removed
 
-    def list_alerts(self, user_id: int) -> List[Dict]:
+    def list_alerts(self, user_id: int) -> List[AlertRecord]:
         """
         列出用戶的所有監控
 
@@ -149,8 +432,8 @@ class AlertManager:
             監控列表
         """
         user_alerts = [
-            alert for alert in self.data["alerts"]
-            if alert["user_id"] == user_id and alert["enabled"]
+            alert for alert in self._view.for_user(user_id)
+            if alert.enabled
         ]
 
         self.logger.debug(f"用戶 {user_id} 有 {len(user_alerts)} 個監控")
@@ -163,12 +446,64 @@ class AlertManager:
         Returns:
             股票代碼列表
         """
-        symbols = set()
-        for alert in self.data["alerts"]:
-            if alert["enabled"]:
-                symbols.add(alert["symbol"])
+        return list(self._view.symbols)
+
+    @staticmethod
+    def _is_triggered(condition: str, current_price: float, target_price: float) -> bool:
+        """判斷價格是否達成監控條件"""
+        if condition == "above":
+            return current_price >= target_price
+        if condition == "below":
+            return current_price <= target_price
+        return False
+
+    @staticmethod
+    def _should_reset(condition: str, current_price: float, target_price: float) -> bool:
+        """判斷已通知的監控是否應重置（價格回到緩衝區外的安全範圍）"""
+        # 計算緩衝區，使用常數並設置最小值
+        buffer = price_buffer(target_price)
+
+        if condition == "above":
+            return current_price < (target_price - buffer)
+        if condition == "below":
+            return current_price > (target_price + buffer)
+        return False
+
+    def _indicator_signals(
+        self,
+        symbol: str,
+        condition: str,
+        target_price: float
+    ) -> Tuple[bool, bool]:
+        """
+        評估指標條件（必須在指標引擎的檢查週期內呼叫）
 
-        return list(symbols)
+        Args:
+            symbol: 股票代碼
+            condition: condition 欄位
+            target_price: 目標價格（與指標比較時不使用）
+
+        Returns:
+            (是否觸發, 是否應重置通知標記)，指標暖機中時皆為 False
+        """
+        parsed = parse_condition(condition)
+        previous, value = self._indicators.read(symbol, parsed.indicator)
+        if parsed.reference is None:
+            reference_previous = reference = target_price
+        else:
+            reference_previous, reference = self._indicators.read(symbol, parsed.reference)
+        if value is None or reference is None:
+            return False, False
+
+        direction = parsed.direction
+        triggered = self._is_triggered(direction, value, reference)
+        if triggered and parsed.is_cross:
+            # 穿越：上一筆樣本必須位於另一側
+            triggered = (
+                previous is not None and reference_previous is not None and
+                not self._is_triggered(direction, previous, reference_previous)
+            )
+        return triggered, self._should_reset(direction, value, reference)
 
     def check_alerts(self, current_prices: Dict[str, Dict]) -> List[Dict]:
         """
@@ -179,73 +514,405 @@ class AlertManager:
 
         Returns:
             需要通知的監控列表，每個元素包含 alert 和 current_price
+
+        在不加鎖的視圖上評估，狀態變更以新記錄表示並以樂觀方式發布，
+        檢查期間聊天指令的讀取與寫入都不會被阻塞。
         """
-        triggered_alerts = []
+        view, updates, triggered_alerts = self._evaluate_cycle(current_prices)
+        self._apply_updates(view, updates, triggered_alerts)
+        return triggered_alerts
 
-        for alert in self.data["alerts"]:
-            if not alert["enabled"]:
+    def check_alerts_stream(self, batches: Iterable[Dict[str, Dict]]) -> Iterator[List[Dict]]:
+        """
+        串流檢查：價格分批到達時逐批評估並發布，不必等待所有股票查詢完成
+
+        整個串流是同一個檢查週期（每個指標只以該股票的價格更新一次），
+        同一股票不應出現在多個批次中。
+
+        Args:
+            batches: 價格字典的可迭代物件，格式同 check_alerts
+
+        Yields:
+            每批需要通知的監控列表
+        """
+        prices: Dict[str, float] = {}
+        with self._indicators.cycle(prices):
+            for current_prices in batches:
+                valid_prices = self._valid_prices(current_prices)
+                # 指標只讀取本批股票的價格，其他股票的價格稍後才加入
+                prices.update((symbol, info["price"]) for symbol, info in valid_prices.items())
+                view, updates, triggered_alerts = self._evaluate_prices(valid_prices)
+                self._apply_updates(view, updates, triggered_alerts)
+                yield triggered_alerts
+
+    def trigger_distances(self, prices: Dict[str, float]) -> Dict[str, Optional[float]]:
+        """
+        每個股票目前價格到最近門檻的相對距離（供自適應查詢排程使用）
+
+        Args:
+            prices: {symbol: 目前價格}
+
+        Returns:
+            {symbol: |價格 - 門檻| / 價格}；引用指標的股票為 None（需固定頻率取樣），
+            沒有監控的股票不在結果中
+        """
+        view = self._view
+        subscriptions = view.subscriptions
+        bands = view.bands
+        trailing = view.trailing
+        by_id = view.by_id
+
+        distances: Dict[str, Optional[float]] = {}
+        for symbol, price in prices.items():
+            if not price or price <= 0:
                 continue
+            nearest = math.inf
+            uses_indicator = False
+            for condition, target_price in subscriptions.get(symbol, ()):
+                if condition in THRESHOLD_CONDITIONS:
+                    nearest = min(nearest, abs(price - target_price))
+                else:
+                    uses_indicator = True
+                    break
+            index = bands.get(symbol)
+            if index is not None:
+                nearest = min(nearest, index.distance(price))
+            for alert_id in trailing.get(symbol, ()):
+                nearest = min(nearest, alert_distance(by_id[alert_id], price))
+
+            if uses_indicator:
+                distances[symbol] = None
+            elif nearest != math.inf:
+                distances[symbol] = nearest / price
+        return distances
+
+    def subscriber_counts(self, symbols: Iterable[str]) -> Dict[str, int]:
+        """
+        每個股票啟用中的監控數量（供查詢排序使用）
 
-            symbol = alert["symbol"]
-            price_info = current_prices.get(symbol)
+        Args:
+            symbols: 股票代碼
 
-            # 如果查詢失敗，跳過
-            if not price_info or not price_info.get("success"):
-                self.logger.warning(f"跳過檢查 {symbol}：無價格資訊")
+        Returns:
+            {symbol: 監控數量}
+        """
+        view = self._view
+        subscriptions = view.subscriptions
+        bands = view.bands
+        trailing = view.trailing
+        return {
+            symbol: (
+                sum(len(subscribers) for subscribers in subscriptions.get(symbol, {}).values())
+                + len(bands.get(symbol, ()))
+                + len(trailing.get(symbol, ()))
+            )
+            for symbol in symbols
+        }
+
+    def _evaluate_cycle(
+        self,
+        current_prices: Dict[str, Dict]
+    ) -> Tuple[AlertView, Dict[str, AlertRecord], List[Dict]]:
+        """
+        在目前發布的視圖上評估一個檢查週期（不發布任何變更）
+
+        Args:
+            current_prices: 當前價格字典，格式 {symbol: price_info}
+
+        Returns:
+            (評估的視圖, {監控 ID: 新記錄}, 需要通知的監控列表)
+        """
+        valid_prices = self._valid_prices(current_prices)
+        prices = {symbol: info["price"] for symbol, info in valid_prices.items()}
+        with self._indicators.cycle(prices):
+            return self._evaluate_prices(valid_prices)
+
+    def _valid_prices(self, current_prices: Dict[str, Dict]) -> Dict[str, Dict]:
+        """每個股票只解析一次價格資訊，查詢失敗且有監控的股票記錄一次"""
+        valid_prices = {}
+        symbols = None
+        for symbol, info in current_prices.items():
+            if info and info.get("success"):
+                valid_prices[symbol] = info
                 continue
+            if symbols is None:
+                symbols = self._view.symbols
+            if symbol in symbols:
+                self.logger.warning(f"跳過檢查 {symbol}：無價格資訊")
+        return valid_prices
+
+    def _evaluate_prices(
+        self,
+        valid_prices: Dict[str, Dict]
+    ) -> Tuple[AlertView, Dict[str, AlertRecord], List[Dict]]:
+        """
+        評估有價格的股票（必須在指標引擎的檢查週期內呼叫，不發布任何變更）
 
+        Args:
+            valid_prices: 查詢成功的價格資訊 {symbol: price_info}
+
+        Returns:
+            (評估的視圖, {監控 ID: 新記錄}, 需要通知的監控列表)
+        """
+        triggered_alerts: List[Dict] = []
+        updates: Dict[str, AlertRecord] = {}
+        now = time.time()
+
+        # 狀態變更會建立大量新記錄，評估期間暫停循環 GC
+        view = self._view
+        with gc_paused():
+            self._evaluate(view, valid_prices, now, updates, triggered_alerts)
+            self._evaluate_bands(view, valid_prices, now, updates, triggered_alerts)
+
+        return view, updates, triggered_alerts
+
+    def _apply_updates(
+        self,
+        view: AlertView,
+        updates: Dict[str, AlertRecord],
+        triggered_alerts: List[Dict]
+    ):
+        """
+        發布檢查週期的狀態變更並排程觸發後到期、必要時儲存
+
+        Args:
+            view: 評估時的視圖（用來判斷最高價是否變動）
+            updates: {監控 ID: 新記錄}
+            triggered_alerts: 需要通知的監控列表
+        """
+        if updates:
+            # 檢查期間被移除的監控會在 replaced 中忽略
+            with gc_paused():
+                self._commit(lambda view: view.replaced(updates))
+            self._schedule_expiry(
+                item["alert"] for item in triggered_alerts
+                if item["alert"].expire_after is not None
+            )
+
+        # 儲存更新（移動停損的最高價與價格路徑有關，更新時也需儲存）
+        if triggered_alerts or any(
+                alert.peak_price != view.get(alert_id).peak_price
+                for alert_id, alert in updates.items()):
+            self.save()
+
+    def _evaluate(
+        self,
+        view: AlertView,
+        valid_prices: Dict[str, Dict],
+        now: float,
+        updates: Dict[str, AlertRecord],
+        triggered_alerts: List[Dict]
+    ):
+        """
+        評估有價格股票的共用門檻與移動停損並收集狀態變更（不修改任何已發布的記錄）
+
+        相同 (股票, 條件, 目標) 的監控共用一次比較（含緩衝區計算），只有在觸發
+        或重置時才逐一處理訂閱者，成本與不同門檻的數量成正比。
+        """
+        is_triggered = self._is_triggered
+        should_reset = self._should_reset
+        indicator_signals = self._indicator_signals
+        by_id = view.by_id
+        subscriptions = view.subscriptions
+        trailing = view.trailing
+
+        for symbol, price_info in valid_prices.items():
             current_price = price_info["price"]
-            target_price = alert["target_price"]
-            condition = alert["condition"]
-
-            # 檢查是否觸發條件
-            triggered = False
-            if condition == "above" and current_price >= target_price:
-                triggered = True
-            elif condition == "below" and current_price <= target_price:
-                triggered = True
-
-            # 如果觸發且尚未通知
-            if triggered and not alert["notified"]:
-                self.logger.info(
-                    f"觸發監控: {symbol} | {condition} {target_price} | "
-                    f"當前: {current_price}"
+
+            for (condition, target_price), subscription in subscriptions.get(symbol, {}).items():
+                # 檢查是否觸發條件（指標條件由共用的指標狀態評估）
+                if condition in THRESHOLD_CONDITIONS:
+                    triggered = is_triggered(condition, current_price, target_price)
+                    reset = None
+                else:
+                    triggered, reset = indicator_signals(symbol, condition, target_price)
+
+                # 觸發：通知所有尚未通知的訂閱者
+                if triggered:
+                    for alert_id in subscription.pending:
+                        alert = by_id[alert_id]
+                        if not self._is_expired(alert, now):
+                            self._mark_triggered(alert, price_info, now, updates, triggered_alerts)
+
+                # 檢查是否應重置通知標記（價格回到安全範圍）
+                elif subscription.notified:
+                    if reset is None:
+                        reset = should_reset(condition, current_price, target_price)
+                    if reset:
+                        self.logger.info(
+                            f"重置監控通知標記: {symbol} {condition} {target_price} | "
+                            f"{len(subscription.notified)} 個監控 | 當前: {current_price}"
+                        )
+                        for alert_id in subscription.notified:
+                            alert = by_id[alert_id]
+                            if not self._is_expired(alert, now):
+                                updates[alert_id] = alert.with_notification(
+                                    False, alert.last_notified_at
+                                )
+
+            # 移動停損：每筆監控只保留最高價，創新高時才建立新記錄
+            for alert_id in trailing.get(symbol, ()):
+                alert = by_id[alert_id]
+                if self._is_expired(alert, now):
+                    continue
+
+                triggered, reset, peak = trailing_signals(
+                    alert.condition, current_price, alert.target_price, alert.peak_price
                 )
+                if peak != alert.peak_price:
+                    alert = alert.replace(peak_price=peak)
+                    updates[alert_id] = alert
 
-                triggered_alerts.append({
-                    "alert": alert,
-                    "current_price": current_price,
-                    "currency": price_info.get("currency", "USD")
-                })
+                if triggered and not alert.notified:
+                    self._mark_triggered(alert, price_info, now, updates, triggered_alerts)
+                elif alert.notified and reset:
+                    self.logger.info(
+                        f"重置監控通知標記: {symbol} | 當前: {current_price}"
+                    )
+                    updates[alert_id] = alert.with_notification(False, alert.last_notified_at)
 
-                # 標記為已通知
-                alert["notified"] = True
-                alert["last_notified_at"] = datetime.now().isoformat()
+    @staticmethod
+    def _is_expired(alert: AlertRecord, now: float) -> bool:
+        """已到期但尚未清除的監控不再通知或重置"""
+        expires_at = alert.expires_at
+        return expires_at is not None and expires_at <= now
 
-            # 檢查是否應重置通知標記（價格回到安全範圍）
-            elif alert["notified"]:
-                # 計算緩衝區，使用常數並設置最小值
-                buffer = max(target_price * BUFFER_PERCENTAGE, MIN_BUFFER_VALUE)
+    def _mark_triggered(
+        self,
+        alert: AlertRecord,
+        price_info: Dict,
+        now: float,
+        updates: Dict[str, AlertRecord],
+        triggered_alerts: List[Dict]
+    ):
+        """將觸發的監控標記為已通知並加入通知清單"""
+        current_price = price_info["price"]
+        self.logger.info(
+            f"觸發監控: {alert.symbol} | {alert.condition} {alert.target_price} | "
+            f"當前: {current_price}"
+        )
+
+        # 標記為已通知
+        notified_alert = alert.with_notification(True, now)
+        if alert.expire_after is not None:
+            # 觸發後到期：取較早的到期時間
+            expiry = now + alert.expire_after
+            if alert.expires_at is None or expiry < alert.expires_at:
+                notified_alert.expires_at = expiry
+        updates[alert.id] = notified_alert
+
+        triggered_alerts.append({
+            "alert": notified_alert,
+            "current_price": current_price,
+            "currency": price_info.get("currency", "USD")
+        })
+
+    def _evaluate_bands(
+        self,
+        view: AlertView,
+        valid_prices: Dict[str, Dict],
+        now: float,
+        updates: Dict[str, AlertRecord],
+        triggered_alerts: List[Dict]
+    ):
+        """
+        評估區間監控（只評估狀態可能改變的監控）
 
-                reset = False
-                if condition == "above" and current_price < (target_price - buffer):
-                    reset = True
-                elif condition == "below" and current_price > (target_price + buffer):
-                    reset = True
+        每個股票記錄上次評估時的端點索引與價格：索引未變時，只有門檻落在上次
+        價格與目前價格之間的監控需要評估（O(log n + k)）；索引已變（新增或移除
+        區間監控）或第一次評估時，重新評估該股票的所有區間監控。
+        """
+        bands = view.bands
+        marks = self._band_marks
+        for symbol in marks.keys() - bands.keys():
+            del marks[symbol]
+
+        for symbol, price_info in valid_prices.items():
+            index = bands.get(symbol)
+            if index is None:
+                continue
+            current_price = price_info["price"]
 
-                if reset:
+            mark = marks.get(symbol)
+            if mark is None or mark[0] is not index:
+                candidates = index.alert_ids
+            elif mark[1] == current_price:
+                continue
+            else:
+                candidates = index.crossed(mark[1], current_price)
+            marks[symbol] = (index, current_price)
+
+            for alert_id in candidates:
+                alert = view.get(alert_id)
+                expires_at = alert.expires_at
+                if expires_at is not None and expires_at <= now:
+                    continue
+
+                triggered, reset = band_signals(
+                    alert.condition, current_price, alert.target_price, alert.upper_price
+                )
+                if triggered and not alert.notified:
+                    self._mark_triggered(alert, price_info, now, updates, triggered_alerts)
+                elif alert.notified and reset:
                     self.logger.info(
                         f"重置監控通知標記: {symbol} | 當前: {current_price}"
                     )
-                    alert["notified"] = False
+                    updates[alert.id] = alert.with_notification(False, alert.last_notified_at)
+
+    def _schedule_expiry(self, alerts: Iterable[AlertRecord]):
+        """將有到期時間的監控加入到期排程"""
+        for alert in alerts:
+            if alert.expires_at is not None:
+                self._expiry.push(alert.id, alert.expires_at)
+
+    def next_expiry(self) -> Optional[float]:
+        """
+        最早的到期時間
+
+        Returns:
+            epoch 秒數，沒有排程時返回 None（可能是已移除監控的殘留項目）
+        """
+        return self._expiry.next_expiry()
+
+    def expire_alerts(self, now: Optional[float] = None) -> List[AlertRecord]:
+        """
+        清除已到期的監控（一次發布、一次儲存）
+
+        只處理到期排程中已到期的項目，成本與到期數量成正比。
+
+        Args:
+            now: 目前時間（epoch 秒數），預設為 time.time()
 
-        # 儲存更新
-        if triggered_alerts:
+        Returns:
+            被清除的監控
+        """
+        now = time.time() if now is None else now
+        due = self._expiry.pop_due(now)
+        if not due:
+            return []
+
+        def build(view: AlertView) -> AlertView:
+            # 已移除或到期時間已變更的殘留項目會被略過
+            expired_ids = []
+            for _, alert_id in due:
+                alert = view.get(alert_id)
+                if alert is not None and alert.expires_at is not None and alert.expires_at <= now:
+                    expired_ids.append(alert_id)
+            return view.removed(expired_ids)
+
+        base, view = self._commit(build)
+        expired = [
+            base.get(alert_id) for alert_id in dict.fromkeys(alert_id for _, alert_id in due)
+            if alert_id in base.by_id and alert_id not in view.by_id
+        ]
+
+        if expired:
             self.save()
+            self.logger.info(f"⏰ 清除 {len(expired)} 個到期監控")
 
-        return triggered_alerts
+        return expired
 
-    def get_alert_by_id(self, alert_id: str) -> Optional[Dict]:
+    def get_alert_by_id(self, alert_id: str) -> Optional[AlertRecord]:
         """
         根據 ID 取得監控
 
@@ -255,10 +922,7 @@ class AlertManager:
         Returns:
             監控資訊，找不到則返回 None
         """
-        for alert in self.data["alerts"]:
-            if alert["id"] == alert_id:
-                return alert
-        return None
+        return self._view.get(alert_id)
 
     def clear_all_alerts(self, user_id: int) -> int:
         """
@@ -270,23 +934,17 @@ class AlertManager:
         Returns:
             清除的監控數量
         """
-        with self._lock:
-            original_count = len([
-                alert for alert in self.data["alerts"]
-                if alert["user_id"] == user_id
-            ])
+        # 移除該用戶的所有監控
+        base, view = self._commit(
+            lambda view: view.removed(alert.id for alert in view.for_user(user_id))
+        )
+        original_count = len(base) - len(view)
 
-            # 移除該用戶的所有監控
-            self.data["alerts"] = [
-                alert for alert in self.data["alerts"]
-                if alert["user_id"] != user_id
-            ]
-
-            if original_count > 0:
-                self.save()
-                self.logger.info(f"清空用戶 {user_id} 的 {original_count} 個監控")
+        if original_count > 0:
+            self.save()
+            self.logger.info(f"清空用戶 {user_id} 的 {original_count} 個監控")
 
-            return original_count
+        return original_count
 
     def clear_alerts_by_symbol(self, user_id: int, symbol: str) -> int:
         """
@@ -299,24 +957,69 @@ class AlertManager:
         Returns:
             清除的監控數量
         """
-        with self._lock:
-            symbol = symbol.upper()
-
-            original_count = len([
-                alert for alert in self.data["alerts"]
-                if alert["user_id"] == user_id and alert["symbol"] == symbol
-            ])
-
-            # 移除該用戶指定股票的所有監控
-            self.data["alerts"] = [
-                alert for alert in self.data["alerts"]
-                if not (alert["user_id"] == user_id and alert["symbol"] == symbol)
-            ]
-
-            if original_count > 0:
-                self.save()
-                self.logger.info(
-                    f"清空用戶 {user_id} 的 {symbol} 監控，共 {original_count} 個"
-                )
+        symbol = symbol.upper()
+
+        # 移除該用戶指定股票的所有監控
+        base, view = self._commit(
+            lambda view: view.removed(
+                alert.id for alert in view.for_user(user_id)
+                if alert.symbol == symbol
+            )
+        )
+        original_count = len(base) - len(view)
+
+        if original_count > 0:
+            self.save()
+            self.logger.info(
+                f"清空用戶 {user_id} 的 {symbol} 監控，共 {original_count} 個"
+            )
 
-            return original_count
+        return original_count
+
+
+def create_alert_manager(
+    watchlist_file: str,
+    backend: Optional[str] = None,
+    save_latency: Optional[float] = None,
+    snapshot_mode: str = "off",
+    eval_workers: int = 0
+) -> AlertManager:
+    """
+    依設定建立監控管理器
+
+    Args:
+        watchlist_file: 監控清單檔案路徑
+        backend: 儲存後端（'json' 或 'sqlite'），未指定時依副檔名判斷
+        save_latency: JSON 後端的背景寫入合併窗口秒數（None 為同步寫入）
+        snapshot_mode: JSON 後端的二進位快照模式（'off'、'alongside' 或 'only'）
+        eval_workers: JSON 後端的分片評估工作程序數量，0 表示在主程序評估
+
+    Returns:
+        對應後端的監控管理器
+    """
+    from .sqlite_alert_manager import SQLITE_SUFFIXES, SQLiteAlertManager
+
+    backend = (backend or "").strip().lower()
+    if not backend:
+        backend = "sqlite" if watchlist_file.lower().endswith(SQLITE_SUFFIXES) else "json"
+
+    if backend == "sqlite":
+        if eval_workers > 0:
+            raise ValueError("分片評估只支援 JSON 後端")
+        return SQLiteAlertManager(watchlist_file)
+    if backend == "json" and eval_workers > 0:
+        from .sharding import ShardedAlertManager
+        return ShardedAlertManager(
+            watchlist_file,
+            eval_workers,
+            save_latency=save_latency,
+            snapshot_mode=snapshot_mode
+        )
+    if backend == "json":
+        return AlertManager(
+            watchlist_file,
+            save_latency=save_latency,
+            snapshot_mode=snapshot_mode
+        )
+
+    raise ValueError(f"無效的儲存後端: {backend}，必須是 'json' 或 'sqlite'")
@@ -0,0 +1,217 @@
+"""監控記錄模組 - 精簡的 __slots__ 記錄，只在持久化邊界轉換為 JSON 格式"""
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional
+
+# JSON 格式的欄位順序（與 watchlist.json 相容）
+ALERT_FIELDS = (
+    "id",
+    "user_id",
+    "symbol",
+    "target_price",
+    "condition",
+    "created_at",
+    "notified",
+    "last_notified_at",
+    "enabled",
+    "expires_at",
+    "expire_after",
+    "upper_price",
+    "peak_price",
+)
+
+_FIELD_SET = frozenset(ALERT_FIELDS)
+_new_record = object.__new__
+
+# 以 epoch 浮點數儲存、對外呈現為 ISO 字串的欄位
+_TIMESTAMP_FIELDS = frozenset({"created_at", "last_notified_at", "expires_at"})
+
+
+def to_epoch(value: Any) -> Optional[float]:
+    """將 ISO 字串或數字轉換為 epoch 秒數"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+
+def _optional_float(value: Any) -> Optional[float]:
+    """將可能為空的數值轉換為浮點數"""
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+def to_isoformat(value: Optional[float]) -> Optional[str]:
+    """將 epoch 秒數轉換為 ISO 字串"""
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value).isoformat()
+
+
+class AlertRecord:
+    """
+    單一監控記錄
+
+    以 __slots__ 取代每筆 9 個 key 的字典：時間欄位為 epoch 浮點數，
+    股票代碼經過 sys.intern 共用同一個字串物件。為了相容既有呼叫端，
+    仍支援 record["symbol"] 形式的唯讀存取（時間欄位回傳 ISO 字串）。
+    """
+
+    __slots__ = ALERT_FIELDS
+
+    def __init__(
+        self,
+        id: str,
+        user_id: int,
+        symbol: str,
+        target_price: float,
+        condition: str,
+        created_at: Optional[float] = None,
+        notified: bool = False,
+        last_notified_at: Optional[float] = None,
+        enabled: bool = True,
+        expires_at: Optional[float] = None,
+        expire_after: Optional[float] = None,
+        upper_price: Optional[float] = None,
+        peak_price: Optional[float] = None
+    ):
+        self.id = id
+        self.user_id = user_id
+        self.symbol = sys.intern(symbol.upper())
+        self.target_price = float(target_price)
+        self.condition = sys.intern(condition)
+        self.created_at = time.time() if created_at is None else created_at
+        self.notified = notified
+        self.last_notified_at = last_notified_at
+        self.enabled = enabled
+        self.expires_at = expires_at  # 到期時間（epoch 秒數）
+        self.expire_after = expire_after  # 觸發後多少秒到期
+        self.upper_price = None if upper_price is None else float(upper_price)  # 區間上限
+        self.peak_price = None if peak_price is None else float(peak_price)  # 移動停損最高價
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AlertRecord":
+        """
+        由 JSON 格式的字典建立記錄
+
+        Args:
+            data: watchlist.json 中的單筆監控
+
+        Returns:
+            監控記錄
+        """
+        return cls(
+            id=data["id"],
+            user_id=int(data["user_id"]),
+            symbol=str(data["symbol"]),
+            target_price=data["target_price"],
+            condition=data["condition"],
+            created_at=to_epoch(data.get("created_at")),
+            notified=bool(data.get("notified", False)),
+            last_notified_at=to_epoch(data.get("last_notified_at")),
+            enabled=bool(data.get("enabled", True)),
+            expires_at=to_epoch(data.get("expires_at")),
+            expire_after=_optional_float(data.get("expire_after")),
+            upper_price=_optional_float(data.get("upper_price")),
+            peak_price=_optional_float(data.get("peak_price"))
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """轉換為 JSON 格式的字典（時間欄位為 ISO 字串）"""
+        return {field: self[field] for field in ALERT_FIELDS}
+
+    def replace(self, **changes: Any) -> "AlertRecord":
+        """
+        複製記錄並套用變更（已發布的記錄不可就地修改）
+
+        Args:
+            **changes: 要變更的欄位（時間欄位為 epoch 秒數）
+
+        Returns:
+            新的監控記錄
+        """
+        record = self.with_notification(self.notified, self.last_notified_at)
+        for field, value in changes.items():
+            if field not in _FIELD_SET:
+                raise TypeError(f"未知的欄位: {field}")
+            setattr(record, field, value)
+        return record
+
+    def with_notification(
+        self,
+        notified: bool,
+        last_notified_at: Optional[float]
+    ) -> "AlertRecord":
+        """
+        複製記錄並變更通知狀態（檢查週期的快速路徑）
+
+        Args:
+            notified: 是否已通知
+            last_notified_at: 最後通知時間（epoch 秒數）
+
+        Returns:
+            新的監控記錄
+        """
+        # 直接複製欄位，避免 **kwargs 與逐欄位 setattr
+        record = _new_record(AlertRecord)
+        record.id = self.id
+        record.user_id = self.user_id
+        record.symbol = self.symbol
+        record.target_price = self.target_price
+        record.condition = self.condition
+        record.created_at = self.created_at
+        record.notified = notified
+        record.last_notified_at = last_notified_at
+        record.enabled = self.enabled
+        record.expires_at = self.expires_at
+        record.expire_after = self.expire_after
+        record.upper_price = self.upper_price
+        record.peak_price = self.peak_price
+        return record
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in ALERT_FIELDS:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if key in _TIMESTAMP_FIELDS:
+            return to_isoformat(value)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """與 dict.get 相同的唯讀存取"""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> Iterator[str]:
+        """欄位名稱（讓 dict(record) 可直接轉換）"""
+        return iter(ALERT_FIELDS)
+
+    def __contains__(self, key: object) -> bool:
+        return key in ALERT_FIELDS
+
+    def __eq__(self, other: object) -> bool:
+        # 以 JSON 格式比較，時間欄位的精度為持久化時的微秒
+        if isinstance(other, AlertRecord):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None  # 可變物件，不可雜湊
+
+    def __repr__(self) -> str:
+        return (
+            f"AlertRecord(id={self.id!r}, user_id={self.user_id}, "
+            f"symbol={self.symbol!r}, condition={self.condition!r}, "
+            f"target_price={self.target_price}, notified={self.notified}, "
+            f"expires_at={self.expires_at})"
+        )
+
@@ -0,0 +1,359 @@
+"""監控清單版本模組 - 寫入時複製（copy-on-write）的不可變監控視圖"""
+from operator import attrgetter
+from typing import Dict, FrozenSet, Iterable, Iterator, Mapping, Optional, Tuple
+
+from .alert_record import AlertRecord
+from .bands import BAND_CONDITIONS, BandIndex
+from .subscriptions import SubscriptionIndex, build_subscriptions, with_changes
+from .trailing import TRAILING_CONDITIONS
+
+_EMPTY: Tuple[AlertRecord, ...] = ()
+_get_id = attrgetter("id")
+
+
+class AlertView:
+    """
+    某一版本的監控清單（不可變）
+
+    讀取端取得視圖後不需加鎖即可查詢，視圖內容永遠不會改變；寫入端透過
+    added/removed/replaced 產生新版本，再以單一屬性指派原子地發布。
+    ID、用戶、股票、區間端點、共用門檻與移動停損索引在第一次查詢時建立，已建立的
+    索引在產生新版本時以增量方式複製，避免每次異動後重新掃描整份清單。
+
+    視圖中的記錄同樣視為不可變，變更記錄必須使用 AlertRecord.replace。
+    由上一版本產生的視圖會在 changes 中記錄這次的差異，讓需要同步副本的呼叫端
+    （例如分片評估）不必比對整份清單。
+    """
+
+    __slots__ = (
+        "version", "alerts", "changes", "_by_id", "_by_user", "_symbols", "_bands",
+        "_subscriptions", "_trailing",
+    )
+
+    def __init__(
+        self,
+        version: int,
+        alerts: Tuple[AlertRecord, ...],
+        by_id: Optional[Dict[str, AlertRecord]] = None,
+        by_user: Optional[Dict[int, Tuple[AlertRecord, ...]]] = None,
+        symbols: Optional[FrozenSet[str]] = None,
+        bands: Optional[Dict[str, BandIndex]] = None,
+        changes: Optional[Tuple[Tuple[AlertRecord, ...], Tuple[AlertRecord, ...]]] = None,
+        subscriptions: Optional[SubscriptionIndex] = None,
+        trailing: Optional[Dict[str, Tuple[str, ...]]] = None
+    ):
+        """
+        初始化監控視圖
+
+        Args:
+            version: 版本編號（每次發布遞增）
+            alerts: 監控記錄
+            by_id: 已建立的 ID 索引（選用）
+            by_user: 已建立的用戶索引（選用）
+            symbols: 已建立的啟用股票集合（選用）
+            bands: 已建立的區間端點索引（選用）
+            changes: 與上一版本的差異 (新增或取代的記錄, 移除的記錄)，None 表示未知
+            subscriptions: 已建立的共用門檻索引（選用）
+            trailing: 已建立的移動停損監控 ID（選用）
+        """
+        self.version = version
+        self.alerts = tuple(alerts)
+        self.changes = changes
+        self._by_id = by_id
+        self._by_user = by_user
+        self._symbols = symbols
+        self._bands = bands
+        self._subscriptions = subscriptions
+        self._trailing = trailing
+
+    def __len__(self) -> int:
+        return len(self.alerts)
+
+    def __iter__(self) -> Iterator[AlertRecord]:
+        return iter(self.alerts)
+
+    # 延遲索引：建立完成後才指派，並行建立時結果相同，不需加鎖
+
+    @property
+    def by_id(self) -> Mapping[str, AlertRecord]:
+        """ID 索引（唯讀）"""
+        index = self._by_id
+        if index is None:
+            index = {alert.id: alert for alert in self.alerts}
+            self._by_id = index
+        return index
+
+    @property
+    def by_user(self) -> Mapping[int, Tuple[AlertRecord, ...]]:
+        """用戶索引（唯讀）"""
+        index = self._by_user
+        if index is None:
+            grouped: Dict[int, list] = {}
+            for alert in self.alerts:
+                grouped.setdefault(alert.user_id, []).append(alert)
+            index = {user_id: tuple(alerts) for user_id, alerts in grouped.items()}
+            self._by_user = index
+        return index
+
+    @property
+    def symbols(self) -> FrozenSet[str]:
+        """啟用中的股票代碼"""
+        symbols = self._symbols
+        if symbols is None:
+            symbols = frozenset(alert.symbol for alert in self.alerts if alert.enabled)
+            self._symbols = symbols
+        return symbols
+
+    @property
+    def bands(self) -> Mapping[str, BandIndex]:
+        """啟用中區間監控的端點索引 {symbol: BandIndex}"""
+        index = self._bands
+        if index is None:
+            grouped: Dict[str, list] = {}
+            for alert in self.alerts:
+                if alert.enabled and alert.condition in BAND_CONDITIONS:
+                    grouped.setdefault(alert.symbol, []).append(alert)
+            index = {
+                symbol: BandIndex.from_alerts(alerts) for symbol, alerts in grouped.items()
+            }
+            self._bands = index
+        return index
+
+    @property
+    def subscriptions(self) -> SubscriptionIndex:
+        """啟用中可共用評估的監控：{股票: {(condition, target_price): 訂閱者}}"""
+        index = self._subscriptions
+        if index is None:
+            index = build_subscriptions(self.alerts)
+            self._subscriptions = index
+        return index
+
+    @property
+    def trailing(self) -> Mapping[str, Tuple[str, ...]]:
+        """啟用中移動停損監控的 ID，依股票分組（各自保存最高價，逐筆評估）"""
+        index = self._trailing
+        if index is None:
+            grouped: Dict[str, list] = {}
+            for alert in self.alerts:
+                if _is_trailing(alert):
+                    grouped.setdefault(alert.symbol, []).append(alert.id)
+            index = {symbol: tuple(ids) for symbol, ids in grouped.items()}
+            self._trailing = index
+        return index
+
+    def get(self, alert_id: str) -> Optional[AlertRecord]:
+        """根據 ID 取得監控"""
+        return self.by_id.get(alert_id)
+
+    def for_user(self, user_id: int) -> Tuple[AlertRecord, ...]:
+        """取得用戶的所有監控（含停用）"""
+        return self.by_user.get(user_id, _EMPTY)
+
+    def added(self, alert: AlertRecord) -> "AlertView":
+        """
+        產生新增一筆監控後的新版本
+
+        Args:
+            alert: 新監控
+
+        Returns:
+            新版本視圖
+        """
+        return self.extended((alert,))
+
+    def extended(self, new_alerts: Iterable[AlertRecord]) -> "AlertView":
+        """
+        產生新增多筆監控後的新版本（整批只複製一次）
+
+        Args:
+            new_alerts: 新監控
+
+        Returns:
+            新版本視圖（沒有新監控時返回自己）
+        """
+        new_alerts = tuple(new_alerts)
+        if not new_alerts:
+            return self
+
+        by_id = by_user = symbols = bands = None
+        if self._by_id is not None:
+            by_id = dict(self._by_id)
+            by_id.update((alert.id, alert) for alert in new_alerts)
+        if self._by_user is not None:
+            by_user = dict(self._by_user)
+            for alert in new_alerts:
+                by_user[alert.user_id] = by_user.get(alert.user_id, _EMPTY) + (alert,)
+        if self._symbols is not None:
+            symbols = self._symbols.union(alert.symbol for alert in new_alerts if alert.enabled)
+        if self._bands is not None:
+            bands = dict(self._bands)
+            grouped: Dict[str, list] = {}
+            for alert in new_alerts:
+                if alert.enabled and alert.condition in BAND_CONDITIONS:
+                    grouped.setdefault(alert.symbol, []).append(alert)
+            for symbol, alerts in grouped.items():
+                index = bands.get(symbol)
+                bands[symbol] = (
+                    BandIndex.from_alerts(alerts) if index is None else index.with_alerts(alerts)
+                )
+        subscriptions = trailing = None
+        if self._subscriptions is not None:
+            subscriptions = with_changes(
+                self._subscriptions, ((None, alert) for alert in new_alerts)
+            )
+        if self._trailing is not None:
+            trailing = self._trailing
+            for alert in new_alerts:
+                if _is_trailing(alert):
+                    if trailing is self._trailing:
+                        trailing = dict(trailing)
+                    trailing[alert.symbol] = trailing.get(alert.symbol, ()) + (alert.id,)
+        return AlertView(
+            self.version + 1, self.alerts + new_alerts, by_id, by_user, symbols, bands,
+            (new_alerts, _EMPTY), subscriptions, trailing
+        )
+
+    def removed(self, alert_ids: Iterable[str]) -> "AlertView":
+        """
+        產生移除指定監控後的新版本
+
+        Args:
+            alert_ids: 要移除的監控 ID
+
+        Returns:
+            新版本視圖（沒有符合的監控時返回自己）
+        """
+        targets = [self.by_id[alert_id] for alert_id in set(alert_ids) if alert_id in self.by_id]
+        if not targets:
+            return self
+
+        removed_ids = {alert.id for alert in targets}
+        alerts = tuple(alert for alert in self.alerts if alert.id not in removed_ids)
+
+        by_id = dict(self.by_id)
+        for alert_id in removed_ids:
+            del by_id[alert_id]
+
+        by_user = None
+        if self._by_user is not None:
+            by_user = dict(self._by_user)
+            for user_id in {alert.user_id for alert in targets}:
+                remaining = tuple(
+                    alert for alert in by_user[user_id] if alert.id not in removed_ids
+                )
+                if remaining:
+                    by_user[user_id] = remaining
+                else:
+                    del by_user[user_id]
+
+        bands = None
+        if self._bands is not None:
+            bands = dict(self._bands)
+            for symbol in {alert.symbol for alert in targets if alert.symbol in bands}:
+                index = bands[symbol].without(removed_ids)
+                if index is None:
+                    del bands[symbol]
+                else:
+                    bands[symbol] = index
+
+        subscriptions = trailing = None
+        if self._subscriptions is not None:
+            subscriptions = with_changes(
+                self._subscriptions, ((alert, None) for alert in targets)
+            )
+        if self._trailing is not None:
+            trailing = self._trailing
+            symbols = {alert.symbol for alert in targets if _is_trailing(alert)}
+            if symbols:
+                trailing = dict(trailing)
+                for symbol in symbols:
+                    remaining = tuple(
+                        alert_id for alert_id in trailing[symbol] if alert_id not in removed_ids
+                    )
+                    if remaining:
+                        trailing[symbol] = remaining
+                    else:
+                        del trailing[symbol]
+
+        # 股票集合在下次查詢時重建（同一股票可能仍有其他監控）
+        return AlertView(
+            self.version + 1, alerts, by_id, by_user, None, bands, (_EMPTY, tuple(targets)),
+            subscriptions, trailing
+        )
+
+    def replaced(self, updates: Mapping[str, AlertRecord]) -> "AlertView":
+        """
+        產生以新記錄取代指定監控後的新版本
+
+        Args:
+            updates: {監控 ID: 新記錄}，不存在的 ID 會被忽略（可能已被移除）
+
+        Returns:
+            新版本視圖（沒有符合的監控時返回自己）
+        """
+        by_id = self.by_id
+        updates = {
+            alert_id: record for alert_id, record in updates.items()
+            if alert_id in by_id
+        }
+        if not updates:
+            return self
+
+        # 以 C 層級的 map 重建清單：updates.get(id, 原記錄)
+        alerts = tuple(map(updates.get, map(_get_id, self.alerts), self.alerts))
+
+        new_by_id = dict(by_id)
+        new_by_id.update(updates)
+
+        by_user = None
+        if self._by_user is not None:
+            by_user = dict(self._by_user)
+            for user_id in {record.user_id for record in updates.values()}:
+                by_user[user_id] = tuple(
+                    updates.get(alert.id, alert) for alert in by_user[user_id]
+                )
+
+        symbols = self._symbols
+        if symbols is not None and any(
+            by_id[alert_id].enabled != record.enabled
+            for alert_id, record in updates.items()
+        ):
+            symbols = None
+
+        # 區間索引只記錄門檻與 ID，只變更通知狀態時可直接共用
+        bands = self._bands
+        if bands is not None and any(
+            (record.condition in BAND_CONDITIONS or by_id[alert_id].condition in BAND_CONDITIONS)
+            and _band_key(by_id[alert_id]) != _band_key(record)
+            for alert_id, record in updates.items()
+        ):
+            bands = None
+
+        # 共用門檻只重建門檻或通知狀態改變的分組
+        subscriptions = self._subscriptions
+        if subscriptions is not None:
+            subscriptions = with_changes(
+                subscriptions,
+                ((by_id[alert_id], record) for alert_id, record in updates.items())
+            )
+
+        trailing = self._trailing
+        if trailing is not None and any(
+            _is_trailing(by_id[alert_id]) != _is_trailing(record)
+            for alert_id, record in updates.items()
+        ):
+            trailing = None
+        return AlertView(
+            self.version + 1, alerts, new_by_id, by_user, symbols, bands,
+            (tuple(updates.values()), _EMPTY), subscriptions, trailing
+        )
+
+
+def _is_trailing(alert: AlertRecord) -> bool:
+    """是否為啟用中的移動停損監控"""
+    return alert.enabled and alert.condition in TRAILING_CONDITIONS
+
+
+def _band_key(alert: AlertRecord) -> Tuple:
+    """影響區間索引的欄位"""
+    return (alert.enabled, alert.symbol, alert.condition, alert.target_price, alert.upper_price)
@@ -0,0 +1,162 @@
+"""價格區間模組 - 通知緩衝區、between/outside 條件與排序端點索引"""
+from bisect import bisect_left, bisect_right
+from typing import FrozenSet, Iterable, List, Optional, Tuple
+
+# 定義緩衝區比例常數
+BUFFER_PERCENTAGE = 0.02  # 2% 緩衝區
+MIN_BUFFER_VALUE = 0.5  # 最小緩衝值
+
+# 區間條件：between 進入區間時通知、outside 離開區間時通知
+BETWEEN = "between"
+OUTSIDE = "outside"
+BAND_CONDITIONS = frozenset({BETWEEN, OUTSIDE})
+
+
+def price_buffer(price: float) -> float:
+    """重置通知標記所需的緩衝距離（目標價格的 2%，至少 0.5）"""
+    return max(abs(price) * BUFFER_PERCENTAGE, MIN_BUFFER_VALUE)
+
+
+def _inner_band(lower: float, upper: float) -> Tuple[float, float]:
+    """outside 重置所需回到的內側區間（區間太窄時使用整個區間）"""
+    inner_lower = lower + price_buffer(lower)
+    inner_upper = upper - price_buffer(upper)
+    if inner_lower >= inner_upper:
+        return lower, upper
+    return inner_lower, inner_upper
+
+
+def band_thresholds(condition: str, lower: float, upper: float) -> Tuple[float, ...]:
+    """
+    區間監控狀態可能改變的所有價格門檻
+
+    價格在兩次檢查之間沒有越過任何門檻時，監控的觸發與重置結果都不會改變。
+
+    Args:
+        condition: between 或 outside
+        lower: 區間下限
+        upper: 區間上限
+
+    Returns:
+        觸發門檻（區間兩端）與重置門檻（加上緩衝區）
+    """
+    if condition == BETWEEN:
+        return (lower - price_buffer(lower), lower, upper, upper + price_buffer(upper))
+    inner_lower, inner_upper = _inner_band(lower, upper)
+    return (lower, inner_lower, inner_upper, upper)
+
+
+def band_signals(
+    condition: str,
+    current_price: float,
+    lower: float,
+    upper: float
+) -> Tuple[bool, bool]:
+    """
+    評估區間條件
+
+    between 在價格進入 [lower, upper] 時觸發，離開區間超過緩衝區後重置；
+    outside 在價格離開區間時觸發，回到區間內且距離兩端超過緩衝區後重置。
+
+    Args:
+        condition: between 或 outside
+        current_price: 當前價格
+        lower: 區間下限
+        upper: 區間上限
+
+    Returns:
+        (是否觸發, 是否應重置通知標記)
+    """
+    inside = lower <= current_price <= upper
+    if condition == BETWEEN:
+        reset = (
+            current_price < lower - price_buffer(lower) or
+            current_price > upper + price_buffer(upper)
+        )
+        return inside, reset
+    inner_lower, inner_upper = _inner_band(lower, upper)
+    return not inside, inner_lower < current_price < inner_upper
+
+
+class BandIndex:
+    """
+    單一股票的區間端點索引（不可變，可在監控視圖的版本之間共用）
+
+    以排序陣列保存每個區間監控的所有門檻；價格由 a 變為 b 時，只有門檻落在
+    [min(a, b), max(a, b)] 內的監控狀態可能改變，以二分搜尋在 O(log n + k)
+    內找出。
+    """
+
+    __slots__ = ("_keys", "_ids", "alert_ids")
+
+    def __init__(self, entries: Iterable[Tuple[float, str]] = ()):
+        """
+        初始化索引
+
+        Args:
+            entries: (門檻, 監控 ID)，不需排序
+        """
+        ordered = sorted(entries)
+        self._keys: List[float] = [key for key, _ in ordered]
+        self._ids: List[str] = [alert_id for _, alert_id in ordered]
+        self.alert_ids: FrozenSet[str] = frozenset(self._ids)
+
+    @staticmethod
+    def entries_for(alert) -> List[Tuple[float, str]]:
+        """監控的所有 (門檻, 監控 ID)"""
+        return [
+            (threshold, alert.id)
+            for threshold in band_thresholds(alert.condition, alert.target_price, alert.upper_price)
+        ]
+
+    @classmethod
+    def from_alerts(cls, alerts: Iterable) -> "BandIndex":
+        """由區間監控建立索引"""
+        return cls(entry for alert in alerts for entry in cls.entries_for(alert))
+
+    def __len__(self) -> int:
+        return len(self.alert_ids)
+
+    def with_alerts(self, alerts: Iterable) -> "BandIndex":
+        """加入區間監控後的新索引"""
+        entries = list(zip(self._keys, self._ids))
+        entries.extend(entry for alert in alerts for entry in self.entries_for(alert))
+        return BandIndex(entries)
+
+    def without(self, alert_ids: Iterable[str]) -> Optional["BandIndex"]:
+        """
+        移除指定監控後的新索引
+
+        Returns:
+            新索引（沒有符合的監控時返回自己，移除後為空時返回 None）
+        """
+        removed = self.alert_ids.intersection(alert_ids)
+        if not removed:
+            return self
+        if len(removed) == len(self.alert_ids):
+            return None
+        return BandIndex(
+            (key, alert_id) for key, alert_id in zip(self._keys, self._ids)
+            if alert_id not in removed
+        )
+
+    def crossed(self, previous_price: float, current_price: float) -> FrozenSet[str]:
+        """
+        價格變動時狀態可能改變的監控
+
+        Args:
+            previous_price: 上次評估時的價格
+            current_price: 當前價格
+
+        Returns:
+            門檻落在兩個價格之間（含端點）的監控 ID
+        """
+        low, high = sorted((previous_price, current_price))
+        start = bisect_left(self._keys, low)
+        end = bisect_right(self._keys, high)
+        return frozenset(self._ids[start:end])
+
+    def distance(self, price: float) -> float:
+        """價格到最近一個門檻的距離（O(log n)）"""
+        position = bisect_left(self._keys, price)
+        return min(abs(price - key) for key in self._keys[max(0, position - 1):position + 1])
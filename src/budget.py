@@ -0,0 +1,133 @@
+"""檢查週期預算模組 - 限制每個週期的查詢時間與請求數，並決定股票的查詢順序"""
+import threading
+import time
+from typing import Callable, Collection, Dict, List, Mapping, Optional, Sequence
+
+# 相對距離小於此值的股票視為即將觸發，優先於上個週期延後的股票
+AT_RISK_DISTANCE = 0.01
+
+# 比較距離時的分級寬度，同一級內再依訂閱數與報價新舊排序
+DISTANCE_BUCKET = 0.005
+
+
+class CycleBudget:
+    """
+    一個檢查週期的查詢預算
+
+    begin() 開始新週期後，查詢執行緒在每次請求前呼叫 take()；時間用完或
+    請求數達上限時返回 False，剩下的股票留到下個週期。
+    """
+
+    def __init__(
+        self,
+        seconds: Optional[float] = None,
+        requests: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        初始化週期預算
+
+        Args:
+            seconds: 每個週期的查詢時間上限（秒），None 表示不限制
+            requests: 每個週期的請求數上限，None 表示不限制
+            clock: 單調時鐘
+        """
+        if seconds is not None and seconds <= 0:
+            raise ValueError("週期時間預算必須大於 0")
+        if requests is not None and requests <= 0:
+            raise ValueError("週期請求預算必須大於 0")
+        self.seconds = seconds
+        self.requests = requests
+        self._clock = clock
+        self._deadline: Optional[float] = None
+        self._used = 0
+        self._exhausted: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def used(self) -> int:
+        """本週期已使用的請求數"""
+        return self._used
+
+    @property
+    def exhausted(self) -> Optional[str]:
+        """預算用完的原因（"time" 或 "requests"），尚未用完時為 None"""
+        return self._exhausted
+
+    def begin(self):
+        """開始新週期"""
+        with self._lock:
+            self._deadline = None if self.seconds is None else self._clock() + self.seconds
+            self._used = 0
+            self._exhausted = None
+
+    def take(self) -> bool:
+        """
+        使用一個請求
+
+        Returns:
+            是否還有預算
+        """
+        with self._lock:
+            if self._exhausted is None:
+                if self.requests is not None and self._used >= self.requests:
+                    self._exhausted = "requests"
+                elif self._deadline is not None and self._clock() >= self._deadline:
+                    self._exhausted = "time"
+            if self._exhausted is not None:
+                return False
+            self._used += 1
+            return True
+
+
+def prioritize(
+    symbols: Sequence[str],
+    distances: Mapping[str, Optional[float]],
+    subscribers: Mapping[str, int],
+    quoted_at: Mapping[str, float],
+    carried: Collection[str] = ()
+) -> List[str]:
+    """
+    依觸發風險排序股票（預算不足時先查詢排在前面的股票）
+
+    順序：即將觸發（距離小於 AT_RISK_DISTANCE、距離未知或引用指標）→ 上個週期延後的
+    股票 → 其他；同一組內依距離分級、訂閱數多、報價舊的先查詢。
+
+    Args:
+        symbols: 要查詢的股票
+        distances: {股票: 到最近門檻的相對距離}，None 或缺少表示未知
+        subscribers: {股票: 啟用中的監控數量}
+        quoted_at: {股票: 上次成功查詢的時間}，缺少表示從未查詢
+        carried: 上個週期因預算不足而延後的股票
+
+    Returns:
+        排序後的股票列表
+    """
+    def key(symbol: str):
+        distance = distances.get(symbol)
+        if distance is None or distance < AT_RISK_DISTANCE:
+            group = 0
+        elif symbol in carried:
+            group = 1
+        else:
+            group = 2
+        bucket = 0 if distance is None else int(distance / DISTANCE_BUCKET)
+        return (group, bucket, -subscribers.get(symbol, 0), quoted_at.get(symbol, 0.0), symbol)
+
+    return sorted(symbols, key=key)
+
+
+def stalest_age(symbols: Collection[str], quoted_at: Dict[str, float], now: float) -> Optional[float]:
+    """
+    最舊報價的年齡
+
+    Args:
+        symbols: 監控中的股票
+        quoted_at: {股票: 上次成功查詢的時間}
+        now: 目前時間
+
+    Returns:
+        最舊報價距今的秒數，沒有任何報價時返回 None（從未查詢的股票不計入）
+    """
+    times = [quoted_at[symbol] for symbol in symbols if symbol in quoted_at]
+    return now - min(times) if times else None
@@ -0,0 +1,116 @@
+"""檢查點模組 - 定期保存最近報價與排程狀態，重啟後以熱快取繼續運行"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .utils import load_json, save_json
+
+# 檢查點格式版本（不相容的變更時遞增）
+CHECKPOINT_VERSION = 1
+
+# 超過此時間（秒）的檢查點不再恢復
+MAX_CHECKPOINT_AGE = 24 * 3600
+
+
+class CheckpointStore:
+    """
+    本機檢查點檔案
+
+    註冊的元件需提供 checkpoint_state()（返回可轉為 JSON 的字典）與
+    restore_checkpoint(state)。檔案以精簡 JSON 原子寫入，程序被強制終止時
+    只會留下完整的舊檔或新檔。
+    """
+
+    def __init__(
+        self,
+        file_path: str,
+        interval: float = 60.0,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        初始化檢查點
+
+        Args:
+            file_path: 檢查點檔案路徑
+            interval: maybe_save 的最短寫入間隔（秒）
+            clock: 時鐘（epoch 秒數）
+        """
+        self.file_path = file_path
+        self.interval = interval
+        self._clock = clock
+        self._components: List[Tuple[str, Any]] = []
+        self._last_saved: Optional[float] = None
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def register(self, name: str, component: Any):
+        """
+        註冊要保存狀態的元件
+
+        Args:
+            name: 元件在檔案中的名稱
+            component: 提供 checkpoint_state 與 restore_checkpoint 的物件
+        """
+        self._components.append((name, component))
+
+    def restore(self) -> bool:
+        """
+        由檔案恢復所有已註冊元件的狀態
+
+        Returns:
+            是否恢復（檔案不存在、版本不符或過舊時返回 False）
+        """
+        data = load_json(self.file_path)
+        if not data:
+            return False
+        if data.get("version") != CHECKPOINT_VERSION:
+            self.logger.warning(f"⚠️ 檢查點版本不符，略過: {self.file_path}")
+            return False
+        age = self._clock() - data.get("saved_at", 0)
+        if age > MAX_CHECKPOINT_AGE:
+            self.logger.info(f"檢查點已過期（{age / 3600:.1f} 小時前），略過")
+            return False
+
+        states = data.get("components", {})
+        for name, component in self._components:
+            if name in states:
+                try:
+                    component.restore_checkpoint(states[name])
+                except Exception as e:
+                    self.logger.error(f"❌ 恢復檢查點失敗 ({name}): {e}", exc_info=True)
+        self._last_saved = data["saved_at"]
+        self.logger.info(f"已恢復 {age:.0f} 秒前的檢查點: {self.file_path}")
+        return True
+
+    def maybe_save(self) -> bool:
+        """距離上次寫入超過間隔時寫入檢查點，返回是否寫入"""
+        last_saved = self._last_saved
+        if last_saved is not None and self._clock() - last_saved < self.interval:
+            return False
+        return self.save()
+
+    def save(self) -> bool:
+        """
+        立即寫入檢查點
+
+        Returns:
+            是否寫入成功
+        """
+        with self._lock:
+            now = self._clock()
+            states: Dict[str, Any] = {}
+            for name, component in self._components:
+                try:
+                    states[name] = component.checkpoint_state()
+                except Exception as e:
+                    self.logger.error(f"❌ 收集檢查點失敗 ({name}): {e}", exc_info=True)
+            saved = save_json(
+                self.file_path,
+                {"version": CHECKPOINT_VERSION, "saved_at": now, "components": states},
+                compact=True
+            )
+            if saved:
+                self._last_saved = now
+                self.logger.debug(f"已寫入檢查點: {self.file_path}")
+            return saved
@@ -0,0 +1,169 @@
+"""監控到期模組 - 到期時間解析與最小堆積排程"""
+import heapq
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+# 時間長度單位（秒）
+_DURATION_UNITS = {
+    "m": 60,
+    "h": 3600,
+    "d": 86400,
+    "w": 7 * 86400,
+}
+_DURATION_PATTERN = re.compile(r"^(\d+(?:\.\d+)?)([mhdw])$")
+
+# 「觸發後 N 天」的前綴，例如 trigger+3d
+TRIGGER_PREFIX = "trigger+"
+
+
+def parse_duration(text: str) -> float:
+    """
+    解析時間長度
+
+    Args:
+        text: 例如 30m、12h、7d、2w
+
+    Returns:
+        秒數
+
+    Raises:
+        ValueError: 格式錯誤或不大於 0
+    """
+    match = _DURATION_PATTERN.match(text.strip().lower())
+    if not match:
+        raise ValueError(f"無效的時間長度: {text}（例如 12h、7d、2w）")
+    seconds = float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+    if seconds <= 0:
+        raise ValueError(f"時間長度必須大於 0: {text}")
+    return seconds
+
+
+def parse_expiry(
+    text: str,
+    now: Optional[float] = None
+) -> Tuple[Optional[float], Optional[float]]:
+    """
+    解析監控到期設定
+
+    支援三種格式：
+        7d / 12h          從現在起算的時間長度
+        2026-12-31        指定日期（或 ISO 日期時間）
+        trigger+3d        觸發後經過指定時間到期
+
+    Args:
+        text: 到期設定
+        now: 目前時間（epoch 秒數），預設為 time.time()
+
+    Returns:
+        (expires_at, expire_after)，其中一個為 None
+
+    Raises:
+        ValueError: 格式錯誤或時間已過
+    """
+    now = time.time() if now is None else now
+    text = text.strip()
+
+    if text.lower().startswith(TRIGGER_PREFIX):
+        return None, parse_duration(text[len(TRIGGER_PREFIX):])
+
+    if _DURATION_PATTERN.match(text.lower()):
+        return now + parse_duration(text), None
+
+    try:
+        expires_at = datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        raise ValueError(
+            f"無效的到期設定: {text}（例如 7d、2026-12-31、trigger+3d）"
+        ) from None
+    if expires_at <= now:
+        raise ValueError(f"到期時間已過: {text}")
+    return expires_at, None
+
+
+class ExpiryQueue:
+    """
+    監控到期排程（最小堆積）
+
+    每個到期時間只在設定時推入一次；監控被移除或到期時間變更時不需從堆積中
+    刪除，過期的項目在到期時由呼叫端比對目前記錄後略過。因為每個項目都有
+    有限的到期時間，殘留項目最晚在原到期時間被取出，堆積不會無限成長。
+    """
+
+    def __init__(self, items: Iterable[Tuple[float, str]] = ()):
+        """
+        初始化到期排程
+
+        Args:
+            items: 初始項目 (expires_at, alert_id)，以 heapify 一次建立
+        """
+        self._heap: List[Tuple[float, str]] = list(items)
+        heapq.heapify(self._heap)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, alert_id: str, expires_at: float):
+        """排程監控到期時間"""
+        with self._lock:
+            heapq.heappush(self._heap, (expires_at, alert_id))
+
+    def next_expiry(self) -> Optional[float]:
+        """最早的到期時間（沒有項目時返回 None）"""
+        heap = self._heap
+        return heap[0][0] if heap else None
+
+    def pop_due(self, now: float) -> List[Tuple[float, str]]:
+        """
+        取出所有已到期的項目
+
+        Args:
+            now: 目前時間（epoch 秒數）
+
+        Returns:
+            [(expires_at, alert_id)]，成本為 O(到期數量 × log n)
+        """
+        due = []
+        with self._lock:
+            heap = self._heap
+            while heap and heap[0][0] <= now:
+                due.append(heapq.heappop(heap))
+        return due
+
+
+def format_duration(seconds: float) -> str:
+    """
+    將秒數格式化為 parse_duration 可解析的時間長度
+
+    Args:
+        seconds: 秒數
+
+    Returns:
+        例如 3d、12h（無法整除時以分鐘表示）
+    """
+    for unit in ("w", "d", "h", "m"):
+        size = _DURATION_UNITS[unit]
+        if seconds >= size and seconds % size == 0:
+            return f"{int(seconds // size)}{unit}"
+    return f"{seconds / 60:g}m"
+
+
+def format_expiry(expires_at: Optional[float], expire_after: Optional[float]) -> str:
+    """
+    將到期設定格式化為 parse_expiry 可解析的文字
+
+    Args:
+        expires_at: 到期時間（epoch 秒數）
+        expire_after: 觸發後多少秒到期
+
+    Returns:
+        ISO 日期時間、trigger+N 或空字串（不會到期）
+    """
+    if expires_at is not None:
+        return datetime.fromtimestamp(expires_at).isoformat(timespec="minutes")
+    if expire_after is not None:
+        return f"{TRIGGER_PREFIX}{format_duration(expire_after)}"
+    return ""
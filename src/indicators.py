@@ -0,0 +1,530 @@
+"""技術指標模組 - 每筆新樣本 O(1) 更新的增量指標與指標監控條件"""
+import math
+import re
+import threading
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Dict, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from .bands import BAND_CONDITIONS, BETWEEN, OUTSIDE
+from .trailing import TRAILING, TRAILING_CONDITIONS, TRAILING_PCT
+
+# 比較方式：above/below 為門檻，cross_above/cross_below 需由另一側穿越，
+# between/outside 為價格區間（見 bands 模組），trailing/trailing_pct 為移動停損
+# （見 trailing 模組）
+ABOVE = "above"
+BELOW = "below"
+CROSS_ABOVE = "cross_above"
+CROSS_BELOW = "cross_below"
+OPERATORS = (ABOVE, BELOW, CROSS_ABOVE, CROSS_BELOW, BETWEEN, OUTSIDE, TRAILING, TRAILING_PCT)
+
+# 只比較價格與目標價格的條件（檢查週期的快速路徑，不需指標狀態）
+THRESHOLD_CONDITIONS = frozenset({ABOVE, BELOW})
+
+# 只支援價格、不能加上指標的條件
+_PRICE_ONLY_CONDITIONS = BAND_CONDITIONS | TRAILING_CONDITIONS
+
+# 代表即時價格的指標名稱
+PRICE = "price"
+
+# 指標週期上限（以檢查次數計），避免單一指標佔用過多記憶體
+MAX_PERIOD = 500
+
+# 指標狀態連續多少個檢查週期沒有被讀取就釋放，以及檢查的間隔
+_IDLE_CYCLES = 288
+_PRUNE_INTERVAL = 64
+
+_INDICATOR_PATTERN = re.compile(r"^(sma|ema|rsi|change)[(_]?(\d+)\)?$")
+
+_OPERATOR_LABELS = {
+    ABOVE: "高於",
+    BELOW: "低於",
+    CROSS_ABOVE: "向上穿越",
+    CROSS_BELOW: "向下穿越",
+    BETWEEN: "介於",
+    OUTSIDE: "超出",
+    TRAILING: "從高點回落",
+    TRAILING_PCT: "從高點回落",
+}
+
+
+class Indicator:
+    """
+    增量指標的基底類別
+
+    每次 update 只處理一筆新樣本（O(1)），value 為最新值、previous 為上一筆
+    樣本時的值；樣本不足（暖機中）時為 None。
+    """
+
+    __slots__ = ("value", "previous", "cycle")
+
+    def __init__(self):
+        self.value: Optional[float] = None
+        self.previous: Optional[float] = None
+        self.cycle = -1  # 最後更新的檢查週期
+
+    def update(self, price: float) -> Optional[float]:
+        """加入一筆新樣本並返回最新值"""
+        self.previous = self.value
+        self.value = self._next(price)
+        return self.value
+
+    def _next(self, price: float) -> Optional[float]:
+        raise NotImplementedError
+
+
+class Price(Indicator):
+    """即時價格（保留上一筆以判斷穿越）"""
+
+    __slots__ = ()
+
+    def _next(self, price: float) -> Optional[float]:
+        return price
+
+
+class SMA(Indicator):
+    """簡單移動平均（滑動窗口 + 累計和）"""
+
+    __slots__ = ("period", "_window", "_sum", "_updates")
+
+    def __init__(self, period: int):
+        super().__init__()
+        self.period = period
+        self._window: deque = deque(maxlen=period)
+        self._sum = 0.0
+        self._updates = 0
+
+    def _next(self, price: float) -> Optional[float]:
+        window = self._window
+        if len(window) == self.period:
+            self._sum -= window[0]
+        window.append(price)
+        self._sum += price
+
+        # 每 period 筆重新加總一次，避免浮點誤差累積（攤銷後仍為 O(1)）
+        self._updates += 1
+        if self._updates >= self.period:
+            self._sum = math.fsum(window)
+            self._updates = 0
+
+        if len(window) < self.period:
+            return None
+        return self._sum / self.period
+
+
+class EMA(Indicator):
+    """指數移動平均（以前 period 筆的 SMA 作為起始值）"""
+
+    __slots__ = ("period", "_alpha", "_count", "_sum", "_ema")
+
+    def __init__(self, period: int):
+        super().__init__()
+        self.period = period
+        self._alpha = 2.0 / (period + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._ema: Optional[float] = None
+
+    def _next(self, price: float) -> Optional[float]:
+        if self._ema is None:
+            self._count += 1
+            self._sum += price
+            if self._count < self.period:
+                return None
+            self._ema = self._sum / self.period
+        else:
+            self._ema += self._alpha * (price - self._ema)
+        return self._ema
+
+
+class RSI(Indicator):
+    """相對強弱指標（Wilder 平滑）"""
+
+    __slots__ = ("period", "_last", "_count", "_gain", "_loss")
+
+    def __init__(self, period: int):
+        super().__init__()
+        self.period = period
+        self._last: Optional[float] = None
+        self._count = 0
+        self._gain = 0.0
+        self._loss = 0.0
+
+    def _next(self, price: float) -> Optional[float]:
+        last = self._last
+        self._last = price
+        if last is None:
+            return None
+
+        change = price - last
+        gain = change if change > 0 else 0.0
+        loss = -change if change < 0 else 0.0
+        period = self.period
+
+        if self._count < period:
+            # 暖機：前 period 筆變動取平均
+            self._gain += gain
+            self._loss += loss
+            self._count += 1
+            if self._count < period:
+                return None
+            self._gain /= period
+            self._loss /= period
+        else:
+            self._gain = (self._gain * (period - 1) + gain) / period
+            self._loss = (self._loss * (period - 1) + loss) / period
+
+        if self._loss == 0:
+            return 100.0 if self._gain > 0 else 50.0
+        return 100.0 - 100.0 / (1.0 + self._gain / self._loss)
+
+
+class Change(Indicator):
+    """最近 period 次檢查的漲跌幅（%）"""
+
+    __slots__ = ("period", "_window")
+
+    def __init__(self, period: int):
+        super().__init__()
+        self.period = period
+        self._window: deque = deque(maxlen=period + 1)
+
+    def _next(self, price: float) -> Optional[float]:
+        window = self._window
+        window.append(price)
+        if len(window) <= self.period or window[0] == 0:
+            return None
+        return (price - window[0]) / window[0] * 100.0
+
+
+_INDICATOR_TYPES = {
+    "sma": SMA,
+    "ema": EMA,
+    "rsi": RSI,
+    "change": Change,
+}
+
+
+def normalize_indicator(text: str) -> str:
+    """
+    將指標寫法轉換為標準格式
+
+    Args:
+        text: 例如 price、SMA(20)、sma20、rsi_14
+
+    Returns:
+        標準格式，例如 price、sma(20)
+
+    Raises:
+        ValueError: 不支援的指標或週期超出範圍
+    """
+    text = text.strip().lower()
+    if text == PRICE:
+        return PRICE
+    match = _INDICATOR_PATTERN.match(text)
+    if not match:
+        raise ValueError(
+            f"無效的指標: {text}（可用 price、sma(N)、ema(N)、rsi(N)、change(N)）"
+        )
+    period = int(match.group(2))
+    if not 1 <= period <= MAX_PERIOD:
+        raise ValueError(f"指標週期必須介於 1 到 {MAX_PERIOD}: {text}")
+    return f"{match.group(1)}({period})"
+
+
+def create_indicator(spec: str) -> Indicator:
+    """依標準格式的指標名稱建立指標狀態"""
+    if spec == PRICE:
+        return Price()
+    name, _, period = spec.partition("(")
+    return _INDICATOR_TYPES[name](int(period.rstrip(")")))
+
+
+class Condition(NamedTuple):
+    """解析後的監控條件：<指標> <比較方式> <指標或目標價格>"""
+
+    indicator: str
+    operator: str
+    reference: Optional[str]  # 比較的指標，None 表示與目標價格比較
+
+    @property
+    def text(self) -> str:
+        """標準格式（價格指標省略），即儲存在 condition 欄位的文字"""
+        parts = [self.operator]
+        if self.indicator != PRICE:
+            parts.insert(0, self.indicator)
+        if self.reference is not None:
+            parts.append(self.reference)
+        return " ".join(parts)
+
+    @property
+    def direction(self) -> str:
+        """門檻方向（above 或 below）"""
+        return ABOVE if self.operator in (ABOVE, CROSS_ABOVE) else BELOW
+
+    @property
+    def is_cross(self) -> bool:
+        """是否為穿越條件"""
+        return self.operator in (CROSS_ABOVE, CROSS_BELOW)
+
+
+@lru_cache(maxsize=1024)
+def parse_condition(text: str) -> Condition:
+    """
+    解析 condition 欄位（結果會快取，相同條件只解析一次）
+
+    格式為 [指標] <above|below|cross_above|cross_below> [比較指標]，或只比較價格
+    的 between/outside/trailing/trailing_pct，例如：
+        above、rsi(14) above、cross_above sma(20)、ema(12) cross_above ema(26)、between
+
+    Args:
+        text: 條件文字
+
+    Returns:
+        解析後的條件
+
+    Raises:
+        ValueError: 格式錯誤
+    """
+    tokens = text.lower().split()
+    position = next((i for i, token in enumerate(tokens[:2]) if token in OPERATORS), None)
+    if position is None or len(tokens) > position + 2:
+        raise ValueError(
+            f"無效的條件: {text}，必須是 {'、'.join(OPERATORS)}（可加上指標）"
+        )
+
+    indicator = normalize_indicator(tokens[0]) if position == 1 else PRICE
+    reference = normalize_indicator(tokens[-1]) if len(tokens) == position + 2 else None
+    if reference == indicator:
+        raise ValueError(f"無效的條件: {text}，比較的兩個指標相同")
+    if tokens[position] in _PRICE_ONLY_CONDITIONS and (indicator != PRICE or reference is not None):
+        raise ValueError(f"無效的條件: {text}，區間與移動停損條件只支援價格")
+    return Condition(indicator, tokens[position], reference)
+
+
+def parse_alert_condition(
+    tokens: Sequence[str]
+) -> Tuple[str, float, Optional[float], List[str]]:
+    """
+    解析指令或匯入行中的「[指標] 條件 目標」
+
+    目標可以是數字（目標價格或指標門檻）、另一個指標，或區間條件的上下限，例如：
+        above 600
+        rsi(14) above 70
+        cross_above sma(20)
+        ema(12) cross_below ema(26)
+        change(12) below -5
+        between 140 160
+        trailing 5%（從最高價回落 5%）、trailing 3（從最高價回落 3 點）
+
+    Args:
+        tokens: 股票代碼之後的欄位
+
+    Returns:
+        (標準格式條件, 目標價格, 區間上限, 剩餘欄位)；與指標比較時目標價格為 0，
+        非區間條件的區間上限為 None
+
+    Raises:
+        ValueError: 格式錯誤
+    """
+    tokens = list(tokens)
+    lowered = [token.lower() for token in tokens[:2]]
+    if lowered[:1] and lowered[0] in OPERATORS:
+        position = 0
+    elif len(lowered) == 2 and lowered[1] in OPERATORS:
+        position = 1
+    else:
+        raise ValueError(f"條件必須是 {'、'.join(OPERATORS)}（可在前面加上指標）")
+
+    if len(tokens) <= position + 1:
+        raise ValueError("缺少目標價格或比較指標")
+    target = tokens[position + 1]
+
+    if lowered[position] in BAND_CONDITIONS:
+        condition = parse_condition(" ".join(tokens[:position + 1]))
+        if len(tokens) <= position + 2:
+            raise ValueError("區間條件需要下限與上限，例如 between 140 160")
+        try:
+            lower, upper = float(target), float(tokens[position + 2])
+        except ValueError:
+            raise ValueError("區間上下限必須是數字") from None
+        if not (0 < lower < upper < math.inf):
+            raise ValueError("區間上限必須大於下限，且兩者都大於 0")
+        return condition.text, lower, upper, tokens[position + 3:]
+
+    if lowered[position] in TRAILING_CONDITIONS:
+        parse_condition(" ".join(tokens[:position + 1]))
+        operator = TRAILING_PCT if target.endswith("%") else lowered[position]
+        try:
+            distance = float(target.rstrip("%"))
+        except ValueError:
+            raise ValueError("回落幅度必須是數字，例如 trailing 5% 或 trailing 3") from None
+        if not (0 < distance < math.inf) or (operator == TRAILING_PCT and distance >= 100):
+            raise ValueError("回落幅度必須大於 0（百分比必須小於 100%）")
+        return operator, distance, None, tokens[position + 2:]
+
+    try:
+        target_price = float(target)
+        reference = None
+    except ValueError:
+        reference = target
+        target_price = 0.0
+
+    condition_tokens = tokens[:position + 1] + ([reference] if reference else [])
+    condition = parse_condition(" ".join(condition_tokens))
+
+    if reference is None:
+        if not math.isfinite(target_price):
+            raise ValueError("目標價格必須是數字")
+        if condition.indicator == PRICE and not target_price > 0:
+            raise ValueError("目標價格必須大於 0")
+
+    return condition.text, target_price, None, tokens[position + 2:]
+
+
+def split_condition(
+    condition: str,
+    target_price: float,
+    upper_price: Optional[float] = None
+) -> Tuple[str, str]:
+    """
+    將監控條件拆成匯出用的「條件」與「目標」欄位（parse_alert_condition 的反向）
+
+    Args:
+        condition: condition 欄位
+        target_price: 目標價格
+        upper_price: 區間上限（區間條件）
+
+    Returns:
+        (條件欄位, 目標欄位)；區間條件的目標欄位為以空白分隔的上下限
+    """
+    parsed = parse_condition(condition)
+    if parsed.operator in BAND_CONDITIONS:
+        return condition, f"{float(target_price)} {float(upper_price)}"
+    if parsed.operator == TRAILING_PCT:
+        return TRAILING, f"{float(target_price)}%"
+    if parsed.reference is None:
+        return condition, str(float(target_price))
+    return parsed._replace(reference=None).text, parsed.reference
+
+
+def indicator_label(spec: str) -> str:
+    """指標的顯示名稱"""
+    if spec == PRICE:
+        return "價格"
+    name, _, period = spec.partition("(")
+    if name == "change":
+        return f"漲跌幅({period.rstrip(')')} 次)"
+    return f"{name.upper()}({period}"
+
+
+def describe_condition(
+    condition: str,
+    target_price: float,
+    format_target: Optional[Callable[[float], str]] = None,
+    upper_price: Optional[float] = None
+) -> str:
+    """
+    監控條件的顯示文字
+
+    Args:
+        condition: condition 欄位
+        target_price: 目標價格
+        format_target: 格式化價格目標的函數（例如加上幣別），預設為 str
+        upper_price: 區間上限（區間條件）
+
+    Returns:
+        例如「價格 高於 $ 150.00」、「RSI(14) 高於 70」、「價格 向上穿越 SMA(20)」、
+        「價格 介於 140.0 ~ 160.0」、「價格 從高點回落 5%」
+    """
+    parsed = parse_condition(condition)
+    format_target = format_target or str
+    if parsed.operator in BAND_CONDITIONS:
+        target = f"{format_target(target_price)} ~ {format_target(upper_price)}"
+    elif parsed.operator == TRAILING_PCT:
+        target = f"{target_price:g}%"
+    elif parsed.reference is not None:
+        target = indicator_label(parsed.reference)
+    elif parsed.indicator == PRICE:
+        target = format_target(target_price)
+    elif parsed.indicator.startswith("change"):
+        target = f"{target_price:g}%"
+    else:
+        target = f"{target_price:g}"
+    return f"{indicator_label(parsed.indicator)} {_OPERATOR_LABELS[parsed.operator]} {target}"
+
+
+class IndicatorEngine:
+    """
+    共用的指標狀態
+
+    每個 (股票, 指標) 只保留一份狀態，所有引用相同指標的監控共用同一份計算。
+    狀態在檢查週期中第一次被讀取時以該週期的價格更新一次（O(1)），之後同一
+    週期的讀取直接取用結果；沒有監控引用的指標不會被計算，長時間未被讀取的
+    狀態會被釋放。
+    """
+
+    def __init__(self, idle_cycles: int = _IDLE_CYCLES):
+        """
+        初始化指標引擎
+
+        Args:
+            idle_cycles: 狀態連續多少個檢查週期未被讀取就釋放
+        """
+        self.idle_cycles = idle_cycles
+        self._states: Dict[Tuple[str, str], Indicator] = {}
+        self._prices: Mapping[str, float] = {}
+        self._cycle = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    @contextmanager
+    def cycle(self, prices: Mapping[str, float]) -> Iterator["IndicatorEngine"]:
+        """
+        開始一個檢查週期（同一時間只有一個週期，read 只能在週期內呼叫）
+
+        Args:
+            prices: 本週期的價格 {symbol: price}
+        """
+        with self._lock:
+            self._cycle += 1
+            self._prices = prices
+            if self._cycle % _PRUNE_INTERVAL == 0:
+                self._prune()
+            try:
+                yield self
+            finally:
+                self._prices = {}
+
+    def read(self, symbol: str, spec: str) -> Tuple[Optional[float], Optional[float]]:
+        """
+        讀取指標（本週期第一次讀取時以本週期的價格更新）
+
+        Args:
+            symbol: 股票代碼
+            spec: 標準格式的指標名稱
+
+        Returns:
+            (上一筆樣本時的值, 最新值)；暖機中或本週期沒有價格時為 None
+        """
+        key = (symbol, spec)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = create_indicator(spec)
+        if state.cycle != self._cycle:
+            price = self._prices.get(symbol)
+            if price is None:
+                return None, None
+            state.update(price)
+            state.cycle = self._cycle
+        return state.previous, state.value
+
+    def _prune(self):
+        """釋放長時間未被讀取的指標狀態"""
+        oldest = self._cycle - self.idle_cycles
+        stale = [key for key, state in self._states.items() if state.cycle < oldest]
+        for key in stale:
+            del self._states[key]
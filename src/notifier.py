@@ -0,0 +1,269 @@
+"""通知佇列模組 - 依 Telegram 速率限制排程對外訊息"""
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional
+
+from telegram.error import NetworkError, RetryAfter
+
+from .utils import percentile
+
+# Telegram 建議的上限：全域約每秒 30 則、同一聊天約每秒 1 則
+GLOBAL_RATE = 30.0
+CHAT_INTERVAL = 1.0
+
+# 優先順序（數字越小越先送）
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+
+# 同時等待發送的工作協程數量
+DEFAULT_WORKERS = 8
+
+# 延遲統計保留的樣本數
+LATENCY_SAMPLES = 1024
+
+# 超過此深度時記錄警告
+DEPTH_WARNING = 1000
+
+# 聊天發送時段表超過此大小時清除已過期的項目
+CHAT_PRUNE_SIZE = 10000
+
+
+class TokenBucket:
+    """預約式權杖桶：每次取用立即扣除權杖，返回需要等待的秒數"""
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        初始化權杖桶
+
+        Args:
+            rate: 每秒補充的權杖數量
+            capacity: 最大累積權杖（允許的瞬間爆量），預設為 rate
+            clock: 單調時鐘
+        """
+        self.rate = rate
+        self.capacity = rate if capacity is None else capacity
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+
+    def _refill(self) -> float:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        return now
+
+    def reserve(self) -> float:
+        """
+        預約一個權杖
+
+        Returns:
+            取得權杖前需要等待的秒數（0 表示可立即使用）
+        """
+        self._refill()
+        self._tokens -= 1
+        return max(0.0, -self._tokens / self.rate)
+
+    def shortfall(self, cost: float = 1.0) -> float:
+        """
+        不扣除權杖，計算取得 cost 個權杖還需等待的秒數
+
+        Returns:
+            需要等待的秒數（0 表示權杖足夠）
+        """
+        self._refill()
+        return max(0.0, (cost - self._tokens) / self.rate)
+
+    def take(self, cost: float = 1.0):
+        """扣除 cost 個權杖（可扣成負值，之後的 shortfall 會包含欠下的權杖）"""
+        self._refill()
+        self._tokens -= cost
+
+    def pause(self, seconds: float):
+        """暫停發放權杖（收到 RetryAfter 時，之後的預約都至少等待這段時間）"""
+        self._refill()
+        self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+class NotificationQueue:
+    """
+    對外通知佇列
+
+    全域權杖桶限制總發送速率，每個聊天另外保持最小間隔；佇列依優先順序取出，
+    同一優先順序內先進先出。必須在 Bot 的事件迴圈中建立與使用。
+    """
+
+    def __init__(
+        self,
+        send: Callable[..., Awaitable],
+        rate: float = GLOBAL_RATE,
+        chat_interval: float = CHAT_INTERVAL,
+        workers: int = DEFAULT_WORKERS,
+        max_retries: int = 3,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        初始化通知佇列
+
+        Args:
+            send: 發送協程，以 chat_id、text、reply_markup 關鍵字參數呼叫
+            rate: 全域每秒發送數量
+            chat_interval: 同一聊天兩則訊息的最小間隔（秒）
+            workers: 同時處理的工作協程數量
+            max_retries: RetryAfter 或網路錯誤時的最大重試次數
+            clock: 單調時鐘
+        """
+        self._send = send
+        self._bucket = TokenBucket(rate, clock=clock)
+        self._chat_interval = chat_interval
+        self._worker_count = workers
+        self._max_retries = max_retries
+        self._clock = clock
+        self.logger = logging.getLogger(__name__)
+
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._sequence = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        # {chat_id: 下一則訊息最早可發送的時間}
+        self._chat_ready: Dict[int, float] = {}
+
+        self._sent = 0
+        self._failed = 0
+        self._retried = 0
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    def start(self):
+        """啟動工作協程"""
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker()) for _ in range(self._worker_count)
+            ]
+
+    async def close(self):
+        """停止工作協程，尚未發送的通知視為失敗"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            future = item[-1]
+            if not future.done():
+                future.set_result(False)
+                self._failed += 1
+
+    def enqueue(
+        self,
+        chat_id: int,
+        text: str,
+        reply_markup=None,
+        priority: int = PRIORITY_NORMAL
+    ) -> asyncio.Future:
+        """
+        加入一則待發送訊息
+
+        Args:
+            chat_id: 聊天 ID
+            text: 訊息內容
+            reply_markup: 按鈕
+            priority: 優先順序（PRIORITY_HIGH 或 PRIORITY_NORMAL）
+
+        Returns:
+            完成時結果為是否送達的 Future
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((
+            priority, next(self._sequence), self._clock(), chat_id, text, reply_markup, future
+        ))
+        depth = self._queue.qsize()
+        if depth % DEPTH_WARNING == 0:
+            self.logger.warning(f"⚠️ 通知佇列積壓 {depth} 則")
+        return future
+
+    def stats(self) -> Dict:
+        """
+        佇列統計
+
+        Returns:
+            depth（待發送）、sent、failed、retried 與最近樣本的 latency_avg / latency_p95（秒）
+        """
+        latencies = sorted(self._latencies)
+        return {
+            "depth": self._queue.qsize(),
+            "sent": self._sent,
+            "failed": self._failed,
+            "retried": self._retried,
+            "latency_avg": sum(latencies) / len(latencies) if latencies else 0.0,
+            "latency_p95": percentile(latencies, 0.95),
+        }
+
+    async def _worker(self):
+        while True:
+            _, _, enqueued_at, chat_id, text, reply_markup, future = await self._queue.get()
+            try:
+                delivered = await self._deliver(chat_id, text, reply_markup)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.set_result(False)
+                raise
+            if delivered:
+                self._sent += 1
+                self._latencies.append(self._clock() - enqueued_at)
+            else:
+                self._failed += 1
+            if not future.done():
+                future.set_result(delivered)
+
+    def _chat_delay(self, chat_id: int) -> float:
+        """預約聊天的下一個發送時段，返回需要等待的秒數"""
+        now = self._clock()
+        ready = max(now, self._chat_ready.get(chat_id, now))
+        self._chat_ready[chat_id] = ready + self._chat_interval
+        if len(self._chat_ready) > CHAT_PRUNE_SIZE:
+            # 清除已過期的時段，避免長時間運行後無限成長
+            self._chat_ready = {
+                chat: ready_at for chat, ready_at in self._chat_ready.items() if ready_at > now
+            }
+        return ready - now
+
+    async def _deliver(self, chat_id: int, text: str, reply_markup) -> bool:
+        """依速率限制發送一則訊息，RetryAfter 時暫停所有發送後重試"""
+        for attempt in range(self._max_retries + 1):
+            delay = max(self._bucket.reserve(), self._chat_delay(chat_id))
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                await self._send(chat_id=chat_id, text=text, reply_markup=reply_markup)
+                return True
+            except RetryAfter as e:
+                wait = _seconds(e.retry_after)
+                self.logger.warning(f"⚠️ Telegram 要求暫停 {wait} 秒 (用戶 {chat_id})")
+                self._bucket.pause(wait)
+            except NetworkError as e:
+                self.logger.warning(
+                    f"發送通知失敗 (嘗試 {attempt + 1}/{self._max_retries + 1}，"
+                    f"用戶 {chat_id}): {e}"
+                )
+                if attempt < self._max_retries:
+                    await asyncio.sleep(2 ** attempt)
+            except Exception as e:
+                self.logger.error(f"❌ 發送通知失敗 (用戶 {chat_id}): {e}", exc_info=True)
+                return False
+            if attempt < self._max_retries:
+                self._retried += 1
+        self.logger.error(f"❌ 發送通知失敗，已重試 {self._max_retries} 次 (用戶 {chat_id})")
+        return False
+
+
+def _seconds(retry_after) -> float:
+    """RetryAfter.retry_after 在不同版本為秒數或 timedelta"""
+    total_seconds = getattr(retry_after, "total_seconds", None)
+    return total_seconds() if total_seconds is not None else float(retry_after)
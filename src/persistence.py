@@ -0,0 +1,169 @@
+"""背景持久化模組 - 合併短時間內的多次異動為一次寫入"""
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+# 寫入失敗後的重試間隔（秒）
+_RETRY_DELAY = 1.0
+
+
+class BackgroundWriter:
+    """
+    髒標記（dirty flag）背景寫入器
+
+    異動端只需呼叫 mark_dirty()（僅設定旗標，不做 I/O）；專屬寫入線程在
+    延遲窗口內收集後續異動，最後只執行一次 write_func。
+    """
+
+    def __init__(
+        self,
+        write_func: Callable[[], bool],
+        latency: float = 0.5,
+        name: str = "background-writer"
+    ):
+        """
+        初始化背景寫入器
+
+        Args:
+            write_func: 實際寫入函數，成功時返回 True
+            latency: 合併窗口秒數（第一次異動後最多延遲多久寫入）
+            name: 寫入線程名稱
+        """
+        self._write_func = write_func
+        self.latency = max(0.0, float(latency))
+        self.logger = logging.getLogger(__name__)
+
+        self._cond = threading.Condition()
+        self._generation = 0  # 每次 mark_dirty 遞增
+        self._written_generation = 0  # 已寫入磁碟的最新 generation
+        self._dirty_since: Optional[float] = None
+        self._flush_requested = False
+        self._closed = False
+
+        self.write_count = 0  # 實際寫入次數
+        self.mark_count = 0  # 異動次數
+        self.failure_count = 0  # 寫入失敗次數
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    @property
+    def dirty(self) -> bool:
+        """是否有尚未寫入的異動"""
+        with self._cond:
+            return self._written_generation < self._generation
+
+    def mark_dirty(self):
+        """標記資料已變更（立即返回）"""
+        with self._cond:
+            self._generation += 1
+            self.mark_count += 1
+            if self._dirty_since is None:
+                self._dirty_since = time.monotonic()
+                self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """
+        立即寫入所有尚未寫入的異動並等待完成
+
+        Args:
+            timeout: 最長等待秒數，None 表示無限等待
+
+        Returns:
+            是否在時限內完成寫入
+        """
+        with self._cond:
+            target = self._generation
+            if self._written_generation >= target:
+                return True
+
+            if self._thread.is_alive():
+                failures = self.failure_count
+                self._flush_requested = True
+                self._cond.notify_all()
+                self._cond.wait_for(
+                    lambda: (
+                        self._written_generation >= target
+                        or self.failure_count != failures
+                        or not self._thread.is_alive()
+                    ),
+                    timeout
+                )
+                return self._written_generation >= target
+
+        # 寫入線程已結束，直接在呼叫端線程寫入
+        return self._write(target)
+
+    def close(self, timeout: Optional[float] = 10.0) -> bool:
+        """
+        寫入剩餘異動並停止寫入線程
+
+        Args:
+            timeout: 最長等待秒數
+
+        Returns:
+            是否成功寫入所有異動
+        """
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        return flushed
+
+    def _write(self, generation: int) -> bool:
+        """執行寫入並更新狀態（呼叫時不可持有 _cond）"""
+        try:
+            success = bool(self._write_func())
+        except Exception as e:
+            self.logger.error(f"背景寫入失敗: {e}", exc_info=True)
+            success = False
+
+        with self._cond:
+            if success:
+                self.write_count += 1
+                self._written_generation = max(self._written_generation, generation)
+                self.logger.debug(
+                    f"背景寫入完成 (generation {generation}, "
+                    f"合併 {self.mark_count} 次異動為 {self.write_count} 次寫入)"
+                )
+            else:
+                self.failure_count += 1
+                if self._dirty_since is None:
+                    # 保留髒標記，稍後重試
+                    self._dirty_since = time.monotonic()
+            self._cond.notify_all()
+        return success
+
+    def _run(self):
+        """寫入線程主迴圈"""
+        while True:
+            with self._cond:
+                while self._dirty_since is None and not self._closed:
+                    self._cond.wait()
+
+                if self._dirty_since is None and self._closed:
+                    return
+
+                # 合併窗口：等待更多異動，直到逾時、被要求 flush 或關閉
+                deadline = self._dirty_since + self.latency
+                while not self._flush_requested and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                generation = self._generation
+                self._dirty_since = None
+                self._flush_requested = False
+
+            # 在鎖外執行 I/O，異動端不需等待磁碟
+            if self._write(generation):
+                continue
+
+            with self._cond:
+                if self._closed:
+                    return
+                # 避免持續失敗時忙碌重試
+                self._cond.wait(_RETRY_DELAY)
@@ -0,0 +1,198 @@
+"""自適應查詢模組 - 依股票距離觸發門檻的遠近與波動度決定下次查詢時間"""
+import heapq
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .bands import BAND_CONDITIONS, band_thresholds
+from .indicators import THRESHOLD_CONDITIONS
+from .trailing import TRAILING_CONDITIONS, trailing_stop
+
+# 預期價格走到門檻所需時間的安全係數（越小越保守）
+DEFAULT_SAFETY = 0.25
+
+# 波動度指數移動平均的權重
+VOLATILITY_ALPHA = 0.3
+
+
+def alert_distance(alert, price: float) -> Optional[float]:
+    """
+    目前價格到監控門檻的絕對距離
+
+    Args:
+        alert: 監控記錄（需要 condition、target_price、upper_price、peak_price）
+        price: 目前價格
+
+    Returns:
+        價格距離，引用指標的監控返回 None（指標依每次查詢取樣，需維持固定頻率）
+    """
+    condition = alert.condition
+    if condition in THRESHOLD_CONDITIONS:
+        return abs(price - alert.target_price)
+    if condition in BAND_CONDITIONS:
+        return min(
+            abs(price - threshold)
+            for threshold in band_thresholds(condition, alert.target_price, alert.upper_price)
+        )
+    if condition in TRAILING_CONDITIONS:
+        if alert.peak_price is None:
+            return 0.0
+        stop = trailing_stop(condition, max(alert.peak_price, price), alert.target_price)
+        return max(0.0, price - stop)
+    return None
+
+
+class AdaptivePoller:
+    """
+    每個股票的下次查詢時間（最小堆積）
+
+    以價格的隨機漫步估計走到最近門檻所需的時間：相對距離為 d、每秒報酬
+    變異數為 σ² 時約為 d² / σ²，乘上安全係數後限制在 [min_interval,
+    max_interval]。沒有波動度資料、引用指標或查詢失敗的股票使用 base_interval。
+
+    下次查詢時間以 {股票: 時間} 為準，堆積中被取代的舊項目在取出時略過。
+    """
+
+    def __init__(
+        self,
+        min_interval: float,
+        max_interval: float,
+        base_interval: float,
+        safety: float = DEFAULT_SAFETY
+    ):
+        """
+        初始化自適應查詢排程
+
+        Args:
+            min_interval: 最短查詢間隔（秒），也是排程器的檢查頻率
+            max_interval: 最長查詢間隔（秒）
+            base_interval: 無法估計時的固定間隔（秒）
+            safety: 安全係數
+        """
+        if not 0 < min_interval <= base_interval <= max_interval:
+            raise ValueError("查詢間隔必須滿足 0 < 最短 <= 固定 <= 最長")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.base_interval = base_interval
+        self.safety = safety
+
+        self._heap: List[Tuple[float, str]] = []
+        self._due_at: Dict[str, float] = {}
+        # {股票: (上次價格, 上次時間, 每秒報酬變異數)}
+        self._volatility: Dict[str, Tuple[float, float, Optional[float]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._due_at)
+
+    def due(self, symbols: Iterable[str], now: float) -> List[str]:
+        """
+        取出需要查詢的股票
+
+        Args:
+            symbols: 目前有監控的股票（不在其中的排程會被清除）
+            now: 目前時間（epoch 秒數）
+
+        Returns:
+            已到期或尚未排程的股票
+        """
+        watched = set(symbols)
+        with self._lock:
+            due = [symbol for symbol in watched if symbol not in self._due_at]
+            heap = self._heap
+            while heap and heap[0][0] <= now:
+                due_at, symbol = heapq.heappop(heap)
+                if self._due_at.get(symbol) != due_at:
+                    continue  # 已被重新排程
+                del self._due_at[symbol]
+                if symbol in watched:
+                    due.append(symbol)
+                else:
+                    self._volatility.pop(symbol, None)
+        return due
+
+    def next_due(self, symbol: str) -> Optional[float]:
+        """股票的下次查詢時間（未排程時返回 None）"""
+        return self._due_at.get(symbol)
+
+    def observe(self, symbol: str, price: float, distance: Optional[float], now: float) -> float:
+        """
+        記錄查詢結果並排程下次查詢
+
+        Args:
+            symbol: 股票代碼
+            price: 查詢到的價格
+            distance: 到最近門檻的相對距離，None 表示使用固定間隔
+            now: 查詢時間（epoch 秒數）
+
+        Returns:
+            下次查詢的間隔秒數
+        """
+        variance = self._update_volatility(symbol, price, now)
+        if distance is None or variance is None:
+            interval = self.base_interval
+        elif variance == 0:
+            interval = self.max_interval
+        else:
+            interval = self.safety * distance * distance / variance
+            interval = min(self.max_interval, max(self.min_interval, interval))
+        self._schedule(symbol, now + interval)
+        return interval
+
+    def failed(self, symbol: str, now: float):
+        """查詢失敗時以固定間隔重試"""
+        self._schedule(symbol, now + self.base_interval)
+
+    def checkpoint_state(self) -> Dict:
+        """檢查點內容：每個股票的下次查詢時間與波動度"""
+        with self._lock:
+            return {
+                "due_at": dict(self._due_at),
+                "volatility": {symbol: list(state) for symbol, state in self._volatility.items()},
+            }
+
+    def restore_checkpoint(self, state: Dict, now: Optional[float] = None):
+        """
+        由檢查點恢復排程
+
+        停機期間已到期的股票依原本的到期順序平均分散在接下來的一個固定間隔內，
+        避免啟動時一次查詢所有股票；尚未到期的股票保持原本的時間。
+
+        Args:
+            state: checkpoint_state 的內容
+            now: 目前時間（epoch 秒數），預設為現在
+        """
+        now = time.time() if now is None else now
+        due_at = state.get("due_at", {})
+        overdue = sorted((at, symbol) for symbol, at in due_at.items() if at <= now)
+        spacing = self.base_interval / len(overdue) if overdue else 0.0
+        with self._lock:
+            self._volatility.update(
+                (symbol, tuple(values)) for symbol, values in state.get("volatility", {}).items()
+            )
+        for rank, (_, symbol) in enumerate(overdue):
+            self._schedule(symbol, now + rank * spacing)
+        for symbol, at in due_at.items():
+            if at > now:
+                self._schedule(symbol, at)
+
+    def _update_volatility(self, symbol: str, price: float, now: float) -> Optional[float]:
+        """更新每秒報酬變異數的指數移動平均，第一筆價格返回 None"""
+        previous = self._volatility.get(symbol)
+        variance = None
+        if previous is not None:
+            last_price, last_time, variance = previous
+            elapsed = now - last_time
+            if elapsed > 0 and last_price > 0 and price > 0:
+                sample = math.log(price / last_price) ** 2 / elapsed
+                variance = sample if variance is None else (
+                    (1 - VOLATILITY_ALPHA) * variance + VOLATILITY_ALPHA * sample
+                )
+        self._volatility[symbol] = (price, now, variance)
+        return variance
+
+    def _schedule(self, symbol: str, due_at: float):
+        with self._lock:
+            self._due_at[symbol] = due_at
+            heapq.heappush(self._heap, (due_at, symbol))
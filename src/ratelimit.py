@@ -0,0 +1,134 @@
+"""指令限流模組 - 限制用戶指令消耗的資料來源查詢額度"""
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from .notifier import TokenBucket
+
+# 每位用戶每分鐘可以觸發的查詢數（也是允許的瞬間爆量）
+DEFAULT_USER_PER_MINUTE = 10
+
+# 所有用戶合計每分鐘可以觸發的查詢數，資料來源其餘的額度保留給定時檢查
+DEFAULT_SHARED_PER_MINUTE = 30
+
+# 最多保留狀態的用戶數，超過時淘汰最久沒有使用的用戶
+DEFAULT_MAX_USERS = 10000
+
+
+class CommandRateLimiter:
+    """
+    用戶指令的查詢限流
+
+    每位用戶一個權杖桶，所有用戶另外共用一個總額度權杖桶；兩者都足夠時才扣除。
+    排程器的查詢不經過這裡，總額度以外的資料來源額度就是排程器的保留額度。
+    超過用戶爆量上限的指令在用戶額度補滿時可以執行，但仍扣除全部查詢數，用戶的
+    權杖桶變成負值，該用戶之後的指令要等欠下的額度補回；共用額度必須足夠支付全部
+    查詢數，不會欠額度，一位用戶的大量查詢不會擋住其他用戶。用戶狀態以 LRU 保存，
+    最多 max_users 位，淘汰的用戶下次從滿額度開始。
+    只在 Bot 的事件迴圈中使用。
+    """
+
+    def __init__(
+        self,
+        user_per_minute: float = DEFAULT_USER_PER_MINUTE,
+        shared_per_minute: Optional[float] = DEFAULT_SHARED_PER_MINUTE,
+        max_users: int = DEFAULT_MAX_USERS,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        初始化限流器
+
+        Args:
+            user_per_minute: 每位用戶每分鐘的查詢數（同時是爆量上限）
+            shared_per_minute: 所有用戶合計每分鐘的查詢數，None 表示不限制
+            max_users: 最多保留狀態的用戶數
+            clock: 單調時鐘
+        """
+        if user_per_minute <= 0:
+            raise ValueError("user_per_minute 必須大於 0")
+        if shared_per_minute is not None and shared_per_minute <= 0:
+            raise ValueError("shared_per_minute 必須大於 0")
+        if max_users < 1:
+            raise ValueError("max_users 必須大於 0")
+        self._user_rate = user_per_minute / 60
+        self._user_capacity = float(user_per_minute)
+        self._shared = (
+            TokenBucket(shared_per_minute / 60, capacity=float(shared_per_minute), clock=clock)
+            if shared_per_minute is not None else None
+        )
+        self._max_users = max_users
+        self._clock = clock
+        self._users: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self._allowed = 0
+        self._limited = 0
+        self._evicted = 0
+        self.logger = logging.getLogger(__name__)
+
+    def acquire(self, user_id: int, cost: int = 1) -> float:
+        """
+        為一個指令取得查詢額度
+
+        Args:
+            user_id: 用戶 ID
+            cost: 指令會發出的查詢數（超過用戶爆量上限時，用戶額度補滿即可執行，但全數扣除）
+
+        Returns:
+            0 表示允許並已扣除額度，否則為需要等待的秒數
+
+        Raises:
+            ValueError: cost 超過 max_cost，永遠無法取得額度
+        """
+        if cost <= 0:
+            return 0.0
+        max_cost = self.max_cost
+        if max_cost is not None and cost > max_cost:
+            raise ValueError(f"查詢數 {cost} 超過共用額度上限 {max_cost}")
+        bucket = self._user_bucket(user_id)
+        wait = bucket.shortfall(min(cost, self._user_capacity))
+        if self._shared is not None:
+            wait = max(wait, self._shared.shortfall(cost))
+        if wait > 0:
+            self._limited += 1
+            self.logger.info(f"⏳ 用戶 {user_id} 查詢過於頻繁（需要 {cost} 次），{wait:.0f} 秒後可再查詢")
+            return wait
+
+        # 全數扣除：大量查詢只讓用戶自己的權杖桶欠額度，由該用戶之後的指令等待補回
+        bucket.take(cost)
+        if self._shared is not None:
+            self._shared.take(cost)
+        self._allowed += 1
+        return 0.0
+
+    @property
+    def max_cost(self) -> Optional[int]:
+        """單一指令最多可以發出的查詢數（共用額度的上限），None 表示不限制"""
+        return int(self._shared.capacity) if self._shared is not None else None
+
+    def _user_bucket(self, user_id: int) -> TokenBucket:
+        """取得用戶的權杖桶並標記為最近使用，超過上限時淘汰最久沒有使用的用戶"""
+        bucket = self._users.get(user_id)
+        if bucket is not None:
+            self._users.move_to_end(user_id)
+            return bucket
+        bucket = self._users[user_id] = TokenBucket(
+            self._user_rate, capacity=self._user_capacity, clock=self._clock
+        )
+        while len(self._users) > self._max_users:
+            self._users.popitem(last=False)
+            self._evicted += 1
+        return bucket
+
+    def stats(self) -> Dict:
+        """
+        限流統計
+
+        Returns:
+            users（保留狀態的用戶數）、allowed、limited 與 evicted
+        """
+        return {
+            "users": len(self._users),
+            "allowed": self._allowed,
+            "limited": self._limited,
+            "evicted": self._evicted,
+        }
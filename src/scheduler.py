@@ -1,12 +1,37 @@
 """背景任務排程器模組"""
-import logging
 import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
 from .alert_manager import AlertManager
+from .budget import CycleBudget, prioritize, stalest_age
+from .checkpoint import CheckpointStore
+from .polling import AdaptivePoller
 from .stock_fetcher import StockFetcher
 from .telegram_bot import TelegramBotHandler
+from .utils import percentile
+
+# 串流管線各階段的容量：查詢結果佇列、每批評估的最大價格數、尚未送達的通知批次
+QUOTE_QUEUE_SIZE = 64
+MAX_EVAL_BATCH = 256
+NOTIFY_PENDING_BATCHES = 32
+
+# 通知階段等待送達的最長時間（秒），逾時後不再等待以免卡住檢查
+NOTIFY_WAIT_SECONDS = 60
+
+# 未設定時間預算時，每個週期的查詢時間上限為排程間隔的比例（保留評估與通知的時間）
+BUDGET_FRACTION = 0.8
+
+# 查詢階段的結束標記
+_END_OF_QUOTES = object()
 
 
 class StockMonitorScheduler:
@@ -17,7 +42,11 @@ class StockMonitorScheduler:
         alert_manager: AlertManager,
         stock_fetcher: StockFetcher,
         telegram_handler: TelegramBotHandler,
-        check_interval_minutes: int = 5
+        check_interval_minutes: int = 5,
+        poller: Optional[AdaptivePoller] = None,
+        cycle_budget_seconds: Optional[float] = None,
+        cycle_max_requests: Optional[int] = None,
+        checkpoint: Optional[CheckpointStore] = None
     ):
         """
         初始化排程器
@@ -27,91 +56,321 @@ class StockMonitorScheduler:
             stock_fetcher: 股票查詢器
             telegram_handler: Telegram Bot 處理器
             check_interval_minutes: 檢查間隔（分鐘）
+            poller: 自適應查詢排程（選用），設定時每個股票依距離門檻遠近決定查詢時間，
+                排程器改以 poller.min_interval 的頻率檢查是否有到期的股票
+            cycle_budget_seconds: 每個週期的查詢時間上限（秒），None 表示排程間隔的 80%
+            cycle_max_requests: 每個週期的請求數上限，None 表示不限制
+            checkpoint: 檢查點（選用），每個週期結束時依間隔寫入
         """
         self.alert_manager = alert_manager
         self.stock_fetcher = stock_fetcher
         self.telegram_handler = telegram_handler
         self.check_interval_minutes = check_interval_minutes
+        self.poller = poller
         self.logger = logging.getLogger(__name__)
+
+        # 週期預算：用完時剩下的股票延到下個週期，並依觸發風險排序查詢
+        if cycle_budget_seconds is None:
+            cycle_budget_seconds = self._tick_seconds() * BUDGET_FRACTION
+        self.budget = CycleBudget(cycle_budget_seconds, cycle_max_requests)
+        self._quoted_at: Dict[str, float] = {}  # 上次成功查詢的時間（epoch 秒數）
+        self._last_prices: Dict[str, float] = {}
+        self._carried: Set[str] = set()  # 上個週期延後的股票
+        self.checkpoint = checkpoint
         self.scheduler = BackgroundScheduler()
+        # 已交給 Bot 但尚未送達的通知批次（通知階段的背壓）
+        self._pending_notifications = threading.BoundedSemaphore(NOTIFY_PENDING_BATCHES)
+
+    def _tick_seconds(self) -> float:
+        """排程器的檢查間隔（秒），自適應查詢時為最短查詢間隔"""
+        if self.poller is not None:
+            return self.poller.min_interval
+        return self.check_interval_minutes * 60
 
     def check_all_stocks(self):
         """
         主要檢查邏輯：查詢所有監控股票並發送通知
+
+        以串流管線執行：查詢執行緒每查到一個價格就放入有界佇列，排程執行緒把
+        已到達的價格合併成小批次評估，觸發的通知立即交給 Bot 的事件迴圈發送。
+        各階段的佇列都有上限，下游來不及處理時上游會等待。
         """
+        stop = threading.Event()
         try:
-            self.logger.info("=" * 50)
-            self.logger.info("開始檢查所有監控股票")
+            selected = self._begin_cycle()
+            if selected is None:
+                return
+            watched_symbols, symbols = selected
 
-            # 1. 取得所有需要監控的股票代碼
-            symbols = self.alert_manager.get_all_symbols()
+            # 2. 查詢執行緒逐一查詢價格並放入有界佇列
+            cycle = _CycleStats()
+            self.budget.begin()
+            quotes: queue.Queue = queue.Queue(maxsize=QUOTE_QUEUE_SIZE)
+            fetcher = threading.Thread(
+                target=self._fetch_stage,
+                args=(symbols, quotes, stop, cycle),
+                name="quote-fetcher",
+                daemon=True
+            )
+            fetcher.start()
 
+            # 3. 價格到達即評估，4. 觸發的通知立即交給 Bot 發送
+            for triggered_alerts in self.alert_manager.check_alerts_stream(
+                    self._quote_batches(quotes, cycle)):
+                if triggered_alerts:
+                    cycle.triggered += len(triggered_alerts)
+                    self._notify_stage(triggered_alerts, cycle)
+            fetcher.join()
+
+            self._finish_cycle(watched_symbols, symbols, cycle)
+
+        except Exception as e:
+            self.logger.error(f"檢查過程發生錯誤: {e}", exc_info=True)
+        finally:
+            # 評估失敗時讓查詢執行緒停止，不會卡在已滿的佇列
+            stop.set()
+
+    def _begin_cycle(self) -> Optional[Tuple[List[str], List[str]]]:
+        """
+        週期開始：清除到期監控並依觸發風險排序本週期要查詢的股票
+
+        Returns:
+            (所有監控中的股票, 本週期要查詢的股票)，沒有需要查詢的股票時返回 None
+        """
+        # 0. 先清除到期的監控，避免查詢與檢查已不需要的股票
+        expired = self.alert_manager.expire_alerts()
+        if expired:
+            self.logger.info(f"清除 {len(expired)} 個到期監控")
+
+        # 1. 取得所有需要監控的股票代碼（自適應查詢時只取到期的股票）
+        watched_symbols = self.alert_manager.get_all_symbols()
+        symbols = watched_symbols
+        watched = len(symbols)
+        if self.poller is not None and symbols:
+            symbols = self.poller.due(symbols, time.time())
             if not symbols:
-                self.logger.info("目前沒有任何監控，跳過檢查")
-                return
+                self.logger.debug(f"{watched} 個股票都尚未到查詢時間")
+                return None
 
-            self.logger.info(f"需要檢查 {len(symbols)} 個股票: {', '.join(symbols)}")
+        self.logger.info("=" * 50)
+        self.logger.info("開始檢查所有監控股票")
+
+        if not symbols:
+            self.logger.info("目前沒有任何監控，跳過檢查")
+            return None
 
-            # 2. 批次查詢所有股票價格
-            current_prices = self.stock_fetcher.get_multiple_prices(symbols)
+        # 依觸發風險排序，預算不足時先查詢可能觸發的股票
+        symbols = self._prioritize(symbols)
 
-            # 記錄查詢結果
-            success_count = sum(
-                1 for info in current_prices.values() if info.get("success")
+        if len(symbols) < watched:
+            self.logger.info(
+                f"需要檢查 {len(symbols)}/{watched} 個股票（其餘尚未到查詢時間）: "
+                f"{', '.join(symbols)}"
             )
-            self.logger.info(f"成功查詢 {success_count}/{len(symbols)} 個股票")
+        else:
+            self.logger.info(f"需要檢查 {len(symbols)} 個股票: {', '.join(symbols)}")
+        return watched_symbols, symbols
+
+    def _finish_cycle(self, watched_symbols: List[str], symbols: List[str], cycle: "_CycleStats"):
+        """週期結束：記錄報價、排程延後與下次查詢的股票並輸出統計"""
+        # 預算用完時沒查詢的股票延到下個週期（自適應查詢時它們仍未排程，下次會到期）
+        attempted = cycle.attempted
+        deferred = symbols[len(attempted):]
+        self._carried = set(deferred)
+        self._record_quotes(cycle, watched_symbols)
+        if self.poller is not None:
+            self._reschedule(attempted, cycle)
 
-            # 3. 檢查是否有監控被觸發
-            triggered_alerts = self.alert_manager.check_alerts(current_prices)
+        self.logger.info(f"成功查詢 {len(cycle.prices)}/{len(attempted)} 個股票")
+        if cycle.triggered:
+            self.logger.info(f"有 {cycle.triggered} 個監控被觸發")
+        else:
+            self.logger.info("沒有監控被觸發")
+        self._log_coverage(watched_symbols, symbols, deferred)
+        cycle.finish(self._log_cycle)
+        if self.checkpoint is not None:
+            self.checkpoint.maybe_save()
 
-            if not triggered_alerts:
-                self.logger.info("沒有監控被觸發")
+        self.logger.info("檢查完成")
+        self.logger.info("=" * 50)
+
+    def checkpoint_state(self) -> Dict:
+        """檢查點內容：最近報價的時間與價格、延後的股票與自適應查詢排程"""
+        state = {
+            "quoted_at": dict(self._quoted_at),
+            "last_prices": dict(self._last_prices),
+            "carried": sorted(self._carried),
+        }
+        if self.poller is not None:
+            state["poller"] = self.poller.checkpoint_state()
+        return state
+
+    def restore_checkpoint(self, state: Dict):
+        """由檢查點恢復排程狀態，重啟後的第一個週期不必重新查詢所有股票"""
+        self._quoted_at.update(state.get("quoted_at", {}))
+        self._last_prices.update(state.get("last_prices", {}))
+        self._carried.update(state.get("carried", []))
+        if self.poller is not None and "poller" in state:
+            self.poller.restore_checkpoint(state["poller"])
+        self.logger.info(
+            f"恢復 {len(self._quoted_at)} 個股票的報價時間"
+            + (f"與 {len(self.poller)} 個查詢排程" if self.poller is not None else "")
+        )
+
+    def _prioritize(self, symbols: List[str]) -> List[str]:
+        """依上次價格到門檻的距離、訂閱數與報價新舊排序要查詢的股票"""
+        last_prices = self._last_prices
+        distances = self.alert_manager.trigger_distances(
+            {symbol: last_prices[symbol] for symbol in symbols if symbol in last_prices}
+        )
+        subscribers = self.alert_manager.subscriber_counts(symbols)
+        return prioritize(symbols, distances, subscribers, self._quoted_at, self._carried)
+
+    def _budgeted(
+        self,
+        symbols: List[str],
+        stop: threading.Event,
+        cycle: "_CycleStats"
+    ) -> Iterator[str]:
+        """依序產出預算內可以查詢的股票，並記錄在 cycle.attempted"""
+        for symbol in symbols:
+            if stop.is_set() or not self.budget.take():
+                return
+            cycle.attempted.append(symbol)
+            yield symbol
+
+    def _fetch_stage(
+        self,
+        symbols: List[str],
+        quotes: queue.Queue,
+        stop: threading.Event,
+        cycle: "_CycleStats"
+    ):
+        """查詢階段：在預算內依序查詢價格放入佇列，最後放入結束標記"""
+        try:
+            for symbol, price_info in self.stock_fetcher.iter_prices(
+                    self._budgeted(symbols, stop, cycle)):
+                if not _put(quotes, (symbol, price_info), stop):
+                    return
+        except Exception as e:
+            self.logger.error(f"查詢價格時發生錯誤: {e}", exc_info=True)
+        _put(quotes, _END_OF_QUOTES, stop)
+
+    def _quote_batches(self, quotes: queue.Queue, cycle: "_CycleStats") -> Iterator[Dict[str, Dict]]:
+        """評估階段的輸入：等待下一個價格，並合併已到達的價格成一批"""
+        while True:
+            item = quotes.get()
+            batch: Dict[str, Dict] = {}
+            while item is not _END_OF_QUOTES:
+                symbol, price_info = item
+                batch[symbol] = price_info
+                if price_info.get("success"):
+                    cycle.prices[symbol] = price_info["price"]
+                if len(batch) >= MAX_EVAL_BATCH:
+                    break
+                try:
+                    item = quotes.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                yield batch
+            if item is _END_OF_QUOTES:
+                return
+
+    def _record_quotes(self, cycle: "_CycleStats", watched_symbols: List[str]):
+        """記錄成功查詢的價格與時間，並清除已不再監控的股票"""
+        now = time.time()
+        self._last_prices.update(cycle.prices)
+        self._quoted_at.update((symbol, now) for symbol in cycle.prices)
+        for stale in self._quoted_at.keys() - set(watched_symbols):
+            del self._quoted_at[stale]
+            self._last_prices.pop(stale, None)
+
+    def _reschedule(self, symbols: List[str], cycle: "_CycleStats"):
+        """依查詢結果與觸發狀態排程每個股票的下次查詢"""
+        now = time.time()
+        distances = self.alert_manager.trigger_distances(cycle.prices)
+        for symbol in symbols:
+            price = cycle.prices.get(symbol)
+            if price is None:
+                self.poller.failed(symbol, now)
             else:
-                self.logger.info(f"有 {len(triggered_alerts)} 個監控被觸發")
-
-                # 4. 發送通知（使用 asyncio 因為 telegram 是異步的）
-                for alert_info in triggered_alerts:
-                    user_id = alert_info["alert"]["user_id"]
-                    symbol = alert_info["alert"]["symbol"]
-
-                    self.logger.info(f"準備發送通知: {symbol} -> 用戶 {user_id}")
-
-                    # 安全地運行異步函數
-                    try:
-                        # 嘗試獲取現有事件循環
-                        try:
-                            loop = asyncio.get_event_loop()
-                            if loop.is_running():
-                                # 如果循環正在運行，創建任務
-                                self.logger.debug("使用現有運行中的事件循環")
-                                asyncio.create_task(
-                                    self.telegram_handler.send_alert(user_id, alert_info)
-                                )
-                            else:
-                                # 如果循環未運行，直接運行
-                                self.logger.debug("使用現有但未運行的事件循環")
-                                loop.run_until_complete(
-                                    self.telegram_handler.send_alert(user_id, alert_info)
-                                )
-                        except RuntimeError as re:
-                            # 沒有事件循環，創建新的
-                            self.logger.debug(f"創建新的事件循環: {re}")
-                            loop = asyncio.new_event_loop()
-                            asyncio.set_event_loop(loop)
-                            loop.run_until_complete(
-                                self.telegram_handler.send_alert(user_id, alert_info)
-                            )
-                    except Exception as e:
-                        self.logger.error(
-                            f"❌ 發送通知失敗 (用戶 {user_id}, {symbol}): {e}",
-                            exc_info=True
-                        )
-
-            self.logger.info("檢查完成")
-            self.logger.info("=" * 50)
+                self.poller.observe(symbol, price, distances.get(symbol), now)
+
+    def _notify_stage(self, triggered_alerts: List[Dict], cycle: "_CycleStats"):
+        """通知階段：交給 Bot 的事件迴圈發送，尚未送達的批次過多時等待"""
+        acquired = self._pending_notifications.acquire(timeout=NOTIFY_WAIT_SECONDS)
+        if not acquired:
+            self.logger.warning(
+                f"⚠️ 尚未送達的通知超過 {NOTIFY_PENDING_BATCHES} 批，不再等待"
+            )
+
+        future = self.telegram_handler.submit_alerts(triggered_alerts)
+        if future is None:
+            if acquired:
+                self._pending_notifications.release()
+            return
+        cycle.submitted()
 
+        def on_done(done: Future):
+            if acquired:
+                self._pending_notifications.release()
+            self._log_delivery(done)
+            cycle.delivered(done, self._log_cycle)
+
+        future.add_done_callback(on_done)
+
+    def _log_delivery(self, future: Future):
+        """記錄一批通知的送達結果（在 Bot 的事件迴圈執行緒呼叫）"""
+        if future.cancelled():
+            self.logger.warning("⚠️ 通知已取消（Bot 正在關閉）")
+            return
+        try:
+            delivered = future.result()
         except Exception as e:
-            self.logger.error(f"檢查過程發生錯誤: {e}", exc_info=True)
+            self.logger.error(f"❌ 發送通知失敗: {e}", exc_info=True)
+            return
+        sent = sum(delivered)
+        if sent == len(delivered):
+            self.logger.info(f"✅ {sent} 則通知已送達")
+        else:
+            self.logger.warning(f"⚠️ 通知送達 {sent}/{len(delivered)} 則")
+
+        notifications = self.telegram_handler.notifications
+        if notifications is not None:
+            stats = notifications.stats()
+            self.logger.info(
+                f"通知佇列: 待發送 {stats['depth']} | 已送 {stats['sent']} | "
+                f"失敗 {stats['failed']} | 重試 {stats['retried']} | "
+                f"延遲 平均 {stats['latency_avg']:.2f}s / p95 {stats['latency_p95']:.2f}s"
+            )
+
+    def _log_coverage(self, watched_symbols: List[str], symbols: List[str], deferred: List[str]):
+        """記錄週期涵蓋率（本週期到期的股票中實際查詢的比例）與最舊報價的年齡"""
+        age = stalest_age(watched_symbols, self._quoted_at, time.time())
+        never = sum(1 for symbol in watched_symbols if symbol not in self._quoted_at)
+        quoted = len(symbols) - len(deferred)
+        self.logger.info(
+            f"涵蓋率: {quoted}/{len(symbols)} 個股票（監控中 {len(watched_symbols)} 個）| "
+            f"請求 {self.budget.used} | 最舊報價 {'無' if age is None else f'{age:.0f}s'}"
+            + (f" | 尚無報價 {never} 個" if never else "")
+        )
+        if deferred:
+            reason = "時間" if self.budget.exhausted == "time" else "請求數"
+            self.logger.warning(
+                f"⚠️ 週期{reason}預算用完，{len(deferred)} 個股票延到下個週期: "
+                f"{', '.join(deferred[:10])}{' ...' if len(deferred) > 10 else ''}"
+            )
+
+    def _log_cycle(self, cycle: "_CycleStats"):
+        """記錄一個檢查週期的通知時間（從週期開始到送達）"""
+        latencies = sorted(cycle.latencies)
+        if not latencies:
+            return
+        self.logger.info(
+            f"通知時間: {len(latencies)} 則 | p50 {percentile(latencies, 0.5):.2f}s | "
+            f"p90 {percentile(latencies, 0.9):.2f}s | 最長 {latencies[-1]:.2f}s"
+        )
 
     def start(self, run_immediately: bool = False):
         """
@@ -120,17 +379,22 @@ class StockMonitorScheduler:
         Args:
             run_immediately: 是否立即執行一次檢查（預設 False，避免 Bot 未初始化）
         """
-        self.logger.info(
-            f"啟動排程器 - 每 {self.check_interval_minutes} 分鐘檢查一次"
-        )
+        self._log_settings()
 
-        # 設定定時任務
+        # 設定定時任務（自適應查詢時以最短間隔檢查是否有到期的股票）
+        if self.poller is not None:
+            trigger = IntervalTrigger(seconds=self.poller.min_interval)
+        else:
+            trigger = IntervalTrigger(minutes=self.check_interval_minutes)
+        # 同時只執行一個週期，錯過的執行合併為一次（超過預算的股票由下個週期接手）
         self.scheduler.add_job(
             func=self.check_all_stocks,
-            trigger=IntervalTrigger(minutes=self.check_interval_minutes),
+            trigger=trigger,
             id="stock_check",
             name="檢查股票價格",
-            replace_existing=True
+            replace_existing=True,
+            max_instances=1,
+            coalesce=True
         )
 
         # 啟動排程器
@@ -142,6 +406,23 @@ class StockMonitorScheduler:
             self.logger.info("執行初始檢查...")
             self.check_all_stocks()
 
+    def _log_settings(self):
+        """記錄檢查頻率與週期預算"""
+        if self.poller is not None:
+            self.logger.info(
+                f"啟動排程器 - 自適應查詢，每 {self.poller.min_interval:g} 秒檢查到期的股票"
+                f"（間隔 {self.poller.min_interval:g}~{self.poller.max_interval:g} 秒）"
+            )
+        else:
+            self.logger.info(
+                f"啟動排程器 - 每 {self.check_interval_minutes} 分鐘檢查一次"
+            )
+
+        limits = [f"{self.budget.seconds:g} 秒"]
+        if self.budget.requests is not None:
+            limits.append(f"{self.budget.requests} 個請求")
+        self.logger.info(f"每個週期的查詢預算: {'、'.join(limits)}")
+
     def stop(self):
         """停止排程器"""
         self.logger.info("正在停止排程器...")
@@ -157,3 +438,213 @@ class StockMonitorScheduler:
         if job:
             return job.next_run_time
         return None
+
+
+class AsyncStockMonitorScheduler(StockMonitorScheduler):
+    """
+    在 Bot 事件迴圈上執行的排程器（asyncio 模式）
+
+    檢查週期本身是協程：阻塞的價格查詢交給查詢執行緒池，評估與其他監控管理器呼叫
+    交給評估執行緒池（單一執行緒，依序執行），觸發的通知直接在同一個事件迴圈排入
+    通知佇列。啟動與停止跟隨 Bot 的生命週期，不另外建立排程執行緒。
+    """
+
+    def __init__(self, *args, **kwargs):
+        """參數同 StockMonitorScheduler"""
+        super().__init__(*args, **kwargs)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._fetch_executor: Optional[ThreadPoolExecutor] = None
+        self._eval_executor: Optional[ThreadPoolExecutor] = None
+        self._notify_slots: Optional[asyncio.BoundedSemaphore] = None
+        self._notify_tasks: Set[asyncio.Task] = set()
+        self._next_run_at: Optional[float] = None
+        self._run_immediately = False
+
+    def start(self, run_immediately: bool = False):
+        """
+        註冊到 Bot 的生命週期，Bot 啟動後在其事件迴圈上開始排程
+
+        Args:
+            run_immediately: Bot 啟動後是否立即執行一次檢查
+        """
+        self._log_settings()
+        self._run_immediately = run_immediately
+        self.telegram_handler.add_lifecycle_hooks(self._on_loop_started, self._on_loop_stopped)
+        self.logger.info("排程器將在 Bot 的事件迴圈上執行（asyncio 模式）")
+
+    def stop(self):
+        """停止排程（可從任何執行緒呼叫，清理在 Bot 關閉時於事件迴圈中完成）"""
+        loop, task = self._loop, self._task
+        if loop is not None and task is not None and not loop.is_closed():
+            self.logger.info("正在停止排程器...")
+            loop.call_soon_threadsafe(task.cancel)
+
+    def get_next_run_time(self):
+        """取得下次執行時間（Bot 尚未啟動時返回 None）"""
+        if self._task is None or self._next_run_at is None:
+            return None
+        return datetime.fromtimestamp(self._next_run_at)
+
+    async def _on_loop_started(self):
+        """Bot 啟動後建立執行緒池並開始排程"""
+        self._loop = asyncio.get_running_loop()
+        self._fetch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="quote-fetch")
+        self._eval_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="alert-eval")
+        self._notify_slots = asyncio.BoundedSemaphore(NOTIFY_PENDING_BATCHES)
+        self._task = asyncio.create_task(self._run())
+        self.logger.info("排程器已啟動")
+
+    async def _on_loop_stopped(self):
+        """Bot 關閉前停止排程，等待目前的週期結束"""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        for executor in (self._fetch_executor, self._eval_executor):
+            if executor is not None:
+                executor.shutdown(wait=False)
+        self._loop = None
+        self.logger.info("排程器已停止")
+
+    async def _run(self):
+        """依固定間隔執行檢查週期，週期超過間隔時略過錯過的執行"""
+        loop = asyncio.get_running_loop()
+        interval = self._tick_seconds()
+        next_run = loop.time() + (0 if self._run_immediately else interval)
+        while True:
+            delay = max(0.0, next_run - loop.time())
+            self._next_run_at = time.time() + delay
+            await asyncio.sleep(delay)
+            await self.check_all_stocks_async()
+            # 超過預算的股票已延到下個週期，錯過的執行不補跑
+            now = loop.time()
+            next_run += interval
+            while next_run <= now:
+                next_run += interval
+
+    async def check_all_stocks_async(self):
+        """
+        主要檢查邏輯（協程版本）：查詢所有監控股票並發送通知
+
+        與 check_all_stocks 相同的串流管線：查詢階段整段在查詢執行緒執行，評估在評估
+        執行緒逐批進行，每批的觸發結果回到事件迴圈後直接排入通知佇列。
+        """
+        loop = asyncio.get_running_loop()
+        stop = threading.Event()
+        stream = None
+        try:
+            selected = await self._in_eval(self._begin_cycle)
+            if selected is None:
+                return
+            watched_symbols, symbols = selected
+
+            # 2. 查詢執行緒逐一查詢價格並放入有界佇列
+            cycle = _CycleStats()
+            self.budget.begin()
+            quotes: queue.Queue = queue.Queue(maxsize=QUOTE_QUEUE_SIZE)
+            fetcher = loop.run_in_executor(
+                self._fetch_executor, self._fetch_stage, symbols, quotes, stop, cycle
+            )
+
+            # 3. 價格到達即在評估執行緒評估，4. 觸發的通知直接排入通知佇列
+            stream = self.alert_manager.check_alerts_stream(self._quote_batches(quotes, cycle))
+            while True:
+                triggered_alerts = await self._in_eval(next, stream, None)
+                if triggered_alerts is None:
+                    break
+                if triggered_alerts:
+                    cycle.triggered += len(triggered_alerts)
+                    await self._notify_async(triggered_alerts, cycle)
+            stream = None
+            await fetcher
+
+            await self._in_eval(self._finish_cycle, watched_symbols, symbols, cycle)
+
+        except Exception as e:
+            self.logger.error(f"檢查過程發生錯誤: {e}", exc_info=True)
+        finally:
+            # 中止時讓查詢執行緒停止，並在評估執行緒關閉串流（不會在事件迴圈上評估）
+            stop.set()
+            if stream is not None:
+                self._eval_executor.submit(stream.close)
+
+    async def _in_eval(self, func: Callable, *args) -> Any:
+        """在評估執行緒執行阻塞呼叫（評估與監控管理器的呼叫依序執行）"""
+        return await asyncio.get_running_loop().run_in_executor(self._eval_executor, func, *args)
+
+    async def _notify_async(self, triggered_alerts: List[Dict], cycle: "_CycleStats"):
+        """通知階段（協程版本）：直接排入通知佇列，尚未送達的批次過多時等待"""
+        try:
+            await asyncio.wait_for(self._notify_slots.acquire(), NOTIFY_WAIT_SECONDS)
+            acquired = True
+        except asyncio.TimeoutError:
+            acquired = False
+            self.logger.warning(
+                f"⚠️ 尚未送達的通知超過 {NOTIFY_PENDING_BATCHES} 批，不再等待"
+            )
+
+        task = asyncio.ensure_future(self.telegram_handler.send_alerts(triggered_alerts))
+        self._notify_tasks.add(task)
+        cycle.submitted()
+
+        def on_done(done: asyncio.Task):
+            self._notify_tasks.discard(done)
+            if acquired:
+                self._notify_slots.release()
+            self._log_delivery(done)
+            cycle.delivered(done, self._log_cycle)
+
+        task.add_done_callback(on_done)
+
+
+class _CycleStats:
+    """一個檢查週期的統計：查詢的股票與成功的價格、觸發數與每則通知從週期開始到送達的時間"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.attempted: List[str] = []  # 在預算內送出查詢的股票（依查詢順序）
+        self.prices: Dict[str, float] = {}  # 查詢成功的價格
+        self.triggered = 0
+        self.latencies: List[float] = []
+        self._pending = 0
+        self._finished = False
+        self._lock = threading.Lock()
+
+    def submitted(self):
+        """一批通知已交給 Bot"""
+        with self._lock:
+            self._pending += 1
+
+    def delivered(self, future: Future, report: Callable[["_CycleStats"], None]):
+        """一批通知完成；週期已結束且所有通知都完成時回報"""
+        try:
+            results = [] if future.cancelled() else future.result()
+        except Exception:
+            results = []
+        elapsed = time.monotonic() - self.started
+        with self._lock:
+            self._pending -= 1
+            self.latencies.extend(elapsed for delivered in results if delivered)
+            done = self._finished and self._pending == 0
+        if done:
+            report(self)
+
+    def finish(self, report: Callable[["_CycleStats"], None]):
+        """評估結束；沒有尚未完成的通知時立即回報"""
+        with self._lock:
+            self._finished = True
+            done = self._pending == 0
+        if done:
+            report(self)
+
+
+def _put(quotes: queue.Queue, item, stop: threading.Event) -> bool:
+    """放入有界佇列（佇列已滿時等待），檢查已中止時返回 False"""
+    while not stop.is_set():
+        try:
+            quotes.put(item, timeout=0.5)
+            return True
+        except queue.Full:
+            continue
+    return False
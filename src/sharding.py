@@ -0,0 +1,478 @@
+"""分片評估模組 - 依股票雜湊將監控分配到多個工作程序並行評估"""
+import logging
+import math
+import multiprocessing
+import threading
+import zlib
+from array import array
+from multiprocessing import shared_memory
+from multiprocessing.connection import Connection
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .alert_manager import AlertManager
+from .alert_record import AlertRecord
+from .alert_view import AlertView
+
+# 價格看板的初始槽位數（不足時以兩倍容量重新配置）
+_INITIAL_SLOTS = 1024
+
+# 關閉時等待工作程序結束的秒數
+_STOP_TIMEOUT = 5.0
+
+# 工作程序回傳的狀態變更：(監控 ID, notified, last_notified_at, expires_at, peak_price)
+StateDelta = Tuple[str, bool, Optional[float], Optional[float], Optional[float]]
+
+
+def shard_of(symbol: str, shards: int) -> int:
+    """
+    股票所屬的分片（跨程序穩定，不受 PYTHONHASHSEED 影響）
+
+    Args:
+        symbol: 股票代碼
+        shards: 分片數量
+
+    Returns:
+        分片編號 0 ~ shards-1
+    """
+    return zlib.crc32(symbol.encode("utf-8")) % shards
+
+
+class PriceBoard:
+    """
+    以共享記憶體廣播檢查週期的價格
+
+    每個股票在第一次出現時分配固定的 float64 槽位（只會增加），沒有價格的槽位
+    為 NaN。工作程序只讀取自己分片的槽位，價格不需經過管道序列化。
+    """
+
+    def __init__(self, capacity: int = _INITIAL_SLOTS):
+        """
+        初始化價格看板
+
+        Args:
+            capacity: 初始槽位數
+        """
+        self.symbols: List[str] = []  # 依槽位排列的股票代碼
+        self._slots: Dict[str, int] = {}
+        self._shm = shared_memory.SharedMemory(create=True, size=capacity * 8)
+
+    @property
+    def name(self) -> str:
+        """共享記憶體名稱（容量擴充後會改變）"""
+        return self._shm.name
+
+    def publish(self, prices: Dict[str, float]):
+        """
+        寫入本週期的價格
+
+        Args:
+            prices: {symbol: price}，未列出的股票視為沒有價格
+        """
+        slots = self._slots
+        for symbol in prices:
+            if symbol not in slots:
+                slots[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+
+        if len(self.symbols) * 8 > self._shm.size:
+            self._grow(len(self.symbols))
+
+        values = array("d", [math.nan]) * len(self.symbols)
+        for symbol, price in prices.items():
+            values[slots[symbol]] = price
+        self._shm.buf[:len(values) * 8] = values.tobytes()
+
+    def _grow(self, needed: int):
+        """以至少兩倍的容量重新配置共享記憶體（工作程序依名稱重新連接）"""
+        capacity = max(needed, self._shm.size // 4)
+        old = self._shm
+        self._shm = shared_memory.SharedMemory(create=True, size=capacity * 8)
+        old.close()
+        old.unlink()
+
+    def close(self):
+        """釋放共享記憶體"""
+        self._shm.close()
+        self._shm.unlink()
+
+
+class _ShardManager(AlertManager):
+    """工作程序內的分片監控表（只存在記憶體中，不寫入磁碟）"""
+
+    def __init__(self):
+        super().__init__("<shard>")
+
+    def _load_data(self) -> Dict:
+        return {"alerts": [], "last_check": None}
+
+    def save(self) -> bool:
+        return True
+
+    def _schedule_expiry(self, alerts):
+        """到期監控由主程序清除後同步移除，分片不需排程"""
+
+    def apply_sync(self, upserts: List[AlertRecord], removed: List[str]):
+        """套用主程序送來的差異（新增或取代的記錄、移除的 ID）"""
+        def build(view: AlertView) -> AlertView:
+            view = view.removed(removed)
+            by_id = view.by_id
+            return view.replaced(
+                {alert.id: alert for alert in upserts if alert.id in by_id}
+            ).extended(alert for alert in upserts if alert.id not in by_id)
+
+        self._commit(build)
+
+    def check_shard(self, prices: Dict[str, float]) -> Tuple[List[StateDelta], List[str]]:
+        """
+        評估分片並返回狀態變更
+
+        Args:
+            prices: 本分片股票的價格
+
+        Returns:
+            (狀態變更, 觸發的監控 ID)
+        """
+        current_prices = {
+            symbol: {"price": price, "success": True} for symbol, price in prices.items()
+        }
+        view, updates, triggered_alerts = self._evaluate_cycle(current_prices)
+        self._apply_updates(view, updates, triggered_alerts)
+        deltas = [
+            (alert_id, alert.notified, alert.last_notified_at, alert.expires_at, alert.peak_price)
+            for alert_id, alert in updates.items()
+        ]
+        return deltas, [item["alert"].id for item in triggered_alerts]
+
+
+def _worker_main(conn: Connection):
+    """
+    工作程序主迴圈
+
+    訊息：
+        ("sync", upserts, removed_ids)          套用差異（不回覆）
+        ("check", board_name, [(slot, symbol)])  讀取價格並評估，回覆 (deltas, ids)
+        ("stop",)                               結束
+    """
+    logging.getLogger("src").setLevel(logging.WARNING)
+    manager = _ShardManager()
+    board: Optional[shared_memory.SharedMemory] = None
+    slots: Dict[str, int] = {}
+
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+
+            command = message[0]
+            if command == "stop":
+                break
+            if command == "sync":
+                manager.apply_sync(message[1], message[2])
+                continue
+
+            _, board_name, new_slots = message
+            try:
+                if board is None or board.name != board_name:
+                    if board is not None:
+                        board.close()
+                    board = shared_memory.SharedMemory(name=board_name)
+                slots.update((symbol, slot) for slot, symbol in new_slots)
+
+                prices = {}
+                with board.buf.cast("d") as values:
+                    for symbol in manager.view().symbols:
+                        slot = slots.get(symbol)
+                        if slot is not None and slot < len(values):
+                            price = values[slot]
+                            if price == price:  # NaN 表示沒有價格
+                                prices[symbol] = price
+                conn.send(manager.check_shard(prices))
+            except Exception as e:  # 回報錯誤，由主程序重建分片
+                conn.send(e)
+    finally:
+        if board is not None:
+            board.close()
+        conn.close()
+
+
+class _Shard:
+    """主程序中一個工作程序的控制資訊"""
+
+    __slots__ = ("index", "process", "conn", "slot_cursor")
+
+    def __init__(self, index: int, process: Any, conn: Connection):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.slot_cursor = 0  # 已送出的價格槽位數
+
+
+class ShardedAlertManager(AlertManager):
+    """
+    多程序分片評估的監控清單管理類別（JSON 後端）
+
+    主程序仍是唯一的資料來源：聊天指令照常在主程序中讀寫並儲存。每個工作程序
+    依股票雜湊持有一個分片的監控副本（含該分片的指標與區間狀態）；每個檢查
+    週期開始時，主程序只把上次同步後的差異（由視圖記錄的 changes 取得）送到
+    對應分片，透過共享記憶體廣播價格，再收集各分片的觸發 ID 與狀態變更並發布。
+    """
+
+    def __init__(
+        self,
+        watchlist_file: str,
+        workers: int,
+        save_latency: Optional[float] = None,
+        snapshot_mode: str = "off",
+        start_method: str = "spawn"
+    ):
+        """
+        初始化分片監控管理器
+
+        Args:
+            watchlist_file: 監控清單 JSON 檔案路徑
+            workers: 工作程序數量
+            save_latency: 背景寫入的合併窗口秒數，None 表示每次異動同步寫入
+            snapshot_mode: 二進位快照模式（'off'、'alongside' 或 'only'）
+            start_method: multiprocessing 啟動方式（主程序有其他線程時應使用 spawn）
+        """
+        if workers < 1:
+            raise ValueError(f"工作程序數量必須大於 0: {workers}")
+
+        # 已同步到工作程序的版本，以及之後發布、尚未同步的版本
+        self._synced: Optional[AlertView] = None
+        self._journal: List[Tuple[AlertView, AlertView]] = []
+        self._journal_lock = threading.Lock()
+        super().__init__(watchlist_file, save_latency=save_latency, snapshot_mode=snapshot_mode)
+
+        self.workers = workers
+        self._context = multiprocessing.get_context(start_method)
+        self._cycle_lock = threading.Lock()  # 同一時間只有一個檢查週期使用管道
+        self._board = PriceBoard()
+        # 由工作程序回傳而發布的記錄，同步時不需再送回
+        self._echoed: Dict[str, AlertRecord] = {}
+
+        self._synced = AlertView(0, ())
+        self._shards = [self._start_shard(index) for index in range(workers)]
+        self.logger.info(f"分片評估已啟動: {workers} 個工作程序")
+
+    def _start_shard(self, index: int) -> _Shard:
+        """啟動工作程序"""
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main, args=(child_conn,), name=f"alert-shard-{index}", daemon=True
+        )
+        process.start()
+        child_conn.close()
+        return _Shard(index, process, parent_conn)
+
+    @staticmethod
+    def _send(shard: _Shard, message: tuple) -> bool:
+        """送出訊息，工作程序已結束時返回 False（由檢查週期重新啟動）"""
+        try:
+            shard.conn.send(message)
+            return True
+        except OSError:
+            return False
+
+    def _commit(self, build):
+        base, view = super()._commit(build)
+        if view is not base and self._synced is not None:
+            with self._journal_lock:
+                self._journal.append((base, view))
+        return base, view
+
+    def _collect_changes(self) -> Tuple[AlertView, Dict[str, AlertRecord], Dict[str, AlertRecord]]:
+        """
+        收集上次同步後的差異
+
+        Returns:
+            (目前的視圖, {ID: 新增或取代的記錄}, {ID: 移除的記錄})
+        """
+        with self._journal_lock:
+            journal, self._journal = self._journal, []
+        view = self._view
+        synced = self._synced
+
+        upserts: Dict[str, AlertRecord] = {}
+        removed: Dict[str, AlertRecord] = {}
+        journal.sort(key=lambda step: step[1].version)
+        chained = all(
+            step_view.changes is not None and step_view.version == step_base.version + 1
+            for step_base, step_view in journal
+        ) and (not journal or journal[0][0] is synced) and (
+            view is (journal[-1][1] if journal else synced)
+        )
+
+        if chained:
+            for _, step_view in journal:
+                step_upserts, step_removed = step_view.changes
+                for alert in step_upserts:
+                    upserts[alert.id] = alert
+                for alert in step_removed:
+                    upserts.pop(alert.id, None)
+                    removed[alert.id] = alert
+        else:
+            # 無法由記錄的差異還原（例如一次建構包含多個操作）時，比對整份清單
+            before, after = synced.by_id, view.by_id
+            for alert_id, alert in after.items():
+                if before.get(alert_id) is not alert:
+                    upserts[alert_id] = alert
+            for alert_id in before.keys() - after.keys():
+                removed[alert_id] = before[alert_id]
+
+        echoed, self._echoed = self._echoed, {}
+        upserts = {
+            alert_id: alert for alert_id, alert in upserts.items()
+            if echoed.get(alert_id) is not alert
+        }
+        return view, upserts, removed
+
+    def _sync_shards(self) -> AlertView:
+        """將上次同步後的差異送到對應的工作程序，返回同步後的視圖"""
+        view, upserts, removed = self._collect_changes()
+        if upserts or removed:
+            per_shard: List[Tuple[List[AlertRecord], List[str]]] = [
+                ([], []) for _ in self._shards
+            ]
+            for alert in upserts.values():
+                per_shard[shard_of(alert.symbol, self.workers)][0].append(alert)
+            for alert in removed.values():
+                per_shard[shard_of(alert.symbol, self.workers)][1].append(alert.id)
+            for shard, (shard_upserts, shard_removed) in zip(self._shards, per_shard):
+                if shard_upserts or shard_removed:
+                    self._send(shard, ("sync", shard_upserts, shard_removed))
+        self._synced = view
+        return view
+
+    def _restart_shard(self, shard: _Shard, view: AlertView):
+        """重新啟動故障的工作程序並送出完整分片（指標狀態會重新暖機）"""
+        self.logger.error(f"❌ 分片 {shard.index} 的工作程序異常，重新啟動")
+        try:
+            shard.conn.close()
+        except OSError:
+            pass
+        if shard.process.is_alive():
+            shard.process.terminate()
+        shard.process.join(_STOP_TIMEOUT)
+
+        replacement = self._start_shard(shard.index)
+        self._shards[shard.index] = replacement
+        self._send(replacement, (
+            "sync",
+            [alert for alert in view.alerts if shard_of(alert.symbol, self.workers) == shard.index],
+            []
+        ))
+
+    def check_alerts_stream(self, batches: Iterable[Dict[str, Dict]]) -> Iterator[List[Dict]]:
+        """
+        串流檢查（分片版本）：收齊所有批次後一次交給工作程序評估
+
+        工作程序每次檢查都是一個獨立的指標週期，逐批評估會讓指標在同一輪查詢中
+        前進多次，因此分片評估不逐批處理。
+
+        Args:
+            batches: 價格字典的可迭代物件，格式同 check_alerts
+
+        Yields:
+            所有批次合併後需要通知的監控列表（只產出一次）
+        """
+        current_prices: Dict[str, Dict] = {}
+        for batch in batches:
+            current_prices.update(batch)
+        yield self.check_alerts(current_prices)
+
+    def check_alerts(self, current_prices: Dict[str, Dict]) -> List[Dict]:
+        """
+        由工作程序並行檢查所有監控，返回需要通知的清單
+
+        Args:
+            current_prices: 當前價格字典，格式 {symbol: price_info}
+
+        Returns:
+            需要通知的監控列表，每個元素包含 alert 和 current_price
+        """
+        with self._cycle_lock:
+            view = self._sync_shards()
+
+            valid_prices = {
+                symbol: info for symbol, info in current_prices.items()
+                if info and info.get("success")
+            }
+            for symbol in view.symbols.difference(valid_prices):
+                self.logger.warning(f"跳過檢查 {symbol}：無價格資訊")
+
+            board = self._board
+            board.publish({symbol: info["price"] for symbol, info in valid_prices.items()})
+            sent = []
+            for shard in self._shards:
+                new_slots = [
+                    (slot, board.symbols[slot])
+                    for slot in range(shard.slot_cursor, len(board.symbols))
+                    if shard_of(board.symbols[slot], self.workers) == shard.index
+                ]
+                shard.slot_cursor = len(board.symbols)
+                sent.append(self._send(shard, ("check", board.name, new_slots)))
+
+            updates: Dict[str, AlertRecord] = {}
+            triggered_ids: List[str] = []
+            for shard, ok in zip(list(self._shards), sent):
+                result = None
+                if ok:
+                    try:
+                        result = shard.conn.recv()
+                    except (EOFError, OSError):
+                        pass
+                if not isinstance(result, tuple):
+                    if result is not None:
+                        self.logger.error(f"❌ 分片 {shard.index} 評估失敗: {result}")
+                    self._restart_shard(shard, view)
+                    continue
+
+                # 與 AlertRecord.replace 相同，但省略欄位檢查（每週期可能有大量變更）
+                deltas, shard_triggered = result
+                by_id = view.by_id
+                for alert_id, notified, last_notified_at, expires_at, peak_price in deltas:
+                    record = by_id[alert_id].with_notification(notified, last_notified_at)
+                    record.expires_at = expires_at
+                    record.peak_price = peak_price
+                    updates[alert_id] = record
+                triggered_ids.extend(shard_triggered)
+
+            triggered_alerts = []
+            for alert_id in triggered_ids:
+                alert = updates[alert_id]
+                price_info = valid_prices[alert.symbol]
+                self.logger.info(
+                    f"觸發監控: {alert.symbol} | {alert.condition} {alert.target_price} | "
+                    f"當前: {price_info['price']}"
+                )
+                triggered_alerts.append({
+                    "alert": alert,
+                    "current_price": price_info["price"],
+                    "currency": price_info.get("currency", "USD")
+                })
+
+            self._echoed = dict(updates)
+            self._apply_updates(view, updates, triggered_alerts)
+
+        return triggered_alerts
+
+    def close(self):
+        """停止工作程序、釋放共享記憶體並寫入剩餘異動"""
+        with self._cycle_lock:
+            for shard in self._shards:
+                try:
+                    shard.conn.send(("stop",))
+                except OSError:
+                    pass
+            for shard in self._shards:
+                shard.process.join(_STOP_TIMEOUT)
+                if shard.process.is_alive():
+                    shard.process.terminate()
+                shard.conn.close()
+            self._shards = []
+            self._board.close()
+        super().close()
+
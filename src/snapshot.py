@@ -0,0 +1,509 @@
+"""
+監控清單二進位快照模組
+
+檔案格式（little-endian，可直接 mmap）：
+
+    Header（64 bytes）
+        magic          8s   b"STKSNAP\\0"
+        version        u16
+        flags          u16  保留
+        count          u32  監控數量
+        string_count   u32  字串表項目數
+        last_check     f64  epoch 秒數，NaN 表示無
+        columns_offset u64
+        strings_offset u64
+        total_size     u64  檔案總長度
+        checksum       u32  header 之後所有內容的 CRC32
+    固定寬度欄位（依序排列，各長 count 筆）
+        user_id        i64
+        target_price   f64
+        created_at     f64
+        last_notified  f64  NaN 表示無
+        expires_at     f64  NaN 表示無（版本 2 起）
+        expire_after   f64  NaN 表示無（版本 2 起）
+        upper_price    f64  NaN 表示無（版本 3 起）
+        peak_price     f64  NaN 表示無（版本 4 起）
+        id_ref         u32  字串表索引
+        symbol_ref     u32
+        condition_ref  u32
+        flags          u8   bit0 notified、bit1 enabled
+    字串表
+        offsets        u32 * (string_count + 1)
+        blob           UTF-8 字串依序串接
+"""
+import argparse
+import logging
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .alert_record import AlertRecord, to_epoch, to_isoformat
+from .utils import gc_paused, load_json, save_json
+
+SNAPSHOT_MAGIC = b"STKSNAP\0"
+SNAPSHOT_VERSION = 4
+SNAPSHOT_SUFFIX = ".snap"
+
+_HEADER = struct.Struct("<8sHHIIdQQQI8x")
+_FLAG_NOTIFIED = 0x01
+_FLAG_ENABLED = 0x02
+
+# (欄位名稱, array typecode, 每筆位元組數)；8 位元組欄位在前以維持對齊
+_COLUMNS = (
+    ("user_id", "q", 8),
+    ("target_price", "d", 8),
+    ("created_at", "d", 8),
+    ("last_notified_at", "d", 8),
+    ("expires_at", "d", 8),
+    ("expire_after", "d", 8),
+    ("upper_price", "d", 8),
+    ("peak_price", "d", 8),
+    ("id_ref", "I", 4),
+    ("symbol_ref", "I", 4),
+    ("condition_ref", "I", 4),
+    ("flags", "B", 1),
+)
+
+# 後來新增的欄位與加入的版本
+_ADDED_IN_VERSION = {
+    "expires_at": 2,
+    "expire_after": 2,
+    "upper_price": 3,
+    "peak_price": 4,
+}
+
+# 各版本的欄位配置（讀取舊版快照時，缺少的欄位視為 NaN）
+_COLUMNS_BY_VERSION = {
+    version: tuple(
+        column for column in _COLUMNS
+        if _ADDED_IN_VERSION.get(column[0], 1) <= version
+    )
+    for version in range(1, SNAPSHOT_VERSION + 1)
+}
+
+_NATIVE_LITTLE = sys.byteorder == "little"
+
+
+class SnapshotError(Exception):
+    """快照檔案格式錯誤或校驗失敗"""
+
+
+def snapshot_path_for(watchlist_file: str) -> str:
+    """
+    取得監控清單對應的快照路徑
+
+    Args:
+        watchlist_file: 監控清單路徑（config/watchlist.json → config/watchlist.snap）
+
+    Returns:
+        快照檔案路徑
+    """
+    path = Path(watchlist_file)
+    if path.suffix == SNAPSHOT_SUFFIX:
+        return str(path)
+    return str(path.with_suffix(SNAPSHOT_SUFFIX))
+
+
+def _align(offset: int, size: int = 8) -> int:
+    """向上對齊到 size 的倍數"""
+    return (offset + size - 1) // size * size
+
+
+def _column_bytes(values: Sequence, typecode: str) -> bytes:
+    """將數值序列轉換為 little-endian 位元組"""
+    column = array(typecode, values)
+    if not _NATIVE_LITTLE:
+        column.byteswap()
+    return column.tobytes()
+
+
+def _read_column(buffer, offset: int, typecode: str, itemsize: int, count: int):
+    """從緩衝區讀取固定寬度欄位（little-endian 主機直接 cast，不複製）"""
+    view = memoryview(buffer)[offset:offset + itemsize * count]
+    if _NATIVE_LITTLE:
+        return view.cast(typecode)
+    column = array(typecode)
+    column.frombytes(view)
+    column.byteswap()
+    return column
+
+
+def write_snapshot(
+    file_path: str,
+    alerts: Sequence[AlertRecord],
+    last_check: Optional[str] = None
+) -> bool:
+    """
+    將監控記錄寫入二進位快照（暫存檔 + rename 原子替換）
+
+    Args:
+        file_path: 快照檔案路徑
+        alerts: 監控記錄列表
+        last_check: 最後檢查時間（ISO 字串）
+
+    Returns:
+        是否寫入成功
+    """
+    temp_path = None
+    try:
+        strings: List[str] = []
+        string_index: Dict[str, int] = {}
+
+        def intern_string(value: str) -> int:
+            index = string_index.get(value)
+            if index is None:
+                index = string_index[value] = len(strings)
+                strings.append(value)
+            return index
+
+        nan = math.nan
+        count = len(alerts)
+        columns = {
+            "user_id": [alert.user_id for alert in alerts],
+            "target_price": [alert.target_price for alert in alerts],
+            "created_at": [alert.created_at for alert in alerts],
+            "last_notified_at": [
+                nan if alert.last_notified_at is None else alert.last_notified_at
+                for alert in alerts
+            ],
+            "expires_at": [
+                nan if alert.expires_at is None else alert.expires_at
+                for alert in alerts
+            ],
+            "expire_after": [
+                nan if alert.expire_after is None else alert.expire_after
+                for alert in alerts
+            ],
+            "upper_price": [
+                nan if alert.upper_price is None else alert.upper_price
+                for alert in alerts
+            ],
+            "peak_price": [
+                nan if alert.peak_price is None else alert.peak_price
+                for alert in alerts
+            ],
+            "id_ref": [intern_string(alert.id) for alert in alerts],
+            "symbol_ref": [intern_string(alert.symbol) for alert in alerts],
+            "condition_ref": [intern_string(alert.condition) for alert in alerts],
+            "flags": [
+                (_FLAG_NOTIFIED if alert.notified else 0)
+                | (_FLAG_ENABLED if alert.enabled else 0)
+                for alert in alerts
+            ],
+        }
+
+        body = bytearray()
+        for name, typecode, _ in _COLUMNS:
+            body += _column_bytes(columns[name], typecode)
+
+        # 字串表：offsets 之後接 UTF-8 blob
+        strings_offset = _align(_HEADER.size + len(body))
+        body += b"\0" * (strings_offset - _HEADER.size - len(body))
+        encoded = [value.encode("utf-8") for value in strings]
+        offsets = [0]
+        for item in encoded:
+            offsets.append(offsets[-1] + len(item))
+        body += _column_bytes(offsets, "I")
+        body += b"".join(encoded)
+
+        header = _HEADER.pack(
+            SNAPSHOT_MAGIC,
+            SNAPSHOT_VERSION,
+            0,
+            count,
+            len(strings),
+            to_epoch(last_check) if last_check else nan,
+            _HEADER.size,
+            strings_offset,
+            _HEADER.size + len(body),
+            zlib.crc32(body)
+        )
+
+        target = Path(file_path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(
+            dir=str(target.parent), prefix=f".{target.name}.", suffix=".tmp"
+        )
+        with os.fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temp_path, file_path)
+        temp_path = None
+
+        logging.debug(f"成功儲存快照: {file_path} ({count} 個監控)")
+        return True
+    except Exception as e:
+        logging.error(f"儲存快照失敗 ({file_path}): {e}")
+        return False
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+class WatchlistSnapshot:
+    """以 mmap 開啟的唯讀快照，欄位直接對應檔案內容"""
+
+    def __init__(self, file_path: str):
+        """
+        開啟並驗證快照（版本、長度與 CRC32）
+
+        Args:
+            file_path: 快照檔案路徑
+
+        Raises:
+            SnapshotError: 格式、版本或校驗錯誤
+        """
+        self.file_path = file_path
+        self._file = open(file_path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:
+            self._file.close()
+            raise SnapshotError(f"快照檔案為空: {file_path}") from e
+
+        try:
+            self._validate()
+        except Exception:
+            self.close()
+            raise
+
+        self._strings: Optional[List[str]] = None
+
+    def _validate(self):
+        """檢查 header 與 checksum"""
+        if len(self._map) < _HEADER.size:
+            raise SnapshotError("快照檔案過短")
+
+        (
+            magic, version, _, count, string_count, last_check,
+            columns_offset, strings_offset, total_size, checksum
+        ) = _HEADER.unpack_from(self._map, 0)
+
+        if magic != SNAPSHOT_MAGIC:
+            raise SnapshotError("不是監控清單快照檔案")
+        if version not in _COLUMNS_BY_VERSION:
+            raise SnapshotError(f"不支援的快照版本: {version}")
+        if total_size != len(self._map):
+            raise SnapshotError("快照檔案長度不符（可能被截斷）")
+        if zlib.crc32(memoryview(self._map)[_HEADER.size:]) != checksum:
+            raise SnapshotError("快照校驗碼錯誤")
+
+        self.version = version
+        self.count = count
+        self.string_count = string_count
+        self.last_check = None if math.isnan(last_check) else to_isoformat(last_check)
+
+        self._columns = {}
+        offset = columns_offset
+        for name, typecode, itemsize in _COLUMNS_BY_VERSION[version]:
+            self._columns[name] = _read_column(self._map, offset, typecode, itemsize, count)
+            offset += itemsize * count
+        for name, typecode, _ in _COLUMNS:
+            if name not in self._columns:
+                self._columns[name] = array(typecode, [math.nan]) * count
+
+        self._string_offsets = _read_column(
+            self._map, strings_offset, "I", 4, string_count + 1
+        )
+        self._blob_offset = strings_offset + 4 * (string_count + 1)
+
+    def string(self, index: int) -> str:
+        """依索引讀取字串表項目（不需解碼整個字串表）"""
+        if self._strings is not None:
+            return self._strings[index]
+        start = self._blob_offset + self._string_offsets[index]
+        end = self._blob_offset + self._string_offsets[index + 1]
+        return self._map[start:end].decode("utf-8")
+
+    def strings(self) -> List[str]:
+        """一次解碼整個字串表（首次呼叫後快取）"""
+        if self._strings is None:
+            offsets = self._string_offsets.tolist()
+            blob = self._map[self._blob_offset:self._blob_offset + offsets[-1]]
+            text = blob.decode("utf-8")
+            if len(text) == len(blob):
+                # 純 ASCII：位元組偏移即字元偏移，整段解碼一次後直接切片
+                self._strings = [text[start:end] for start, end in zip(offsets, offsets[1:])]
+            else:
+                self._strings = [
+                    blob[start:end].decode("utf-8")
+                    for start, end in zip(offsets, offsets[1:])
+                ]
+        return self._strings
+
+    def column(self, name: str):
+        """取得固定寬度欄位（memoryview 或 array）"""
+        return self._columns[name]
+
+    def record(self, index: int) -> AlertRecord:
+        """讀取單筆監控"""
+        columns = self._columns
+        last_notified = columns["last_notified_at"][index]
+        expires_at = columns["expires_at"][index]
+        expire_after = columns["expire_after"][index]
+        upper_price = columns["upper_price"][index]
+        peak_price = columns["peak_price"][index]
+        flags = columns["flags"][index]
+        return AlertRecord(
+            id=self.string(columns["id_ref"][index]),
+            user_id=columns["user_id"][index],
+            symbol=self.string(columns["symbol_ref"][index]),
+            target_price=columns["target_price"][index],
+            condition=self.string(columns["condition_ref"][index]),
+            created_at=columns["created_at"][index],
+            notified=bool(flags & _FLAG_NOTIFIED),
+            last_notified_at=None if math.isnan(last_notified) else last_notified,
+            enabled=bool(flags & _FLAG_ENABLED),
+            expires_at=None if math.isnan(expires_at) else expires_at,
+            expire_after=None if math.isnan(expire_after) else expire_after,
+            upper_price=None if math.isnan(upper_price) else upper_price,
+            peak_price=None if math.isnan(peak_price) else peak_price
+        )
+
+    def records(self) -> List[AlertRecord]:
+        """批次建立所有監控記錄（欄位一次轉為 list，避免逐筆解析）"""
+        strings = self.strings()
+        columns = {name: self._columns[name].tolist() for name, _, _ in _COLUMNS}
+
+        # 只有代碼與條件需要 intern（每個不同值一次）
+        shared = {
+            ref: sys.intern(strings[ref])
+            for ref in set(columns["symbol_ref"]) | set(columns["condition_ref"])
+        }
+
+        new = AlertRecord.__new__
+        records = []
+        append = records.append
+
+        # 大量建立物件時暫停循環 GC，避免反覆掃描不斷成長的物件集合
+        with gc_paused():
+            for (user_id, target_price, created_at, last_notified, expires_at,
+                 expire_after, upper_price, peak_price, id_ref, symbol_ref, condition_ref,
+                 flags) in zip(
+                    columns["user_id"], columns["target_price"], columns["created_at"],
+                    columns["last_notified_at"], columns["expires_at"],
+                    columns["expire_after"], columns["upper_price"], columns["peak_price"],
+                    columns["id_ref"], columns["symbol_ref"], columns["condition_ref"],
+                    columns["flags"]):
+                record = new(AlertRecord)
+                record.id = strings[id_ref]
+                record.user_id = user_id
+                record.symbol = shared[symbol_ref]
+                record.target_price = target_price
+                record.condition = shared[condition_ref]
+                record.created_at = created_at
+                record.notified = bool(flags & _FLAG_NOTIFIED)
+                record.last_notified_at = (
+                    None if last_notified != last_notified else last_notified
+                )
+                record.enabled = bool(flags & _FLAG_ENABLED)
+                # NaN != NaN：以比較取代 math.isnan 呼叫
+                record.expires_at = None if expires_at != expires_at else expires_at
+                record.expire_after = None if expire_after != expire_after else expire_after
+                record.upper_price = None if upper_price != upper_price else upper_price
+                record.peak_price = None if peak_price != peak_price else peak_price
+                append(record)
+
+        return records
+
+    def close(self):
+        """釋放 mmap 與檔案"""
+        columns = getattr(self, "_columns", {})
+        for column in columns.values():
+            if isinstance(column, memoryview):
+                column.release()
+        offsets = getattr(self, "_string_offsets", None)
+        if isinstance(offsets, memoryview):
+            offsets.release()
+        self._columns = {}
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self) -> "WatchlistSnapshot":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_snapshot(file_path: str) -> Tuple[List[AlertRecord], Optional[str]]:
+    """
+    讀取快照中的所有監控
+
+    Args:
+        file_path: 快照檔案路徑
+
+    Returns:
+        (監控記錄列表, 最後檢查時間)
+
+    Raises:
+        SnapshotError: 格式、版本或校驗錯誤
+    """
+    with WatchlistSnapshot(file_path) as snapshot:
+        return snapshot.records(), snapshot.last_check
+
+
+def json_to_snapshot(json_file: str, snapshot_file: str) -> int:
+    """
+    將 JSON 監控清單轉換為快照
+
+    Returns:
+        轉換的監控數量
+    """
+    data = load_json(json_file, {"alerts": [], "last_check": None})
+    alerts = [AlertRecord.from_dict(alert) for alert in data.get("alerts", [])]
+    if not write_snapshot(snapshot_file, alerts, data.get("last_check")):
+        raise SnapshotError(f"無法寫入快照: {snapshot_file}")
+    return len(alerts)
+
+
+def snapshot_to_json(snapshot_file: str, json_file: str) -> int:
+    """
+    將快照轉換回 JSON 監控清單
+
+    Returns:
+        轉換的監控數量
+    """
+    alerts, last_check = read_snapshot(snapshot_file)
+    data = {"alerts": [alert.to_dict() for alert in alerts], "last_check": last_check}
+    if not save_json(json_file, data):
+        raise SnapshotError(f"無法寫入 JSON: {json_file}")
+    return len(alerts)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令列入口：python -m src.snapshot {to-snapshot,to-json} <來源> <目標>"""
+    parser = argparse.ArgumentParser(description="監控清單 JSON / 二進位快照互轉")
+    parser.add_argument("direction", choices=["to-snapshot", "to-json"])
+    parser.add_argument("source", help="來源檔案")
+    parser.add_argument("target", help="目標檔案")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        if args.direction == "to-snapshot":
+            count = json_to_snapshot(args.source, args.target)
+        else:
+            count = snapshot_to_json(args.source, args.target)
+    except (OSError, SnapshotError) as e:
+        print(f"❌ 轉換失敗：{e}")
+        return 1
+
+    print(f"✅ 已轉換 {count} 個監控到 {args.target}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,725 @@
+"""SQLite 監控儲存後端模組"""
+import argparse
+import logging
+import math
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .alert_manager import AlertManager
+from .alert_record import AlertRecord, to_epoch
+from .bands import BAND_CONDITIONS, band_signals
+from .indicators import THRESHOLD_CONDITIONS, IndicatorEngine
+from .polling import alert_distance
+from .trailing import TRAILING_CONDITIONS, trailing_signals
+from .utils import generate_alert_id, load_json
+
+# 視為 SQLite 資料庫的副檔名
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+# 資料表與索引（id 為 PRIMARY KEY，SQLite 會自動建立唯一索引）
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    target_price REAL NOT NULL,
+    condition TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    notified INTEGER NOT NULL DEFAULT 0,
+    last_notified_at TEXT,
+    enabled INTEGER NOT NULL DEFAULT 1,
+    expires_at REAL,
+    expire_after REAL,
+    upper_price REAL,
+    peak_price REAL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# 舊版資料庫缺少的欄位（啟動時以 ALTER TABLE 補上）
+_ADDED_COLUMNS = (
+    ("expires_at", "REAL"),
+    ("expire_after", "REAL"),
+    ("upper_price", "REAL"),
+    ("peak_price", "REAL"),
+)
+
+# 到期時間以 epoch 秒數（REAL）儲存，部分索引只包含有到期時間的監控
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_alerts_symbol_enabled ON alerts (symbol, enabled);
+CREATE INDEX IF NOT EXISTS idx_alerts_user_id ON alerts (user_id);
+CREATE INDEX IF NOT EXISTS idx_alerts_expires_at ON alerts (expires_at)
+    WHERE expires_at IS NOT NULL;
+"""
+
+# 熱門查詢使用固定 SQL 字串，讓 sqlite3 的 statement cache 重複使用預編譯語句
+_COLUMNS = (
+    "id, user_id, symbol, target_price, condition, created_at, "
+    "notified, last_notified_at, enabled, expires_at, expire_after, upper_price, "
+    "peak_price"
+)
+_SELECT_DUPLICATE = (
+    "SELECT id FROM alerts WHERE user_id = ? AND symbol = ? AND condition = ? "
+    "AND enabled = 1 AND abs(target_price - ?) < 0.01 "
+    "AND abs(ifnull(upper_price, 0) - ifnull(?, 0)) < 0.01 LIMIT 1"
+)
+_INSERT_ALERT = f"INSERT INTO alerts ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_INSERT_OR_IGNORE_ALERT = (
+    f"INSERT OR IGNORE INTO alerts ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_DELETE_ALERT = "DELETE FROM alerts WHERE id = ? AND user_id = ?"
+_DELETE_BY_USER = "DELETE FROM alerts WHERE user_id = ?"
+_DELETE_BY_USER_SYMBOL = "DELETE FROM alerts WHERE user_id = ? AND symbol = ?"
+_SELECT_BY_USER = (
+    f"SELECT {_COLUMNS} FROM alerts WHERE user_id = ? AND enabled = 1 ORDER BY rowid"
+)
+_SELECT_BY_SYMBOL = (
+    f"SELECT {_COLUMNS} FROM alerts WHERE symbol = ? AND enabled = 1 "
+    "AND (expires_at IS NULL OR expires_at > ?) ORDER BY rowid"
+)
+_SELECT_BY_ID = f"SELECT {_COLUMNS} FROM alerts WHERE id = ?"
+_SELECT_SYMBOLS = "SELECT DISTINCT symbol FROM alerts WHERE enabled = 1"
+_COUNT_BY_SYMBOL = (
+    "SELECT symbol, COUNT(*) AS subscribers FROM alerts WHERE enabled = 1 GROUP BY symbol"
+)
+_UPDATE_NOTIFIED = (
+    "UPDATE alerts SET notified = ?, last_notified_at = ?, expires_at = ? WHERE id = ?"
+)
+_UPDATE_PEAK = "UPDATE alerts SET peak_price = ? WHERE id = ?"
+_SELECT_EXPIRED = f"SELECT {_COLUMNS} FROM alerts WHERE expires_at <= ?"
+_DELETE_EXPIRED = "DELETE FROM alerts WHERE expires_at <= ?"
+_SELECT_NEXT_EXPIRY = "SELECT MIN(expires_at) FROM alerts WHERE expires_at IS NOT NULL"
+_UPSERT_META = "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)"
+
+
+class SQLiteAlertManager(AlertManager):
+    """以 SQLite（WAL 模式）儲存的監控清單管理類別"""
+
+    def __init__(self, database_file: str):
+        """
+        初始化 SQLite 監控管理器
+
+        Args:
+            database_file: SQLite 資料庫檔案路徑
+        """
+        self.watchlist_file = database_file
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.RLock()  # 同進程內序列化寫入
+        self._local = threading.local()  # 每個線程各自的連線
+        self._connections: List[sqlite3.Connection] = []
+        self._indicators = IndicatorEngine()
+
+        Path(database_file).parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            conn = self._connection()
+            conn.executescript(_SCHEMA)
+            existing = {row["name"] for row in conn.execute("PRAGMA table_info(alerts)")}
+            for name, column_type in _ADDED_COLUMNS:
+                if name not in existing:
+                    conn.execute(f"ALTER TABLE alerts ADD COLUMN {name} {column_type}")
+                    self.logger.info(f"資料庫欄位升級: 新增 {name}")
+            conn.executescript(_INDEXES)
+
+        count = self._connection().execute("SELECT COUNT(*) FROM alerts").fetchone()[0]
+        self.logger.info(f"載入監控資料庫: {count} 個監控 ({database_file})")
+
+    def _connection(self) -> sqlite3.Connection:
+        """取得目前線程的資料庫連線（不存在則建立）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # isolation_level=None：由 _transaction 明確控制交易範圍
+            conn = sqlite3.connect(
+                self.watchlist_file,
+                isolation_level=None,
+                check_same_thread=False,
+                cached_statements=128,
+                timeout=5.0
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """寫入交易（BEGIN IMMEDIATE，失敗時回滾）"""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            else:
+                conn.execute("COMMIT")
+
+    @staticmethod
+    def _row_to_alert(row: sqlite3.Row) -> AlertRecord:
+        """將資料列轉換為與 JSON 後端相同的監控記錄"""
+        return AlertRecord(
+            id=row["id"],
+            user_id=row["user_id"],
+            symbol=row["symbol"],
+            target_price=row["target_price"],
+            condition=row["condition"],
+            created_at=to_epoch(row["created_at"]),
+            notified=bool(row["notified"]),
+            last_notified_at=to_epoch(row["last_notified_at"]),
+            enabled=bool(row["enabled"]),
+            expires_at=row["expires_at"],
+            expire_after=row["expire_after"],
+            upper_price=row["upper_price"],
+            peak_price=row["peak_price"]
+        )
+
+    @staticmethod
+    def _alert_to_row(alert: AlertRecord) -> tuple:
+        """將監控記錄轉換為 INSERT 參數"""
+        return (
+            alert.id,
+            int(alert.user_id),
+            alert.symbol,
+            alert.target_price,
+            alert.condition,
+            alert["created_at"],
+            int(alert.notified),
+            alert["last_notified_at"],
+            int(alert.enabled),
+            alert.expires_at,
+            alert.expire_after,
+            alert.upper_price,
+            alert.peak_price
+        )
+
+    def save(self) -> bool:
+        """記錄最後檢查時間（每次異動已在交易中提交）"""
+        try:
+            with self._transaction() as conn:
+                conn.execute(_UPSERT_META, ("last_check", datetime.now().isoformat()))
+            self.logger.debug("監控資料庫已更新")
+            return True
+        except sqlite3.Error as e:
+            self.logger.error(f"更新監控資料庫失敗: {e}")
+            return False
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """每次異動已在交易中提交，無需額外寫入"""
+        return True
+
+    def close(self):
+        """關閉所有線程的資料庫連線"""
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+            self._local = threading.local()
+
+    def add_alert(
+        self,
+        user_id: int,
+        symbol: str,
+        target_price: float,
+        condition: str,
+        expires_at: Optional[float] = None,
+        expire_after: Optional[float] = None,
+        upper_price: Optional[float] = None,
+        peak_price: Optional[float] = None
+    ) -> Optional[AlertRecord]:
+        """
+        新增監控（自動檢查重複）
+
+        Args:
+            user_id: Telegram 用戶 ID
+            symbol: 股票代碼
+            target_price: 目標價格（區間條件為下限）
+            condition: 條件，例如 'above'、'rsi(14) above'、'between'
+                （格式見 indicators.parse_condition）
+            expires_at: 到期時間（epoch 秒數），None 表示不會到期
+            expire_after: 觸發後經過多少秒到期，None 表示不會因觸發而到期
+            upper_price: 區間上限（只用於 between/outside）
+            peak_price: 移動停損的起始最高價，None 表示從第一次檢查的價格開始追蹤
+
+        Returns:
+            新增的監控資訊，如果已存在相同監控則返回 None
+        """
+        condition = self._normalize_condition(condition, target_price, upper_price)
+
+        symbol_upper = symbol.upper()
+        target_price_float = float(target_price)
+
+        with self._transaction() as conn:
+            existing = conn.execute(
+                _SELECT_DUPLICATE,
+                (user_id, symbol_upper, condition, target_price_float, upper_price)
+            ).fetchone()
+
+            if existing:
+                self.logger.warning(
+                    f"⚠️  忽略重複監控: 用戶 {user_id} | {symbol_upper} | "
+                    f"{condition} {target_price_float} (已存在 ID: {existing['id']})"
+                )
+                return None
+
+            alert = AlertRecord(
+                id=generate_alert_id(),
+                user_id=user_id,
+                symbol=symbol_upper,
+                target_price=target_price_float,
+                condition=condition,
+                expires_at=expires_at,
+                expire_after=expire_after,
+                upper_price=upper_price,
+                peak_price=peak_price if condition in TRAILING_CONDITIONS else None
+            )
+            conn.execute(_INSERT_ALERT, self._alert_to_row(alert))
+
+        self.logger.info(
+            f"新增監控: 用戶 {user_id} | {symbol_upper} | "
+            f"{condition} {target_price_float} | ID: {alert.id}"
+        )
+        return alert
+
+    def add_alerts(self, alerts: Iterable[Dict[str, Any]]) -> List[Optional[AlertRecord]]:
+        """
+        批次新增監控（單一交易內去重並寫入）
+
+        Args:
+            alerts: 監控列表，每筆包含 user_id、symbol、target_price、condition
+
+        Returns:
+            與輸入順序對應的結果，重複（已存在或批次內重複）的項目為 None
+        """
+        records = self._new_records(alerts)
+
+        results: List[Optional[AlertRecord]] = []
+        with self._transaction() as conn:
+            # 同一交易內先前插入的資料列也會被查到，批次內重複同樣會被略過
+            for alert in records:
+                existing = conn.execute(
+                    _SELECT_DUPLICATE,
+                    (alert.user_id, alert.symbol, alert.condition, alert.target_price,
+                     alert.upper_price)
+                ).fetchone()
+                if existing:
+                    results.append(None)
+                    continue
+                conn.execute(_INSERT_ALERT, self._alert_to_row(alert))
+                results.append(alert)
+
+        added = sum(1 for alert in results if alert is not None)
+        self.logger.info(f"批次新增監控: {added}/{len(records)} 筆（{len(records) - added} 筆重複）")
+        return results
+
+    def import_alerts(self, alerts: Iterable[Dict[str, Any]]) -> int:
+        """
+        在單一交易中匯入既有監控（相同 ID 會略過）
+
+        Args:
+            alerts: JSON 格式的監控列表
+
+        Returns:
+            實際匯入的監控數量
+        """
+        rows = [self._alert_to_row(AlertRecord.from_dict(alert)) for alert in alerts]
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(_INSERT_OR_IGNORE_ALERT, rows)
+            imported = conn.total_changes - before
+
+        self.logger.info(f"匯入監控: {imported}/{len(rows)} 筆")
+        return imported
+
+    def remove_alert(self, user_id: int, alert_id: str) -> bool:
+        """
+        移除監控
+
+        Args:
+            user_id: Telegram 用戶 ID
+            alert_id: 監控 ID
+
+        Returns:
+            是否移除成功
+        """
+        with self._transaction() as conn:
+            removed = conn.execute(_DELETE_ALERT, (alert_id, user_id)).rowcount > 0
+
+        if removed:
+            self.logger.info(f"移除監控: 用戶 {user_id} | ID: {alert_id}")
+        else:
+            self.logger.warning(f"找不到監控或無權限: 用戶 {user_id} | ID: {alert_id}")
+
+        return removed
+
+    def list_alerts(self, user_id: int) -> List[AlertRecord]:
+        """
+        列出用戶的所有監控
+
+        Args:
+            user_id: Telegram 用戶 ID
+
+        Returns:
+            監控列表
+        """
+        rows = self._connection().execute(_SELECT_BY_USER, (user_id,)).fetchall()
+        user_alerts = [self._row_to_alert(row) for row in rows]
+
+        self.logger.debug(f"用戶 {user_id} 有 {len(user_alerts)} 個監控")
+        return user_alerts
+
+    def get_all_symbols(self) -> List[str]:
+        """
+        取得所有啟用的監控股票代碼（去重）
+
+        Returns:
+            股票代碼列表
+        """
+        rows = self._connection().execute(_SELECT_SYMBOLS).fetchall()
+        return [row["symbol"] for row in rows]
+
+    def check_alerts(self, current_prices: Dict[str, Dict]) -> List[Dict]:
+        """
+        檢查有價格資訊的股票監控，返回需要通知的清單
+
+        Args:
+            current_prices: 當前價格字典，格式 {symbol: price_info}
+
+        Returns:
+            需要通知的監控列表，每個元素包含 alert 和 current_price
+        """
+        valid_prices = self._valid_prices(current_prices)
+        prices = {symbol: info["price"] for symbol, info in valid_prices.items()}
+        with self._indicators.cycle(prices):
+            return self._check_prices(valid_prices)
+
+    def check_alerts_stream(self, batches: Iterable[Dict[str, Dict]]) -> Iterator[List[Dict]]:
+        """
+        串流檢查：價格分批到達時逐批評估並寫入（整個串流是同一個檢查週期）
+
+        Args:
+            batches: 價格字典的可迭代物件，格式同 check_alerts
+
+        Yields:
+            每批需要通知的監控列表
+        """
+        prices: Dict[str, float] = {}
+        with self._indicators.cycle(prices):
+            for current_prices in batches:
+                valid_prices = self._valid_prices(current_prices)
+                prices.update((symbol, info["price"]) for symbol, info in valid_prices.items())
+                yield self._check_prices(valid_prices)
+
+    def trigger_distances(self, prices: Dict[str, float]) -> Dict[str, Optional[float]]:
+        """
+        每個股票目前價格到最近門檻的相對距離（供自適應查詢排程使用）
+
+        Args:
+            prices: {symbol: 目前價格}
+
+        Returns:
+            {symbol: |價格 - 門檻| / 價格}；引用指標的股票為 None，沒有監控的股票不在結果中
+        """
+        conn = self._connection()
+        now = time.time()
+        distances: Dict[str, Optional[float]] = {}
+        for symbol, price in prices.items():
+            if not price or price <= 0:
+                continue
+            nearest = math.inf
+            for row in conn.execute(_SELECT_BY_SYMBOL, (symbol.upper(), now)):
+                distance = alert_distance(self._row_to_alert(row), price)
+                if distance is None:
+                    distances[symbol] = None
+                    break
+                nearest = min(nearest, distance)
+            else:
+                if nearest != math.inf:
+                    distances[symbol] = nearest / price
+        return distances
+
+    def subscriber_counts(self, symbols: Iterable[str]) -> Dict[str, int]:
+        """
+        每個股票啟用中的監控數量（供查詢排序使用）
+
+        Args:
+            symbols: 股票代碼
+
+        Returns:
+            {symbol: 監控數量}
+        """
+        counts = {
+            row["symbol"]: row["subscribers"]
+            for row in self._connection().execute(_COUNT_BY_SYMBOL)
+        }
+        return {symbol: counts.get(symbol, 0) for symbol in symbols}
+
+    def _valid_prices(self, current_prices: Dict[str, Dict]) -> Dict[str, Dict]:
+        """過濾查詢失敗的價格資訊"""
+        valid_prices = {}
+        for symbol, price_info in current_prices.items():
+            # 如果查詢失敗，跳過
+            if not price_info or not price_info.get("success"):
+                self.logger.warning(f"跳過檢查 {symbol}：無價格資訊")
+                continue
+            valid_prices[symbol.upper()] = price_info
+        return valid_prices
+
+    def _check_prices(self, valid_prices: Dict[str, Dict]) -> List[Dict]:
+        """評估有價格的股票並在同一個交易中寫入狀態變更（必須在指標週期內呼叫）"""
+        triggered_alerts = []
+        updates = []  # (notified, last_notified_at, expires_at, id)
+        peak_updates = []  # (peak_price, id)
+        conn = self._connection()
+        now = time.time()
+
+        for symbol, price_info in valid_prices.items():
+            self._check_symbol(
+                conn, symbol, price_info, now, updates, peak_updates, triggered_alerts
+            )
+
+        # 所有狀態變更在同一個交易中寫入
+        if updates or peak_updates:
+            with self._transaction() as write_conn:
+                write_conn.executemany(_UPDATE_NOTIFIED, updates)
+                write_conn.executemany(_UPDATE_PEAK, peak_updates)
+                write_conn.execute(
+                    _UPSERT_META, ("last_check", datetime.now().isoformat())
+                )
+
+        return triggered_alerts
+
+    def _check_symbol(
+        self,
+        conn: sqlite3.Connection,
+        symbol: str,
+        price_info: Dict,
+        now: float,
+        updates: List[tuple],
+        peak_updates: List[tuple],
+        triggered_alerts: List[Dict]
+    ):
+        """評估單一股票的監控並收集狀態變更"""
+        current_price = price_info["price"]
+        # 相同門檻的監控共用一次評估結果：{(條件, 目標, 上限): (觸發, 重置)}
+        signals: Dict[tuple, tuple] = {}
+
+        # 透過 (symbol, enabled) 索引只讀取該股票的監控
+        for row in conn.execute(_SELECT_BY_SYMBOL, (symbol, now)):
+            target_price = row["target_price"]
+            condition = row["condition"]
+            notified = bool(row["notified"])
+            peak = row["peak_price"]
+
+            if condition in TRAILING_CONDITIONS:
+                # 移動停損有各自的最高價，不能共用
+                triggered, reset, peak = trailing_signals(
+                    condition, current_price, target_price, row["peak_price"]
+                )
+                if peak != row["peak_price"]:
+                    peak_updates.append((peak, row["id"]))
+            else:
+                key = (condition, target_price, row["upper_price"])
+                signal = signals.get(key)
+                if signal is None:
+                    signal = signals[key] = self._signals(
+                        symbol, condition, current_price, target_price, row["upper_price"]
+                    )
+                triggered, reset = signal
+
+            if triggered:
+                if notified:
+                    continue
+
+                self.logger.info(
+                    f"觸發監控: {symbol} | {condition} {target_price} | "
+                    f"當前: {current_price}"
+                )
+
+                alert = self._row_to_alert(row)
+                alert.peak_price = peak
+                alert.notified = True
+                alert.last_notified_at = now
+                if alert.expire_after is not None:
+                    # 觸發後到期：取較早的到期時間
+                    expiry = now + alert.expire_after
+                    if alert.expires_at is None or expiry < alert.expires_at:
+                        alert.expires_at = expiry
+                updates.append((1, alert["last_notified_at"], alert.expires_at, alert.id))
+
+                triggered_alerts.append({
+                    "alert": alert,
+                    "current_price": current_price,
+                    "currency": price_info.get("currency", "USD")
+                })
+
+            # 檢查是否應重置通知標記（價格回到安全範圍）
+            elif notified and reset:
+                self.logger.info(
+                    f"重置監控通知標記: {symbol} | 當前: {current_price}"
+                )
+                updates.append((0, row["last_notified_at"], row["expires_at"], row["id"]))
+
+    def _signals(
+        self,
+        symbol: str,
+        condition: str,
+        current_price: float,
+        target_price: float,
+        upper_price: Optional[float]
+    ) -> tuple:
+        """
+        評估一個門檻的觸發與重置訊號
+
+        Returns:
+            (是否觸發, 是否應重置通知標記)
+        """
+        # 指標條件由共用的指標狀態評估
+        if condition in THRESHOLD_CONDITIONS:
+            return (
+                self._is_triggered(condition, current_price, target_price),
+                self._should_reset(condition, current_price, target_price)
+            )
+        if condition in BAND_CONDITIONS:
+            return band_signals(condition, current_price, target_price, upper_price)
+        return self._indicator_signals(symbol, condition, target_price)
+
+    def next_expiry(self) -> Optional[float]:
+        """
+        最早的到期時間
+
+        Returns:
+            epoch 秒數，沒有會到期的監控時返回 None
+        """
+        return self._connection().execute(_SELECT_NEXT_EXPIRY).fetchone()[0]
+
+    def expire_alerts(self, now: Optional[float] = None) -> List[AlertRecord]:
+        """
+        在單一交易中刪除已到期的監控（透過 expires_at 部分索引，只讀取到期的資料列）
+
+        Args:
+            now: 目前時間（epoch 秒數），預設為 time.time()
+
+        Returns:
+            被刪除的監控
+        """
+        now = time.time() if now is None else now
+        with self._transaction() as conn:
+            expired = [
+                self._row_to_alert(row)
+                for row in conn.execute(_SELECT_EXPIRED, (now,))
+            ]
+            if expired:
+                conn.execute(_DELETE_EXPIRED, (now,))
+
+        if expired:
+            self.logger.info(f"⏰ 清除 {len(expired)} 個到期監控")
+        return expired
+
+    def get_alert_by_id(self, alert_id: str) -> Optional[AlertRecord]:
+        """
+        根據 ID 取得監控
+
+        Args:
+            alert_id: 監控 ID
+
+        Returns:
+            監控資訊，找不到則返回 None
+        """
+        row = self._connection().execute(_SELECT_BY_ID, (alert_id,)).fetchone()
+        return self._row_to_alert(row) if row else None
+
+    def clear_all_alerts(self, user_id: int) -> int:
+        """
+        清空用戶的所有監控
+
+        Args:
+            user_id: Telegram 用戶 ID
+
+        Returns:
+            清除的監控數量
+        """
+        with self._transaction() as conn:
+            cleared = conn.execute(_DELETE_BY_USER, (user_id,)).rowcount
+
+        if cleared > 0:
+            self.logger.info(f"清空用戶 {user_id} 的 {cleared} 個監控")
+
+        return cleared
+
+    def clear_alerts_by_symbol(self, user_id: int, symbol: str) -> int:
+        """
+        清空用戶指定股票的所有監控
+
+        Args:
+            user_id: Telegram 用戶 ID
+            symbol: 股票代碼
+
+        Returns:
+            清除的監控數量
+        """
+        symbol = symbol.upper()
+
+        with self._transaction() as conn:
+            cleared = conn.execute(_DELETE_BY_USER_SYMBOL, (user_id, symbol)).rowcount
+
+        if cleared > 0:
+            self.logger.info(f"清空用戶 {user_id} 的 {symbol} 監控，共 {cleared} 個")
+
+        return cleared
+
+
+def migrate_json_to_sqlite(json_file: str, database_file: str) -> int:
+    """
+    一次性將 JSON 監控清單匯入 SQLite 資料庫
+
+    Args:
+        json_file: 既有的 JSON 監控清單路徑
+        database_file: 目標 SQLite 資料庫路徑
+
+    Returns:
+        匯入的監控數量
+    """
+    data = load_json(json_file, {"alerts": [], "last_check": None})
+    manager = SQLiteAlertManager(database_file)
+
+    try:
+        imported = manager.import_alerts(data.get("alerts", []))
+        if data.get("last_check"):
+            with manager._transaction() as conn:
+                conn.execute(_UPSERT_META, ("last_check", data["last_check"]))
+        return imported
+    finally:
+        manager.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令列入口：python -m src.sqlite_alert_manager <json> <db>"""
+    parser = argparse.ArgumentParser(description="將 JSON 監控清單匯入 SQLite")
+    parser.add_argument("json_file", help="來源 JSON 監控清單")
+    parser.add_argument("database_file", help="目標 SQLite 資料庫")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    imported = migrate_json_to_sqlite(args.json_file, args.database_file)
+    print(f"✅ 已匯入 {imported} 個監控到 {args.database_file}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
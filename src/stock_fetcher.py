@@ -1,13 +1,20 @@
 """股票價格查詢模組"""
 import logging
 import os
+import threading
 import time
 from datetime import datetime, timedelta
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
 
 import yfinance as yf
 import requests
 
+# 最近報價快取的股票數量上限（超過時淘汰最久沒有更新的股票）
+QUOTE_CACHE_SIZE = 10000
+
+# 檢查點中的報價超過此時間（秒）不再恢復
+QUOTE_RESTORE_MAX_AGE = 24 * 3600
+
 
 class StockFetcher:
     """股票價格查詢類別"""
@@ -29,6 +36,11 @@ class StockFetcher:
         self._use_finmind_backup = True  # 啟用 FinMind 備援
         self._alpha_vantage_key = os.getenv("ALPHA_VANTAGE_API_KEY", "demo")  # Alpha Vantage API Key
 
+        # 最近一次成功的報價 {股票: (查詢時間, 價格資訊)} 與各資料來源的健康狀態
+        self._quotes: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._health: Dict[str, Dict[str, Any]] = {}
+        self._state_lock = threading.Lock()
+
     def normalize_symbol(self, symbol: str) -> str:
         """
         標準化股票代碼
@@ -79,6 +91,109 @@ class StockFetcher:
                 time.sleep(wait_time)
         self._last_request_time = time.time()
 
+    def _provider_available(self, provider: str) -> bool:
+        """資料來源是否可用（被要求暫停的來源在暫停期間跳過）"""
+        health = self._health.get(provider)
+        return health is None or health["paused_until"] <= time.time()
+
+    def _record_provider(self, provider: str, success: bool, pause: float = 0.0):
+        """記錄資料來源的查詢結果，pause 大於 0 時暫停該來源"""
+        now = time.time()
+        with self._state_lock:
+            health = self._health.setdefault(provider, {
+                "successes": 0,
+                "failures": 0,
+                "consecutive_failures": 0,
+                "last_success_at": None,
+                "paused_until": 0.0,
+            })
+            if success:
+                health["successes"] += 1
+                health["consecutive_failures"] = 0
+                health["last_success_at"] = now
+            else:
+                health["failures"] += 1
+                health["consecutive_failures"] += 1
+            if pause > 0:
+                health["paused_until"] = now + pause
+
+    def provider_health(self) -> Dict[str, Dict[str, Any]]:
+        """
+        各資料來源的健康狀態
+
+        Returns:
+            {來源: successes、failures、consecutive_failures、last_success_at、paused_until}
+        """
+        with self._state_lock:
+            return {provider: dict(health) for provider, health in self._health.items()}
+
+    def _remember(self, symbol: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """記錄成功的報價（以標準化後的代碼為 key）"""
+        with self._state_lock:
+            self._quotes.pop(symbol, None)
+            self._quotes[symbol] = (time.time(), result)
+            if len(self._quotes) > QUOTE_CACHE_SIZE:
+                del self._quotes[next(iter(self._quotes))]
+        return result
+
+    def cached_price(self, symbol: str, max_age: float) -> Optional[Dict[str, Any]]:
+        """
+        取得最近查詢過的報價
+
+        Args:
+            symbol: 股票代碼
+            max_age: 可接受的報價年齡（秒）
+
+        Returns:
+            價格資訊（同 get_price），沒有夠新的報價時返回 None
+        """
+        cached = self._quotes.get(self.normalize_symbol(symbol))
+        if cached is None or time.time() - cached[0] > max_age:
+            return None
+        return cached[1]
+
+    def cached_prices(self, symbols: Iterable[str], max_age: float) -> Dict[str, Dict[str, Any]]:
+        """
+        批次取得最近查詢過的報價
+
+        Args:
+            symbols: 股票代碼
+            max_age: 可接受的報價年齡（秒）
+
+        Returns:
+            {標準化後的股票代碼: 價格資訊}，只包含有夠新報價的股票
+        """
+        results = {}
+        for symbol in symbols:
+            cached = self.cached_price(symbol, max_age)
+            if cached is not None:
+                results[self.normalize_symbol(symbol)] = cached
+        return results
+
+    def checkpoint_state(self) -> Dict[str, Any]:
+        """檢查點內容：最近報價、資料來源健康狀態與請求間隔"""
+        with self._state_lock:
+            return {
+                "quotes": [[symbol, at, result] for symbol, (at, result) in self._quotes.items()],
+                "health": {provider: dict(health) for provider, health in self._health.items()},
+                "min_request_interval": self._min_request_interval,
+                "last_request_time": self._last_request_time,
+            }
+
+    def restore_checkpoint(self, state: Dict[str, Any]):
+        """由檢查點恢復最近報價與資料來源狀態（過舊的報價不恢復）"""
+        oldest = time.time() - QUOTE_RESTORE_MAX_AGE
+        with self._state_lock:
+            for symbol, at, result in state.get("quotes", []):
+                if at >= oldest:
+                    self._quotes[symbol] = (at, result)
+            self._health.update(state.get("health", {}))
+        self._min_request_interval = state.get("min_request_interval", self._min_request_interval)
+        self._last_request_time = state.get("last_request_time", self._last_request_time)
+        self.logger.info(
+            f"恢復 {len(self._quotes)} 個最近報價與 {len(self._health)} 個資料來源狀態"
+        )
+
     def _get_price_from_finmind(self, symbol: str) -> Dict[str, Any]:
         """
         從 FinMind API 查詢股票價格（支援台股和美股）
@@ -279,44 +394,54 @@ class StockFetcher:
         symbol = self.normalize_symbol(symbol)
         is_taiwan_stock = ".TW" in symbol.upper()
 
-        # 1. 嘗試 yfinance（主要 API）
-        try:
-            self._wait_for_rate_limit()
-            self.logger.info(f"[yfinance] 查詢: {symbol}")
-
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
-
-            # 嘗試多種價格欄位
-            price = None
-            for field in ["regularMarketPrice", "currentPrice", "previousClose", "open"]:
-                if field in info and info[field] is not None:
-                    price = float(info[field])
-                    break
-
-            if price is not None:
-                currency = info.get("currency", "USD")
-                self.logger.info(f"✅ [yfinance] 成功: {symbol} = {price} {currency}")
-                return {
-                    "symbol": symbol,
-                    "price": price,
-                    "currency": currency,
-                    "timestamp": datetime.now().isoformat(),
-                    "success": True,
-                    "source": "yfinance"
-                }
+        # 1. 嘗試 yfinance（主要 API，被要求暫停時直接使用備援）
+        if not self._provider_available("yfinance"):
+            self.logger.info(f"⏸️ [yfinance] 暫停中（Rate Limit），直接使用備援: {symbol}")
+        else:
+            try:
+                self._wait_for_rate_limit()
+                self.logger.info(f"[yfinance] 查詢: {symbol}")
+
+                ticker = yf.Ticker(symbol)
+                info = ticker.info
+
+                # 嘗試多種價格欄位
+                price = None
+                for field in ["regularMarketPrice", "currentPrice", "previousClose", "open"]:
+                    if field in info and info[field] is not None:
+                        price = float(info[field])
+                        break
+
+                if price is not None:
+                    currency = info.get("currency", "USD")
+                    self.logger.info(f"✅ [yfinance] 成功: {symbol} = {price} {currency}")
+                    self._record_provider("yfinance", True)
+                    return self._remember(symbol, {
+                        "symbol": symbol,
+                        "price": price,
+                        "currency": currency,
+                        "timestamp": datetime.now().isoformat(),
+                        "success": True,
+                        "source": "yfinance"
+                    })
+                self._record_provider("yfinance", False)
 
-        except Exception as e:
-            self.logger.warning(f"❌ [yfinance] 失敗: {symbol} - {e}")
+            except Exception as e:
+                self.logger.warning(f"❌ [yfinance] 失敗: {symbol} - {e}")
+                rate_limited = "429" in str(e) or "Too Many Requests" in str(e)
+                self._record_provider(
+                    "yfinance", False, self._rate_limit_wait if rate_limited else 0.0
+                )
 
         # 2. yfinance 失敗，快速切換到 FinMind（支援台股和美股）
         if self._use_finmind_backup:
             self.logger.info(f"⚡ 快速切換到 FinMind: {symbol}")
             finmind_result = self._get_price_from_finmind(symbol)
+            self._record_provider("finmind", finmind_result.get("success", False))
 
             if finmind_result.get("success"):
                 self.logger.info(f"✅ [FinMind] 成功: {symbol} = {finmind_result['price']}")
-                return finmind_result
+                return self._remember(symbol, finmind_result)
             else:
                 self.logger.warning(f"❌ [FinMind] 失敗: {symbol}")
 
@@ -324,10 +449,11 @@ class StockFetcher:
         if self._alpha_vantage_key and self._alpha_vantage_key != "demo":
             self.logger.info(f"⚡ 嘗試 Alpha Vantage: {symbol}")
             av_result = self._get_price_from_alphavantage(symbol)
+            self._record_provider("alphavantage", av_result.get("success", False))
 
             if av_result.get("success"):
                 self.logger.info(f"✅ [Alpha Vantage] 成功: {symbol} = {av_result['price']}")
-                return av_result
+                return self._remember(symbol, av_result)
             else:
                 self.logger.warning(f"❌ [Alpha Vantage] 失敗: {symbol}")
 
@@ -360,17 +486,122 @@ class StockFetcher:
         Returns:
             字典，key 為股票代碼，value 為價格資訊
         """
-        results = {}
-
         self.logger.info(f"開始批次查詢 {len(symbols)} 個股票")
+        return dict(self.iter_prices(symbols))
 
-        for i, symbol in enumerate(symbols):
+    def iter_prices(self, symbols: Iterable[str]) -> Iterator[Tuple[str, Dict]]:
+        """
+        逐一查詢股票價格，每查到一個就產出（供串流檢查使用）
+
+        Args:
+            symbols: 股票代碼列表
+
+        Yields:
+            (股票代碼, 價格資訊)
+        """
+        for symbol in symbols:
             result = self.get_price(symbol)
-            results[symbol] = result
 
             # 如果遇到 Rate Limit 錯誤，增加後續請求的間隔
             if not result.get("success") and result.get("error") and "429" in result.get("error", ""):
                 self.logger.warning("檢測到 Rate Limit，增加請求間隔到 5 秒")
                 self._min_request_interval = 5.0
 
-        return results
+            yield symbol, result
+
+    def get_prices_batch(self, symbols: Iterable[str]) -> Dict[str, Dict]:
+        """
+        以單次 yfinance 下載批次查詢多個股票價格
+
+        所有代碼合併為一次請求（取最近 5 個交易日的收盤價），只有批次結果中
+        缺少的代碼才逐一改用 get_price 的備援流程。
+
+        Args:
+            symbols: 股票代碼（會先標準化並去重）
+
+        Returns:
+            字典，key 為標準化後的股票代碼，value 為價格資訊
+        """
+        return dict(self.iter_prices_batch(symbols))
+
+    def iter_prices_batch(self, symbols: Iterable[str]) -> Iterator[Tuple[str, Dict]]:
+        """
+        批次查詢（同 get_prices_batch），結果一查到就產出
+
+        批次下載的結果一次產出，缺漏的代碼在備援查詢完成後逐一產出；yfinance
+        暫停中（Rate Limit）時不下載，全部改用單一查詢的備援流程。
+
+        Args:
+            symbols: 股票代碼（會先標準化並去重）
+
+        Yields:
+            (標準化後的股票代碼, 價格資訊)
+        """
+        normalized = list(dict.fromkeys(self.normalize_symbol(s) for s in symbols))
+        results: Dict[str, Dict] = {}
+        if not normalized:
+            return
+
+        if not self._provider_available("yfinance"):
+            self.logger.info("⏸️ [yfinance] 暫停中（Rate Limit），批次查詢直接使用備援")
+        else:
+            try:
+                self._wait_for_rate_limit()
+                self.logger.info(f"[yfinance] 批次查詢 {len(normalized)} 個股票")
+                data = yf.download(
+                    normalized,
+                    period="5d",
+                    interval="1d",
+                    group_by="ticker",
+                    auto_adjust=False,
+                    progress=False,
+                    threads=False
+                )
+
+                for symbol in normalized:
+                    price = self._last_close(data, symbol)
+                    if price is None:
+                        continue
+                    results[symbol] = self._remember(symbol, {
+                        "symbol": symbol,
+                        "price": price,
+                        "currency": "TWD" if ".TW" in symbol else "USD",
+                        "timestamp": datetime.now().isoformat(),
+                        "success": True,
+                        "source": "yfinance"
+                    })
+                self._record_provider("yfinance", bool(results))
+
+            except Exception as e:
+                self.logger.warning(f"❌ [yfinance] 批次查詢失敗: {e}")
+                rate_limited = "429" in str(e) or "Too Many Requests" in str(e)
+                self._record_provider(
+                    "yfinance", False, self._rate_limit_wait if rate_limited else 0.0
+                )
+
+            self.logger.info(f"✅ [yfinance] 批次查詢成功 {len(results)}/{len(normalized)} 個")
+            yield from results.items()
+
+        # 批次結果缺漏的代碼改用單一查詢（含 FinMind、Alpha Vantage 備援）
+        for symbol in normalized:
+            if symbol not in results:
+                yield symbol, self.get_price(symbol)
+
+    @staticmethod
+    def _last_close(data: Any, symbol: str) -> Optional[float]:
+        """從 yf.download 的結果取出指定代碼最後一筆收盤價"""
+        if data is None or getattr(data, "empty", True):
+            return None
+
+        columns = data.columns
+        if getattr(columns, "nlevels", 1) > 1:
+            if symbol not in columns.get_level_values(0):
+                return None
+            closes = data[symbol]["Close"]
+        else:
+            closes = data["Close"]
+
+        closes = closes.dropna()
+        if closes.empty:
+            return None
+        return float(closes.iloc[-1])
@@ -0,0 +1,137 @@
+"""共用訂閱模組 - 相同門檻的監控只評估一次，再分送給所有訂閱者"""
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .bands import BAND_CONDITIONS
+from .trailing import TRAILING_CONDITIONS
+
+# (股票代碼, 條件, 目標價格)
+SubscriptionKey = Tuple[str, str, float]
+
+# {股票代碼: {(條件, 目標價格): 訂閱者}}，依股票分組以便只評估有價格的股票
+SubscriptionIndex = Dict[str, Dict[Tuple[str, float], "Subscription"]]
+
+# 有各自狀態、不能共用評估結果的條件（區間由端點索引評估，移動停損有各自的最高價）
+_UNSHARED_CONDITIONS = BAND_CONDITIONS | TRAILING_CONDITIONS
+
+
+class Subscription(NamedTuple):
+    """同一門檻的訂閱者（監控 ID），依通知狀態分開保存"""
+
+    pending: Tuple[str, ...]  # 尚未通知，觸發時通知
+    notified: Tuple[str, ...]  # 已通知，重置時清除標記
+
+    def __len__(self) -> int:  # type: ignore[override]
+        return len(self.pending) + len(self.notified)
+
+
+def subscription_key(alert) -> Optional[SubscriptionKey]:
+    """
+    監控所屬的共用門檻
+
+    Returns:
+        (symbol, condition, target_price)，停用或不能共用評估的監控返回 None
+    """
+    if not alert.enabled or alert.condition in _UNSHARED_CONDITIONS:
+        return None
+    return (alert.symbol, alert.condition, alert.target_price)
+
+
+def build_subscriptions(alerts: Iterable) -> SubscriptionIndex:
+    """由監控建立 {股票: {門檻: 訂閱者}} 索引"""
+    grouped: Dict[str, Dict[Tuple[str, float], Tuple[List[str], List[str]]]] = {}
+    for alert in alerts:
+        key = subscription_key(alert)
+        if key is not None:
+            symbol, condition, target_price = key
+            pending, notified = grouped.setdefault(symbol, {}).setdefault(
+                (condition, target_price), ([], [])
+            )
+            (notified if alert.notified else pending).append(alert.id)
+    return {
+        symbol: {
+            threshold: Subscription(tuple(pending), tuple(notified))
+            for threshold, (pending, notified) in groups.items()
+        }
+        for symbol, groups in grouped.items()
+    }
+
+
+def with_changes(
+    index: SubscriptionIndex,
+    changes: Iterable[Tuple[Optional[object], Optional[object]]]
+) -> SubscriptionIndex:
+    """
+    套用異動後的新索引（只複製受影響的股票，只重建受影響的門檻）
+
+    Args:
+        index: 目前的索引（不會被修改）
+        changes: (舊記錄, 新記錄) 配對，新增時舊記錄為 None、移除時新記錄為 None
+
+    Returns:
+        新索引（沒有影響任何門檻時返回原索引）
+    """
+    dropped: Dict[SubscriptionKey, List[str]] = {}
+    joined: Dict[SubscriptionKey, Tuple[List[str], List[str]]] = {}
+    flipped: List[Tuple[SubscriptionKey, object]] = []
+
+    for old, new in changes:
+        old_key = None if old is None else subscription_key(old)
+        new_key = None if new is None else subscription_key(new)
+        if old_key == new_key:
+            if old_key is None or old.notified == new.notified:
+                continue
+            # 常見情況：門檻只有一個訂閱者且只改變通知狀態，直接取代分組
+            if len(index[old_key[0]][old_key[1:]]) == 1:
+                flipped.append((old_key, new))
+                continue
+        if old_key is not None:
+            dropped.setdefault(old_key, []).append(old.id)
+        if new_key is not None:
+            pending, notified = joined.setdefault(new_key, ([], []))
+            (notified if new.notified else pending).append(new.id)
+
+    if not dropped and not joined and not flipped:
+        return index
+
+    result = dict(index)
+    copied = set()
+
+    def groups_for(symbol):
+        """取得可修改的股票分組（每個股票只複製一次）"""
+        if symbol not in copied:
+            copied.add(symbol)
+            result[symbol] = dict(result.get(symbol, ()))
+        return result[symbol]
+
+    for (symbol, condition, target_price), new in flipped:
+        groups_for(symbol)[(condition, target_price)] = (
+            Subscription((), (new.id,)) if new.notified else Subscription((new.id,), ())
+        )
+
+    empty = Subscription((), ())
+    for key in dropped.keys() | joined.keys():
+        groups = groups_for(key[0])
+        threshold = key[1:]
+        current = groups.get(threshold, empty)
+        ids = dropped.get(key)
+        if ids is None:
+            pending, notified = current
+        elif len(ids) == len(current):
+            pending = notified = ()
+        else:
+            pending = tuple(alert_id for alert_id in current.pending if alert_id not in ids)
+            notified = tuple(alert_id for alert_id in current.notified if alert_id not in ids)
+
+        new_ids = joined.get(key)
+        if new_ids is not None:
+            pending += tuple(new_ids[0])
+            notified += tuple(new_ids[1])
+        if pending or notified:
+            groups[threshold] = Subscription(pending, notified)
+        else:
+            del groups[threshold]
+
+    for symbol in copied:
+        if not result[symbol]:
+            del result[symbol]
+    return result
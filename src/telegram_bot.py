@@ -1,22 +1,75 @@
 """Telegram Bot 處理器模組"""
 import asyncio
+import html
 import logging
-from typing import Optional
-
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+import math
+import secrets
+import signal
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from telegram import (
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+    Update,
+)
 from telegram.error import TimedOut, NetworkError
 from telegram.ext import (
     Application,
     CommandHandler,
     CallbackQueryHandler,
     ContextTypes,
+    InlineQueryHandler,
     MessageHandler,
     filters,
 )
 
+from .alert_io import format_alert_lines, parse_alert_lines
 from .alert_manager import AlertManager
+from .expiry import format_duration, parse_expiry
+from .indicators import describe_condition, parse_alert_condition
+from .notifier import PRIORITY_HIGH, PRIORITY_NORMAL, NotificationQueue
+from .ratelimit import CommandRateLimiter
 from .stock_fetcher import StockFetcher
+from .tickers import Ticker, TickerIndex
+from .trailing import TRAILING_CONDITIONS
+from .updates import DEFAULT_CONCURRENCY, ChatOrderedUpdateProcessor
 from .utils import format_price
+from .webhook import WebhookServer
+
+# /import 單次最多匯入的監控數量
+MAX_IMPORT_ALERTS = 200
+
+# Telegram 單則訊息長度上限為 4096 字元，保留一些空間
+MAX_MESSAGE_LENGTH = 4000
+
+# 同一用戶的觸發通知合併時，每則訊息最多包含的監控數量
+MAX_ALERTS_PER_MESSAGE = 20
+
+# /price 直接使用此時間（秒）內的報價快取
+PRICE_CACHE_SECONDS = 60
+
+# /price 單次最多查詢的股票數量
+MAX_PRICE_SYMBOLS = 20
+
+# 多股票 /price 編輯回覆的最短間隔（秒），期間查到的價格合併為一次編輯
+PRICE_EDIT_INTERVAL = 1.0
+
+# inline 查詢最多返回的建議數量
+INLINE_RESULTS = 10
+
+# inline 建議附上此時間（秒）內的報價快取
+INLINE_QUOTE_MAX_AGE = 24 * 3600
+
+# Telegram 快取 inline 查詢結果的秒數（報價會變動，保持較短）
+INLINE_CACHE_SECONDS = 30
+
+# 只向 Telegram 訂閱實際處理的更新類型（指令訊息、按鈕回調與 inline 查詢），其他類型不會被送來
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY, Update.INLINE_QUERY]
 
 
 class TelegramBotHandler:
@@ -26,7 +79,14 @@ class TelegramBotHandler:
         self,
         token: str,
         alert_manager: AlertManager,
-        stock_fetcher: StockFetcher
+        stock_fetcher: StockFetcher,
+        webhook_url: Optional[str] = None,
+        webhook_listen: str = "127.0.0.1",
+        webhook_port: int = 8443,
+        webhook_secret: Optional[str] = None,
+        max_concurrent_updates: int = DEFAULT_CONCURRENCY,
+        rate_limiter: Optional[CommandRateLimiter] = None,
+        ticker_index: Optional[TickerIndex] = None
     ):
         """
         初始化 Telegram Bot
@@ -35,12 +95,52 @@ class TelegramBotHandler:
             token: Telegram Bot Token
             alert_manager: 監控管理器
             stock_fetcher: 股票查詢器
+            webhook_url: Telegram 推送更新的公開 HTTPS 網址（None 表示使用長輪詢）
+            webhook_listen: 內建 HTTP 伺服器的監聽位址
+            webhook_port: 內建 HTTP 伺服器的埠號
+            webhook_secret: 驗證推送來源的 secret token（None 表示每次啟動隨機產生）
+            max_concurrent_updates: 同時處理的更新數量（同一聊天的更新仍依序處理）
+            rate_limiter: 用戶指令的查詢限流器（None 表示不限制）
+            ticker_index: inline 查詢自動完成使用的股票代碼目錄（None 表示不提供建議）
         """
         self.token = token
         self.alert_manager = alert_manager
         self.stock_fetcher = stock_fetcher
+        self.webhook_url = webhook_url
+        self.webhook_listen = webhook_listen
+        self.webhook_port = webhook_port
+        self.webhook_secret = webhook_secret or secrets.token_urlsafe(32)
+        self.max_concurrent_updates = max_concurrent_updates
+        self.rate_limiter = rate_limiter
+        self.ticker_index = ticker_index
+        # 更新處理器（並行處理不同聊天的更新，提供排隊延遲統計）
+        self.updates: Optional[ChatOrderedUpdateProcessor] = None
+        # webhook 模式下由 stop() 設定以結束運行
+        self._stop_event: Optional[asyncio.Event] = None
         self.logger = logging.getLogger(__name__)
         self.application: Optional[Application] = None
+        # Bot 運行中的事件迴圈，供背景執行緒提交通知
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # 對外通知佇列（在事件迴圈中建立）
+        self.notifications: Optional[NotificationQueue] = None
+        # Bot 啟動後與關閉時在事件迴圈中執行的協程（例如 asyncio 排程器）
+        self._started_hooks: List[Callable[[], Awaitable]] = []
+        self._stopped_hooks: List[Callable[[], Awaitable]] = []
+
+    def add_lifecycle_hooks(
+        self,
+        on_started: Callable[[], Awaitable],
+        on_stopped: Callable[[], Awaitable]
+    ):
+        """
+        註冊在 Bot 事件迴圈中執行的啟動與關閉協程
+
+        Args:
+            on_started: 通知佇列啟動後執行
+            on_stopped: 通知佇列關閉前執行（依註冊的相反順序）
+        """
+        self._started_hooks.append(on_started)
+        self._stopped_hooks.insert(0, on_stopped)
 
     async def safe_reply(self, update: Update, text: str, max_retries: int = 3, **kwargs):
         """
@@ -79,12 +179,16 @@ class TelegramBotHandler:
 
 📋 可用命令：
 /help - 顯示幫助訊息
-/price <代碼> - 查詢股票當前價格
-/add <代碼> <above/below> <價格> - 新增監控
+/price <代碼> [代碼...] - 查詢股票當前價格（可一次查詢多個）
+/add <代碼> [指標] <條件> <目標> [到期] - 新增監控
 /list - 列出我的監控清單
 /remove <ID> - 移除指定監控
 /clear - 清空所有監控
 /clearstock <代碼> - 清空指定股票的所有監控
+/import - 批次新增監控（每行一筆）
+/export - 匯出監控清單（CSV）
+
+🔎 在任何聊天輸入「@機器人名稱 代碼或名稱」即可搜尋股票（例如 台積 或 apple）
 
 💡 股票代碼格式：
 • 台股：2330.TW 或 2330（會自動加 .TW）
@@ -93,6 +197,7 @@ class TelegramBotHandler:
 範例：
 /price 2330.TW
 /add AAPL above 150
+/add AAPL rsi(14) above 70
 /clearstock 2330.TW
         """
         await update.message.reply_text(welcome_message)
@@ -104,16 +209,32 @@ class TelegramBotHandler:
 📖 Stock Itching 使用說明
 
 🔍 查詢股票價格：
-/price <股票代碼>
-範例：/price 2330.TW 或 /price AAPL
+/price <股票代碼> [股票代碼...]
+範例：/price 2330.TW 或 /price AAPL MSFT 2330
+
+🔎 搜尋股票代碼：
+在任何聊天輸入「@機器人名稱 代碼或名稱」，例如 台積 或 apple，
+選擇結果即可分享代碼與最近的報價
 
 ➕ 新增價格監控：
-/add <股票代碼> <above/below> <目標價格>
-• above：當價格高於目標時通知
-• below：當價格低於目標時通知
+/add <股票代碼> [指標] <條件> <目標> [到期]
+• above / below：高於 / 低於目標時通知
+• cross_above / cross_below：由下往上 / 由上往下穿越目標時通知
+• between / outside：價格進入 / 離開區間時通知（目標為「下限 上限」）
+• trailing：從新增以來的最高價回落時通知（目標為百分比如 5%，或點數如 3）
+• 指標（選填，預設為價格）：sma(N)、ema(N)、rsi(N)、change(N)（N 次檢查的漲跌幅 %）
+• 目標：數字，或另一個指標
+• 到期（選填）：7d（7 天後）、2026-12-31（指定日期）、trigger+3d（觸發後 3 天）
 範例：
 /add 2330.TW above 600
-/add AAPL below 140
+/add AAPL below 140 30d
+/add TSLA above 300 trigger+1d
+/add AAPL rsi(14) above 70
+/add AAPL cross_above sma(20)
+/add NVDA ema(12) cross_above ema(26)
+/add 2330.TW change(12) below -5
+/add 2330.TW between 580 620
+/add NVDA trailing 8%
 
 📋 查看監控清單：
 /list
@@ -129,9 +250,18 @@ class TelegramBotHandler:
 範例：
 /clearstock 2330.TW
 
+📥 批次匯入 / 📤 匯出：
+/import 後換行輸入多筆監控，每行「代碼,[指標] 條件,目標[,到期]」
+範例：
+/import
+2330.TW,above,600
+AAPL below 140
+/export - 以相同格式匯出所有監控
+
 💡 提示：
 • 系統每 5 分鐘自動檢查一次價格
 • 觸發通知後不會重複提醒（除非價格回到安全範圍）
+• 指標以每次檢查的價格計算，新增後需累積足夠次數才會開始判斷
 • 台股代碼可以只輸入數字，系統會自動加 .TW
         """
         await update.message.reply_text(help_message)
@@ -139,26 +269,37 @@ class TelegramBotHandler:
     async def price_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """處理 /price 命令"""
         try:
-            if not context.args or len(context.args) != 1:
+            if not context.args:
                 await update.message.reply_text(
-                    "❌ 用法錯誤！\n正確格式：/price <股票代碼>\n範例：/price 2330.TW"
+                    "❌ 用法錯誤！\n正確格式：/price <股票代碼> [股票代碼...]\n"
+                    "範例：/price 2330.TW 或 /price AAPL MSFT 2330"
                 )
                 return
+            if len(context.args) > 1:
+                await self._price_many(update, context.args)
+                return
 
             symbol = context.args[0]
             user_id = update.effective_user.id
             self.logger.info(f"用戶 {user_id} 請求查詢: {symbol}")
 
-            await update.message.reply_text(f"🔍 查詢中：{symbol}...")
-
-            # 查詢價格（在 thread 中執行，避免阻塞事件循環）
-            self.logger.info(f"開始查詢股票價格: {symbol}")
-            result = await asyncio.to_thread(self.stock_fetcher.get_price, symbol)
-            self.logger.info(f"查詢完成: {symbol}, 成功={result['success']}")
+            # 優先使用最近的報價快取，否則查詢價格（在 thread 中執行，避免阻塞事件循環）
+            result = await asyncio.to_thread(
+                self.stock_fetcher.cached_price, symbol, PRICE_CACHE_SECONDS
+            )
+            cached = result is not None
+            if not cached:
+                # 先確認額度再告知查詢中，被限流的用戶只收到限流訊息
+                if not await self._take_quota(update):
+                    return
+                await update.message.reply_text(f"🔍 查詢中：{symbol}...")
+                self.logger.info(f"開始查詢股票價格: {symbol}")
+                result = await asyncio.to_thread(self.stock_fetcher.get_price, symbol)
+            self.logger.info(f"查詢完成: {symbol}, 成功={result['success']}, 快取={cached}")
 
             if result["success"]:
                 price_str = format_price(result["price"], result["currency"])
-                source = result.get("source", "unknown")
+                source = result.get("source", "unknown") + ("（快取）" if cached else "")
                 message = f"""
 📊 {result['symbol']}
 💰 當前價格：{price_str}
@@ -183,37 +324,224 @@ class TelegramBotHandler:
             except:
                 pass
 
+    async def _price_many(self, update: Update, args: List[str]):
+        """
+        查詢多個股票：先以快取回覆表格，其餘股票批次查詢，查到後編輯同一則回覆
+
+        Args:
+            update: Telegram Update 對象
+            args: 使用者輸入的股票代碼
+        """
+        user_id = update.effective_user.id
+        symbols = list(dict.fromkeys(self.stock_fetcher.normalize_symbol(arg) for arg in args))
+        if len(symbols) > MAX_PRICE_SYMBOLS:
+            await update.message.reply_text(f"❌ 一次最多查詢 {MAX_PRICE_SYMBOLS} 個股票")
+            return
+        self.logger.info(f"用戶 {user_id} 請求查詢 {len(symbols)} 個股票: {' '.join(symbols)}")
+
+        # {股票: (價格資訊, 是否為快取)}，None 表示查詢中
+        rows: Dict[str, Optional[Tuple[Dict, bool]]] = dict.fromkeys(symbols)
+        for symbol in symbols:
+            if not self.stock_fetcher.validate_symbol(symbol):
+                rows[symbol] = ({"success": False, "error": "代碼格式無效"}, False)
+        cached = await asyncio.to_thread(
+            self.stock_fetcher.cached_prices,
+            [symbol for symbol, row in rows.items() if row is None],
+            PRICE_CACHE_SECONDS
+        )
+        rows.update((symbol, (result, True)) for symbol, result in cached.items())
+
+        missing = [symbol for symbol, row in rows.items() if row is None]
+        max_cost = self._max_query_cost()
+        error = None
+        if max_cost is not None and len(missing) > max_cost:
+            error = f"一次最多查詢 {max_cost} 個股票"
+        else:
+            wait = self._quota_wait(update, len(missing))
+            if wait:
+                error = f"查詢太頻繁，請 {math.ceil(wait)} 秒後再試"
+        if error:
+            # 額度不足時只顯示快取的報價
+            limited = {"success": False, "error": error}
+            rows.update((symbol, (limited, False)) for symbol in missing)
+            missing = []
+
+        message = await update.message.reply_text(self._price_table(rows), parse_mode="HTML")
+        if missing:
+            await self._stream_prices(message, rows, missing)
+        self.logger.info(f"✅ 已回覆用戶 {user_id}: 快取 {len(cached)} 個、查詢 {len(missing)} 個")
+
+    async def _stream_prices(
+        self,
+        message,
+        rows: Dict[str, Optional[Tuple[Dict, bool]]],
+        missing: List[str]
+    ):
+        """
+        在 thread 中批次查詢，依查到的順序編輯回覆（每 PRICE_EDIT_INTERVAL 秒最多一次）
+
+        Args:
+            message: 要編輯的回覆
+            rows: 表格內容，查到的價格會直接寫入
+            missing: 要查詢的股票
+        """
+        loop = asyncio.get_running_loop()
+        arrivals: asyncio.Queue = asyncio.Queue()
+
+        def fetch():
+            try:
+                for symbol, result in self.stock_fetcher.iter_prices_batch(missing):
+                    loop.call_soon_threadsafe(arrivals.put_nowait, (symbol, result))
+            finally:
+                loop.call_soon_threadsafe(arrivals.put_nowait, None)
+
+        fetcher = asyncio.ensure_future(asyncio.to_thread(fetch))
+        last_edit = loop.time()
+        dirty = done = False
+        while not done:
+            timeout = max(0.0, last_edit + PRICE_EDIT_INTERVAL - loop.time()) if dirty else None
+            try:
+                item = await asyncio.wait_for(arrivals.get(), timeout)
+                if item is None:
+                    done = True
+                else:
+                    rows[item[0]] = (item[1], False)
+                    dirty = True
+            except asyncio.TimeoutError:
+                pass
+            if dirty and (done or loop.time() - last_edit >= PRICE_EDIT_INTERVAL):
+                await self._edit_price_table(message, rows)
+                last_edit = loop.time()
+                dirty = False
+
+        try:
+            await fetcher
+        except Exception as e:
+            self.logger.error(f"❌ 批次查詢失敗: {e}", exc_info=True)
+        # 查詢中斷時，剩下的股票標示為失敗
+        unfinished = [symbol for symbol, row in rows.items() if row is None]
+        if unfinished:
+            rows.update((symbol, ({"success": False}, False)) for symbol in unfinished)
+            await self._edit_price_table(message, rows)
+
+    async def _edit_price_table(self, message, rows: Dict[str, Optional[Tuple[Dict, bool]]]):
+        """編輯報價表格（編輯失敗只記錄，不中斷查詢）"""
+        try:
+            await message.edit_text(self._price_table(rows), parse_mode="HTML")
+        except Exception as e:
+            self.logger.warning(f"更新報價表格失敗: {e}")
+
+    def _quota_wait(self, update: Update, cost: int = 1) -> float:
+        """
+        為需要查詢資料來源的指令扣除用戶額度
+
+        Args:
+            update: Telegram Update 對象
+            cost: 會發出的查詢數
+
+        Returns:
+            0 表示可以查詢，否則為需要等待的秒數
+        """
+        if self.rate_limiter is None:
+            return 0.0
+        return self.rate_limiter.acquire(update.effective_user.id, cost)
+
+    def _max_query_cost(self) -> Optional[int]:
+        """單一指令最多可以發出的查詢數，None 表示不限制"""
+        return self.rate_limiter.max_cost if self.rate_limiter is not None else None
+
+    async def _take_quota(self, update: Update, cost: int = 1) -> bool:
+        """扣除用戶額度，不足或超過單一指令上限時回覆用戶，返回是否可以查詢"""
+        max_cost = self._max_query_cost()
+        if max_cost is not None and cost > max_cost:
+            await self.safe_reply(
+                update,
+                f"❌ 一次最多查詢 {max_cost} 個股票（收到 {cost} 個），請分批送出。\n"
+                f"（股價查詢額度由所有用戶與定時檢查共用）"
+            )
+            return False
+        wait = self._quota_wait(update, cost)
+        if wait:
+            await self.safe_reply(
+                update,
+                f"🐢 查詢太頻繁了，請 {math.ceil(wait)} 秒後再試。\n"
+                f"（股價查詢額度由所有用戶與定時檢查共用）"
+            )
+        return not wait
+
+    @staticmethod
+    def _price_table(rows: Dict[str, Optional[Tuple[Dict, bool]]]) -> str:
+        """
+        組合多股票報價表格
+
+        Args:
+            rows: {股票: (價格資訊, 是否為快取)}，None 表示查詢中
+
+        Returns:
+            HTML 訊息內容（表格以等寬字型顯示）
+        """
+        width = max(len(symbol) for symbol in rows)
+        lines = []
+        for symbol, row in rows.items():
+            if row is None:
+                status = "⏳ 查詢中"
+            elif row[0].get("success"):
+                result, cached = row
+                source = result.get("source", "unknown") + ("（快取）" if cached else "")
+                status = f"{format_price(result['price'], result['currency']):>14}  {source}"
+            else:
+                status = f"❌ {row[0].get('error', '查詢失敗')}"
+            lines.append(f"{symbol:<{width}}  {status}")
+
+        pending = sum(1 for row in rows.values() if row is None)
+        header = f"📊 {len(rows)} 個股票報價" + (f"（{pending} 個查詢中）" if pending else "")
+        table = html.escape("\n".join(lines))
+        return f"{header}\n<pre>{table}</pre>\n🕐 更新時間：{datetime.now():%H:%M:%S}"
+
     async def add_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """處理 /add 命令"""
         try:
             user_id = update.effective_user.id
             self.logger.info(f"用戶 {user_id} 執行 /add 命令")
 
-            if not context.args or len(context.args) != 3:
-                await update.message.reply_text(
-                    "❌ 用法錯誤！\n"
-                    "正確格式：/add <股票代碼> <above/below> <目標價格>\n"
-                    "範例：/add 2330.TW above 600"
-                )
+            usage = (
+                "❌ 用法錯誤！\n"
+                "正確格式：/add <股票代碼> [指標] <條件> <目標> [到期]\n"
+                "範例：/add 2330.TW above 600、/add AAPL below 140 30d、"
+                "/add AAPL rsi(14) above 70"
+            )
+            if not context.args or len(context.args) < 3:
+                await update.message.reply_text(usage)
                 return
 
             symbol = context.args[0]
-            condition = context.args[1].lower()
 
             try:
-                target_price = float(context.args[2])
-            except ValueError:
-                await update.message.reply_text("❌ 目標價格必須是數字！")
+                condition, target_price, upper_price, rest = parse_alert_condition(
+                    context.args[1:]
+                )
+            except ValueError as e:
+                await update.message.reply_text(f"❌ {e}")
                 return
 
-            if condition not in ["above", "below"]:
-                await update.message.reply_text("❌ 條件必須是 'above' 或 'below'！")
+            if len(rest) > 1:
+                await update.message.reply_text(usage)
                 return
 
+            expires_at = expire_after = None
+            if rest:
+                try:
+                    expires_at, expire_after = parse_expiry(rest[0])
+                except ValueError as e:
+                    await update.message.reply_text(f"❌ {e}")
+                    return
+
             # 先驗證股票代碼
             symbol_normalized = self.stock_fetcher.normalize_symbol(symbol)
             self.logger.info(f"驗證股票代碼: {symbol_normalized}")
 
+            if not await self._take_quota(update):
+                return
             await self.safe_reply(update, f"⏳ 驗證股票代碼：{symbol_normalized}...")
 
             self.logger.info(f"開始查詢股票價格: {symbol_normalized}")
@@ -229,24 +557,33 @@ class TelegramBotHandler:
 
             # 新增監控
             self.logger.info(f"新增監控: {symbol_normalized} {condition} {target_price}")
-            alert = self.alert_manager.add_alert(
+            alert = await asyncio.to_thread(
+                self.alert_manager.add_alert,
                 user_id=user_id,
                 symbol=symbol_normalized,
                 target_price=target_price,
-                condition=condition
+                condition=condition,
+                expires_at=expires_at,
+                expire_after=expire_after,
+                upper_price=upper_price,
+                peak_price=price_check["price"]
+            )
+
+            condition_text = describe_condition(
+                condition, target_price,
+                lambda price: format_price(price, price_check["currency"]),
+                upper_price
             )
 
             # 檢查是否重複（add_alert 返回 None 表示忽略重複警報）
             if alert is None:
-                condition_text = "高於" if condition == "above" else "低於"
-                price_str = format_price(target_price, price_check["currency"])
                 current_price_str = format_price(price_check['price'], price_check['currency'])
 
                 message = f"""
 ℹ️ 此監控已存在，未重複新增
 
 📊 股票：{symbol_normalized}
-🎯 條件：價格 {condition_text} {price_str}
+🎯 條件：{condition_text}
 💰 當前價格：{current_price_str}
 
 使用 /list 查看所有監控。
@@ -255,17 +592,16 @@ class TelegramBotHandler:
                 await self.safe_reply(update, message.strip())
                 return
 
-            condition_text = "高於" if condition == "above" else "低於"
-            price_str = format_price(target_price, price_check["currency"])
             current_price_str = format_price(price_check['price'], price_check['currency'])
 
             message = f"""
 ✅ 監控已新增！
 
 📊 股票：{alert['symbol']}
-🎯 條件：價格 {condition_text} {price_str}
+🎯 條件：{condition_text}
 🆔 監控ID：{alert['id'][:8]}...
 💰 當前價格：{current_price_str}
+⏰ 到期：{self._expiry_text(alert)}
 
 系統會每 5 分鐘檢查一次，達標時會通知你。
 使用 /list 查看所有監控。
@@ -282,12 +618,21 @@ class TelegramBotHandler:
             except:
                 pass
 
+    @staticmethod
+    def _expiry_text(alert) -> str:
+        """監控到期設定的顯示文字"""
+        if alert["expires_at"]:
+            return alert["expires_at"][:16].replace("T", " ")
+        if alert["expire_after"]:
+            return f"觸發後 {format_duration(alert['expire_after'])}"
+        return "不會到期"
+
     async def list_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """處理 /list 命令"""
         try:
             user_id = update.effective_user.id
             self.logger.info(f"用戶 {user_id} 執行 /list 命令")
-            alerts = self.alert_manager.list_alerts(user_id)
+            alerts = await asyncio.to_thread(self.alert_manager.list_alerts, user_id)
 
             if not alerts:
                 await self.safe_reply(
@@ -299,13 +644,25 @@ class TelegramBotHandler:
             message_parts = ["📋 你的監控清單：\n"]
 
             for i, alert in enumerate(alerts, 1):
-                condition_text = "高於" if alert["condition"] == "above" else "低於"
+                condition_text = describe_condition(
+                    alert["condition"], alert["target_price"], upper_price=alert["upper_price"]
+                )
                 status = "🔔 已通知" if alert["notified"] else "⏳ 監控中"
 
+                expiry_line = ""
+                if alert.get("expires_at") or alert.get("expire_after"):
+                    expiry_line = f"   到期：{self._expiry_text(alert)}\n"
+
+                peak_line = ""
+                if alert.get("peak_price") is not None:
+                    peak_line = f"   最高價：{alert['peak_price']}\n"
+
                 message_parts.append(
                     f"{i}. {alert['symbol']}\n"
-                    f"   條件：{condition_text} {alert['target_price']}\n"
+                    f"   條件：{condition_text}\n"
                     f"   狀態：{status}\n"
+                    f"{peak_line}"
+                    f"{expiry_line}"
                     f"   ID：{alert['id'][:8]}...\n"
                 )
 
@@ -341,7 +698,7 @@ class TelegramBotHandler:
             alert_id_prefix = context.args[0]
 
             # 尋找匹配的監控 ID
-            alerts = self.alert_manager.list_alerts(user_id)
+            alerts = await asyncio.to_thread(self.alert_manager.list_alerts, user_id)
             matched_alert = None
 
             for alert in alerts:
@@ -358,7 +715,9 @@ class TelegramBotHandler:
                 return
 
             # 移除監控
-            success = self.alert_manager.remove_alert(user_id, matched_alert["id"])
+            success = await asyncio.to_thread(
+                self.alert_manager.remove_alert, user_id, matched_alert["id"]
+            )
 
             if success:
                 await self.safe_reply(
@@ -385,14 +744,14 @@ class TelegramBotHandler:
             self.logger.info(f"用戶 {user_id} 執行 /clear 命令")
 
             # 先檢查是否有監控
-            alerts = self.alert_manager.list_alerts(user_id)
+            alerts = await asyncio.to_thread(self.alert_manager.list_alerts, user_id)
 
             if not alerts:
                 await self.safe_reply(update, "📋 你目前沒有任何監控。")
                 return
 
             # 執行清空
-            cleared_count = self.alert_manager.clear_all_alerts(user_id)
+            cleared_count = await asyncio.to_thread(self.alert_manager.clear_all_alerts, user_id)
 
             if cleared_count > 0:
                 await self.safe_reply(
@@ -425,7 +784,9 @@ class TelegramBotHandler:
         symbol = self.stock_fetcher.normalize_symbol(context.args[0])
 
         # 執行清空
-        cleared_count = self.alert_manager.clear_alerts_by_symbol(user_id, symbol)
+        cleared_count = await asyncio.to_thread(
+            self.alert_manager.clear_alerts_by_symbol, user_id, symbol
+        )
 
         if cleared_count > 0:
             await update.message.reply_text(
@@ -439,6 +800,169 @@ class TelegramBotHandler:
                 f"📋 沒有 {symbol} 的監控需要清空。"
             )
 
+    async def import_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """處理 /import 命令 - 批次新增監控"""
+        try:
+            user_id = update.effective_user.id
+            self.logger.info(f"用戶 {user_id} 執行 /import 命令")
+
+            # 保留換行：只移除第一個 token（/import 或 /import@bot）
+            parts = (update.message.text or "").split(maxsplit=1)
+            payload = parts[1] if len(parts) > 1 else ""
+
+            entries, errors = parse_alert_lines(payload)
+
+            if not entries and not errors:
+                await self.safe_reply(
+                    update,
+                    "❌ 用法錯誤！\n"
+                    "正確格式：/import 後換行，每行一筆「代碼,[指標] 條件,目標[,到期]」\n"
+                    "範例：\n/import\n2330.TW,above,600\nAAPL below 140"
+                )
+                return
+
+            if len(entries) > MAX_IMPORT_ALERTS:
+                await self.safe_reply(
+                    update,
+                    f"❌ 一次最多匯入 {MAX_IMPORT_ALERTS} 筆監控（收到 {len(entries)} 筆）"
+                )
+                return
+
+            # 所有代碼以一次批次查詢驗證
+            symbols = [self.stock_fetcher.normalize_symbol(entry["symbol"]) for entry in entries]
+            quotes = {}
+            if symbols:
+                if not await self._take_quota(update, len(set(symbols))):
+                    return
+                await self.safe_reply(update, f"⏳ 驗證 {len(set(symbols))} 個股票代碼...")
+                quotes = await asyncio.to_thread(self.stock_fetcher.get_prices_batch, symbols)
+
+            batch = []
+            for entry, symbol in zip(entries, symbols):
+                if not quotes.get(symbol, {}).get("success"):
+                    errors.append(f"第 {entry['line']} 行：無法查詢到此股票 {symbol}")
+                    continue
+                batch.append({
+                    "user_id": user_id,
+                    "symbol": symbol,
+                    "condition": entry["condition"],
+                    "target_price": entry["target_price"],
+                    "upper_price": entry["upper_price"],
+                    "peak_price": quotes[symbol]["price"],
+                    "expires_at": entry["expires_at"],
+                    "expire_after": entry["expire_after"]
+                })
+
+            # 整批只寫入一次
+            results = await asyncio.to_thread(self.alert_manager.add_alerts, batch) if batch else []
+            added = sum(1 for alert in results if alert is not None)
+            duplicates = len(results) - added
+
+            message_parts = [f"📥 匯入完成：新增 {added} 個監控"]
+            if duplicates:
+                message_parts.append(f"ℹ️ 已存在而略過：{duplicates} 個")
+            if errors:
+                message_parts.append(f"❌ 無法匯入：{len(errors)} 行")
+                message_parts.extend(errors[:10])
+                if len(errors) > 10:
+                    message_parts.append(f"...（還有 {len(errors) - 10} 行）")
+            message_parts.append("\n使用 /list 查看所有監控。")
+
+            await self.safe_reply(update, "\n".join(message_parts))
+            self.logger.info(
+                f"✅ 用戶 {user_id} 匯入監控: 新增 {added}、重複 {duplicates}、失敗 {len(errors)}"
+            )
+
+        except Exception as e:
+            self.logger.error(f"❌ import_command 執行失敗: {e}", exc_info=True)
+            try:
+                await update.message.reply_text(f"❌ 匯入失敗：{str(e)}")
+            except:
+                pass
+
+    async def export_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """處理 /export 命令 - 匯出監控清單"""
+        try:
+            user_id = update.effective_user.id
+            self.logger.info(f"用戶 {user_id} 執行 /export 命令")
+            alerts = await asyncio.to_thread(self.alert_manager.list_alerts, user_id)
+
+            if not alerts:
+                await self.safe_reply(update, "📋 你目前沒有任何監控。")
+                return
+
+            # 依行切分，避免超過單則訊息長度上限
+            chunks = []
+            current = ""
+            for line in format_alert_lines(alerts).splitlines(keepends=True):
+                if len(current) + len(line) > MAX_MESSAGE_LENGTH:
+                    chunks.append(current)
+                    current = ""
+                current += line
+            chunks.append(current)
+
+            await self.safe_reply(
+                update,
+                f"📤 共 {len(alerts)} 個監控，可直接貼在 /import 後重新匯入："
+            )
+            for chunk in chunks:
+                await self.safe_reply(update, chunk.rstrip("\n"))
+            self.logger.info(f"✅ 已匯出用戶 {user_id} 的 {len(alerts)} 個監控")
+
+        except Exception as e:
+            self.logger.error(f"❌ export_command 執行失敗: {e}", exc_info=True)
+            try:
+                await update.message.reply_text(f"❌ 匯出失敗：{str(e)}")
+            except:
+                pass
+
+    async def inline_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """處理 inline 查詢：以本機代碼目錄自動完成，附上快取的報價（不查詢資料來源）"""
+        query = update.inline_query
+        try:
+            tickers = []
+            if self.ticker_index is not None:
+                tickers = self.ticker_index.search(query.query, INLINE_RESULTS)
+            quotes = {}
+            if tickers:
+                quotes = await asyncio.to_thread(
+                    self.stock_fetcher.cached_prices,
+                    [ticker.symbol for ticker in tickers],
+                    INLINE_QUOTE_MAX_AGE
+                )
+            results = [self._inline_result(ticker, quotes.get(ticker.symbol)) for ticker in tickers]
+            await query.answer(results, cache_time=INLINE_CACHE_SECONDS)
+        except Exception as e:
+            self.logger.error(f"❌ inline_query 執行失敗: {e}", exc_info=True)
+
+    @staticmethod
+    def _inline_result(ticker: Ticker, quote: Optional[Dict]) -> InlineQueryResultArticle:
+        """
+        組合一筆 inline 建議
+
+        Args:
+            ticker: 股票
+            quote: 快取的報價（None 表示沒有最近的報價）
+
+        Returns:
+            選擇後送出股票代碼與報價的建議
+        """
+        title = f"{ticker.symbol} {ticker.name}"
+        if quote is not None:
+            price_str = format_price(quote["price"], quote["currency"])
+            quoted_at = quote.get("timestamp", "")[5:16].replace("T", " ")
+            description = f"{price_str}（報價時間 {quoted_at}）"
+            text = f"📊 {title}\n💰 價格：{price_str}\n🕐 報價時間：{quoted_at}"
+        else:
+            description = "尚無最近的報價"
+            text = f"📊 {title}\n使用 /price {ticker.symbol} 查詢即時價格"
+        return InlineQueryResultArticle(
+            id=ticker.symbol,
+            title=title,
+            description=description,
+            input_message_content=InputTextMessageContent(text)
+        )
+
     async def error_handler(
         self,
         update: Optional[Update],
@@ -452,67 +976,119 @@ class TelegramBotHandler:
                 "❌ 發生錯誤，請稍後再試或聯絡管理員。"
             )
 
-    async def send_alert(self, user_id: int, alert_info: dict):
+    def submit_alerts(self, triggered_alerts: List[Dict]) -> Optional[Future]:
         """
-        發送價格觸發通知
+        從背景執行緒提交通知到 Bot 的事件迴圈（執行緒安全）
 
         Args:
-            user_id: Telegram 用戶 ID
-            alert_info: 包含 alert、current_price、currency 的字典
+            triggered_alerts: check_alerts 返回的觸發清單
+
+        Returns:
+            完成時結果為每筆通知是否送達的 Future，Bot 尚未啟動時返回 None
         """
-        try:
-            # 檢查 Bot 是否已初始化
-            if not self.application or not self.application.bot:
-                self.logger.warning(
-                    f"Telegram Bot 尚未初始化，無法發送通知給用戶 {user_id}"
-                )
-                return
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            self.logger.warning(
+                f"Telegram Bot 尚未啟動，無法發送 {len(triggered_alerts)} 則通知"
+            )
+            return None
+        return asyncio.run_coroutine_threadsafe(self.send_alerts(triggered_alerts), loop)
 
-            alert = alert_info["alert"]
-            current_price = alert_info["current_price"]
-            currency = alert_info["currency"]
+    async def send_alerts(self, triggered_alerts: List[Dict]) -> List[bool]:
+        """
+        透過通知佇列發送觸發通知，同一用戶的通知合併為一則訊息
 
-            condition_text = "高於" if alert["condition"] == "above" else "低於"
-            target_str = format_price(alert["target_price"], currency)
-            current_str = format_price(current_price, currency)
+        Args:
+            triggered_alerts: check_alerts 返回的觸發清單
 
-            message = f"""
-🔔 價格警報觸發！
+        Returns:
+            每筆通知是否送達（順序與輸入相同）
+        """
+        if self.notifications is None:
+            self.logger.warning(
+                f"Telegram Bot 尚未初始化，無法發送 {len(triggered_alerts)} 則通知"
+            )
+            return [False] * len(triggered_alerts)
+
+        by_user: Dict[int, List[int]] = {}
+        for index, alert_info in enumerate(triggered_alerts):
+            by_user.setdefault(alert_info["alert"]["user_id"], []).append(index)
+
+        futures = []
+        for user_id, indexes in by_user.items():
+            for start in range(0, len(indexes), MAX_ALERTS_PER_MESSAGE):
+                chunk = indexes[start:start + MAX_ALERTS_PER_MESSAGE]
+                alert_infos = [triggered_alerts[index] for index in chunk]
+                text, reply_markup = self._alert_message(alert_infos)
+                priority = (
+                    PRIORITY_HIGH
+                    if any(info["alert"]["condition"] in TRAILING_CONDITIONS for info in alert_infos)
+                    else PRIORITY_NORMAL
+                )
+                self.logger.info(f"排入通知: 用戶 {user_id}，{len(chunk)} 個監控")
+                futures.append((chunk, self.notifications.enqueue(
+                    user_id, text, reply_markup, priority
+                )))
+
+        delivered = [False] * len(triggered_alerts)
+        for chunk, future in futures:
+            sent = await future
+            for index in chunk:
+                delivered[index] = sent
+        return delivered
+
+    async def send_alert(self, user_id: int, alert_info: dict) -> bool:
+        """
+        發送單一價格觸發通知
 
-📊 股票：{alert['symbol']}
-💰 當前價格：{current_str}
-🎯 目標價格：{condition_text} {target_str}
+        Args:
+            user_id: Telegram 用戶 ID（與 alert_info 中的 user_id 相同）
+            alert_info: 包含 alert、current_price、currency 的字典
 
-條件已達成，請注意！
-            """
+        Returns:
+            是否發送成功
+        """
+        return (await self.send_alerts([alert_info]))[0]
 
-            # 創建移除按鈕
-            keyboard = [
-                [
-                    InlineKeyboardButton(
-                        "🗑️ 移除此警報",
-                        callback_data=f"remove_alert:{alert['id']}"
-                    )
-                ]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+    @staticmethod
+    def _alert_message(alert_infos: List[Dict]):
+        """
+        組合同一用戶的觸發通知
 
-            self.logger.info(
-                f"正在發送通知給用戶 {user_id}: {alert['symbol']} {current_price}"
-            )
+        Args:
+            alert_infos: 同一用戶的觸發資訊
 
-            await self.application.bot.send_message(
-                chat_id=user_id,
-                text=message.strip(),
-                reply_markup=reply_markup
+        Returns:
+            (訊息內容, 每個監控一個移除按鈕的 InlineKeyboardMarkup)
+        """
+        blocks = []
+        keyboard = []
+        for alert_info in alert_infos:
+            alert = alert_info["alert"]
+            currency = alert_info["currency"]
+            condition_text = describe_condition(
+                alert["condition"], alert["target_price"],
+                lambda price: format_price(price, currency),
+                alert["upper_price"]
             )
-
-            self.logger.info(
-                f"✅ 通知發送成功 (用戶 {user_id})"
+            current_str = format_price(alert_info["current_price"], currency)
+            blocks.append(
+                f"📊 股票：{alert['symbol']}\n"
+                f"💰 當前價格：{current_str}\n"
+                f"🎯 條件：{condition_text}"
             )
+            keyboard.append([
+                InlineKeyboardButton(
+                    "🗑️ 移除此警報" if len(alert_infos) == 1 else f"🗑️ 移除 {alert['symbol']}",
+                    callback_data=f"remove_alert:{alert['id']}"
+                )
+            ])
 
-        except Exception as e:
-            self.logger.error(f"❌ 發送通知失敗 (用戶 {user_id}): {e}", exc_info=True)
+        title = "🔔 價格警報觸發！"
+        if len(alert_infos) > 1:
+            title = f"🔔 價格警報觸發！（{len(alert_infos)} 個）"
+        text = f"{title}\n\n" + "\n\n".join(blocks) + "\n\n條件已達成，請注意！"
+        return text, InlineKeyboardMarkup(keyboard)
 
     async def button_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """處理按鈕點擊回調"""
@@ -531,19 +1107,22 @@ class TelegramBotHandler:
 
                 # 移除警報
                 self.logger.info(f"嘗試移除警報: {alert_id}")
-                success = self.alert_manager.remove_alert(user_id, alert_id)
+                success = await asyncio.to_thread(
+                    self.alert_manager.remove_alert, user_id, alert_id
+                )
 
+                # 合併通知中只移除被點擊的按鈕，保留其他監控的按鈕
+                reply_markup = self._without_button(query.message.reply_markup, callback_data)
                 if success:
-                    # 更新訊息，移除按鈕
                     await query.edit_message_text(
                         text=f"{query.message.text}\n\n✅ 警報已移除",
-                        reply_markup=None
+                        reply_markup=reply_markup
                     )
                     self.logger.info(f"✅ 警報已移除: {alert_id} (用戶 {user_id})")
                 else:
                     await query.edit_message_text(
                         text=f"{query.message.text}\n\n❌ 移除失敗（警報不存在或無權限）",
-                        reply_markup=None
+                        reply_markup=reply_markup
                     )
                     self.logger.warning(f"移除警報失敗: {alert_id} (用戶 {user_id})")
 
@@ -557,36 +1136,145 @@ class TelegramBotHandler:
             except:
                 pass
 
+    @staticmethod
+    def _without_button(
+        reply_markup: Optional[InlineKeyboardMarkup],
+        callback_data: str
+    ) -> Optional[InlineKeyboardMarkup]:
+        """移除指定按鈕後的鍵盤，沒有剩餘按鈕時返回 None"""
+        if reply_markup is None:
+            return None
+        rows = [
+            [button for button in row if button.callback_data != callback_data]
+            for row in reply_markup.inline_keyboard
+        ]
+        rows = [row for row in rows if row]
+        return InlineKeyboardMarkup(rows) if rows else None
+
     def run(self):
-        """啟動 Bot（阻塞運行）"""
+        """啟動 Bot（阻塞運行，設定 webhook_url 時以 webhook 接收更新，否則長輪詢）"""
         self.logger.info("正在啟動 Telegram Bot...")
+        self.application = self.build_application()
 
-        # 建立應用程式
-        self.application = Application.builder().token(self.token).build()
+        if self.webhook_url:
+            asyncio.run(self._run_webhook())
+            return
+
+        self.logger.info("Telegram Bot 已啟動（長輪詢）")
+
+        # 運行 Bot（阻塞）
+        self.application.run_polling(allowed_updates=ALLOWED_UPDATES)
+
+    def build_application(self) -> Application:
+        """
+        建立應用程式並註冊所有處理器
+
+        Returns:
+            尚未初始化的 Application
+        """
+        self.updates = ChatOrderedUpdateProcessor(self.max_concurrent_updates)
+        application = (
+            Application.builder()
+            .token(self.token)
+            .concurrent_updates(self.updates)
+            .post_init(self._on_started)
+            .post_shutdown(self._on_stopped)
+            .build()
+        )
 
         # 註冊命令處理器
-        self.application.add_handler(CommandHandler("start", self.start_command))
-        self.application.add_handler(CommandHandler("help", self.help_command))
-        self.application.add_handler(CommandHandler("price", self.price_command))
-        self.application.add_handler(CommandHandler("add", self.add_command))
-        self.application.add_handler(CommandHandler("list", self.list_command))
-        self.application.add_handler(CommandHandler("remove", self.remove_command))
-        self.application.add_handler(CommandHandler("clear", self.clear_command))
-        self.application.add_handler(CommandHandler("clearstock", self.clearstock_command))
-
-        # 註冊按鈕回調處理器
-        self.application.add_handler(CallbackQueryHandler(self.button_callback))
+        application.add_handler(CommandHandler("start", self.start_command))
+        application.add_handler(CommandHandler("help", self.help_command))
+        application.add_handler(CommandHandler("price", self.price_command))
+        application.add_handler(CommandHandler("add", self.add_command))
+        application.add_handler(CommandHandler("list", self.list_command))
+        application.add_handler(CommandHandler("remove", self.remove_command))
+        application.add_handler(CommandHandler("clear", self.clear_command))
+        application.add_handler(CommandHandler("clearstock", self.clearstock_command))
+        application.add_handler(CommandHandler("import", self.import_command))
+        application.add_handler(CommandHandler("export", self.export_command))
+
+        # 註冊按鈕回調與 inline 查詢處理器
+        application.add_handler(CallbackQueryHandler(self.button_callback))
+        application.add_handler(InlineQueryHandler(self.inline_query))
 
         # 註冊錯誤處理器
-        self.application.add_error_handler(self.error_handler)
+        application.add_error_handler(self.error_handler)
+        return application
 
-        self.logger.info("Telegram Bot 已啟動")
+    async def _run_webhook(self):
+        """
+        以 webhook 模式運行，直到 stop() 被呼叫或收到 SIGINT/SIGTERM
 
-        # 運行 Bot（阻塞）
-        self.application.run_polling(allowed_updates=Update.ALL_TYPES)
+        內建 HTTP 伺服器收到的更新放入 Application 的更新佇列，與長輪詢走相同的
+        處理流程。關閉時不刪除 webhook，改回長輪詢時 PTB 會自動刪除。
+        """
+        application = self.application
+        self._stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self._stop_event.set)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass  # 非主執行緒或平台不支援時只能透過 stop() 結束
+
+        server = WebhookServer(
+            self._enqueue_update,
+            self.webhook_secret,
+            path=urlsplit(self.webhook_url).path or "/",
+            listen=self.webhook_listen,
+            port=self.webhook_port
+        )
+        try:
+            async with application:
+                await self._on_started(application)
+                await application.start()
+                await server.start()
+                try:
+                    await application.bot.set_webhook(
+                        url=self.webhook_url,
+                        allowed_updates=ALLOWED_UPDATES,
+                        secret_token=self.webhook_secret
+                    )
+                    self.logger.info(f"Telegram Bot 已啟動（webhook: {self.webhook_url}）")
+                    await self._stop_event.wait()
+                finally:
+                    await server.stop()
+                    await application.stop()
+        finally:
+            await self._on_stopped(application)
+            self._stop_event = None
+
+    async def _enqueue_update(self, data: Dict[str, Any]):
+        """把 webhook 收到的更新放入 Application 的更新佇列"""
+        await self.application.update_queue.put(Update.de_json(data, self.application.bot))
+
+    async def _on_started(self, application: Application):
+        """Bot 初始化完成後啟動通知佇列並記錄事件迴圈，排程器才能提交通知"""
+        self.notifications = NotificationQueue(application.bot.send_message)
+        self.notifications.start()
+        self._loop = asyncio.get_running_loop()
+        for hook in self._started_hooks:
+            await hook()
+
+    async def _on_stopped(self, application: Application):
+        """Bot 關閉後停止接受通知"""
+        for hook in self._stopped_hooks:
+            try:
+                await hook()
+            except Exception as e:
+                self.logger.error(f"關閉時發生錯誤: {e}", exc_info=True)
+        self._loop = None
+        if self.notifications is not None:
+            await self.notifications.close()
+            self.notifications = None
 
     def stop(self):
         """停止 Bot"""
-        if self.application:
+        loop, stop_event = self._loop, self._stop_event
+        if loop is not None and stop_event is not None:
+            self.logger.info("正在停止 Telegram Bot...")
+            loop.call_soon_threadsafe(stop_event.set)
+        elif self.application:
             self.logger.info("正在停止 Telegram Bot...")
             self.application.stop()
@@ -0,0 +1,234 @@
+"""股票代碼目錄模組 - 本機的台股與美股代碼索引，供 inline 查詢自動完成"""
+import bisect
+import csv
+import heapq
+import logging
+import os
+import sys
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import requests
+
+# 預設的代碼目錄檔案
+DEFAULT_TICKER_FILE = "config/tickers.csv"
+
+# 交易所公開的上市清單
+TWSE_LISTINGS_URL = "https://openapi.twse.com.tw/v1/exchangeReport/STOCK_DAY_ALL"
+TPEX_LISTINGS_URL = "https://www.tpex.org.tw/openapi/v1/tpex_mainboard_daily_close_quotes"
+NASDAQ_LISTINGS_URL = "https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt"
+OTHER_LISTINGS_URL = "https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt"
+
+# 排名：代碼完全相同 < 代碼開頭相同 < 名稱（或名稱中的單字）開頭相同 < 名稱包含
+_EXACT, _SYMBOL_PREFIX, _NAME_PREFIX, _NAME_CONTAINS = range(4)
+
+
+class Ticker(NamedTuple):
+    """目錄中的一檔股票"""
+
+    symbol: str  # 查詢用的代碼（台股含 .TW / .TWO）
+    name: str
+    market: str  # TW 或 US
+
+
+class TickerIndex:
+    """
+    股票代碼索引
+
+    代碼與名稱分別以排序陣列保存，前綴搜尋使用二分搜尋；台股代碼同時以去掉
+    .TW / .TWO 的數字索引，名稱以完整名稱與每個單字索引。結果不足時再以名稱
+    包含查詢字串補足（中文名稱沒有單字邊界）。建立後只讀，可在多個協程間共用。
+    """
+
+    def __init__(self, tickers: Iterable[Ticker] = ()):
+        """
+        建立索引
+
+        Args:
+            tickers: 股票清單（代碼重複時保留第一筆）
+        """
+        self._tickers: List[Ticker] = []
+        self._positions = {}
+        for ticker in tickers:
+            if ticker.symbol not in self._positions:
+                self._positions[ticker.symbol] = len(self._tickers)
+                self._tickers.append(ticker)
+
+        symbol_keys: List[Tuple[str, int]] = []
+        name_keys: List[Tuple[str, int]] = []
+        for i, ticker in enumerate(self._tickers):
+            symbol_keys.append((ticker.symbol, i))
+            base = ticker.symbol.rsplit(".", 1)[0]
+            if base != ticker.symbol:
+                symbol_keys.append((base, i))
+            name = ticker.name.lower()
+            name_keys.append((name, i))
+            name_keys.extend((word, i) for word in set(name.split()[1:]))
+        self._symbol_keys = sorted(symbol_keys)
+        self._name_keys = sorted(name_keys)
+        self._names = [ticker.name.lower() for ticker in self._tickers]
+
+    def __len__(self) -> int:
+        return len(self._tickers)
+
+    def search(self, query: str, limit: int = 10) -> List[Ticker]:
+        """
+        以代碼或名稱搜尋
+
+        Args:
+            query: 使用者輸入（代碼或名稱的開頭，或名稱的一部分）
+            limit: 最多返回的筆數
+
+        Returns:
+            依相關程度排序的股票（同一等級中代碼較短的在前）
+        """
+        query = query.strip()
+        if not query or limit <= 0:
+            return []
+        upper, lower = query.upper(), query.lower()
+
+        ranks = {}
+
+        def hit(i: int, rank: int):
+            if rank < ranks.get(i, _NAME_CONTAINS + 1):
+                ranks[i] = rank
+
+        for key, i in _prefixed(self._symbol_keys, upper):
+            hit(i, _EXACT if key == upper else _SYMBOL_PREFIX)
+        for _, i in _prefixed(self._name_keys, lower):
+            hit(i, _NAME_PREFIX)
+        if len(ranks) < limit:
+            for i, name in enumerate(self._names):
+                if lower in name:
+                    hit(i, _NAME_CONTAINS)
+
+        ranked = heapq.nsmallest(
+            limit, ranks, key=lambda i: (ranks[i], len(self._tickers[i].symbol), i)
+        )
+        return [self._tickers[i] for i in ranked]
+
+    def get(self, symbol: str) -> Optional[Ticker]:
+        """以完整代碼取得股票，不在目錄中時返回 None"""
+        i = self._positions.get(symbol)
+        return self._tickers[i] if i is not None else None
+
+
+def _prefixed(keys: List[Tuple[str, int]], prefix: str) -> Iterator[Tuple[str, int]]:
+    """排序陣列中以 prefix 開頭的項目"""
+    for j in range(bisect.bisect_left(keys, (prefix,)), len(keys)):
+        if not keys[j][0].startswith(prefix):
+            return
+        yield keys[j]
+
+
+def load_tickers(file_path: str) -> TickerIndex:
+    """
+    由 CSV（symbol,name,market）載入代碼目錄
+
+    Args:
+        file_path: 目錄檔案路徑
+
+    Returns:
+        索引（檔案不存在或無法讀取時為空索引）
+    """
+    logger = logging.getLogger(__name__)
+    try:
+        with open(file_path, "r", encoding="utf-8", newline="") as f:
+            tickers = [
+                Ticker(row["symbol"].strip(), row["name"].strip(), row.get("market", "").strip())
+                for row in csv.DictReader(f)
+                if row.get("symbol") and row.get("name")
+            ]
+    except FileNotFoundError:
+        logger.warning(f"⚠️ 找不到股票代碼目錄: {file_path}（可執行 python -m src.tickers 下載）")
+        return TickerIndex()
+    except (OSError, csv.Error, KeyError) as e:
+        logger.error(f"❌ 讀取股票代碼目錄失敗: {e}")
+        return TickerIndex()
+
+    index = TickerIndex(tickers)
+    logger.info(f"已載入 {len(index)} 檔股票代碼: {file_path}")
+    return index
+
+
+def save_tickers(file_path: str, tickers: Iterable[Ticker]):
+    """以 CSV 寫入代碼目錄（先寫暫存檔再取代）"""
+    directory = os.path.dirname(file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{file_path}.tmp"
+    with open(temp_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(Ticker._fields)
+        writer.writerows(tickers)
+    os.replace(temp_path, file_path)
+
+
+def parse_tw_listings(rows: List[dict], code_field: str, name_field: str, suffix: str) -> List[Ticker]:
+    """
+    解析台灣證交所 / 櫃買中心 OpenAPI 的清單
+
+    Args:
+        rows: API 回傳的 JSON 陣列
+        code_field: 代碼欄位
+        name_field: 名稱欄位
+        suffix: 代碼後綴（.TW 或 .TWO）
+    """
+    return [
+        Ticker(f"{row[code_field].strip()}{suffix}", row[name_field].strip(), "TW")
+        for row in rows
+        if row.get(code_field) and row.get(name_field)
+    ]
+
+
+def parse_us_listings(text: str, symbol_field: str) -> List[Ticker]:
+    """
+    解析 Nasdaq Trader 的代碼清單（以 | 分隔，最後一行是檔案時間）
+
+    Args:
+        text: 檔案內容
+        symbol_field: 代碼欄位（nasdaqlisted 為 Symbol，otherlisted 為 ACT Symbol）
+    """
+    tickers = []
+    for row in csv.DictReader(text.splitlines(), delimiter="|"):
+        symbol = (row.get(symbol_field) or "").strip()
+        if not symbol or row.get("Test Issue") == "Y" or symbol.startswith("File Creation Time"):
+            continue
+        # 名稱去掉「 - Common Stock」之類的證券類別說明；Yahoo 以 - 表示股票類別（BRK.B → BRK-B）
+        name = (row.get("Security Name") or "").split(" - ")[0].strip()
+        tickers.append(Ticker(symbol.replace(".", "-"), name or symbol, "US"))
+    return tickers
+
+
+def download_listings(timeout: float = 30.0) -> List[Ticker]:
+    """
+    由交易所下載台股（上市、上櫃）與美股清單
+
+    Returns:
+        股票清單
+
+    Raises:
+        requests.RequestException: 任一來源下載失敗
+    """
+    tickers = []
+    response = requests.get(TWSE_LISTINGS_URL, timeout=timeout)
+    response.raise_for_status()
+    tickers += parse_tw_listings(response.json(), "Code", "Name", ".TW")
+
+    response = requests.get(TPEX_LISTINGS_URL, timeout=timeout)
+    response.raise_for_status()
+    tickers += parse_tw_listings(response.json(), "SecuritiesCompanyCode", "CompanyName", ".TWO")
+
+    for url, field in ((NASDAQ_LISTINGS_URL, "Symbol"), (OTHER_LISTINGS_URL, "ACT Symbol")):
+        response = requests.get(url, timeout=timeout)
+        response.raise_for_status()
+        tickers += parse_us_listings(response.text, field)
+    return tickers
+
+
+if __name__ == "__main__":
+    # 更新代碼目錄：python -m src.tickers [檔案路徑]
+    logging.basicConfig(level=logging.INFO)
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_TICKER_FILE
+    listings = download_listings()
+    save_tickers(path, listings)
+    print(f"✅ 已寫入 {len(listings)} 檔股票代碼: {path}")
@@ -0,0 +1,55 @@
+"""移動停損模組 - 從監控建立以來的最高價回落指定幅度時通知"""
+from typing import Optional, Tuple
+
+from .bands import price_buffer
+
+# trailing：回落固定點數；trailing_pct：回落百分比
+TRAILING = "trailing"
+TRAILING_PCT = "trailing_pct"
+TRAILING_CONDITIONS = frozenset({TRAILING, TRAILING_PCT})
+
+
+def trailing_stop(condition: str, peak: float, distance: float) -> float:
+    """
+    停損價格
+
+    Args:
+        condition: trailing 或 trailing_pct
+        peak: 監控建立以來的最高價
+        distance: 回落點數或百分比
+
+    Returns:
+        價格跌破（含）此價格時觸發
+    """
+    if condition == TRAILING_PCT:
+        return peak * (1.0 - distance / 100.0)
+    return peak - distance
+
+
+def trailing_signals(
+    condition: str,
+    current_price: float,
+    distance: float,
+    peak: Optional[float]
+) -> Tuple[bool, bool, float]:
+    """
+    評估移動停損（O(1)，不需保存價格歷史）
+
+    每筆監控只保留一個最高價，新價格超過最高價時更新；觸發後價格回到停損價
+    加上緩衝區以上時重置。
+
+    Args:
+        condition: trailing 或 trailing_pct
+        current_price: 當前價格
+        distance: 回落點數或百分比
+        peak: 目前記錄的最高價，None 表示尚未觀察到價格
+
+    Returns:
+        (是否觸發, 是否應重置通知標記, 更新後的最高價)
+    """
+    if peak is None or current_price > peak:
+        peak = current_price
+    stop = trailing_stop(condition, peak, distance)
+    triggered = current_price <= stop
+    reset = current_price > stop + price_buffer(stop)
+    return triggered, reset, peak
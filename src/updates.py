@@ -0,0 +1,209 @@
+"""更新處理模組 - 並行處理不同聊天的更新，同一聊天依序處理"""
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from .utils import percentile
+
+# 預設同時處理的更新數量
+DEFAULT_CONCURRENCY = 8
+
+# 每種更新保留的排隊延遲樣本數
+DELAY_SAMPLES = 512
+
+# 分開統計的更新種類上限（其餘歸為 other，避免任意指令名稱讓統計無限成長）
+MAX_KINDS = 32
+
+# 定期記錄統計的間隔（秒）
+REPORT_INTERVAL = 300.0
+
+# 排隊超過此時間（秒）時記錄警告
+SLOW_QUEUE_WARNING = 5.0
+
+# 基底類別的信號量不設上限，實際上限由本類別在聊天排序之後控制
+_UNBOUNDED = 1 << 30
+
+
+def update_kind(update: object) -> str:
+    """
+    更新的種類（統計排隊延遲用）
+
+    Args:
+        update: Telegram 更新
+
+    Returns:
+        指令名稱（例如 /add）、callback、inline 或 message
+    """
+    if not isinstance(update, Update):
+        return type(update).__name__
+    if update.callback_query is not None:
+        return "callback"
+    if update.inline_query is not None:
+        return "inline"
+    message = update.effective_message
+    text = message.text if message is not None else None
+    if text and text.startswith("/"):
+        return text.split(maxsplit=1)[0].split("@", 1)[0].lower()
+    return "message"
+
+
+def update_chat(update: object) -> Optional[Hashable]:
+    """更新所屬的聊天（沒有聊天的更新不需要排序，返回 None）"""
+    if isinstance(update, Update) and update.effective_chat is not None:
+        return update.effective_chat.id
+    return None
+
+
+class _Chat:
+    """一個聊天的排序鎖與等待中的更新數"""
+
+    __slots__ = ("lock", "pending")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    並行的更新處理器（Application.concurrent_updates 使用）
+
+    不同聊天的更新最多同時處理 max_concurrent_updates 個，同一聊天的更新依到達順序
+    一個接一個處理（/add 之後的 /list 一定看得到新增的監控）。等待前一個同聊天更新的
+    更新不佔用並行名額，慢的聊天不會擋住其他聊天。記錄每種更新從到達到開始處理的
+    排隊延遲。
+    """
+
+    def __init__(
+        self,
+        max_concurrent_updates: int = DEFAULT_CONCURRENCY,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        初始化更新處理器
+
+        Args:
+            max_concurrent_updates: 同時處理的更新數量上限
+            clock: 單調時鐘
+        """
+        if max_concurrent_updates < 1:
+            raise ValueError("max_concurrent_updates 必須大於 0")
+        # 基底類別以 max_concurrent_updates 建立信號量，建立期間先讓它不設上限
+        self._limit = _UNBOUNDED
+        super().__init__(_UNBOUNDED)
+        self._limit = max_concurrent_updates
+        self._slots = asyncio.Semaphore(max_concurrent_updates)
+        self._clock = clock
+        self._chats: Dict[Hashable, _Chat] = {}
+        self._delays: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._active = 0
+        self._waiting = 0
+        self._processed = 0
+        self._last_report = clock()
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def max_concurrent_updates(self) -> int:
+        """同時處理的更新數量上限"""
+        return self._limit
+
+    async def initialize(self) -> None:
+        """不需要配置資源"""
+
+    async def shutdown(self) -> None:
+        """記錄最後的統計"""
+        if self._processed:
+            self._report()
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """等待同一聊天的前一個更新與並行名額，然後處理更新"""
+        arrived = self._clock()
+        chat_id = update_chat(update)
+        chat = None
+        if chat_id is not None:
+            chat = self._chats.get(chat_id)
+            if chat is None:
+                chat = self._chats[chat_id] = _Chat()
+            chat.pending += 1
+        # 沒有聊天的更新不需要排序，使用自己的鎖
+        lock = chat.lock if chat is not None else asyncio.Lock()
+
+        self._waiting += 1
+        waiting = True
+        try:
+            async with lock:
+                async with self._slots:
+                    self._waiting -= 1
+                    waiting = False
+                    self._active += 1
+                    try:
+                        self._record(update_kind(update), self._clock() - arrived)
+                        await coroutine
+                    finally:
+                        self._active -= 1
+                        self._processed += 1
+        finally:
+            if waiting:
+                self._waiting -= 1
+            if chat is not None:
+                chat.pending -= 1
+                if chat.pending == 0:
+                    del self._chats[chat_id]
+            # 被取消時 coroutine 可能從未執行，關閉以免出現未 await 的警告
+            if asyncio.iscoroutine(coroutine):
+                coroutine.close()
+
+        if self._clock() - self._last_report >= REPORT_INTERVAL:
+            self._report()
+
+    def _record(self, kind: str, delay: float):
+        """記錄一個更新的排隊延遲"""
+        if kind not in self._delays:
+            if len(self._delays) >= MAX_KINDS:
+                kind = "other"
+            self._delays.setdefault(kind, deque(maxlen=DELAY_SAMPLES))
+        self._delays[kind].append(delay)
+        self._counts[kind] = self._counts.get(kind, 0) + 1
+        if delay >= SLOW_QUEUE_WARNING:
+            self.logger.warning(f"⚠️ 更新 {kind} 排隊 {delay:.1f} 秒才開始處理")
+
+    def stats(self) -> Dict:
+        """
+        處理統計
+
+        Returns:
+            active（處理中）、waiting（排隊中）、processed 與 delays
+            （{種類: {count, avg, p95, max}}，最近樣本的排隊延遲秒數）
+        """
+        delays = {}
+        for kind, samples in self._delays.items():
+            values = sorted(samples)
+            delays[kind] = {
+                "count": self._counts[kind],
+                "avg": sum(values) / len(values),
+                "p95": percentile(values, 0.95),
+                "max": values[-1],
+            }
+        return {
+            "active": self._active,
+            "waiting": self._waiting,
+            "processed": self._processed,
+            "delays": delays,
+        }
+
+    def _report(self):
+        """記錄處理統計"""
+        self._last_report = self._clock()
+        stats = self.stats()
+        busiest = sorted(stats["delays"].items(), key=lambda item: -item[1]["p95"])[:5]
+        self.logger.info(
+            f"更新處理: 處理中 {stats['active']} | 排隊 {stats['waiting']} | "
+            f"已處理 {stats['processed']} | 排隊延遲 p95: "
+            + (", ".join(f"{kind} {d['p95'] * 1000:.0f}ms" for kind, d in busiest) or "無")
+        )
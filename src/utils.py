@@ -1,11 +1,14 @@
 """工具函數模組 - 日誌、JSON 操作和格式化"""
+import gc
 import json
 import logging
 import logging.handlers
 import os
+import tempfile
 import uuid
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence
 
 
 def setup_logging(log_dir: str = "logs", log_level: str = "INFO") -> None:
@@ -68,13 +71,18 @@ def setup_logging(log_dir: str = "logs", log_level: str = "INFO") -> None:
     logging.info(f"日誌系統已初始化 - 層級: {log_level}")
 
 
-def load_json(file_path: str, default: Optional[Dict] = None) -> Dict[str, Any]:
+def load_json(
+    file_path: str,
+    default: Optional[Dict] = None,
+    object_hook: Optional[Callable[[Dict], Any]] = None
+) -> Dict[str, Any]:
     """
     安全地載入 JSON 檔案
 
     Args:
         file_path: JSON 檔案路徑
         default: 載入失敗時返回的預設值
+        object_hook: 解析每個 JSON 物件時的轉換函數（同 json.load）
 
     Returns:
         JSON 內容字典
@@ -88,7 +96,7 @@ def load_json(file_path: str, default: Optional[Dict] = None) -> Dict[str, Any]:
             return default
 
         with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+            data = json.load(f, object_hook=object_hook)
             logging.debug(f"成功載入 JSON: {file_path}")
             return data
     except json.JSONDecodeError as e:
@@ -99,30 +107,48 @@ def load_json(file_path: str, default: Optional[Dict] = None) -> Dict[str, Any]:
         return default
 
 
-def save_json(file_path: str, data: Dict[str, Any]) -> bool:
+def save_json(file_path: str, data: Dict[str, Any], compact: bool = False) -> bool:
     """
-    安全地儲存 JSON 檔案
+    安全地儲存 JSON 檔案（先寫入暫存檔並 fsync，再以 rename 原子替換）
 
     Args:
         file_path: JSON 檔案路徑
         data: 要儲存的字典資料
+        compact: 是否省略縮排與空白（機器讀取的檔案）
 
     Returns:
         是否儲存成功
     """
+    temp_path = None
     try:
         # 確保目錄存在
-        Path(file_path).parent.mkdir(parents=True, exist_ok=True)
-
-        # 寫入檔案
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        target = Path(file_path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+
+        # 寫入同目錄的暫存檔，確保 rename 在同一檔案系統內完成
+        fd, temp_path = tempfile.mkstemp(
+            dir=str(target.parent), prefix=f".{target.name}.", suffix=".tmp"
+        )
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            if compact:
+                json.dump(data, f, separators=(",", ":"), ensure_ascii=False)
+            else:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+
+        # 原子替換：讀取端只會看到完整的舊檔或新檔
+        os.replace(temp_path, file_path)
+        temp_path = None
 
         logging.debug(f"成功儲存 JSON: {file_path}")
         return True
     except Exception as e:
         logging.error(f"儲存 JSON 失敗 ({file_path}): {e}")
         return False
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
 
 
 def format_price(price: float, currency: str = "USD") -> str:
@@ -153,6 +179,38 @@ def format_price(price: float, currency: str = "USD") -> str:
         return f"{price:,.2f} {currency}"
 
 
+@contextmanager
+def gc_paused() -> Iterator[None]:
+    """
+    暫停循環 GC 的區塊
+
+    大量建立物件時，循環 GC 會反覆掃描不斷成長的物件集合；離開區塊後恢復原本的設定。
+    """
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """
+    已排序數列的百分位數（最近排名法）
+
+    Args:
+        sorted_values: 由小到大排序的數列
+        fraction: 百分位（0~1，例如 0.95）
+
+    Returns:
+        百分位數，空數列返回 0
+    """
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
 def generate_alert_id() -> str:
     """
     生成唯一的監控 ID
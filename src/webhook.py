@@ -0,0 +1,215 @@
+"""Webhook 模組 - 內建 HTTP 伺服器接收 Telegram 推送的更新（取代長輪詢）"""
+import asyncio
+import hmac
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+# 請求本文大小上限（位元組），Telegram 的單一更新遠小於此值
+MAX_BODY_SIZE = 1 << 20
+
+# 連線閒置或讀取一個請求的逾時秒數
+READ_TIMEOUT = 30.0
+
+# Telegram 放在請求標頭中的 secret token（setWebhook 的 secret_token）
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    431: "Request Header Fields Too Large",
+}
+
+
+class _BadRequest(Exception):
+    """無法解析的請求（回覆狀態碼後關閉連線）"""
+
+    def __init__(self, status: int):
+        super().__init__(status)
+        self.status = status
+
+
+class WebhookServer:
+    """
+    接收 Telegram webhook 的最小 HTTP/1.1 伺服器（asyncio，在 Bot 的事件迴圈上執行）
+
+    只接受指定路徑的 POST，以固定時間比較驗證 secret token 後把 JSON 本文交給
+    handler（放入 Bot 的更新佇列）並立即回覆 200。連線保持開啟，Telegram 可以
+    重用連線連續推送。TLS 由前面的反向代理處理。
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Dict[str, Any]], Awaitable[None]],
+        secret_token: str,
+        path: str = "/",
+        listen: str = "127.0.0.1",
+        port: int = 8443
+    ):
+        """
+        初始化 webhook 伺服器
+
+        Args:
+            handler: 處理一個更新（已解析的 JSON）的協程函數
+            secret_token: setWebhook 時設定的 secret token
+            path: 接受請求的路徑
+            listen: 監聽位址
+            port: 監聽埠號（0 表示由系統分配）
+        """
+        if not secret_token:
+            raise ValueError("webhook 必須設定 secret token")
+        self.handler = handler
+        self.path = path or "/"
+        self.listen = listen
+        self._secret = secret_token.encode("utf-8")
+        self._port = port
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self.received = 0  # 已交給 handler 的更新數
+        self.rejected = 0  # 被拒絕的請求數
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def port(self) -> int:
+        """實際監聽的埠號"""
+        if self._server is not None and self._server.sockets:
+            return self._server.sockets[0].getsockname()[1]
+        return self._port
+
+    async def start(self):
+        """開始監聽"""
+        self._server = await asyncio.start_server(self._serve_connection, self.listen, self._port)
+        self.logger.info(f"Webhook 伺服器已啟動: http://{self.listen}:{self.port}{self.path}")
+
+    async def stop(self):
+        """停止監聽並關閉所有連線"""
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        await self._server.wait_closed()
+        self._server = None
+        self.logger.info(f"Webhook 伺服器已停止（收到 {self.received} 個更新，拒絕 {self.rejected} 個請求）")
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """處理一條連線上的請求，直到對方關閉、要求關閉或閒置逾時"""
+        self._writers.add(writer)
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader), READ_TIMEOUT)
+                except _BadRequest as e:
+                    self.rejected += 1
+                    await _respond(writer, e.status, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                status = await self._dispatch(method, path, headers, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await _respond(writer, status, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _dispatch(self, method: str, path: str, headers: Dict[str, str], body: bytes) -> int:
+        """驗證請求並交給 handler，返回 HTTP 狀態碼"""
+        if path.split("?", 1)[0] != self.path:
+            status = 404
+        elif method != "POST":
+            status = 405
+        elif not hmac.compare_digest(headers.get(SECRET_HEADER, "").encode("utf-8"), self._secret):
+            self.logger.warning("⚠️ Webhook 請求的 secret token 不符，已拒絕")
+            status = 403
+        else:
+            try:
+                update = json.loads(body)
+            except ValueError:
+                update = None
+            status = 200 if isinstance(update, dict) else 400
+        if status != 200:
+            self.rejected += 1
+            return status
+
+        # handler 失敗也回覆 200：非 2xx 會讓 Telegram 重送同一個更新並擋住之後的更新
+        try:
+            await self.handler(update)
+            self.received += 1
+        except Exception as e:
+            self.logger.error(f"❌ 處理 webhook 更新失敗: {e}", exc_info=True)
+        return 200
+
+
+async def _read_request(
+    reader: asyncio.StreamReader
+) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    """
+    讀取一個 HTTP 請求
+
+    Returns:
+        (方法, 路徑, {小寫標頭: 值}, 本文)，連線已關閉時返回 None
+
+    Raises:
+        _BadRequest: 請求格式錯誤、缺少 Content-Length、單行超過讀取上限或本文過大
+    """
+    line = await _readline(reader, 400)
+    if not line:
+        return None
+    parts = line.decode("latin-1").split()
+    if len(parts) != 3 or not parts[2].startswith("HTTP/1."):
+        raise _BadRequest(400)
+    method, path, _ = parts
+
+    headers: Dict[str, str] = {}
+    while True:
+        line = await _readline(reader, 431)
+        if line in (b"\r\n", b"\n"):
+            break
+        if not line or len(headers) > 100:
+            raise _BadRequest(400)
+        name, sep, value = line.decode("latin-1").partition(":")
+        if not sep:
+            raise _BadRequest(400)
+        headers[name.strip().lower()] = value.strip()
+
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise _BadRequest(411)
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise _BadRequest(400) from None
+    if length < 0:
+        raise _BadRequest(400)
+    if length > MAX_BODY_SIZE:
+        raise _BadRequest(413)
+    body = await reader.readexactly(length) if length else b""
+    return method, path, headers, body
+
+
+async def _readline(reader: asyncio.StreamReader, status: int) -> bytes:
+    """讀取一行，超過 StreamReader 的上限（64 KiB）時以 status 拒絕請求"""
+    try:
+        return await reader.readline()
+    except ValueError:
+        raise _BadRequest(status) from None
+
+
+async def _respond(writer: asyncio.StreamWriter, status: int, keep_alive: bool):
+    """回覆沒有本文的 HTTP 回應"""
+    writer.write(
+        f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}\r\n"
+        f"Content-Length: 0\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+    )
+    await writer.drain()
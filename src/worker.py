@@ -0,0 +1,584 @@
+"""監控工作程序模組 - 查詢與評估在獨立程序執行，透過管道與 Bot 前端溝通"""
+import itertools
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .stock_fetcher import StockFetcher
+
+# 前端可以呼叫的工作程序方法，其他方法一律拒絕
+REMOTE_METHODS = {
+    "alerts": frozenset({
+        "add_alert", "add_alerts", "list_alerts", "remove_alert",
+        "clear_all_alerts", "clear_alerts_by_symbol",
+    }),
+    "fetcher": frozenset({"get_price", "cached_price", "cached_prices"}),
+}
+
+# 前端可以串流的工作程序方法（返回迭代器，結果逐筆送回前端）
+REMOTE_STREAMS = {
+    "fetcher": frozenset({"iter_prices_batch"}),
+}
+
+# 前端等待呼叫結果的秒數（監控異動與快取讀取）
+CALL_TIMEOUT = 30.0
+
+# 查詢資料來源的呼叫等待的秒數：單一股票的完整備援流程（每個來源約 10 秒，加上請求間隔）
+PROVIDER_CALL_TIMEOUT = 120.0
+
+# 批次查詢的下載時間隨股票數增加，每個股票額外等待的秒數
+PROVIDER_SECONDS_PER_SYMBOL = 2.0
+
+# 工作程序同時執行的前端呼叫數量（價格查詢可能需要數秒）
+CALL_THREADS = 4
+
+# 工作程序異常結束後重新啟動的等待時間（秒），連續失敗時加倍
+RESTART_MIN_DELAY = 1.0
+RESTART_MAX_DELAY = 60.0
+
+# 工作程序運行超過此時間（秒）後結束，等待時間重設為最小值
+_STABLE_SECONDS = 60.0
+
+# 關閉時等待工作程序寫入監控清單並結束的秒數
+_STOP_TIMEOUT = 30.0
+
+
+class WorkerUnavailable(RuntimeError):
+    """監控工作程序未運行（重新啟動中、已停止或逾時未回應）"""
+
+
+class _CallStream:
+    """
+    串流呼叫在前端的接收端
+
+    與 Future 相同以 set_result / set_exception 結束，因此工作程序結束時可以與一般
+    呼叫一起失敗；逐筆送回的結果以 put_item 放入佇列。
+    """
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue()
+
+    def put_item(self, item: Any):
+        self._queue.put(("item", item))
+
+    def set_result(self, value: Any):
+        self._queue.put(("done", value))
+
+    def set_exception(self, exception: BaseException):
+        self._queue.put(("error", exception))
+
+    def get(self, timeout: Optional[float]) -> Tuple[str, Any]:
+        """取出下一筆，timeout 秒內沒有收到時拋出 queue.Empty"""
+        return self._queue.get(timeout=timeout)
+
+
+def _send(conn: Connection, lock: threading.Lock, message: tuple) -> bool:
+    """送出訊息（多個執行緒共用同一個管道），管道已關閉時返回 False"""
+    with lock:
+        try:
+            conn.send(message)
+            return True
+        except (OSError, ValueError):
+            return False
+
+
+class MonitorWorkerLink:
+    """
+    工作程序端的管道
+
+    執行前端轉送的監控異動與價格查詢，並把觸發通知送回前端發送。提供
+    submit_alerts 與 notifications，可直接作為排程器的 telegram_handler。
+
+    訊息（前端 → 工作程序）：
+        ("call", call_id, target, method, args, kwargs)  執行呼叫，回覆 result
+        ("stream", call_id, target, method, args, kwargs)  執行串流呼叫，逐筆回覆 item，最後回覆 result
+        ("cancel", call_id)                              前端不再接收，串流在下一筆前停止
+        ("delivered", notify_id, [是否送達])              一批通知的送達結果
+        ("stop",)                                        結束
+
+    訊息（工作程序 → 前端）：
+        ("result", call_id, ok, 返回值或例外)
+        ("item", call_id, 迭代器產出的一筆)
+        ("notify", notify_id, triggered_alerts)
+    """
+
+    # 通知佇列在前端程序，排程器不記錄佇列統計
+    notifications = None
+
+    def __init__(self, conn: Connection):
+        """
+        初始化工作程序端的管道
+
+        Args:
+            conn: 與前端程序連接的管道
+        """
+        self._conn = conn
+        self._send_lock = threading.Lock()
+        self._ids = itertools.count()
+        self._notifications: Dict[int, Future] = {}
+        # {call_id: 取消旗標}，進行中的串流呼叫
+        self._streams: Dict[int, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.logger = logging.getLogger(__name__)
+
+    def submit_alerts(self, triggered_alerts: List[Dict]) -> Optional[Future]:
+        """
+        把觸發通知送到前端發送
+
+        Args:
+            triggered_alerts: check_alerts 返回的觸發清單
+
+        Returns:
+            完成時為每筆通知是否送達的 Future，前端已關閉時返回 None
+        """
+        future: Future = Future()
+        with self._lock:
+            notify_id = next(self._ids)
+            self._notifications[notify_id] = future
+        if not _send(self._conn, self._send_lock, ("notify", notify_id, triggered_alerts)):
+            with self._lock:
+                self._notifications.pop(notify_id, None)
+            self.logger.warning(f"前端已關閉，無法發送 {len(triggered_alerts)} 則通知")
+            return None
+        return future
+
+    def serve(self, targets: Dict[str, Any]):
+        """
+        處理前端的訊息，直到收到停止要求或前端關閉管道
+
+        Args:
+            targets: {"alerts": 監控管理器, "fetcher": 股票查詢器}
+        """
+        executor = ThreadPoolExecutor(max_workers=CALL_THREADS, thread_name_prefix="worker-call")
+        try:
+            while True:
+                try:
+                    message = self._conn.recv()
+                except (EOFError, OSError):
+                    self.logger.warning("前端已關閉管道，工作程序結束")
+                    break
+
+                command = message[0]
+                if command == "stop":
+                    self.logger.info("收到前端的停止要求")
+                    break
+                if command == "call":
+                    executor.submit(self._call, targets, *message[1:])
+                elif command == "stream":
+                    # 在送出前登記，避免取消訊息比串流開始執行更早到達
+                    cancelled = threading.Event()
+                    with self._lock:
+                        self._streams[message[1]] = cancelled
+                    executor.submit(self._stream, targets, cancelled, *message[1:])
+                elif command == "cancel":
+                    with self._lock:
+                        cancelled = self._streams.get(message[1])
+                    if cancelled is not None:
+                        cancelled.set()
+                elif command == "delivered":
+                    _, notify_id, delivered = message
+                    with self._lock:
+                        future = self._notifications.pop(notify_id, None)
+                    if future is not None:
+                        future.set_result(delivered)
+        finally:
+            executor.shutdown(wait=True)
+            # 前端不會再回覆的通知視為取消
+            with self._lock:
+                pending, self._notifications = self._notifications, {}
+            for future in pending.values():
+                future.cancel()
+
+    def _call(
+        self,
+        targets: Dict[str, Any],
+        call_id: int,
+        target: str,
+        method: str,
+        args: tuple,
+        kwargs: Dict[str, Any]
+    ):
+        """執行前端的呼叫並回覆結果（例外也回傳給前端）"""
+        try:
+            if method not in REMOTE_METHODS.get(target, ()):
+                raise AttributeError(f"不允許的遠端呼叫: {target}.{method}")
+            reply = ("result", call_id, True, getattr(targets[target], method)(*args, **kwargs))
+        except Exception as e:
+            reply = ("result", call_id, False, e)
+        self._reply(call_id, reply)
+
+    def _stream(
+        self,
+        targets: Dict[str, Any],
+        cancelled: threading.Event,
+        call_id: int,
+        target: str,
+        method: str,
+        args: tuple,
+        kwargs: Dict[str, Any]
+    ):
+        """
+        執行前端的串流呼叫，迭代器每產出一筆就送回前端，結束後回覆 result
+
+        前端取消（逾時或提前結束）後，在下一筆前關閉迭代器，不再查詢剩下的股票。
+        """
+        try:
+            if method not in REMOTE_STREAMS.get(target, ()):
+                raise AttributeError(f"不允許的遠端串流: {target}.{method}")
+            items = iter(getattr(targets[target], method)(*args, **kwargs))
+            try:
+                while True:
+                    # 每一筆查詢前確認前端仍在接收
+                    if cancelled.is_set():
+                        self.logger.info(f"前端已取消串流呼叫: {target}.{method}")
+                        return
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        break
+                    if not _send(self._conn, self._send_lock, ("item", call_id, item)):
+                        return  # 前端已關閉管道
+            finally:
+                close = getattr(items, "close", None)
+                if close is not None:
+                    close()
+            reply = ("result", call_id, True, None)
+        except Exception as e:
+            reply = ("result", call_id, False, e)
+        finally:
+            with self._lock:
+                self._streams.pop(call_id, None)
+        self._reply(call_id, reply)
+
+    def _reply(self, call_id: int, reply: tuple):
+        """回覆呼叫結果（例外也回傳給前端）"""
+        try:
+            _send(self._conn, self._send_lock, reply)
+        except Exception as e:  # 返回值或例外無法序列化
+            _send(self._conn, self._send_lock, ("result", call_id, False, RuntimeError(repr(e))))
+
+
+class MonitorWorkerProcess:
+    """
+    前端程序中的監控工作程序管理
+
+    啟動並監督工作程序（異常結束時以加倍的等待時間重新啟動），轉送 Bot 的
+    監控異動與價格查詢，並把工作程序送來的觸發通知交給 Bot 發送。工作程序
+    重新啟動期間的呼叫會拋出 WorkerUnavailable。
+    """
+
+    def __init__(
+        self,
+        target: Callable[..., None],
+        args: Tuple = (),
+        start_method: str = "spawn"
+    ):
+        """
+        初始化工作程序管理
+
+        Args:
+            target: 工作程序入口（模組層級函數），第一個參數為管道
+            args: 傳給 target 的其他參數
+            start_method: multiprocessing 啟動方式（前端有其他線程時應使用 spawn）
+        """
+        self._target = target
+        self._args = args
+        self._context = multiprocessing.get_context(start_method)
+        self._notifier: Optional[Callable[[List[Dict]], Optional[Future]]] = None
+        self._process: Optional[Any] = None
+        self._conn: Optional[Connection] = None
+        # {call_id: Future 或 _CallStream}
+        self._calls: Dict[int, Any] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._supervisor: Optional[threading.Thread] = None
+        self.restarts = 0
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def pid(self) -> Optional[int]:
+        """目前工作程序的 PID"""
+        process = self._process
+        return process.pid if process is not None else None
+
+    def start(self, notifier: Callable[[List[Dict]], Optional[Future]]):
+        """
+        啟動工作程序與監督執行緒
+
+        Args:
+            notifier: 發送觸發通知的函數（TelegramBotHandler.submit_alerts）
+        """
+        self._notifier = notifier
+        self._spawn()
+        self._supervisor = threading.Thread(
+            target=self._supervise, name="monitor-supervisor", daemon=True
+        )
+        self._supervisor.start()
+
+    def _spawn(self):
+        """啟動工作程序（工作程序可能再啟動分片評估程序，因此不是 daemon）"""
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=self._target, args=(child_conn, *self._args), name="monitor-worker"
+        )
+        process.start()
+        child_conn.close()
+        with self._lock:
+            self._process = process
+            self._conn = parent_conn
+        self.logger.info(f"監控工作程序已啟動 (PID {process.pid})")
+
+    def _supervise(self):
+        """讀取工作程序的訊息；工作程序結束時讓等待中的呼叫失敗並重新啟動"""
+        failures = 0  # 連續的異常結束次數
+        while True:
+            started = time.monotonic()
+            self._read(self._conn)
+            self._process.join(_STOP_TIMEOUT if self._stopping.is_set() else 1.0)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join()
+            self._fail_calls()
+            if self._stopping.is_set():
+                break
+
+            if time.monotonic() - started >= _STABLE_SECONDS:
+                failures = 0
+            delay = min(RESTART_MIN_DELAY * 2 ** failures, RESTART_MAX_DELAY)
+            self.logger.error(
+                f"❌ 監控工作程序異常結束 (exit code {self._process.exitcode})，"
+                f"{delay:g} 秒後重新啟動"
+            )
+            if self._stopping.wait(delay):
+                break
+            self._spawn()
+            self.restarts += 1
+            failures += 1
+
+    def _read(self, conn: Connection):
+        """處理工作程序的訊息，直到管道關閉"""
+        while True:
+            try:
+                message = conn.recv()
+            except Exception:  # 管道關閉，或工作程序在寫入途中結束
+                return
+
+            command = message[0]
+            if command == "result":
+                _, call_id, ok, value = message
+                with self._lock:
+                    future = self._calls.pop(call_id, None)
+                if future is not None:
+                    if ok:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(value)
+            elif command == "item":
+                _, call_id, item = message
+                with self._lock:
+                    stream = self._calls.get(call_id)
+                if stream is not None:
+                    stream.put_item(item)
+            elif command == "notify":
+                self._forward(conn, message[1], message[2])
+
+    def _forward(self, conn: Connection, notify_id: int, triggered_alerts: List[Dict]):
+        """把觸發通知交給 Bot，送達後回覆工作程序"""
+        undelivered = [False] * len(triggered_alerts)
+        future = self._notifier(triggered_alerts) if self._notifier is not None else None
+        if future is None:
+            _send(conn, self._send_lock, ("delivered", notify_id, undelivered))
+            return
+
+        def on_done(done: Future):
+            try:
+                delivered = undelivered if done.cancelled() else done.result()
+            except Exception:
+                delivered = undelivered
+            _send(conn, self._send_lock, ("delivered", notify_id, delivered))
+
+        future.add_done_callback(on_done)
+
+    def _fail_calls(self):
+        """工作程序結束：關閉管道並讓尚未回覆的呼叫失敗"""
+        with self._lock:
+            conn, self._conn = self._conn, None
+            calls, self._calls = self._calls, {}
+        if conn is not None:
+            conn.close()
+        for future in calls.values():
+            future.set_exception(WorkerUnavailable("監控工作程序已結束"))
+
+    def call(
+        self,
+        target: str,
+        method: str,
+        *args,
+        timeout: Optional[float] = CALL_TIMEOUT,
+        **kwargs
+    ) -> Any:
+        """
+        在工作程序執行呼叫並等待結果
+
+        Args:
+            target: "alerts"（監控管理器）或 "fetcher"（股票查詢器）
+            method: 方法名稱（需列在 REMOTE_METHODS）
+            timeout: 等待結果的秒數，None 表示一直等待
+
+        Returns:
+            方法的返回值（工作程序中的例外會在此拋出）
+
+        Raises:
+            WorkerUnavailable: 工作程序未運行或逾時未回應
+        """
+        future: Future = Future()
+        call_id = self._submit("call", future, target, method, args, kwargs)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self._calls.pop(call_id, None)
+            raise WorkerUnavailable(f"監控工作程序逾時未回應: {target}.{method}") from None
+
+    def stream(
+        self,
+        target: str,
+        method: str,
+        *args,
+        timeout: Optional[float] = CALL_TIMEOUT,
+        **kwargs
+    ) -> Iterator[Any]:
+        """
+        在工作程序執行返回迭代器的方法，逐筆產出工作程序送回的結果
+
+        Args:
+            target: "fetcher"（股票查詢器）
+            method: 方法名稱（需列在 REMOTE_STREAMS）
+            timeout: 等待下一筆結果的秒數，None 表示一直等待
+
+        Yields:
+            迭代器產出的每一筆（工作程序中的例外會在此拋出）
+
+        Raises:
+            WorkerUnavailable: 工作程序未運行或逾時未回應
+        """
+        stream = _CallStream()
+        call_id = self._submit("stream", stream, target, method, args, kwargs)
+        finished = False
+        try:
+            while True:
+                try:
+                    kind, value = stream.get(timeout)
+                except queue.Empty:
+                    raise WorkerUnavailable(
+                        f"監控工作程序逾時未回應: {target}.{method}"
+                    ) from None
+                if kind == "item":
+                    yield value
+                else:
+                    finished = True
+                    if kind == "error":
+                        raise value
+                    return
+        finally:
+            # 逾時或提前結束：忽略之後送回的結果，並要求工作程序停止查詢
+            with self._lock:
+                pending = self._calls.pop(call_id, None) is not None
+                conn = self._conn
+            if not finished and pending and conn is not None:
+                _send(conn, self._send_lock, ("cancel", call_id))
+
+    def _submit(
+        self,
+        command: str,
+        receiver: Any,
+        target: str,
+        method: str,
+        args: tuple,
+        kwargs: Dict[str, Any]
+    ) -> int:
+        """登記接收端並把呼叫送到工作程序，返回 call_id"""
+        with self._lock:
+            conn = self._conn
+            if conn is None:
+                raise WorkerUnavailable("監控工作程序未運行")
+            call_id = next(self._ids)
+            self._calls[call_id] = receiver
+        if not _send(conn, self._send_lock, (command, call_id, target, method, args, kwargs)):
+            with self._lock:
+                self._calls.pop(call_id, None)
+            raise WorkerUnavailable("監控工作程序未運行")
+        return call_id
+
+    def stop(self):
+        """要求工作程序寫入監控清單後結束，並停止監督"""
+        self._stopping.set()
+        with self._lock:
+            conn = self._conn
+        if conn is not None:
+            self.logger.info("正在停止監控工作程序...")
+            _send(conn, self._send_lock, ("stop",))
+        if self._supervisor is not None:
+            self._supervisor.join(_STOP_TIMEOUT + 5)
+            self.logger.info("監控工作程序已停止")
+
+
+class RemoteAlertManager:
+    """Bot 前端使用的監控管理器：每個呼叫都在工作程序執行"""
+
+    def __init__(self, worker: MonitorWorkerProcess):
+        self._worker = worker
+
+    def add_alert(self, *args, **kwargs):
+        return self._worker.call("alerts", "add_alert", *args, **kwargs)
+
+    def add_alerts(self, alerts: List[Dict]):
+        return self._worker.call("alerts", "add_alerts", alerts)
+
+    def list_alerts(self, user_id: int):
+        return self._worker.call("alerts", "list_alerts", user_id)
+
+    def remove_alert(self, user_id: int, alert_id: str) -> bool:
+        return self._worker.call("alerts", "remove_alert", user_id, alert_id)
+
+    def clear_all_alerts(self, user_id: int) -> int:
+        return self._worker.call("alerts", "clear_all_alerts", user_id)
+
+    def clear_alerts_by_symbol(self, user_id: int, symbol: str) -> int:
+        return self._worker.call("alerts", "clear_alerts_by_symbol", user_id, symbol)
+
+
+class RemoteStockFetcher(StockFetcher):
+    """
+    Bot 前端使用的股票查詢器：代碼標準化與驗證在本機執行，價格查詢交給工作程序
+
+    查詢資料來源的呼叫依工作量等待（批次查詢逐筆串流回前端），快取讀取維持 CALL_TIMEOUT。
+    get_prices_batch 沿用 StockFetcher 的實作，收集 iter_prices_batch 的結果。
+    """
+
+    def __init__(self, worker: MonitorWorkerProcess):
+        super().__init__()
+        self._worker = worker
+
+    def get_price(self, symbol: str) -> Dict[str, Any]:
+        return self._worker.call("fetcher", "get_price", symbol, timeout=PROVIDER_CALL_TIMEOUT)
+
+    def iter_prices_batch(self, symbols: Iterable[str]) -> Iterator[Tuple[str, Dict]]:
+        # 工作程序每查到一個股票就送回；批次下載前的等待依股票數延長
+        symbols = list(symbols)
+        timeout = PROVIDER_CALL_TIMEOUT + PROVIDER_SECONDS_PER_SYMBOL * len(symbols)
+        yield from self._worker.stream("fetcher", "iter_prices_batch", symbols, timeout=timeout)
+
+    def cached_price(self, symbol: str, max_age: float) -> Optional[Dict[str, Any]]:
+        return self._worker.call("fetcher", "cached_price", symbol, max_age)
+
+    def cached_prices(self, symbols: Iterable[str], max_age: float) -> Dict[str, Dict[str, Any]]:
+        return self._worker.call("fetcher", "cached_prices", list(symbols), max_age)
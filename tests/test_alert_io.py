@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""測試 alert_io.py 模組"""
+import unittest
+from datetime import datetime
+
+from src.alert_io import format_alert_lines, parse_alert_lines
+from src.alert_record import AlertRecord
+
+
+class TestAlertIO(unittest.TestCase):
+    """測試監控匯入/匯出格式"""
+
+    def test_parse_mixed_delimiters(self):
+        """測試逗號、分號、Tab 與空白分隔"""
+        entries, errors = parse_alert_lines(
+            "2330.TW,above,600\n"
+            "AAPL below 140\n"
+            "MSFT;ABOVE;450.5\n"
+            "TSLA\tbelow\t200\n"
+        )
+
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            [(e["symbol"], e["condition"], e["target_price"]) for e in entries],
+            [("2330.TW", "above", 600.0), ("AAPL", "below", 140.0),
+             ("MSFT", "above", 450.5), ("TSLA", "below", 200.0)]
+        )
+        self.assertEqual([e["line"] for e in entries], [1, 2, 3, 4])
+
+    def test_parse_skips_header_comments_and_blank_lines(self):
+        """測試略過標題列、註解與空行"""
+        entries, errors = parse_alert_lines(
+            "symbol,condition,target_price\n\n# 我的監控\nAAPL,above,150\n"
+        )
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["line"], 4)
+
+    def test_parse_reports_invalid_lines(self):
+        """測試無效行回報行號，其餘行照常解析"""
+        entries, errors = parse_alert_lines(
+            "AAPL,above\n"
+            "AAPL,sideways,150\n"
+            "AAPL,above,abc\n"
+            "AAPL,above,-1\n"
+            "GOOGL,below,100\n"
+        )
+
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0]["symbol"], "GOOGL")
+        self.assertEqual(len(errors), 4)
+        self.assertTrue(errors[0].startswith("第 1 行"))
+        self.assertTrue(errors[3].startswith("第 4 行"))
+
+    def test_export_round_trip(self):
+        """測試匯出內容可直接重新匯入"""
+        alerts = [
+            {"symbol": "2330.TW", "condition": "above", "target_price": 600},
+            {"symbol": "AAPL", "condition": "below", "target_price": 140.25},
+        ]
+        text = format_alert_lines(alerts)
+
+        self.assertTrue(text.startswith("symbol,condition,target_price,expiry\n"))
+        entries, errors = parse_alert_lines(text)
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            [(e["symbol"], e["condition"], e["target_price"]) for e in entries],
+            [("2330.TW", "above", 600.0), ("AAPL", "below", 140.25)]
+        )
+
+    def test_indicator_conditions(self):
+        """測試指標條件的匯入與匯出還原"""
+        entries, errors = parse_alert_lines(
+            "AAPL,rsi(14) above,70\n"
+            "NVDA ema12 cross_above ema26 7d\n"
+            "TSLA,change(12) below,-5,\n"
+            "MSFT,macd(1) above,1\n"
+            "2330.TW,between,580 620\n"
+            "0050.TW outside 120 140 trigger+1d\n"
+        )
+
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(errors[0].startswith("第 4 行"))
+        self.assertEqual(
+            [(e["symbol"], e["condition"], e["target_price"]) for e in entries],
+            [("AAPL", "rsi(14) above", 70.0),
+             ("NVDA", "ema(12) cross_above ema(26)", 0.0),
+             ("TSLA", "change(12) below", -5.0),
+             ("2330.TW", "between", 580.0),
+             ("0050.TW", "outside", 120.0)]
+        )
+        self.assertEqual([e["upper_price"] for e in entries[2:]], [None, 620.0, 140.0])
+        self.assertIsNotNone(entries[1]["expires_at"])
+
+        text = format_alert_lines(entries)
+        self.assertIn("NVDA,ema(12) cross_above,ema(26),", text)
+        self.assertIn("TSLA,change(12) below,-5.0,\n", text)
+        self.assertIn("2330.TW,between,580.0 620.0,\n", text)
+        restored, errors = parse_alert_lines(text)
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            [(e["condition"], e["target_price"], e["upper_price"]) for e in restored],
+            [(e["condition"], e["target_price"], e["upper_price"]) for e in entries]
+        )
+
+    def test_trailing_conditions(self):
+        """測試移動停損的匯入與匯出還原"""
+        entries, errors = parse_alert_lines("NVDA,trailing,8%\n2330.TW trailing 30 7d\n")
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            [(e["condition"], e["target_price"]) for e in entries],
+            [("trailing_pct", 8.0), ("trailing", 30.0)]
+        )
+
+        text = format_alert_lines(entries)
+        self.assertIn("NVDA,trailing,8.0%,\n", text)
+        restored, errors = parse_alert_lines(text)
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            [(e["condition"], e["target_price"]) for e in restored],
+            [(e["condition"], e["target_price"]) for e in entries]
+        )
+
+    def test_expiry_column(self):
+        """測試選用的到期欄位與匯出還原"""
+        now = datetime(2026, 1, 1).timestamp()
+        entries, errors = parse_alert_lines(
+            "AAPL,above,150,7d\n"
+            "MSFT below 300 trigger+3d\n"
+            "TSLA,above,200,2026-06-30\n"
+            "NVDA,above,100,yesterday\n",
+            now=now
+        )
+
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(errors[0].startswith("第 4 行"))
+        self.assertEqual(entries[0]["expires_at"], now + 7 * 86400)
+        self.assertIsNone(entries[0]["expire_after"])
+        self.assertEqual(entries[1]["expire_after"], 3 * 86400)
+        self.assertIsNone(entries[1]["expires_at"])
+        self.assertEqual(entries[2]["expires_at"], datetime(2026, 6, 30).timestamp())
+
+        text = format_alert_lines([
+            AlertRecord("a", 1, "AAPL", 150, "above", expires_at=entries[2]["expires_at"]),
+            AlertRecord("b", 1, "MSFT", 300, "below", expire_after=3 * 86400),
+        ])
+        self.assertIn("AAPL,above,150.0,2026-06-30T00:00\n", text)
+        self.assertIn("MSFT,below,300.0,trigger+3d\n", text)
+        restored, errors = parse_alert_lines(text, now=now)
+        self.assertEqual(errors, [])
+        self.assertEqual(restored[0]["expires_at"], entries[2]["expires_at"])
+        self.assertEqual(restored[1]["expire_after"], 3 * 86400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,8 +5,10 @@ import tempfile
 import threading
 import time
 import unittest
+from unittest.mock import patch
 
 from src.alert_manager import AlertManager
+from src.bands import band_signals
 
 
 class TestAlertManager(unittest.TestCase):
@@ -51,6 +53,44 @@ class TestAlertManager(unittest.TestCase):
                 condition="invalid"
             )
 
+    def test_add_alerts_batch(self):
+        """測試批次新增：整批去重（含批次內重複）並只寫入一次"""
+        self.manager.add_alert(123, "AAPL", 150.0, "above")
+
+        results = self.manager.add_alerts([
+            {"user_id": 123, "symbol": "aapl", "target_price": 150.0, "condition": "above"},
+            {"user_id": 123, "symbol": "MSFT", "target_price": 300.0, "condition": "above"},
+            {"user_id": 123, "symbol": "MSFT", "target_price": 300.0, "condition": "above"},
+            {"user_id": 456, "symbol": "MSFT", "target_price": 300.0, "condition": "above"},
+        ])
+
+        self.assertIsNone(results[0])
+        self.assertEqual(results[1]["symbol"], "MSFT")
+        self.assertIsNone(results[2])
+        self.assertEqual(results[3]["user_id"], 456)
+        self.assertEqual(len(self.manager.list_alerts(123)), 2)
+        self.assertEqual(len(self.manager.list_alerts(456)), 1)
+
+    def test_add_alerts_single_write(self):
+        """測試整批只寫入檔案一次"""
+        batch = [
+            {"user_id": 123, "symbol": f"STOCK{i}", "target_price": 100.0, "condition": "above"}
+            for i in range(20)
+        ]
+        with patch("src.alert_manager.save_json", return_value=True) as mock_save:
+            self.manager.add_alerts(batch)
+        self.assertEqual(mock_save.call_count, 1)
+        self.assertEqual(len(self.manager.list_alerts(123)), 20)
+
+    def test_add_alerts_invalid_condition_rejects_batch(self):
+        """測試批次中有無效條件時整批拒絕"""
+        with self.assertRaises(ValueError):
+            self.manager.add_alerts([
+                {"user_id": 123, "symbol": "AAPL", "target_price": 150.0, "condition": "above"},
+                {"user_id": 123, "symbol": "MSFT", "target_price": 300.0, "condition": "sideways"},
+            ])
+        self.assertEqual(self.manager.list_alerts(123), [])
+
     def test_list_alerts(self):
         """測試列出監控"""
         # 新增兩個監控
@@ -260,6 +300,278 @@ class TestAlertManager(unittest.TestCase):
         triggered = self.manager.check_alerts(current_prices)
         self.assertEqual(len(triggered), 1)
 
+    def test_indexes_follow_mutations(self):
+        """測試索引在異動後保持一致"""
+        first = self.manager.add_alert(123, "AAPL", 150.0, "above")
+        self.assertIs(self.manager.get_alert_by_id(first.id), first)
+
+        second = self.manager.add_alert(123, "MSFT", 300.0, "above")
+        self.assertIs(self.manager.get_alert_by_id(second.id), second)
+        self.assertEqual(len(self.manager.list_alerts(123)), 2)
+
+        self.manager.remove_alert(123, first.id)
+        self.assertIsNone(self.manager.get_alert_by_id(first.id))
+        self.assertEqual(len(self.manager.list_alerts(123)), 1)
+
+        self.manager.clear_all_alerts(123)
+        self.assertIsNone(self.manager.get_alert_by_id(second.id))
+
+    def test_view_is_immutable(self):
+        """測試讀取端持有的版本不受後續異動與檢查影響"""
+        alert = self.manager.add_alert(123, "AAPL", 150.0, "above")
+        view = self.manager.view()
+
+        self.manager.add_alert(123, "MSFT", 300.0, "above")
+        triggered = self.manager.check_alerts({
+            "AAPL": {"price": 155.0, "currency": "USD", "success": True}
+        })
+
+        # 舊版本保持原樣，記錄未被就地修改
+        self.assertEqual(len(view), 1)
+        self.assertEqual(view.symbols, frozenset({"AAPL"}))
+        self.assertFalse(view.get(alert.id).notified)
+        self.assertFalse(alert.notified)
+
+        # 新版本包含所有變更
+        current = self.manager.view()
+        self.assertGreater(current.version, view.version)
+        self.assertTrue(current.get(alert.id).notified)
+        self.assertIs(triggered[0]["alert"], current.get(alert.id))
+
+    def _run_prices(self, manager, symbol, prices):
+        """依序執行多個檢查週期，返回每個週期觸發的監控 ID"""
+        return [
+            [item["alert"].id for item in manager.check_alerts({
+                symbol: {"price": price, "currency": "USD", "success": True}
+            })]
+            for price in prices
+        ]
+
+    def test_indicator_threshold(self):
+        """測試指標門檻條件：暖機完成後才觸發，回到緩衝區外後重置"""
+        alert = self.manager.add_alert(123, "AAPL", 70, "RSI3 above")
+        self.assertEqual(alert.condition, "rsi(3) above")
+
+        prices = [10, 11, 12, 13, 14, 10, 5, 6, 7, 8, 9, 10, 11]
+        cycles = self._run_prices(self.manager, "AAPL", prices)
+        # 第 4 次檢查才有 3 筆變動（RSI = 100）；下跌後重置，RSI 回到 73.4 時再次觸發
+        self.assertEqual(cycles[:3], [[], [], []])
+        self.assertEqual(cycles[3], [alert.id])
+        self.assertEqual(cycles[11], [alert.id])
+        self.assertEqual(sum(cycles, []), [alert.id, alert.id])
+
+    def test_indicator_cross(self):
+        """測試穿越條件只在由另一側穿越時觸發"""
+        alert = self.manager.add_alert(123, "AAPL", 0, "cross_above sma(3)")
+        cycles = self._run_prices(self.manager, "AAPL", [10, 11, 12, 9, 8, 12, 13, 14])
+        # 建立時已在均線上方不觸發；先跌破後第 6 次檢查向上穿越
+        self.assertEqual(cycles[5], [alert.id])
+        self.assertEqual(sum(cycles, []), [alert.id])
+
+    def test_indicator_shared_between_alerts(self):
+        """測試相同指標由所有監控共用一份狀態"""
+        for user_id in range(50):
+            self.manager.add_alert(user_id, "AAPL", 1000 + user_id, "sma(5) above")
+            self.manager.add_alert(user_id, "AAPL", 0, "ema(12) cross_above ema(26)")
+
+        with patch("src.indicators.SMA._next", autospec=True,
+                   side_effect=lambda indicator, price: price) as mock_next:
+            self._run_prices(self.manager, "AAPL", [100.0, 101.0])
+        self.assertEqual(mock_next.call_count, 2)
+        self.assertEqual(len(self.manager._indicators), 3)
+
+    def test_band_alerts(self):
+        """測試區間條件的觸發與緩衝區重置"""
+        between = self.manager.add_alert(123, "AAPL", 140, "between", upper_price=160)
+        outside = self.manager.add_alert(123, "AAPL", 140, "outside", upper_price=160)
+        self.assertEqual(between.upper_price, 160.0)
+
+        cycles = self._run_prices(
+            self.manager, "AAPL", [130, 150, 139, 136, 145, 161, 163.5, 155, 150]
+        )
+        self.assertEqual(cycles, [
+            [outside.id],   # 130：在區間外
+            [between.id],   # 150：進入區間；outside 回到內側 (142.8, 156.8) 而重置
+            [outside.id],   # 139：離開區間，但仍在 between 的緩衝區內
+            [],             # 136：between 重置
+            [between.id],   # 145：再次進入；outside 重置
+            [outside.id],   # 161：離開區間
+            [],             # 163.5：between 重置
+            [between.id],   # 155：進入；outside 重置
+            [],             # 150
+        ])
+
+    def test_band_alert_validation(self):
+        """測試區間上限的驗證與重複判斷"""
+        with self.assertRaises(ValueError):
+            self.manager.add_alert(123, "AAPL", 160, "between", upper_price=140)
+        with self.assertRaises(ValueError):
+            self.manager.add_alert(123, "AAPL", 160, "between")
+        with self.assertRaises(ValueError):
+            self.manager.add_alert(123, "AAPL", 160, "above", upper_price=170)
+
+        self.assertIsNotNone(self.manager.add_alert(123, "AAPL", 140, "between", upper_price=160))
+        self.assertIsNone(self.manager.add_alert(123, "AAPL", 140, "between", upper_price=160))
+        self.assertIsNotNone(self.manager.add_alert(123, "AAPL", 140, "between", upper_price=170))
+
+        reloaded = AlertManager(self.test_file)
+        self.assertEqual(
+            sorted(alert.upper_price for alert in reloaded.list_alerts(123)), [160.0, 170.0]
+        )
+
+    def test_band_index_limits_evaluation(self):
+        """測試價格變動只評估門檻被越過的區間監控"""
+        for i in range(100):
+            self.manager.add_alert(1, "AAPL", 100 + 10 * i, "between", upper_price=105 + 10 * i)
+
+        with patch("src.alert_manager.band_signals", wraps=band_signals) as mock_signals:
+            self._run_prices(self.manager, "AAPL", [102.0])
+            self.assertEqual(mock_signals.call_count, 100)  # 第一次評估全部
+
+            mock_signals.reset_mock()
+            self._run_prices(self.manager, "AAPL", [103.0])
+            self.assertEqual(mock_signals.call_count, 0)
+
+            mock_signals.reset_mock()
+            triggered = self._run_prices(self.manager, "AAPL", [121.0])
+            self.assertEqual(mock_signals.call_count, 3)  # 前三個區間有門檻落在 103~121
+            self.assertEqual(len(triggered[0]), 1)
+
+    def test_shared_threshold_evaluated_once(self):
+        """測試相同門檻只比較一次，觸發與重置套用到所有訂閱者"""
+        alerts = [self.manager.add_alert(user_id, "2330.TW", 1000, "above")
+                  for user_id in range(50)]
+        self.manager.add_alert(99, "2330.TW", 1100, "above")
+
+        with patch.object(self.manager, "_is_triggered",
+                          wraps=self.manager._is_triggered) as mock_triggered:
+            cycles = self._run_prices(self.manager, "2330.TW", [1010.0])
+            self.assertEqual(mock_triggered.call_count, 2)
+        self.assertEqual(sorted(cycles[0]), sorted(alert.id for alert in alerts))
+
+        # 已通知的訂閱者一起重置，之後可再次觸發
+        self.manager.remove_alert(0, alerts[0].id)
+        cycles = self._run_prices(self.manager, "2330.TW", [900.0, 1010.0])
+        self.assertEqual(cycles[0], [])
+        self.assertEqual(len(cycles[1]), 49)
+
+    def test_check_alerts_stream(self):
+        """測試串流檢查逐批產出觸發結果，且整個串流只是一個指標週期"""
+        above = self.manager.add_alert(1, "AAPL", 150, "above")
+        indicator = self.manager.add_alert(1, "MSFT", 0, "change(1) above")
+
+        def batches(prices):
+            for symbol, price in prices:
+                yield {symbol: {"price": price, "currency": "USD", "success": True}}
+
+        for prices in ([("AAPL", 100.0), ("MSFT", 100.0)], [("MSFT", 101.0), ("AAPL", 160.0)]):
+            results = [
+                [item["alert"].id for item in triggered]
+                for triggered in self.manager.check_alerts_stream(batches(prices))
+            ]
+        self.assertEqual(results, [[indicator.id], [above.id]])
+        self.assertTrue(self.manager.get_alert_by_id(above.id).notified)
+
+    def test_trigger_distances(self):
+        """測試到最近門檻的相對距離，引用指標的股票返回 None"""
+        self.manager.add_alert(1, "AAPL", 110, "above")
+        self.manager.add_alert(2, "AAPL", 95, "below")
+        self.manager.add_alert(1, "MSFT", 90, "between", upper_price=120)
+        self.manager.add_alert(1, "TSLA", 50, "rsi(14) above")
+
+        distances = self.manager.trigger_distances(
+            {"AAPL": 100.0, "MSFT": 100.0, "TSLA": 200.0, "NVDA": 100.0}
+        )
+        self.assertEqual(distances, {"AAPL": 0.05, "MSFT": 0.1, "TSLA": None})
+        self.assertEqual(
+            self.manager.subscriber_counts(["AAPL", "MSFT", "NVDA"]),
+            {"AAPL": 2, "MSFT": 1, "NVDA": 0}
+        )
+
+    def test_trailing_alerts(self):
+        """測試移動停損追蹤最高價、觸發與重置，且最高價會被儲存"""
+        pct = self.manager.add_alert(123, "AAPL", 5, "trailing_pct", peak_price=100.0)
+        points = self.manager.add_alert(123, "AAPL", 3, "trailing")
+        self.assertEqual(pct.peak_price, 100.0)
+        self.assertIsNone(points.peak_price)
+        self.assertIsNone(self.manager.add_alert(123, "AAPL", 140, "above", peak_price=1).peak_price)
+
+        cycles = self._run_prices(self.manager, "AAPL", [104, 99, 98.7, 101, 110, 104.5])
+        self.assertEqual(cycles, [
+            [],                     # 104：兩者最高價皆為 104
+            [points.id],            # 99：回落 5 點；百分比停損為 98.8
+            [pct.id],               # 98.7
+            [],                     # 101：pct 重置（停損 98.8 + 緩衝區 1.976）；points 未重置
+            [],                     # 110：新高，points 重置
+            [pct.id, points.id],    # 104.5：停損 104.5 / 107
+        ])
+
+        # 最高價創新高但未觸發時同樣會儲存
+        self._run_prices(self.manager, "AAPL", [120])
+        reloaded = AlertManager(self.test_file)
+        self.assertEqual(
+            sorted(alert.peak_price for alert in reloaded.list_alerts(123)
+                   if alert.condition != "above"),
+            [120.0, 120.0]
+        )
+
+    def test_expire_alerts(self):
+        """測試到期監控一次清除，且只儲存一次"""
+        now = time.time()
+        short = self.manager.add_alert(123, "AAPL", 150.0, "above", expires_at=now + 60)
+        long = self.manager.add_alert(123, "MSFT", 300.0, "above", expires_at=now + 3600)
+        keep = self.manager.add_alert(123, "GOOGL", 140.0, "above")
+        removed = self.manager.add_alert(123, "TSLA", 200.0, "above", expires_at=now + 30)
+        self.manager.remove_alert(123, removed.id)
+
+        self.assertEqual(self.manager.expire_alerts(now), [])
+
+        with patch("src.alert_manager.save_json", return_value=True) as mock_save:
+            expired = self.manager.expire_alerts(now + 120)
+        self.assertEqual([alert.id for alert in expired], [short.id])
+        self.assertEqual(mock_save.call_count, 1)
+
+        ids = {alert.id for alert in self.manager.list_alerts(123)}
+        self.assertEqual(ids, {long.id, keep.id})
+        self.assertEqual(self.manager.next_expiry(), long.expires_at)
+        self.assertNotIn("AAPL", self.manager.get_all_symbols())
+
+    def test_expire_after_trigger(self):
+        """測試觸發後到期：觸發時設定到期時間"""
+        alert = self.manager.add_alert(123, "AAPL", 150.0, "above", expire_after=86400)
+        self.assertIsNone(alert.expires_at)
+        self.assertIsNone(self.manager.next_expiry())
+
+        before = time.time()
+        triggered = self.manager.check_alerts({
+            "AAPL": {"price": 155.0, "currency": "USD", "success": True}
+        })
+        notified = triggered[0]["alert"]
+        self.assertGreaterEqual(notified.expires_at, before + 86400)
+        self.assertEqual(self.manager.get_alert_by_id(alert.id).expires_at, notified.expires_at)
+        self.assertEqual(self.manager.next_expiry(), notified.expires_at)
+
+        expired = self.manager.expire_alerts(notified.expires_at)
+        self.assertEqual([a.id for a in expired], [alert.id])
+
+    def test_expired_alert_not_notified(self):
+        """測試尚未清除的到期監控不會觸發通知"""
+        self.manager.add_alert(123, "AAPL", 150.0, "above", expires_at=time.time() - 1)
+        triggered = self.manager.check_alerts({
+            "AAPL": {"price": 155.0, "currency": "USD", "success": True}
+        })
+        self.assertEqual(triggered, [])
+
+    def test_expiry_persisted(self):
+        """測試到期設定寫入檔案，重新載入後仍會排程"""
+        expires_at = time.time() + 60
+        alert = self.manager.add_alert(123, "AAPL", 150.0, "above", expires_at=expires_at)
+
+        reloaded = AlertManager(self.test_file)
+        self.assertAlmostEqual(reloaded.get_alert_by_id(alert.id).expires_at, expires_at, places=5)
+        self.assertAlmostEqual(reloaded.next_expiry(), expires_at, places=5)
+        self.assertEqual(len(reloaded.expire_alerts(expires_at + 1)), 1)
+
     def test_persistence(self):
         """測試資料持久化"""
         # 新增監控
@@ -275,6 +587,45 @@ class TestAlertManager(unittest.TestCase):
         self.assertEqual(alerts[0]["id"], alert_id)
 
 
+class TestAlertManagerBackgroundSave(unittest.TestCase):
+    """測試背景合併寫入"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_file = os.path.join(self.temp_dir, "test_watchlist.json")
+        self.manager = AlertManager(self.test_file, save_latency=30.0)
+
+    def tearDown(self):
+        """測試後清理"""
+        import shutil
+        self.manager.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_burst_is_coalesced_until_flush(self):
+        """測試大量異動在 flush 時只寫入一次"""
+        for i in range(50):
+            self.manager.add_alert(123, f"STOCK{i}", 100.0, "above")
+
+        # 合併窗口尚未結束，檔案還沒寫入
+        self.assertFalse(os.path.exists(self.test_file))
+
+        self.assertTrue(self.manager.flush())
+        self.assertEqual(self.manager._writer.write_count, 1)
+
+        reloaded = AlertManager(self.test_file)
+        self.assertEqual(len(reloaded.list_alerts(123)), 50)
+
+    def test_close_flushes(self):
+        """測試關閉時寫入剩餘異動"""
+        alert = self.manager.add_alert(123, "AAPL", 150.0, "above")
+        self.manager.close()
+
+        reloaded = AlertManager(self.test_file)
+        self.assertEqual(reloaded.get_alert_by_id(alert["id"])["symbol"], "AAPL")
+
+
 class TestAlertManagerConcurrency(unittest.TestCase):
     """測試並發安全性"""
 
@@ -344,6 +695,43 @@ class TestAlertManagerConcurrency(unittest.TestCase):
         alerts = self.manager.list_alerts(123)
         self.assertEqual(len(alerts), 0)
 
+    def test_readers_during_checks(self):
+        """測試檢查與異動進行時，讀取端看到的版本始終一致"""
+        for i in range(50):
+            self.manager.add_alert(i % 5, f"STOCK{i % 10}", 80.0 + i, "above")
+
+        errors = []
+        stop = threading.Event()
+
+        def read_views():
+            while not stop.is_set():
+                view = self.manager.view()
+                user_total = sum(len(view.for_user(user_id)) for user_id in view.by_user)
+                if user_total != len(view) or len(view.by_id) != len(view):
+                    errors.append(view.version)
+
+        def check_prices():
+            for i in range(50):
+                price = 150.0 if i % 2 else 50.0
+                self.manager.check_alerts({
+                    f"STOCK{n}": {"price": price, "currency": "USD", "success": True}
+                    for n in range(10)
+                })
+
+        reader = threading.Thread(target=read_views)
+        reader.start()
+        checker = threading.Thread(target=check_prices)
+        checker.start()
+        for i in range(20):
+            self.manager.add_alert(99, f"NEW{i}", 10.0, "below")
+        self.manager.clear_all_alerts(99)
+        checker.join()
+        stop.set()
+        reader.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.manager.view()), 50)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""測試 alert_record.py 模組"""
+import sys
+import unittest
+
+from src.alert_record import AlertRecord, to_epoch, to_isoformat
+
+
+class TestAlertRecord(unittest.TestCase):
+    """測試精簡監控記錄"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.data = {
+            "id": "abc-123",
+            "user_id": 123,
+            "symbol": "aapl",
+            "target_price": 150,
+            "condition": "above",
+            "created_at": "2026-01-29T10:30:00.123456",
+            "notified": True,
+            "last_notified_at": None,
+            "enabled": True
+        }
+
+    def test_slots(self):
+        """測試沒有 __dict__，無法新增任意屬性"""
+        record = AlertRecord.from_dict(self.data)
+        self.assertFalse(hasattr(record, "__dict__"))
+        with self.assertRaises(AttributeError):
+            record.extra = 1
+
+    def test_from_dict_conversion(self):
+        """測試 JSON 格式轉換為記錄"""
+        record = AlertRecord.from_dict(self.data)
+
+        self.assertEqual(record.symbol, "AAPL")
+        self.assertIsInstance(record.target_price, float)
+        self.assertIsInstance(record.created_at, float)
+        self.assertIsNone(record.last_notified_at)
+
+    def test_symbol_interned(self):
+        """測試相同代碼共用同一字串物件"""
+        first = AlertRecord.from_dict(self.data)
+        second = AlertRecord("x", 1, "".join(["AA", "PL"]), 1.0, "below")
+        self.assertIs(first.symbol, second.symbol)
+        self.assertIs(first.symbol, sys.intern("AAPL"))
+
+    def test_round_trip(self):
+        """測試轉換回 JSON 格式"""
+        record = AlertRecord.from_dict(self.data)
+        restored = record.to_dict()
+
+        self.assertEqual(restored["created_at"], self.data["created_at"])
+        self.assertEqual(restored["symbol"], "AAPL")
+        self.assertEqual(restored["target_price"], 150.0)
+        self.assertEqual(AlertRecord.from_dict(restored), record)
+        self.assertEqual(record, restored)
+
+    def test_mapping_access(self):
+        """測試相容字典形式的唯讀存取"""
+        record = AlertRecord.from_dict(self.data)
+
+        self.assertEqual(record["id"], "abc-123")
+        self.assertEqual(record["created_at"], self.data["created_at"])
+        self.assertEqual(record.get("missing", "default"), "default")
+        self.assertIn("notified", record)
+        self.assertEqual(dict(record), record.to_dict())
+        with self.assertRaises(KeyError):
+            record["missing"]
+
+    def test_replace(self):
+        """測試複製並變更記錄，原記錄不受影響"""
+        record = AlertRecord.from_dict(self.data)
+        updated = record.replace(notified=False, last_notified_at=100.0)
+
+        self.assertIsNot(updated, record)
+        self.assertFalse(updated.notified)
+        self.assertEqual(updated.last_notified_at, 100.0)
+        self.assertTrue(record.notified)
+        self.assertIsNone(record.last_notified_at)
+        self.assertEqual(updated.id, record.id)
+        with self.assertRaises(TypeError):
+            record.replace(unknown=1)
+
+    def test_timestamp_helpers(self):
+        """測試時間欄位轉換"""
+        self.assertIsNone(to_epoch(None))
+        self.assertIsNone(to_epoch("not-a-date"))
+        self.assertEqual(to_epoch(12.5), 12.5)
+        self.assertIsNone(to_isoformat(None))
+        epoch = to_epoch("2026-01-29T10:30:00")
+        self.assertEqual(to_isoformat(epoch), "2026-01-29T10:30:00")
+
+
+if __name__ == "__main__":
+    unittest.main()
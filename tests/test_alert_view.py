@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""測試 alert_view.py 模組"""
+import unittest
+
+from src.alert_record import AlertRecord
+from src.alert_view import AlertView
+
+
+def make_alert(alert_id, user_id, symbol, enabled=True):
+    """建立測試用監控記錄"""
+    return AlertRecord(
+        id=alert_id,
+        user_id=user_id,
+        symbol=symbol,
+        target_price=100.0,
+        condition="above",
+        enabled=enabled
+    )
+
+
+class TestAlertView(unittest.TestCase):
+    """測試寫入時複製的監控視圖"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.alerts = [
+            make_alert("a", 1, "AAPL"),
+            make_alert("b", 1, "MSFT"),
+            make_alert("c", 2, "AAPL"),
+            make_alert("d", 3, "TSLA", enabled=False),
+        ]
+        self.view = AlertView(0, self.alerts)
+
+    def test_lazy_indexes(self):
+        """測試延遲建立的索引"""
+        self.assertIs(self.view.get("b"), self.alerts[1])
+        self.assertEqual(len(self.view.for_user(1)), 2)
+        self.assertEqual(self.view.for_user(42), ())
+        self.assertEqual(self.view.symbols, frozenset({"AAPL", "MSFT"}))
+
+    def test_added(self):
+        """測試新增產生新版本，已建立的索引增量更新"""
+        self.view.by_user  # 先建立索引
+        new_alert = make_alert("e", 2, "NVDA")
+        added = self.view.added(new_alert)
+
+        self.assertEqual(added.version, 1)
+        self.assertEqual(len(added), 5)
+        self.assertIs(added.get("e"), new_alert)
+        self.assertEqual(len(added.for_user(2)), 2)
+        self.assertIn("NVDA", added.symbols)
+
+        # 舊版本不變
+        self.assertEqual(len(self.view), 4)
+        self.assertIsNone(self.view.get("e"))
+        self.assertEqual(len(self.view.for_user(2)), 1)
+
+    def test_extended(self):
+        """測試整批新增只產生一個新版本"""
+        self.view.by_id
+        self.view.symbols
+        extended = self.view.extended([make_alert("e", 4, "NVDA"), make_alert("f", 4, "AMD")])
+
+        self.assertEqual(extended.version, 1)
+        self.assertEqual(len(extended.for_user(4)), 2)
+        self.assertIsNotNone(extended.get("f"))
+        self.assertEqual(extended.symbols, frozenset({"AAPL", "MSFT", "NVDA", "AMD"}))
+        self.assertIs(self.view.extended([]), self.view)
+
+    def test_removed(self):
+        """測試移除產生新版本"""
+        self.view.by_user
+        removed = self.view.removed(["a", "c", "missing"])
+
+        self.assertEqual([alert.id for alert in removed], ["b", "d"])
+        self.assertIsNone(removed.get("a"))
+        self.assertEqual(removed.for_user(2), ())
+        self.assertNotIn(2, removed.by_user)
+        self.assertEqual(removed.symbols, frozenset({"MSFT"}))
+        self.assertIs(self.view.removed(["missing"]), self.view)
+
+    def test_replaced(self):
+        """測試以新記錄取代，忽略已不存在的監控"""
+        self.view.by_user
+        updated = self.alerts[0].replace(notified=True)
+        enabled = self.alerts[3].replace(enabled=True)
+        replaced = self.view.replaced({"a": updated, "d": enabled, "gone": updated})
+
+        self.assertIs(replaced.get("a"), updated)
+        self.assertIs(replaced.alerts[0], updated)
+        self.assertIs(replaced.for_user(1)[0], updated)
+        self.assertIn("TSLA", replaced.symbols)
+        self.assertFalse(self.view.get("a").notified)
+        self.assertIs(self.view.replaced({"gone": updated}), self.view)
+
+
+    def test_band_index(self):
+        """測試區間端點索引的增量維護與共用"""
+        band = AlertRecord("e", 4, "AAPL", 140.0, "between", upper_price=160.0)
+        view = self.view.added(band)
+        index = view.bands["AAPL"]
+        self.assertEqual(index.alert_ids, {"e"})
+        self.assertNotIn("MSFT", view.bands)
+
+        # 只變更通知狀態時共用同一個索引
+        notified = view.replaced({"e": band.with_notification(True, 1.0)})
+        self.assertIs(notified.bands["AAPL"], index)
+
+        # 其他股票的異動不影響既有索引
+        other = notified.extended([
+            AlertRecord("f", 4, "MSFT", 1.0, "outside", upper_price=2.0)
+        ])
+        self.assertIs(other.bands["AAPL"], index)
+        self.assertEqual(other.bands["MSFT"].alert_ids, {"f"})
+
+        removed = other.removed(["e"])
+        self.assertNotIn("AAPL", removed.bands)
+        disabled = other.replaced({"f": other.get("f").replace(enabled=False)})
+        self.assertNotIn("MSFT", disabled.bands)
+
+    def test_subscription_index(self):
+        """測試共用門檻索引的增量維護與移動停損清單"""
+        subscriptions = self.view.subscriptions
+        self.assertEqual(subscriptions["AAPL"][("above", 100.0)].pending, ("a", "c"))
+        self.assertNotIn("TSLA", subscriptions)
+
+        # 通知狀態變更時移到已通知清單，其他股票共用同一個分組
+        notified = self.view.replaced({"a": self.alerts[0].with_notification(True, 1.0)})
+        group = notified.subscriptions["AAPL"][("above", 100.0)]
+        self.assertEqual((group.pending, group.notified), (("c",), ("a",)))
+        self.assertIs(notified.subscriptions["MSFT"], subscriptions["MSFT"])
+
+        trailing = AlertRecord("e", 4, "AAPL", 5.0, "trailing", peak_price=120.0)
+        extended = notified.extended([trailing])
+        self.assertEqual(extended.trailing, {"AAPL": ("e",)})
+        self.assertIs(extended.subscriptions, notified.subscriptions)
+
+        removed = extended.removed(["a", "c", "e"])
+        self.assertNotIn("AAPL", removed.subscriptions)
+        self.assertEqual(removed.trailing, {})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""測試 bands.py 模組"""
+import unittest
+
+from src.alert_record import AlertRecord
+from src.bands import BandIndex, band_signals, band_thresholds, price_buffer
+
+
+class TestBandSignals(unittest.TestCase):
+    """測試區間條件與緩衝區"""
+
+    def test_price_buffer(self):
+        """測試緩衝區為 2%，至少 0.5"""
+        self.assertEqual(price_buffer(100.0), 2.0)
+        self.assertEqual(price_buffer(10.0), 0.5)
+
+    def test_between(self):
+        """測試進入區間觸發，離開超過緩衝區後重置"""
+        self.assertEqual(band_signals("between", 150.0, 140.0, 160.0), (True, False))
+        self.assertEqual(band_signals("between", 140.0, 140.0, 160.0), (True, False))
+        self.assertEqual(band_signals("between", 138.0, 140.0, 160.0), (False, False))
+        self.assertEqual(band_signals("between", 137.0, 140.0, 160.0), (False, True))
+        self.assertEqual(band_signals("between", 163.5, 140.0, 160.0), (False, True))
+
+    def test_outside(self):
+        """測試離開區間觸發，回到內側後重置"""
+        self.assertEqual(band_signals("outside", 139.0, 140.0, 160.0), (True, False))
+        self.assertEqual(band_signals("outside", 161.0, 140.0, 160.0), (True, False))
+        self.assertEqual(band_signals("outside", 141.0, 140.0, 160.0), (False, False))
+        self.assertEqual(band_signals("outside", 150.0, 140.0, 160.0), (False, True))
+        # 區間比緩衝區窄：回到區間內即重置
+        self.assertEqual(band_signals("outside", 10.2, 10.0, 10.5), (False, True))
+
+    def test_thresholds(self):
+        """測試門檻包含區間兩端與緩衝區"""
+        self.assertEqual(band_thresholds("between", 100.0, 200.0), (98.0, 100.0, 200.0, 204.0))
+        self.assertEqual(band_thresholds("outside", 100.0, 200.0), (100.0, 102.0, 196.0, 200.0))
+
+
+class TestBandIndex(unittest.TestCase):
+    """測試排序端點索引"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.alerts = [
+            AlertRecord("a", 1, "AAPL", 100.0, "between", upper_price=110.0),
+            AlertRecord("b", 1, "AAPL", 150.0, "outside", upper_price=170.0),
+            AlertRecord("c", 2, "AAPL", 300.0, "between", upper_price=400.0),
+        ]
+        self.index = BandIndex.from_alerts(self.alerts)
+
+    def test_crossed(self):
+        """測試只返回門檻落在價格變動範圍內的監控"""
+        self.assertEqual(self.index.crossed(120.0, 140.0), frozenset())
+        self.assertEqual(self.index.crossed(105.0, 120.0), {"a"})
+        self.assertEqual(self.index.crossed(160.0, 99.0), {"a", "b"})
+        self.assertEqual(self.index.crossed(0.0, 1000.0), {"a", "b", "c"})
+
+    def test_with_and_without(self):
+        """測試新增與移除產生新索引，原索引不變"""
+        added = self.index.with_alerts([
+            AlertRecord("d", 3, "AAPL", 125.0, "between", upper_price=130.0)
+        ])
+        self.assertEqual(added.crossed(120.0, 140.0), {"d"})
+        self.assertEqual(len(self.index), 3)
+
+        removed = added.without(["a", "d"])
+        self.assertEqual(removed.alert_ids, {"b", "c"})
+        self.assertIs(self.index.without(["x"]), self.index)
+        self.assertIsNone(self.index.without(["a", "b", "c"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
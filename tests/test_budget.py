@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""測試 budget.py 模組"""
+import unittest
+
+from src.budget import CycleBudget, prioritize, stalest_age
+
+
+class FakeClock:
+    """可手動推進的時鐘"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCycleBudget(unittest.TestCase):
+    """測試週期預算"""
+
+    def test_request_budget(self):
+        """測試請求數上限，新週期重新計算"""
+        budget = CycleBudget(requests=2)
+        budget.begin()
+        self.assertEqual([budget.take() for _ in range(3)], [True, True, False])
+        self.assertEqual((budget.used, budget.exhausted), (2, "requests"))
+
+        budget.begin()
+        self.assertTrue(budget.take())
+        self.assertIsNone(budget.exhausted)
+
+    def test_time_budget(self):
+        """測試時間用完後不再發放請求"""
+        clock = FakeClock()
+        budget = CycleBudget(seconds=10, clock=clock)
+        budget.begin()
+        clock.now = 9.9
+        self.assertTrue(budget.take())
+        clock.now = 10.0
+        self.assertFalse(budget.take())
+        self.assertEqual(budget.exhausted, "time")
+
+    def test_unlimited(self):
+        """測試未設定上限時不限制"""
+        budget = CycleBudget()
+        budget.begin()
+        self.assertTrue(all(budget.take() for _ in range(1000)))
+
+    def test_invalid(self):
+        """測試無效的預算"""
+        with self.assertRaises(ValueError):
+            CycleBudget(seconds=0)
+        with self.assertRaises(ValueError):
+            CycleBudget(requests=-1)
+
+
+class TestPrioritize(unittest.TestCase):
+    """測試查詢順序"""
+
+    def test_order(self):
+        """測試即將觸發 → 延後 → 其他，同組依距離、訂閱數與報價新舊排序"""
+        distances = {
+            "NEAR": 0.002, "INDICATOR": None, "CARRIED": 0.2,
+            "POPULAR": 0.05, "OLD": 0.05, "NEW": 0.05, "FAR": 0.3,
+        }
+        subscribers = {"POPULAR": 10, "OLD": 1, "NEW": 1}
+        quoted_at = {"OLD": 100.0, "NEW": 200.0, "NEAR": 300.0}
+        order = prioritize(
+            list(distances) + ["UNQUOTED"], distances, subscribers, quoted_at, {"CARRIED"}
+        )
+        self.assertEqual(order, [
+            "INDICATOR", "UNQUOTED", "NEAR", "CARRIED", "POPULAR", "OLD", "NEW", "FAR",
+        ])
+
+    def test_stalest_age(self):
+        """測試最舊報價的年齡（從未查詢的股票不計入）"""
+        quoted_at = {"A": 100.0, "B": 250.0, "GONE": 0.0}
+        self.assertEqual(stalest_age(["A", "B", "C"], quoted_at, 300.0), 200.0)
+        self.assertIsNone(stalest_age(["C"], quoted_at, 300.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""測試 checkpoint.py 模組"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.checkpoint import CHECKPOINT_VERSION, MAX_CHECKPOINT_AGE, CheckpointStore
+
+
+class FakeComponent:
+    """記錄恢復內容的假元件"""
+
+    def __init__(self, state=None):
+        self.state = state
+        self.restored = None
+
+    def checkpoint_state(self):
+        return self.state
+
+    def restore_checkpoint(self, state):
+        self.restored = state
+
+
+class TestCheckpointStore(unittest.TestCase):
+    """測試檢查點檔案"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "checkpoint.json")
+        self.now = 1000.0
+
+    def tearDown(self):
+        """測試後清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _store(self, **kwargs):
+        return CheckpointStore(self.path, clock=lambda: self.now, **kwargs)
+
+    def test_round_trip(self):
+        """測試寫入後由新的實例恢復各元件狀態"""
+        store = self._store()
+        store.register("fetcher", FakeComponent({"quotes": [["AAPL", 990.0, {"price": 1.0}]]}))
+        store.register("scheduler", FakeComponent({"carried": ["MSFT"]}))
+        self.assertTrue(store.save())
+
+        with open(self.path, encoding="utf-8") as f:
+            content = f.read()
+        self.assertNotIn("\n", content)  # 精簡格式
+        self.assertEqual(json.loads(content)["version"], CHECKPOINT_VERSION)
+
+        fetcher, scheduler, missing = FakeComponent(), FakeComponent(), FakeComponent()
+        restored = self._store()
+        restored.register("fetcher", fetcher)
+        restored.register("scheduler", scheduler)
+        restored.register("missing", missing)
+        self.assertTrue(restored.restore())
+        self.assertEqual(fetcher.restored, {"quotes": [["AAPL", 990.0, {"price": 1.0}]]})
+        self.assertEqual(scheduler.restored, {"carried": ["MSFT"]})
+        self.assertIsNone(missing.restored)
+
+    def test_rejects_missing_stale_or_incompatible(self):
+        """測試檔案不存在、過期或版本不符時不恢復"""
+        component = FakeComponent({"a": 1})
+        store = self._store()
+        store.register("c", component)
+        self.assertFalse(store.restore())
+
+        store.save()
+        self.now += MAX_CHECKPOINT_AGE + 1
+        self.assertFalse(store.restore())
+
+        self.now = 1000.0
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"version": CHECKPOINT_VERSION + 1, "saved_at": self.now, "components": {}}, f)
+        self.assertFalse(store.restore())
+        self.assertIsNone(component.restored)
+
+    def test_maybe_save_interval(self):
+        """測試 maybe_save 依間隔寫入，元件錯誤不影響其他元件"""
+        broken = FakeComponent()
+        broken.checkpoint_state = lambda: 1 / 0
+        store = self._store(interval=60)
+        store.register("broken", broken)
+        store.register("ok", FakeComponent({"a": 1}))
+
+        with self.assertLogs("src.checkpoint", level="ERROR"):
+            self.assertTrue(store.maybe_save())
+        self.now += 30
+        self.assertFalse(store.maybe_save())
+        self.now += 30
+        with self.assertLogs("src.checkpoint", level="ERROR"):
+            self.assertTrue(store.maybe_save())
+
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["components"], {"ok": {"a": 1}})
+
+
+if __name__ == "__main__":
+    unittest.main()
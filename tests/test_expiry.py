@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""測試 expiry.py 模組"""
+import unittest
+from datetime import datetime
+
+from src.expiry import (
+    ExpiryQueue,
+    format_duration,
+    format_expiry,
+    parse_duration,
+    parse_expiry,
+)
+
+
+class TestExpiryParsing(unittest.TestCase):
+    """測試到期設定解析"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.now = datetime(2026, 1, 1, 12, 0).timestamp()
+
+    def test_parse_duration(self):
+        """測試時間長度單位"""
+        self.assertEqual(parse_duration("30m"), 1800)
+        self.assertEqual(parse_duration("12H"), 12 * 3600)
+        self.assertEqual(parse_duration("1.5d"), 1.5 * 86400)
+        self.assertEqual(parse_duration("2w"), 14 * 86400)
+        for invalid in ("", "7", "d", "-1d", "0d", "3y"):
+            with self.assertRaises(ValueError):
+                parse_duration(invalid)
+
+    def test_parse_expiry_forms(self):
+        """測試相對時間、指定日期與觸發後到期"""
+        self.assertEqual(parse_expiry("7d", self.now), (self.now + 7 * 86400, None))
+        self.assertEqual(
+            parse_expiry("2026-03-01", self.now),
+            (datetime(2026, 3, 1).timestamp(), None)
+        )
+        self.assertEqual(parse_expiry("trigger+3d", self.now), (None, 3 * 86400))
+
+    def test_parse_expiry_invalid(self):
+        """測試無效或已過的到期設定"""
+        for invalid in ("soon", "2025-12-31", "trigger+", "trigger+x"):
+            with self.assertRaises(ValueError):
+                parse_expiry(invalid, self.now)
+
+    def test_format_round_trip(self):
+        """測試格式化結果可再次解析"""
+        self.assertEqual(format_duration(3 * 86400), "3d")
+        self.assertEqual(format_duration(14 * 86400), "2w")
+        self.assertEqual(format_duration(90 * 60), "90m")
+        self.assertEqual(format_expiry(None, None), "")
+        self.assertEqual(
+            parse_expiry(format_expiry(None, 36 * 3600), self.now), (None, 36 * 3600)
+        )
+        expires_at = datetime(2026, 2, 1, 9, 30).timestamp()
+        self.assertEqual(parse_expiry(format_expiry(expires_at, None), self.now)[0], expires_at)
+
+
+class TestExpiryQueue(unittest.TestCase):
+    """測試到期排程"""
+
+    def test_pop_due_in_order(self):
+        """測試只取出已到期的項目，並依時間排序"""
+        queue = ExpiryQueue([(30.0, "c"), (10.0, "a")])
+        queue.push("b", 20.0)
+        queue.push("d", 40.0)
+
+        self.assertEqual(queue.next_expiry(), 10.0)
+        self.assertEqual(queue.pop_due(25.0), [(10.0, "a"), (20.0, "b")])
+        self.assertEqual(len(queue), 2)
+        self.assertEqual(queue.pop_due(25.0), [])
+        self.assertEqual(queue.pop_due(100.0), [(30.0, "c"), (40.0, "d")])
+        self.assertIsNone(queue.next_expiry())
+
+
+if __name__ == "__main__":
+    unittest.main()
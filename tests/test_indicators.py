@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""測試 indicators.py 模組"""
+import unittest
+
+from src.indicators import (
+    EMA,
+    RSI,
+    SMA,
+    Change,
+    IndicatorEngine,
+    describe_condition,
+    normalize_indicator,
+    parse_alert_condition,
+    parse_condition,
+    split_condition,
+)
+
+
+class TestIndicators(unittest.TestCase):
+    """測試增量指標"""
+
+    def feed(self, indicator, prices):
+        """依序加入價格並返回每次的值"""
+        return [indicator.update(price) for price in prices]
+
+    def test_sma(self):
+        """測試簡單移動平均與滑動窗口"""
+        values = self.feed(SMA(3), [1, 2, 3, 4, 5, 6, 7])
+        self.assertEqual(values[:2], [None, None])
+        self.assertEqual(values[2:], [2.0, 3.0, 4.0, 5.0, 6.0])
+
+    def test_ema(self):
+        """測試指數移動平均以 SMA 作為起始值"""
+        ema = EMA(3)
+        values = self.feed(ema, [2, 4, 6, 8])
+        self.assertEqual(values[:2], [None, None])
+        self.assertEqual(values[2], 4.0)
+        self.assertEqual(values[3], 6.0)  # 4 + 0.5 * (8 - 4)
+        self.assertEqual(ema.previous, 4.0)
+
+    def test_rsi(self):
+        """測試 RSI 的極端值與 Wilder 平滑"""
+        self.assertEqual(self.feed(RSI(3), [1, 2, 3, 4])[-1], 100.0)
+        self.assertEqual(self.feed(RSI(3), [4, 3, 2, 1])[-1], 0.0)
+
+        values = self.feed(RSI(2), [10, 11, 10, 12])
+        self.assertEqual(values[:2], [None, None])
+        self.assertAlmostEqual(values[2], 50.0)
+        # 平均漲幅 (0.5 + 2) / 2、平均跌幅 0.5 / 2
+        self.assertAlmostEqual(values[3], 100 - 100 / (1 + 1.25 / 0.25))
+
+    def test_change(self):
+        """測試 N 次檢查的漲跌幅"""
+        values = self.feed(Change(2), [100, 105, 110, 99])
+        self.assertEqual(values[:2], [None, None])
+        self.assertAlmostEqual(values[2], 10.0)
+        self.assertAlmostEqual(values[3], (99 - 105) / 105 * 100)
+
+
+class TestConditions(unittest.TestCase):
+    """測試條件解析"""
+
+    def test_normalize_indicator(self):
+        """測試指標寫法轉換"""
+        self.assertEqual(normalize_indicator("SMA(20)"), "sma(20)")
+        self.assertEqual(normalize_indicator("rsi14"), "rsi(14)")
+        self.assertEqual(normalize_indicator("ema_12"), "ema(12)")
+        self.assertEqual(normalize_indicator("Price"), "price")
+        for invalid in ("macd(12)", "sma", "sma(0)", "sma(100000)"):
+            with self.assertRaises(ValueError):
+                normalize_indicator(invalid)
+
+    def test_parse_condition(self):
+        """測試 condition 欄位的標準格式"""
+        self.assertEqual(parse_condition("above").text, "above")
+        self.assertEqual(parse_condition("price BELOW").text, "below")
+        self.assertEqual(parse_condition("RSI14 above").text, "rsi(14) above")
+        self.assertEqual(
+            parse_condition("ema12 cross_above EMA(26)").text, "ema(12) cross_above ema(26)"
+        )
+        condition = parse_condition("cross_below sma(20)")
+        self.assertEqual(condition.indicator, "price")
+        self.assertEqual(condition.direction, "below")
+        self.assertTrue(condition.is_cross)
+        for invalid in ("", "sideways", "sma(20) sma(50) above", "ema(12) above ema(12)"):
+            with self.assertRaises(ValueError):
+                parse_condition(invalid)
+
+    def test_parse_alert_condition(self):
+        """測試指令參數解析"""
+        self.assertEqual(parse_alert_condition(["above", "600"]), ("above", 600.0, None, []))
+        self.assertEqual(
+            parse_alert_condition(["rsi(14)", "above", "70", "7d"]),
+            ("rsi(14) above", 70.0, None, ["7d"])
+        )
+        self.assertEqual(
+            parse_alert_condition(["cross_above", "SMA20"]),
+            ("cross_above sma(20)", 0.0, None, [])
+        )
+        self.assertEqual(
+            parse_alert_condition(["change(12)", "below", "-5"]),
+            ("change(12) below", -5.0, None, [])
+        )
+        self.assertEqual(
+            parse_alert_condition(["BETWEEN", "140", "160", "7d"]),
+            ("between", 140.0, 160.0, ["7d"])
+        )
+        self.assertEqual(parse_alert_condition(["trailing", "5%"]), ("trailing_pct", 5.0, None, []))
+        self.assertEqual(
+            parse_alert_condition(["trailing", "3", "7d"]), ("trailing", 3.0, None, ["7d"])
+        )
+        for invalid in (["above"], ["above", "-1"], ["above", "abc"], ["sideways", "1"], [],
+                        ["between", "160"], ["between", "160", "140"], ["outside", "a", "b"],
+                        ["rsi(14)", "between", "30", "70"], ["trailing", "0"],
+                        ["trailing", "100%"], ["trailing", "x%"], ["rsi(14)", "trailing", "5"]):
+            with self.assertRaises(ValueError):
+                parse_alert_condition(invalid)
+
+    def test_split_and_describe(self):
+        """測試匯出欄位與顯示文字"""
+        self.assertEqual(split_condition("above", 600), ("above", "600.0"))
+        self.assertEqual(
+            split_condition("ema(12) cross_above ema(26)", 0.0), ("ema(12) cross_above", "ema(26)")
+        )
+        self.assertEqual(describe_condition("above", 150.0, lambda p: f"$ {p:.2f}"),
+                         "價格 高於 $ 150.00")
+        self.assertEqual(describe_condition("rsi(14) above", 70.0), "RSI(14) 高於 70")
+        self.assertEqual(describe_condition("cross_above sma(20)", 0.0), "價格 向上穿越 SMA(20)")
+        self.assertEqual(describe_condition("change(12) below", -5.0), "漲跌幅(12 次) 低於 -5%")
+        self.assertEqual(split_condition("between", 140, 160), ("between", "140.0 160.0"))
+        self.assertEqual(describe_condition("outside", 140.0, None, 160.0),
+                         "價格 超出 140.0 ~ 160.0")
+        self.assertEqual(split_condition("trailing_pct", 5), ("trailing", "5.0%"))
+        self.assertEqual(describe_condition("trailing_pct", 5.0), "價格 從高點回落 5%")
+        self.assertEqual(describe_condition("trailing", 3.0, lambda p: f"$ {p:.2f}"),
+                         "價格 從高點回落 $ 3.00")
+
+
+class TestIndicatorEngine(unittest.TestCase):
+    """測試共用指標狀態"""
+
+    def test_updates_once_per_cycle(self):
+        """測試同一週期多次讀取只更新一次"""
+        engine = IndicatorEngine()
+        for price in (1.0, 2.0, 3.0):
+            with engine.cycle({"AAPL": price}):
+                first = engine.read("AAPL", "sma(2)")
+                self.assertEqual(engine.read("AAPL", "sma(2)"), first)
+        self.assertEqual(first, (1.5, 2.5))
+        self.assertEqual(len(engine), 1)
+
+    def test_missing_price_skips_sample(self):
+        """測試本週期沒有價格時不更新"""
+        engine = IndicatorEngine()
+        with engine.cycle({"AAPL": 1.0}):
+            engine.read("AAPL", "price")
+        with engine.cycle({}):
+            self.assertEqual(engine.read("AAPL", "price"), (None, None))
+        with engine.cycle({"AAPL": 2.0}):
+            self.assertEqual(engine.read("AAPL", "price"), (1.0, 2.0))
+
+    def test_prunes_idle_states(self):
+        """測試釋放長時間未讀取的狀態"""
+        engine = IndicatorEngine(idle_cycles=1)
+        with engine.cycle({"AAPL": 1.0}):
+            engine.read("AAPL", "sma(5)")
+        for _ in range(100):
+            with engine.cycle({}):
+                pass
+        self.assertEqual(len(engine), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
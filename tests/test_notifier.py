@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""測試 notifier.py 模組"""
+import asyncio
+import time
+import unittest
+
+from telegram.error import RetryAfter, TimedOut
+
+from src.notifier import PRIORITY_HIGH, NotificationQueue, TokenBucket
+
+
+class FakeClock:
+    """可手動推進的時鐘"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket(unittest.TestCase):
+    """測試預約式權杖桶"""
+
+    def test_reserve_and_refill(self):
+        """測試爆量後依速率排隊，經過時間後補充"""
+        clock = FakeClock()
+        bucket = TokenBucket(10, capacity=2, clock=clock)
+        self.assertEqual([bucket.reserve() for _ in range(4)], [0.0, 0.0, 0.1, 0.2])
+
+        clock.now = 1.0
+        self.assertEqual(bucket.reserve(), 0.0)
+
+    def test_pause(self):
+        """測試暫停後的預約至少等待暫停時間"""
+        clock = FakeClock()
+        bucket = TokenBucket(10, clock=clock)
+        bucket.pause(3)
+        self.assertAlmostEqual(bucket.reserve(), 3.1)
+
+
+class TestNotificationQueue(unittest.TestCase):
+    """測試通知佇列的速率限制、優先順序與重試"""
+
+    def _run(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def test_chat_pacing_and_stats(self):
+        """測試同一聊天保持間隔、不同聊天同時發送，並記錄延遲"""
+        sent = []
+
+        async def send(chat_id, text, reply_markup=None):
+            sent.append((chat_id, text, time.monotonic()))
+
+        async def scenario():
+            queue = NotificationQueue(send, chat_interval=0.2)
+            queue.start()
+            futures = [queue.enqueue(1, "a"), queue.enqueue(1, "b"), queue.enqueue(2, "c")]
+            results = await asyncio.gather(*futures)
+            stats = queue.stats()
+            await queue.close()
+            return results, stats
+
+        results, stats = self._run(scenario())
+        self.assertEqual(results, [True, True, True])
+        self.assertEqual([text for chat_id, text, _ in sent if chat_id == 1], ["a", "b"])
+        times = {text: at for _, text, at in sent}
+        self.assertGreaterEqual(times["b"] - times["a"], 0.18)
+        self.assertLess(times["c"] - times["a"], 0.1)
+        self.assertEqual((stats["depth"], stats["sent"], stats["failed"]), (0, 3, 0))
+        self.assertGreater(stats["latency_p95"], 0.15)
+
+    def test_priority(self):
+        """測試積壓時高優先順序的訊息先送"""
+        sent = []
+
+        async def send(chat_id, text, reply_markup=None):
+            sent.append(text)
+
+        async def scenario():
+            queue = NotificationQueue(send, workers=1, chat_interval=0)
+            futures = [queue.enqueue(i, f"normal{i}") for i in range(3)]
+            futures.append(queue.enqueue(9, "stop", priority=PRIORITY_HIGH))
+            queue.start()
+            await asyncio.gather(*futures)
+            await queue.close()
+
+        self._run(scenario())
+        self.assertEqual(sent, ["stop", "normal0", "normal1", "normal2"])
+
+    def test_retry_after(self):
+        """測試 RetryAfter 時暫停後重試，其他錯誤重試次數用盡後失敗"""
+        calls = []
+
+        async def send(chat_id, text, reply_markup=None):
+            calls.append((chat_id, time.monotonic()))
+            if chat_id == 1 and len(calls) == 1:
+                raise RetryAfter(0.3)
+            if chat_id == 2:
+                raise TimedOut()
+
+        async def scenario():
+            queue = NotificationQueue(send, max_retries=1, chat_interval=0)
+            queue.start()
+            ok = await queue.enqueue(1, "a")
+            failed = await queue.enqueue(2, "b")
+            stats = queue.stats()
+            await queue.close()
+            return ok, failed, stats
+
+        ok, failed, stats = self._run(scenario())
+        self.assertTrue(ok)
+        self.assertFalse(failed)
+        self.assertGreaterEqual(calls[1][1] - calls[0][1], 0.28)
+        self.assertEqual([chat_id for chat_id, _ in calls], [1, 1, 2, 2])
+        self.assertEqual((stats["sent"], stats["failed"], stats["retried"]), (1, 1, 2))
+
+    def test_close_fails_pending(self):
+        """測試關閉時尚未發送的通知返回 False"""
+        async def send(chat_id, text, reply_markup=None):
+            await asyncio.sleep(10)
+
+        async def scenario():
+            queue = NotificationQueue(send, workers=1)
+            queue.start()
+            futures = [queue.enqueue(1, "a"), queue.enqueue(2, "b")]
+            await asyncio.sleep(0.05)
+            await queue.close()
+            return [future.result() for future in futures]
+
+        self.assertEqual(self._run(scenario()), [False, False])
+
+
+if __name__ == "__main__":
+    unittest.main()
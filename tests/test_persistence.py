@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""測試 persistence.py 模組"""
+import threading
+import time
+import unittest
+
+from src.persistence import BackgroundWriter
+
+
+class TestBackgroundWriter(unittest.TestCase):
+    """測試背景寫入器"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.writes = []
+        self.fail = False
+        self.write_event = threading.Event()
+
+    def _write(self):
+        """模擬寫入"""
+        self.writes.append(time.monotonic())
+        self.write_event.set()
+        return not self.fail
+
+    def test_coalesce_burst(self):
+        """測試短時間內的多次異動合併為一次寫入"""
+        writer = BackgroundWriter(self._write, latency=0.2)
+        try:
+            for _ in range(100):
+                writer.mark_dirty()
+            self.assertTrue(writer.dirty)
+            self.assertTrue(self.write_event.wait(2.0))
+            time.sleep(0.05)
+            self.assertEqual(len(self.writes), 1)
+            self.assertFalse(writer.dirty)
+        finally:
+            writer.close()
+
+    def test_mark_dirty_does_not_block(self):
+        """測試異動端不會等待寫入"""
+        def slow_write():
+            time.sleep(0.3)
+            return True
+
+        writer = BackgroundWriter(slow_write, latency=0.0)
+        try:
+            writer.mark_dirty()
+            time.sleep(0.05)  # 寫入線程此時正在寫入
+            start = time.perf_counter()
+            writer.mark_dirty()
+            self.assertLess(time.perf_counter() - start, 0.05)
+        finally:
+            writer.close()
+
+    def test_flush_writes_immediately(self):
+        """測試 flush 不等待合併窗口"""
+        writer = BackgroundWriter(self._write, latency=30.0)
+        try:
+            writer.mark_dirty()
+            start = time.monotonic()
+            self.assertTrue(writer.flush(timeout=2.0))
+            self.assertLess(time.monotonic() - start, 2.0)
+            self.assertEqual(len(self.writes), 1)
+            # 沒有新異動時 flush 不會寫入
+            self.assertTrue(writer.flush())
+            self.assertEqual(len(self.writes), 1)
+        finally:
+            writer.close()
+
+    def test_flush_reports_failure(self):
+        """測試寫入失敗時 flush 返回 False 並保留髒標記"""
+        self.fail = True
+        writer = BackgroundWriter(self._write, latency=30.0)
+        try:
+            writer.mark_dirty()
+            self.assertFalse(writer.flush(timeout=2.0))
+            self.assertTrue(writer.dirty)
+            self.assertGreaterEqual(writer.failure_count, 1)
+
+            self.fail = False
+            self.assertTrue(writer.flush(timeout=2.0))
+            self.assertFalse(writer.dirty)
+        finally:
+            writer.close()
+
+    def test_close_writes_pending(self):
+        """測試關閉時寫入剩餘異動"""
+        writer = BackgroundWriter(self._write, latency=30.0)
+        writer.mark_dirty()
+        self.assertTrue(writer.close(timeout=2.0))
+        self.assertEqual(len(self.writes), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
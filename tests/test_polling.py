@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""測試 polling.py 模組"""
+import unittest
+
+from src.alert_record import AlertRecord
+from src.polling import AdaptivePoller, alert_distance
+
+
+class TestAlertDistance(unittest.TestCase):
+    """測試價格到門檻的距離"""
+
+    def test_distances(self):
+        """測試門檻、區間、移動停損與指標條件"""
+        self.assertEqual(alert_distance(AlertRecord("a", 1, "X", 110.0, "above"), 100.0), 10.0)
+        band = AlertRecord("b", 1, "X", 90.0, "between", upper_price=105.0)
+        self.assertEqual(alert_distance(band, 100.0), 5.0)
+        trailing = AlertRecord("c", 1, "X", 10.0, "trailing_pct", peak_price=110.0)
+        self.assertAlmostEqual(alert_distance(trailing, 100.0), 1.0)
+        self.assertEqual(alert_distance(trailing.replace(peak_price=None), 100.0), 0.0)
+        self.assertIsNone(alert_distance(AlertRecord("d", 1, "X", 70.0, "rsi(14) above"), 100.0))
+
+
+class TestAdaptivePoller(unittest.TestCase):
+    """測試自適應查詢排程"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.poller = AdaptivePoller(min_interval=60, max_interval=1800, base_interval=300)
+
+    def test_interval_follows_distance(self):
+        """測試離門檻越近間隔越短，並限制在最短與最長間隔之間"""
+        for symbol in ("NEAR", "FAR", "EDGE"):
+            self.poller.observe(symbol, 100.0, 0.01, 0)
+        self.assertEqual(self.poller.observe("NEAR", 101.0, 0.005, 60), 60)
+        self.assertEqual(self.poller.observe("FAR", 101.0, 0.30, 60), 1800)
+        middle = self.poller.observe("EDGE", 101.0, 0.03, 60)
+        self.assertTrue(60 < middle < 1800)
+
+    def test_fallback_to_base_interval(self):
+        """測試沒有波動度資料、引用指標或查詢失敗時使用固定間隔"""
+        self.assertEqual(self.poller.observe("AAPL", 100.0, 0.01, 0), 300)
+        self.assertEqual(self.poller.observe("AAPL", 101.0, None, 60), 300)
+        self.poller.failed("MSFT", 0)
+        self.assertEqual(self.poller.next_due("MSFT"), 300)
+
+    def test_due(self):
+        """測試到期順序、新股票立即查詢、重新排程與移除的股票"""
+        self.assertEqual(sorted(self.poller.due(["A", "B"], 0)), ["A", "B"])
+        self.poller.failed("A", 0)
+        self.poller.failed("B", 100)
+        self.poller.failed("C", 0)
+        self.assertEqual(self.poller.due(["A", "B"], 299), [])
+        self.assertEqual(self.poller.due(["A", "B"], 300), ["A"])
+
+        # 重新排程後舊的堆積項目被略過；不再監控的股票被清除
+        self.poller.failed("B", 200)
+        self.assertEqual(self.poller.due(["A", "B"], 450), ["A"])
+        self.assertIsNone(self.poller.next_due("C"))
+        self.assertEqual(self.poller.due(["B"], 500), ["B"])
+
+    def test_restore_spreads_overdue_symbols(self):
+        """測試恢復檢查點時已到期的股票依到期順序分散在一個固定間隔內"""
+        self.poller.observe("A", 100.0, 0.05, -50)
+        self.poller.failed("B", -100)
+        self.poller.failed("C", 0)
+        self.poller.failed("D", 10_000)
+        state = self.poller.checkpoint_state()
+
+        restored = AdaptivePoller(min_interval=60, max_interval=1800, base_interval=300)
+        restored.restore_checkpoint(state, now=1000)
+
+        self.assertEqual(restored.next_due("B"), 1000)
+        self.assertEqual(restored.next_due("A"), 1100)
+        self.assertEqual(restored.next_due("C"), 1200)
+        self.assertEqual(restored.next_due("D"), 10_300)
+        self.assertEqual(restored.due(["A", "B", "C", "D"], 1000), ["B"])
+        self.assertEqual(restored.checkpoint_state()["volatility"], state["volatility"])
+
+    def test_invalid_intervals(self):
+        """測試間隔設定驗證"""
+        with self.assertRaises(ValueError):
+            AdaptivePoller(min_interval=600, max_interval=1800, base_interval=300)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""測試 ratelimit.py 模組"""
+import unittest
+
+from src.ratelimit import CommandRateLimiter
+
+
+class FakeClock:
+    """可手動推進的時鐘"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestCommandRateLimiter(unittest.TestCase):
+    """測試用戶與共用額度的限流"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.clock = FakeClock()
+
+    def test_user_budget(self):
+        """測試用戶用完額度後需要等待，被拒絕時不扣額度，經過時間後補充"""
+        limiter = CommandRateLimiter(6, shared_per_minute=None, clock=self.clock)
+        self.assertEqual(limiter.acquire(1, cost=5), 0.0)
+        self.assertEqual(limiter.acquire(1), 0.0)
+        self.assertAlmostEqual(limiter.acquire(1), 10.0)
+        self.assertAlmostEqual(limiter.acquire(1, cost=3), 30.0)
+        self.assertEqual(limiter.acquire(2), 0.0)  # 其他用戶不受影響
+
+        self.clock.now = 10.0
+        self.assertEqual(limiter.acquire(1), 0.0)
+        # 超過爆量上限的查詢等額度補滿即可執行，但全數扣除，之後要等欠下的額度補回
+        self.clock.now = 70.0
+        self.assertEqual(limiter.acquire(1, cost=50), 0.0)
+        self.assertAlmostEqual(limiter.acquire(1), 450.0)
+        self.clock.now = 520.0
+        self.assertEqual(limiter.acquire(1), 0.0)
+        self.assertEqual(limiter.stats(), {"users": 2, "allowed": 6, "limited": 3, "evicted": 0})
+
+    def test_large_command_does_not_block_other_users(self):
+        """測試大量查詢只讓該用戶欠額度，其他用戶不受影響；超過共用額度上限的查詢被拒絕"""
+        limiter = CommandRateLimiter(10, shared_per_minute=30, clock=self.clock)
+        self.assertEqual(limiter.max_cost, 30)
+        self.assertEqual(limiter.acquire(1, cost=25), 0.0)
+        self.assertEqual(limiter.acquire(2), 0.0)
+        # 用戶 1 欠 15 次，以每分鐘 10 次補回到 1 次需要 96 秒
+        self.assertAlmostEqual(limiter.acquire(1), 96.0)
+        with self.assertRaises(ValueError):
+            limiter.acquire(2, cost=31)
+        self.assertIsNone(CommandRateLimiter(10, shared_per_minute=None).max_cost)
+
+    def test_shared_budget(self):
+        """測試所有用戶合計的額度用完時，額度還夠的用戶也要等待"""
+        limiter = CommandRateLimiter(5, shared_per_minute=8, clock=self.clock)
+        self.assertEqual(limiter.acquire(1, cost=5), 0.0)
+        self.assertEqual(limiter.acquire(2, cost=3), 0.0)
+        self.assertAlmostEqual(limiter.acquire(3), 7.5)
+        self.clock.now = 7.5
+        self.assertEqual(limiter.acquire(3), 0.0)
+
+    def test_lru_eviction(self):
+        """測試保留的用戶數有上限，淘汰最久沒有使用的用戶"""
+        limiter = CommandRateLimiter(1, shared_per_minute=None, max_users=2, clock=self.clock)
+        limiter.acquire(1)
+        limiter.acquire(2)
+        self.assertGreater(limiter.acquire(1), 0)  # 用戶 1 最近使用
+        limiter.acquire(3)  # 淘汰用戶 2
+        self.assertEqual(limiter.stats()["users"], 2)
+        self.assertEqual(limiter.stats()["evicted"], 1)
+        self.assertGreater(limiter.acquire(1), 0)
+        self.assertEqual(limiter.acquire(2), 0.0)  # 重新從滿額度開始
+
+    def test_invalid_limits(self):
+        """測試無效的設定"""
+        with self.assertRaises(ValueError):
+            CommandRateLimiter(0)
+        with self.assertRaises(ValueError):
+            CommandRateLimiter(5, shared_per_minute=0)
+        with self.assertRaises(ValueError):
+            CommandRateLimiter(5, max_users=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
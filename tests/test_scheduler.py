@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""測試 scheduler.py 模組"""
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import Future
+
+from src.alert_manager import AlertManager
+from src.checkpoint import CheckpointStore
+from src.polling import AdaptivePoller
+from src.scheduler import AsyncStockMonitorScheduler, StockMonitorScheduler
+
+
+class FakeFetcher:
+    """依請求順序、以設定的延遲逐一產出價格的假查詢器"""
+
+    def __init__(self, quotes):
+        self.quotes = {symbol: (price, delay) for symbol, price, delay in quotes}
+        self.requested = []  # 每個週期實際查詢的股票（依查詢順序）
+
+    def iter_prices(self, symbols):
+        requested = []
+        self.requested.append(requested)
+        for symbol in symbols:
+            requested.append(symbol)
+            price, delay = self.quotes.get(symbol, (None, 0))
+            time.sleep(delay)
+            yield symbol, {"price": price, "currency": "USD", "success": price is not None}
+
+
+class FakeHandler:
+    """立即送達並記錄提交時間的假 Bot"""
+
+    def __init__(self):
+        self.notifications = None
+        self.submitted = []
+
+    def submit_alerts(self, triggered_alerts):
+        self.submitted.append((time.monotonic(), [item["alert"].symbol for item in triggered_alerts]))
+        future = Future()
+        future.set_result([True] * len(triggered_alerts))
+        return future
+
+
+class FakeAsyncHandler:
+    """在事件迴圈中送達並記錄送達時間的假 Bot（asyncio 模式）"""
+
+    def __init__(self):
+        self.notifications = None
+        self.sent = []
+        self.hooks = []
+        self.threads = set()
+
+    def add_lifecycle_hooks(self, on_started, on_stopped):
+        self.hooks.append((on_started, on_stopped))
+
+    async def send_alerts(self, triggered_alerts):
+        self.threads.add(threading.current_thread().name)
+        self.sent.append((time.monotonic(), [item["alert"].symbol for item in triggered_alerts]))
+        return [True] * len(triggered_alerts)
+
+
+class TestStreamingCheck(unittest.TestCase):
+    """測試查詢、評估與通知的串流管線"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.manager = AlertManager(os.path.join(self.temp_dir, "watchlist.json"))
+        self.handler = FakeHandler()
+
+    def tearDown(self):
+        """測試後清理"""
+        self.manager.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _scheduler(self, quotes, **kwargs):
+        return StockMonitorScheduler(self.manager, FakeFetcher(quotes), self.handler, **kwargs)
+
+    def test_notifies_before_slow_symbols(self):
+        """測試先查到的股票不必等待最慢的查詢就發送通知"""
+        self.manager.add_alert(1, "FAST", 100, "above")
+        self.manager.add_alert(2, "SLOW", 100, "above")
+        self.manager.add_alert(3, "BAD", 100, "above")
+        scheduler = self._scheduler([("FAST", 110.0, 0), ("SLOW", 120.0, 0.5)])
+
+        start = time.monotonic()
+        with self.assertLogs("src.scheduler", level="INFO") as logs:
+            scheduler.check_all_stocks()
+
+        (fast_at, fast), (slow_at, slow) = self.handler.submitted
+        self.assertEqual((fast, slow), (["FAST"], ["SLOW"]))
+        self.assertLess(fast_at - start, 0.3)
+        self.assertGreaterEqual(slow_at - start, 0.5)
+        self.assertTrue(any("成功查詢 2/3" in line for line in logs.output))
+        self.assertTrue(any("通知時間: 2 則" in line for line in logs.output))
+        self.assertTrue(self.manager.list_alerts(2)[0].notified)
+
+    def test_indicators_advance_once_per_cycle(self):
+        """測試逐批評估時指標每個週期只更新一次"""
+        alert = self.manager.add_alert(1, "AAA", 0, "change(1) above")
+        # BBB 的訂閱較多而先查詢，AAA 在同一週期的第二批評估
+        self.manager.add_alert(1, "BBB", 1000, "above")
+        self.manager.add_alert(2, "BBB", 1000, "above")
+        for price in (100.0, 100.0, 103.0):
+            self._scheduler([("BBB", 1.0, 0), ("AAA", price, 0.05)]).check_all_stocks()
+        self.assertTrue(self.manager.get_alert_by_id(alert.id).notified)
+
+    def test_adaptive_polling_skips_symbols_not_due(self):
+        """測試自適應查詢只查詢到期的股票，查詢後重新排程"""
+        self.manager.add_alert(1, "AAA", 110, "above")
+        self.manager.add_alert(1, "BBB", 90, "below")
+        fetcher = FakeFetcher([("AAA", 100.0, 0)])
+        poller = AdaptivePoller(min_interval=60, max_interval=1800, base_interval=300)
+        scheduler = StockMonitorScheduler(self.manager, fetcher, self.handler, poller=poller)
+
+        scheduler.check_all_stocks()
+        scheduler.check_all_stocks()
+        self.assertEqual(fetcher.requested, [["AAA", "BBB"]])
+        # 查到價格的股票依距離排程，查詢失敗的股票以固定間隔重試
+        self.assertIsNotNone(poller.next_due("AAA"))
+        self.assertAlmostEqual(poller.next_due("BBB") - time.time(), 300, delta=5)
+
+    def test_checkpoint_warm_restart(self):
+        """測試重啟後由檢查點恢復報價時間與查詢排程，不必重新查詢所有股票"""
+        self.manager.add_alert(1, "AAA", 110, "above")
+        self.manager.add_alert(1, "BBB", 90, "below")
+        path = os.path.join(self.temp_dir, "checkpoint.json")
+
+        def build(fetcher):
+            poller = AdaptivePoller(min_interval=60, max_interval=1800, base_interval=300)
+            checkpoint = CheckpointStore(path)
+            scheduler = StockMonitorScheduler(
+                self.manager, fetcher, self.handler, poller=poller, checkpoint=checkpoint
+            )
+            checkpoint.register("scheduler", scheduler)
+            return scheduler, checkpoint
+
+        scheduler, _ = build(FakeFetcher([("AAA", 100.0, 0)]))
+        scheduler.check_all_stocks()  # 週期結束時寫入檢查點
+        self.assertTrue(os.path.exists(path))
+
+        fetcher = FakeFetcher([("AAA", 100.0, 0)])
+        restarted, checkpoint = build(fetcher)
+        self.assertTrue(checkpoint.restore())
+        self.assertEqual(restarted._quoted_at, scheduler._quoted_at)
+        self.assertEqual(restarted._last_prices, {"AAA": 100.0})
+        restarted.check_all_stocks()
+        self.assertEqual([symbol for cycle in fetcher.requested for symbol in cycle], [])
+
+    def test_budget_prioritizes_and_carries_over(self):
+        """測試預算用完時先查詢接近門檻的股票，剩下的延到下個週期"""
+        self.manager.add_alert(1, "FAR", 200, "above")
+        self.manager.add_alert(1, "MID", 120, "above")
+        self.manager.add_alert(1, "NEAR", 101, "above")
+        fetcher = FakeFetcher([("FAR", 100.0, 0), ("MID", 100.0, 0), ("NEAR", 100.0, 0)])
+        scheduler = StockMonitorScheduler(
+            self.manager, fetcher, self.handler, cycle_max_requests=3
+        )
+        scheduler.check_all_stocks()  # 取得第一次報價
+
+        scheduler.budget.requests = 1
+        with self.assertLogs("src.scheduler", level="INFO") as logs:
+            scheduler.check_all_stocks()
+        self.assertEqual(fetcher.requested[-1], ["NEAR"])
+        self.assertTrue(any("涵蓋率: 1/3" in line for line in logs.output))
+        self.assertTrue(any("2 個股票延到下個週期" in line for line in logs.output))
+
+        # 上個週期延後的股票優先於較接近門檻（但未達即將觸發）、剛查詢過的 NEAR
+        scheduler.budget.requests = 2
+        scheduler.check_all_stocks()
+        self.assertEqual(fetcher.requested[-1], ["MID", "FAR"])
+
+    def test_time_budget(self):
+        """測試時間預算用完後不再送出查詢"""
+        for symbol in ("AAA", "BBB", "CCC"):
+            self.manager.add_alert(1, symbol, 1000, "above")
+        scheduler = self._scheduler(
+            [("AAA", 1.0, 0.2), ("BBB", 1.0, 0.2), ("CCC", 1.0, 0.2)], cycle_budget_seconds=0.1
+        )
+        scheduler.check_all_stocks()
+        self.assertEqual(scheduler.stock_fetcher.requested, [["AAA"]])
+        self.assertEqual(scheduler.budget.exhausted, "time")
+
+
+class TestAsyncScheduler(unittest.TestCase):
+    """測試在事件迴圈上執行的排程器"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.manager = AlertManager(os.path.join(self.temp_dir, "watchlist.json"))
+        self.handler = FakeAsyncHandler()
+
+    def tearDown(self):
+        """測試後清理"""
+        self.manager.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _run(self, scheduler, body):
+        """在事件迴圈中啟動排程器、執行測試內容後關閉"""
+        async def main():
+            scheduler.start()
+            (on_started, on_stopped), = self.handler.hooks
+            await on_started()
+            try:
+                return await body()
+            finally:
+                await on_stopped()
+        return asyncio.run(main())
+
+    def test_cycle_runs_on_loop(self):
+        """測試查詢與評估在執行緒池執行，通知在事件迴圈送達且不必等待最慢的查詢"""
+        self.manager.add_alert(1, "FAST", 100, "above")
+        self.manager.add_alert(2, "SLOW", 100, "above")
+        fetcher = FakeFetcher([("FAST", 110.0, 0), ("SLOW", 120.0, 0.5)])
+        scheduler = AsyncStockMonitorScheduler(self.manager, fetcher, self.handler)
+
+        async def body():
+            start = time.monotonic()
+            with self.assertLogs("src.scheduler", level="INFO") as logs:
+                await scheduler.check_all_stocks_async()
+            return start, logs.output
+
+        start, output = self._run(scheduler, body)
+        (fast_at, fast), (slow_at, slow) = self.handler.sent
+        self.assertEqual((fast, slow), (["FAST"], ["SLOW"]))
+        self.assertLess(fast_at - start, 0.3)
+        self.assertGreaterEqual(slow_at - start, 0.5)
+        self.assertEqual(self.handler.threads, {threading.main_thread().name})
+        self.assertTrue(any("成功查詢 2/2" in line for line in output))
+        self.assertTrue(any("通知時間: 2 則" in line for line in output))
+        self.assertTrue(self.manager.list_alerts(2)[0].notified)
+
+    def test_indicators_advance_once_per_cycle(self):
+        """測試協程版本逐批評估時指標每個週期只更新一次"""
+        alert = self.manager.add_alert(1, "AAA", 0, "change(1) above")
+        self.manager.add_alert(1, "BBB", 1000, "above")
+        self.manager.add_alert(2, "BBB", 1000, "above")
+
+        async def body():
+            for price in (100.0, 100.0, 103.0):
+                scheduler.stock_fetcher = FakeFetcher([("BBB", 1.0, 0), ("AAA", price, 0.05)])
+                await scheduler.check_all_stocks_async()
+
+        scheduler = AsyncStockMonitorScheduler(self.manager, FakeFetcher([]), self.handler)
+        self._run(scheduler, body)
+        self.assertTrue(self.manager.get_alert_by_id(alert.id).notified)
+
+    def test_periodic_run_and_stop(self):
+        """測試依間隔執行週期，stop 後在 Bot 關閉時結束"""
+        self.manager.add_alert(1, "AAA", 100, "above")
+        fetcher = FakeFetcher([("AAA", 90.0, 0)])
+        poller = AdaptivePoller(min_interval=0.05, max_interval=1, base_interval=0.05)
+        scheduler = AsyncStockMonitorScheduler(self.manager, fetcher, self.handler, poller=poller)
+
+        async def body():
+            await asyncio.sleep(0)
+            self.assertIsNotNone(scheduler.get_next_run_time())
+            await asyncio.sleep(0.3)
+            scheduler.stop()
+            await asyncio.sleep(0)
+            return len(fetcher.requested)
+
+        cycles = self._run(scheduler, body)
+        self.assertGreaterEqual(cycles, 2)
+        self.assertEqual(len(fetcher.requested), cycles)
+        self.assertIsNone(scheduler.get_next_run_time())
+
+
+if __name__ == "__main__":
+    unittest.main()
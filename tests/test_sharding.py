@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""測試 sharding.py 模組"""
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from src.alert_manager import AlertManager, create_alert_manager
+from src.sharding import PriceBoard, ShardedAlertManager, shard_of
+
+
+class TestShardHelpers(unittest.TestCase):
+    """測試分片規則與價格看板"""
+
+    def test_shard_of_is_stable(self):
+        """測試分片編號與 PYTHONHASHSEED 無關且落在範圍內"""
+        self.assertEqual(shard_of("AAPL", 4), shard_of("AAPL", 4))
+        self.assertEqual(shard_of("AAPL", 1), 0)
+        self.assertEqual({shard_of(f"SYM{i}", 4) for i in range(100)}, {0, 1, 2, 3})
+
+    def test_price_board_grows(self):
+        """測試槽位固定、容量不足時重新配置"""
+        board = PriceBoard(capacity=2)
+        try:
+            board.publish({"A": 1.0, "B": 2.0})
+            name = board.name
+            board.publish({"C": 3.0, "A": 4.0})
+            self.assertEqual(board.symbols, ["A", "B", "C"])
+            self.assertNotEqual(board.name, name)
+        finally:
+            board.close()
+
+
+class TestShardedAlertManager(unittest.TestCase):
+    """測試多程序分片評估"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.manager = ShardedAlertManager(os.path.join(self.temp_dir, "sharded.json"), 2)
+
+    def tearDown(self):
+        """測試後清理"""
+        self.manager.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _prices(self, prices):
+        return {
+            symbol: {"price": price, "currency": "USD", "success": True}
+            for symbol, price in prices.items()
+        }
+
+    def test_matches_single_process(self):
+        """測試觸發結果與單一程序相同，且聊天指令的異動會同步到分片"""
+        local = AlertManager(os.path.join(self.temp_dir, "local.json"))
+        rng = random.Random(11)
+        symbols = [f"S{i}" for i in range(12)]
+        conditions = ["above", "below", "between", "trailing", "sma(3) above", "cross_below ema(4)"]
+        items = []
+        for i in range(120):
+            item = dict(user_id=i % 5, symbol=rng.choice(symbols),
+                        target_price=rng.uniform(85, 115), condition=rng.choice(conditions))
+            if item["condition"] == "between":
+                item["upper_price"] = item["target_price"] + 5
+            items.append(item)
+        local.add_alerts(items)
+        self.manager.add_alerts(items)
+
+        prices = dict.fromkeys(symbols, 100.0)
+        for cycle in range(40):
+            for symbol in symbols:
+                prices[symbol] = max(1.0, prices[symbol] + rng.gauss(0, 3))
+            if cycle == 15:
+                for manager in (local, self.manager):
+                    for alert in manager.list_alerts(2)[:6]:
+                        manager.remove_alert(2, alert.id)
+                    manager.add_alert(7, "S1", 100, "above")
+                    manager.clear_alerts_by_symbol(3, "S4")
+
+            expected = sorted(
+                (item["alert"].user_id, item["alert"].symbol, item["alert"].condition,
+                 item["alert"].target_price)
+                for item in local.check_alerts(self._prices(prices))
+            )
+            actual = sorted(
+                (item["alert"].user_id, item["alert"].symbol, item["alert"].condition,
+                 item["alert"].target_price)
+                for item in self.manager.check_alerts(self._prices(prices))
+            )
+            self.assertEqual(actual, expected)
+
+        # 分片回傳的狀態會發布到主程序並儲存
+        self.assertEqual(
+            sorted(alert.notified for alert in self.manager.view().alerts),
+            sorted(alert.notified for alert in local.view().alerts)
+        )
+
+    def test_restarts_failed_worker(self):
+        """測試工作程序異常時重新啟動並送出完整分片"""
+        alert = self.manager.add_alert(1, "AAPL", 150, "above")
+        self.manager.check_alerts(self._prices({"AAPL": 100.0}))
+
+        shard = self.manager._shards[shard_of("AAPL", 2)]
+        shard.process.kill()
+        shard.process.join()
+        self.assertEqual(self.manager.check_alerts(self._prices({"AAPL": 100.0})), [])
+
+        triggered = self.manager.check_alerts(self._prices({"AAPL": 160.0}))
+        self.assertEqual([item["alert"].id for item in triggered], [alert.id])
+        self.assertTrue(self.manager.get_alert_by_id(alert.id).notified)
+
+    def test_create_alert_manager(self):
+        """測試只有 JSON 後端支援分片評估"""
+        with self.assertRaises(ValueError):
+            create_alert_manager(os.path.join(self.temp_dir, "watchlist.db"), eval_workers=2)
+        with self.assertRaises(ValueError):
+            ShardedAlertManager(os.path.join(self.temp_dir, "zero.json"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
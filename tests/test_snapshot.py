@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""測試 snapshot.py 模組"""
+import os
+import tempfile
+import time
+import unittest
+
+from src.alert_manager import AlertManager
+from src.alert_record import AlertRecord
+from src.snapshot import (
+    SnapshotError,
+    WatchlistSnapshot,
+    json_to_snapshot,
+    read_snapshot,
+    snapshot_path_for,
+    snapshot_to_json,
+    write_snapshot,
+)
+from src.utils import load_json
+
+
+class TestSnapshot(unittest.TestCase):
+    """測試二進位快照格式"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.snap_file = os.path.join(self.temp_dir, "watchlist.snap")
+        self.alerts = [
+            AlertRecord("id-1", 123, "AAPL", 150.0, "above"),
+            AlertRecord("id-2", 456, "2330.TW", 600.5, "below", notified=True,
+                        last_notified_at=time.time()),
+            AlertRecord("id-3", 123, "AAPL", 140.0, "below", enabled=False),
+        ]
+
+    def tearDown(self):
+        """測試後清理"""
+        import shutil
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_round_trip(self):
+        """測試寫入後讀回相同內容"""
+        self.assertTrue(write_snapshot(self.snap_file, self.alerts, "2026-01-29T10:00:00"))
+
+        alerts, last_check = read_snapshot(self.snap_file)
+        self.assertEqual(alerts, self.alerts)
+        self.assertEqual(last_check, "2026-01-29T10:00:00")
+        self.assertIsNone(alerts[0].last_notified_at)
+        self.assertFalse(alerts[2].enabled)
+        # 字串表中的代碼會被 intern
+        self.assertIs(alerts[0].symbol, alerts[2].symbol)
+
+    def test_expiry_columns(self):
+        """測試到期、區間上限與最高價欄位寫入與讀回"""
+        alerts = self.alerts + [
+            AlertRecord("id-4", 123, "MSFT", 300.0, "above", expires_at=time.time() + 60),
+            AlertRecord("id-5", 123, "MSFT", 280.0, "below", expire_after=86400.0),
+            AlertRecord("id-6", 123, "MSFT", 280.0, "between", upper_price=300.0),
+            AlertRecord("id-7", 123, "NVDA", 5.0, "trailing_pct", peak_price=120.5),
+        ]
+        write_snapshot(self.snap_file, alerts)
+
+        loaded, _ = read_snapshot(self.snap_file)
+        self.assertEqual(loaded, alerts)
+        self.assertIsNone(loaded[0].expires_at)
+        self.assertEqual(loaded[4].expire_after, 86400.0)
+        self.assertEqual(loaded[5].upper_price, 300.0)
+        self.assertIsNone(loaded[4].upper_price)
+        self.assertEqual(loaded[6].peak_price, 120.5)
+
+    def test_read_old_versions(self):
+        """測試仍可讀取缺少後來新增欄位的舊版快照"""
+        from unittest.mock import patch
+        from src import snapshot
+
+        alerts = self.alerts + [
+            AlertRecord("id-4", 123, "NVDA", 5.0, "trailing_pct", peak_price=120.5)
+        ]
+        for version in (1, 2, 3):
+            with patch.object(snapshot, "SNAPSHOT_VERSION", version), \
+                    patch.object(snapshot, "_COLUMNS", snapshot._COLUMNS_BY_VERSION[version]):
+                write_snapshot(self.snap_file, alerts)
+
+            with WatchlistSnapshot(self.snap_file) as snap:
+                self.assertEqual(snap.version, version)
+                loaded = snap.records()
+                self.assertEqual(snap.record(1), self.alerts[1])
+            self.assertEqual(loaded[:3], self.alerts[:3])
+            self.assertIsNone(loaded[3].peak_price)
+            self.assertIsNone(loaded[1].expires_at)
+            self.assertIsNone(loaded[1].expire_after)
+            self.assertIsNone(loaded[1].upper_price)
+
+    def test_non_ascii_strings(self):
+        """測試字串表中的非 ASCII 字串"""
+        alerts = self.alerts + [AlertRecord("監控-4", 789, "TSMC", 1.0, "above")]
+        write_snapshot(self.snap_file, alerts)
+
+        loaded, _ = read_snapshot(self.snap_file)
+        self.assertEqual(loaded[3].id, "監控-4")
+        self.assertEqual(loaded[0].id, "id-1")
+
+    def test_random_access(self):
+        """測試不需解碼全部即可讀取單筆"""
+        write_snapshot(self.snap_file, self.alerts)
+
+        with WatchlistSnapshot(self.snap_file) as snapshot:
+            self.assertEqual(snapshot.count, 3)
+            self.assertIsNone(snapshot.last_check)
+            self.assertEqual(snapshot.record(1), self.alerts[1])
+            self.assertEqual(list(snapshot.column("user_id")), [123, 456, 123])
+
+    def test_empty_snapshot(self):
+        """測試沒有監控的快照"""
+        write_snapshot(self.snap_file, [])
+        self.assertEqual(read_snapshot(self.snap_file), ([], None))
+
+    def test_corrupted_checksum(self):
+        """測試內容損毀時校驗失敗"""
+        write_snapshot(self.snap_file, self.alerts)
+        with open(self.snap_file, "r+b") as f:
+            f.seek(80)
+            byte = f.read(1)
+            f.seek(80)
+            f.write(bytes([byte[0] ^ 0xFF]))
+
+        with self.assertRaises(SnapshotError):
+            read_snapshot(self.snap_file)
+
+    def test_truncated_and_invalid(self):
+        """測試截斷或非快照檔案"""
+        write_snapshot(self.snap_file, self.alerts)
+        with open(self.snap_file, "r+b") as f:
+            f.truncate(os.path.getsize(self.snap_file) - 4)
+        with self.assertRaises(SnapshotError):
+            read_snapshot(self.snap_file)
+
+        with open(self.snap_file, "wb") as f:
+            f.write(b"{\"alerts\": []}" + b"\0" * 64)
+        with self.assertRaises(SnapshotError):
+            read_snapshot(self.snap_file)
+
+    def test_snapshot_path_for(self):
+        """測試快照路徑推導"""
+        self.assertEqual(snapshot_path_for("config/watchlist.json"), "config/watchlist.snap")
+        self.assertEqual(snapshot_path_for("config/watchlist.snap"), "config/watchlist.snap")
+
+    def test_conversion_tools(self):
+        """測試 JSON 與快照互轉"""
+        json_file = os.path.join(self.temp_dir, "watchlist.json")
+        back_file = os.path.join(self.temp_dir, "back.json")
+
+        manager = AlertManager(json_file)
+        manager.add_alert(123, "AAPL", 150.0, "above")
+        manager.add_alert(456, "MSFT", 300.0, "below")
+
+        self.assertEqual(json_to_snapshot(json_file, self.snap_file), 2)
+        self.assertEqual(snapshot_to_json(self.snap_file, back_file), 2)
+        self.assertEqual(
+            load_json(back_file)["alerts"],
+            load_json(json_file)["alerts"]
+        )
+
+
+class TestAlertManagerSnapshot(unittest.TestCase):
+    """測試 AlertManager 的快照模式"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.json_file = os.path.join(self.temp_dir, "watchlist.json")
+        self.snap_file = os.path.join(self.temp_dir, "watchlist.snap")
+
+    def tearDown(self):
+        """測試後清理"""
+        import shutil
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_alongside_writes_both(self):
+        """測試 alongside 模式同時寫入 JSON 與快照"""
+        manager = AlertManager(self.json_file, snapshot_mode="alongside")
+        alert = manager.add_alert(123, "AAPL", 150.0, "above")
+
+        self.assertTrue(os.path.exists(self.json_file))
+        self.assertTrue(os.path.exists(self.snap_file))
+
+        reloaded = AlertManager(self.json_file, snapshot_mode="alongside")
+        self.assertEqual(reloaded.get_alert_by_id(alert.id), alert)
+
+    def test_only_mode_skips_json(self):
+        """測試 only 模式只寫入快照"""
+        manager = AlertManager(self.json_file, snapshot_mode="only")
+        manager.add_alert(123, "AAPL", 150.0, "above")
+
+        self.assertFalse(os.path.exists(self.json_file))
+        reloaded = AlertManager(self.json_file, snapshot_mode="only")
+        self.assertEqual(len(reloaded.list_alerts(123)), 1)
+
+    def test_newer_json_wins(self):
+        """測試 JSON 較新時改用 JSON 載入"""
+        manager = AlertManager(self.json_file, snapshot_mode="alongside")
+        manager.add_alert(123, "AAPL", 150.0, "above")
+
+        # JSON 被另一個只寫 JSON 的實例更新
+        json_only = AlertManager(self.json_file)
+        json_only.add_alert(123, "MSFT", 300.0, "above")
+        future = time.time() + 10
+        os.utime(self.json_file, (future, future))
+
+        reloaded = AlertManager(self.json_file, snapshot_mode="alongside")
+        self.assertEqual(len(reloaded.list_alerts(123)), 2)
+
+    def test_corrupted_snapshot_falls_back_to_json(self):
+        """測試快照損毀時改用 JSON"""
+        manager = AlertManager(self.json_file, snapshot_mode="alongside")
+        manager.add_alert(123, "AAPL", 150.0, "above")
+        with open(self.snap_file, "wb") as f:
+            f.write(b"garbage")
+        os.utime(self.json_file, (0, 0))
+
+        reloaded = AlertManager(self.json_file, snapshot_mode="alongside")
+        self.assertEqual(len(reloaded.list_alerts(123)), 1)
+
+    def test_invalid_mode(self):
+        """測試無效的快照模式"""
+        with self.assertRaises(ValueError):
+            AlertManager(self.json_file, snapshot_mode="sometimes")
+
+
+if __name__ == "__main__":
+    unittest.main()
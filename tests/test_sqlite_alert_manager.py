@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""測試 sqlite_alert_manager.py 模組"""
+import os
+import tempfile
+import time
+import threading
+import unittest
+from unittest.mock import patch
+
+from src.alert_manager import AlertManager, create_alert_manager
+from src.sqlite_alert_manager import SQLiteAlertManager, migrate_json_to_sqlite
+
+
+class TestSQLiteAlertManager(unittest.TestCase):
+    """測試 SQLite 後端的監控管理功能"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.test_file = os.path.join(self.temp_dir, "test_watchlist.db")
+        self.manager = SQLiteAlertManager(self.test_file)
+
+    def tearDown(self):
+        """測試後清理"""
+        import shutil
+        self.manager.close()
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_wal_mode_and_indexes(self):
+        """測試 WAL 模式與索引"""
+        conn = self.manager._connection()
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+        indexes = {row["name"] for row in conn.execute("PRAGMA index_list(alerts)")}
+        self.assertIn("idx_alerts_symbol_enabled", indexes)
+        self.assertIn("idx_alerts_user_id", indexes)
+
+    def test_add_and_list_alerts(self):
+        """測試新增與列出監控"""
+        alert = self.manager.add_alert(123, "aapl", 150.0, "above")
+        self.manager.add_alert(123, "GOOGL", 140.0, "below")
+        self.manager.add_alert(456, "MSFT", 300.0, "above")
+
+        self.assertEqual(alert["symbol"], "AAPL")
+        self.assertFalse(alert["notified"])
+        self.assertTrue(alert["enabled"])
+
+        alerts = self.manager.list_alerts(123)
+        self.assertEqual([a["symbol"] for a in alerts], ["AAPL", "GOOGL"])
+        self.assertEqual(self.manager.get_alert_by_id(alert["id"]), alert)
+
+    def test_add_duplicate_alert(self):
+        """測試重複監控會被忽略"""
+        self.assertIsNotNone(self.manager.add_alert(123, "AAPL", 150.0, "above"))
+        self.assertIsNone(self.manager.add_alert(123, "AAPL", 150.001, "above"))
+        self.assertEqual(len(self.manager.list_alerts(123)), 1)
+
+    def test_add_alerts_batch(self):
+        """測試批次新增：整批去重（含批次內重複）並只寫入一次"""
+        self.manager.add_alert(123, "AAPL", 150.0, "above")
+
+        results = self.manager.add_alerts([
+            {"user_id": 123, "symbol": "aapl", "target_price": 150.0, "condition": "above"},
+            {"user_id": 123, "symbol": "MSFT", "target_price": 300.0, "condition": "above"},
+            {"user_id": 123, "symbol": "MSFT", "target_price": 300.0, "condition": "above"},
+            {"user_id": 456, "symbol": "MSFT", "target_price": 300.0, "condition": "above"},
+        ])
+
+        self.assertIsNone(results[0])
+        self.assertEqual(results[1]["symbol"], "MSFT")
+        self.assertIsNone(results[2])
+        self.assertEqual(results[3]["user_id"], 456)
+        self.assertEqual(len(self.manager.list_alerts(123)), 2)
+        self.assertEqual(len(self.manager.list_alerts(456)), 1)
+
+    def test_add_alerts_invalid_condition_rejects_batch(self):
+        """測試批次中有無效條件時整批拒絕"""
+        with self.assertRaises(ValueError):
+            self.manager.add_alerts([
+                {"user_id": 123, "symbol": "AAPL", "target_price": 150.0, "condition": "above"},
+                {"user_id": 123, "symbol": "MSFT", "target_price": 300.0, "condition": "sideways"},
+            ])
+        self.assertEqual(self.manager.list_alerts(123), [])
+
+    def test_add_alert_invalid_condition(self):
+        """測試無效的條件"""
+        with self.assertRaises(ValueError):
+            self.manager.add_alert(123, "AAPL", 150.0, "invalid")
+
+    def test_remove_and_clear(self):
+        """測試移除與清空監控"""
+        alert = self.manager.add_alert(123, "AAPL", 150.0, "above")
+        self.manager.add_alert(123, "AAPL", 140.0, "below")
+        self.manager.add_alert(123, "GOOGL", 140.0, "below")
+
+        self.assertFalse(self.manager.remove_alert(456, alert["id"]))
+        self.assertTrue(self.manager.remove_alert(123, alert["id"]))
+        self.assertEqual(self.manager.clear_alerts_by_symbol(123, "aapl"), 1)
+        self.assertEqual(self.manager.clear_all_alerts(123), 1)
+        self.assertEqual(self.manager.list_alerts(123), [])
+
+    def test_get_all_symbols(self):
+        """測試取得所有股票代碼"""
+        self.manager.add_alert(123, "AAPL", 150.0, "above")
+        self.manager.add_alert(456, "AAPL", 140.0, "below")
+        self.manager.add_alert(123, "GOOGL", 140.0, "below")
+
+        self.assertEqual(sorted(self.manager.get_all_symbols()), ["AAPL", "GOOGL"])
+
+    def test_check_alerts_trigger_and_reset(self):
+        """測試觸發、防重複通知與重置"""
+        alert = self.manager.add_alert(123, "AAPL", 150.0, "above")
+        prices = {"AAPL": {"price": 155.0, "currency": "USD", "success": True}}
+
+        triggered = self.manager.check_alerts(prices)
+        self.assertEqual(len(triggered), 1)
+        self.assertEqual(triggered[0]["alert"]["id"], alert["id"])
+        self.assertTrue(self.manager.get_alert_by_id(alert["id"])["notified"])
+
+        self.assertEqual(self.manager.check_alerts(prices), [])
+
+        prices["AAPL"]["price"] = 146.0
+        self.manager.check_alerts(prices)
+        self.assertFalse(self.manager.get_alert_by_id(alert["id"])["notified"])
+
+        prices["AAPL"]["price"] = 155.0
+        self.assertEqual(len(self.manager.check_alerts(prices)), 1)
+
+    def test_shared_threshold_evaluated_once(self):
+        """測試同一股票的相同門檻只評估一次"""
+        for user_id in range(20):
+            self.manager.add_alert(user_id, "AAPL", 150.0, "above")
+        prices = {"AAPL": {"price": 155.0, "currency": "USD", "success": True}}
+
+        with patch.object(self.manager, "_signals", wraps=self.manager._signals) as mock_signals:
+            self.assertEqual(len(self.manager.check_alerts(prices)), 20)
+            self.assertEqual(mock_signals.call_count, 1)
+
+    def test_check_alerts_stream(self):
+        """測試串流檢查逐批寫入並產出觸發結果"""
+        alert = self.manager.add_alert(123, "AAPL", 150.0, "above")
+        batches = [
+            {"MSFT": {"price": 1.0, "currency": "USD", "success": True}},
+            {"AAPL": {"price": 155.0, "currency": "USD", "success": True}},
+        ]
+        results = [len(triggered) for triggered in self.manager.check_alerts_stream(batches)]
+        self.assertEqual(results, [0, 1])
+        self.assertTrue(self.manager.get_alert_by_id(alert["id"])["notified"])
+
+    def test_trigger_distances(self):
+        """測試到最近門檻的相對距離，引用指標的股票返回 None"""
+        self.manager.add_alert(123, "AAPL", 110.0, "above")
+        self.manager.add_alert(456, "AAPL", 95.0, "below")
+        self.manager.add_alert(123, "TSLA", 50.0, "rsi(14) above")
+
+        distances = self.manager.trigger_distances({"AAPL": 100.0, "TSLA": 200.0, "NVDA": 1.0})
+        self.assertEqual(distances, {"AAPL": 0.05, "TSLA": None})
+        self.assertEqual(self.manager.subscriber_counts(["AAPL", "NVDA"]), {"AAPL": 2, "NVDA": 0})
+
+    def test_expire_alerts(self):
+        """測試到期監控在單一交易中刪除，觸發後到期會設定到期時間"""
+        now = time.time()
+        short = self.manager.add_alert(123, "AAPL", 150.0, "above", expires_at=now + 60)
+        self.manager.add_alert(123, "MSFT", 300.0, "above")
+        after = self.manager.add_alert(123, "GOOGL", 140.0, "above", expire_after=3600)
+
+        self.assertEqual(self.manager.next_expiry(), short.expires_at)
+        self.assertEqual(self.manager.expire_alerts(now), [])
+        expired = self.manager.expire_alerts(now + 120)
+        self.assertEqual([alert.id for alert in expired], [short.id])
+        self.assertEqual(len(self.manager.list_alerts(123)), 2)
+
+        triggered = self.manager.check_alerts({
+            "GOOGL": {"price": 150.0, "currency": "USD", "success": True}
+        })
+        self.assertEqual(triggered[0]["alert"].id, after.id)
+        expires_at = self.manager.get_alert_by_id(after.id).expires_at
+        self.assertGreaterEqual(expires_at, now + 3600)
+
+        # 到期但尚未清除的監控不會觸發
+        self.manager.add_alert(123, "TSLA", 200.0, "above", expires_at=now - 1)
+        self.assertEqual(self.manager.check_alerts({
+            "TSLA": {"price": 250.0, "currency": "USD", "success": True}
+        }), [])
+
+    def test_indicator_conditions(self):
+        """測試指標條件與 JSON 後端相同"""
+        rsi = self.manager.add_alert(123, "AAPL", 70, "rsi(3) above")
+        cross = self.manager.add_alert(123, "AAPL", 0, "cross_above sma(3)")
+        self.assertEqual(self.manager.get_alert_by_id(rsi.id).condition, "rsi(3) above")
+
+        triggered = []
+        for price in [10, 11, 12, 9, 8, 12, 13, 14]:
+            result = self.manager.check_alerts({
+                "AAPL": {"price": price, "currency": "USD", "success": True}
+            })
+            triggered.append(sorted(item["alert"].id for item in result))
+
+        self.assertEqual(triggered[5], sorted([cross.id, rsi.id]))
+        self.assertEqual(sum(triggered, []).count(cross.id), 1)
+
+    def test_band_alerts_match_json_backend(self):
+        """測試區間監控在兩種後端的觸發結果相同（JSON 後端使用端點索引）"""
+        import random
+        json_manager = AlertManager(os.path.join(self.temp_dir, "bands.json"))
+        rng = random.Random(3)
+        for i in range(60):
+            lower = rng.uniform(80, 120)
+            item = dict(user_id=i, symbol="AAPL", target_price=lower,
+                        condition=rng.choice(["between", "outside"]),
+                        upper_price=lower + rng.uniform(0.5, 20))
+            json_manager.add_alert(**item)
+            self.manager.add_alert(**item)
+        self.assertIsNone(self.manager.add_alert(**item))
+
+        price = 100.0
+        for _ in range(200):
+            price = max(1.0, price + rng.gauss(0, 3))
+            prices = {"AAPL": {"price": price, "currency": "USD", "success": True}}
+            expected = sorted(
+                (item["alert"].user_id, item["alert"].condition)
+                for item in json_manager.check_alerts(prices)
+            )
+            actual = sorted(
+                (item["alert"].user_id, item["alert"].condition)
+                for item in self.manager.check_alerts(prices)
+            )
+            self.assertEqual(actual, expected)
+
+    def test_trailing_alerts_match_json_backend(self):
+        """測試移動停損在兩種後端的觸發結果與最高價相同"""
+        import random
+        json_manager = AlertManager(os.path.join(self.temp_dir, "trailing.json"))
+        rng = random.Random(5)
+        for i in range(20):
+            item = dict(user_id=i, symbol="AAPL", peak_price=100.0 if i % 2 else None,
+                        condition=rng.choice(["trailing", "trailing_pct"]),
+                        target_price=rng.uniform(1, 10))
+            json_manager.add_alert(**item)
+            self.manager.add_alert(**item)
+
+        price = 100.0
+        for _ in range(100):
+            price = max(1.0, price + rng.gauss(0, 3))
+            prices = {"AAPL": {"price": price, "currency": "USD", "success": True}}
+            expected = sorted(item["alert"].user_id for item in json_manager.check_alerts(prices))
+            actual = sorted(item["alert"].user_id for item in self.manager.check_alerts(prices))
+            self.assertEqual(actual, expected)
+
+        reopened = SQLiteAlertManager(self.test_file)
+        for user_id in range(20):
+            self.assertEqual(
+                reopened.list_alerts(user_id)[0].peak_price,
+                json_manager.list_alerts(user_id)[0].peak_price
+            )
+        reopened.close()
+
+    def test_upgrade_old_schema(self):
+        """測試舊版資料庫自動補上到期欄位"""
+        import sqlite3
+        old_file = os.path.join(self.temp_dir, "old.db")
+        conn = sqlite3.connect(old_file)
+        conn.executescript("""
+            CREATE TABLE alerts (
+                id TEXT PRIMARY KEY, user_id INTEGER NOT NULL, symbol TEXT NOT NULL,
+                target_price REAL NOT NULL, condition TEXT NOT NULL,
+                created_at TEXT NOT NULL, notified INTEGER NOT NULL DEFAULT 0,
+                last_notified_at TEXT, enabled INTEGER NOT NULL DEFAULT 1
+            );
+            INSERT INTO alerts VALUES ('old-1', 1, 'AAPL', 150.0, 'above',
+                '2026-01-01T00:00:00', 0, NULL, 1);
+        """)
+        conn.close()
+
+        manager = SQLiteAlertManager(old_file)
+        try:
+            alert = manager.get_alert_by_id("old-1")
+            self.assertIsNone(alert.expires_at)
+            self.assertIsNone(manager.next_expiry())
+            self.assertIsNotNone(manager.add_alert(1, "MSFT", 300.0, "above", expires_at=1.0))
+            self.assertEqual(len(manager.expire_alerts(2.0)), 1)
+        finally:
+            manager.close()
+
+    def test_persistence(self):
+        """測試重新開啟資料庫後資料仍存在"""
+        alert = self.manager.add_alert(123, "AAPL", 150.0, "above")
+
+        reopened = SQLiteAlertManager(self.test_file)
+        try:
+            alerts = reopened.list_alerts(123)
+            self.assertEqual(len(alerts), 1)
+            self.assertEqual(alerts[0]["id"], alert["id"])
+        finally:
+            reopened.close()
+
+    def test_concurrent_add_alerts(self):
+        """測試並發新增監控"""
+        def add_alerts(user_id):
+            for i in range(5):
+                self.manager.add_alert(user_id, f"STOCK{i}", 100.0, "above")
+
+        threads = [threading.Thread(target=add_alerts, args=(uid,)) for uid in range(1, 4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        for user_id in range(1, 4):
+            self.assertEqual(len(self.manager.list_alerts(user_id)), 5)
+
+
+class TestMigration(unittest.TestCase):
+    """測試 JSON 匯入與後端選擇"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """測試後清理"""
+        import shutil
+        if os.path.exists(self.temp_dir):
+            shutil.rmtree(self.temp_dir)
+
+    def test_migrate_json_to_sqlite(self):
+        """測試一次性匯入 JSON 監控清單"""
+        json_file = os.path.join(self.temp_dir, "watchlist.json")
+        db_file = os.path.join(self.temp_dir, "watchlist.db")
+
+        json_manager = AlertManager(json_file)
+        first = json_manager.add_alert(123, "AAPL", 150.0, "above")
+        json_manager.add_alert(456, "2330.TW", 600.0, "below")
+
+        self.assertEqual(migrate_json_to_sqlite(json_file, db_file), 2)
+        # 重複執行不會產生重複資料
+        self.assertEqual(migrate_json_to_sqlite(json_file, db_file), 0)
+
+        manager = SQLiteAlertManager(db_file)
+        try:
+            self.assertEqual(manager.get_alert_by_id(first["id"]), first)
+            self.assertEqual(len(manager.list_alerts(456)), 1)
+        finally:
+            manager.close()
+
+    def test_create_alert_manager_backend(self):
+        """測試依設定選擇後端"""
+        json_manager = create_alert_manager(os.path.join(self.temp_dir, "a.json"))
+        self.assertNotIsInstance(json_manager, SQLiteAlertManager)
+
+        db_manager = create_alert_manager(os.path.join(self.temp_dir, "a.db"))
+        self.assertIsInstance(db_manager, SQLiteAlertManager)
+        db_manager.close()
+
+        forced = create_alert_manager(os.path.join(self.temp_dir, "b.data"), "sqlite")
+        self.assertIsInstance(forced, SQLiteAlertManager)
+        forced.close()
+
+        with self.assertRaises(ValueError):
+            create_alert_manager(os.path.join(self.temp_dir, "c.json"), "redis")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 """測試 stock_fetcher.py 模組"""
+import json
+import time
 import unittest
 from unittest.mock import MagicMock, patch
 
-from src.stock_fetcher import StockFetcher
+from src.stock_fetcher import QUOTE_RESTORE_MAX_AGE, StockFetcher
 
 
 class TestStockFetcher(unittest.TestCase):
@@ -85,6 +87,49 @@ class TestStockFetcher(unittest.TestCase):
 
         self.assertFalse(result["success"])
 
+    @patch('yfinance.Ticker')
+    def test_cached_price(self, mock_ticker):
+        """測試成功的報價被快取，過期或未查詢過時返回 None"""
+        mock_ticker.return_value.info = {"regularMarketPrice": 600.0, "currency": "TWD"}
+
+        self.assertIsNone(self.fetcher.cached_price("2330", 60))
+        self.fetcher.get_price("2330")
+        self.assertEqual(self.fetcher.cached_price("2330", 60)["price"], 600.0)
+        self.assertEqual(self.fetcher.cached_price("2330.TW", 60)["price"], 600.0)
+        self.assertEqual(list(self.fetcher.cached_prices(["2330", "AAPL"], 60)), ["2330.TW"])
+        with patch("src.stock_fetcher.time.time", return_value=time.time() + 120):
+            self.assertIsNone(self.fetcher.cached_price("2330", 60))
+
+    @patch('yfinance.Ticker')
+    def test_rate_limit_pauses_yfinance(self, mock_ticker):
+        """測試 yfinance 回應 429 後暫停，期間直接使用備援"""
+        mock_ticker.side_effect = Exception("429 Client Error: Too Many Requests")
+        backup = {"symbol": "AAPL", "price": 1.0, "currency": "USD", "success": True}
+        with patch.object(self.fetcher, "_get_price_from_finmind", return_value=backup):
+            self.assertTrue(self.fetcher.get_price("AAPL")["success"])
+            self.assertTrue(self.fetcher.get_price("AAPL")["success"])
+
+        self.assertEqual(mock_ticker.call_count, 1)
+        health = self.fetcher.provider_health()
+        self.assertEqual(health["yfinance"]["consecutive_failures"], 1)
+        self.assertGreater(health["yfinance"]["paused_until"], time.time())
+        self.assertEqual(health["finmind"]["successes"], 2)
+
+    @patch('yfinance.Ticker')
+    def test_checkpoint_round_trip(self, mock_ticker):
+        """測試檢查點恢復報價快取與資料來源狀態，過舊的報價不恢復"""
+        mock_ticker.return_value.info = {"regularMarketPrice": 150.0, "currency": "USD"}
+        self.fetcher.get_price("AAPL")
+        state = self.fetcher.checkpoint_state()
+        state["quotes"].append(["OLD", time.time() - QUOTE_RESTORE_MAX_AGE - 1, {"price": 1.0}])
+
+        restored = StockFetcher()
+        restored.restore_checkpoint(json.loads(json.dumps(state)))
+
+        self.assertEqual(restored.cached_price("AAPL", 60)["price"], 150.0)
+        self.assertIsNone(restored.cached_price("OLD", float("inf")))
+        self.assertEqual(restored.provider_health()["yfinance"]["successes"], 1)
+
     def test_get_multiple_prices(self):
         """測試批次查詢（整合測試，需要網路）"""
         # 注意：這是整合測試，可能較慢
@@ -103,6 +148,61 @@ class TestStockFetcher(unittest.TestCase):
             self.skipTest("需要網路連線")
 
 
+    @patch('yfinance.download')
+    def test_get_prices_batch(self, mock_download):
+        """測試批次查詢只呼叫一次下載，缺漏代碼才逐一查詢"""
+        import pandas as pd
+
+        columns = pd.MultiIndex.from_product([["AAPL", "2330.TW"], ["Close", "Volume"]])
+        mock_download.return_value = pd.DataFrame(
+            [[150.0, 1, 600.0, 2], [151.5, 1, float("nan"), 2]],
+            columns=columns
+        )
+        self.fetcher._min_request_interval = 0
+
+        fallback = {"symbol": "MSFT", "price": 300.0, "currency": "USD", "success": True}
+        with patch.object(self.fetcher, "get_price", return_value=fallback) as mock_get_price:
+            results = self.fetcher.get_prices_batch(["aapl", "2330", "MSFT", "AAPL"])
+
+        mock_download.assert_called_once()
+        self.assertEqual(mock_download.call_args[0][0], ["AAPL", "2330.TW", "MSFT"])
+        self.assertEqual(results["AAPL"]["price"], 151.5)
+        self.assertEqual(results["2330.TW"]["price"], 600.0)
+        self.assertEqual(results["2330.TW"]["currency"], "TWD")
+        mock_get_price.assert_called_once_with("MSFT")
+        self.assertEqual(results["MSFT"]["price"], 300.0)
+
+    @patch('yfinance.download')
+    def test_get_prices_batch_download_failure(self, mock_download):
+        """測試批次下載失敗時改用單一查詢"""
+        mock_download.side_effect = Exception("API Error")
+        self.fetcher._min_request_interval = 0
+
+        failed = {"symbol": "AAPL", "price": None, "success": False}
+        with patch.object(self.fetcher, "get_price", return_value=failed):
+            results = self.fetcher.get_prices_batch(["AAPL"])
+
+        self.assertFalse(results["AAPL"]["success"])
+
+
+    @patch('yfinance.download')
+    def test_get_prices_batch_respects_rate_limit_pause(self, mock_download):
+        """測試批次下載回應 429 後暫停 yfinance，暫停期間的批次查詢不再下載"""
+        mock_download.side_effect = Exception("429 Client Error: Too Many Requests")
+        self.fetcher._min_request_interval = 0
+
+        backup = {"symbol": "AAPL", "price": 1.0, "currency": "USD", "success": True}
+        with patch.object(self.fetcher, "get_price", return_value=backup) as mock_get_price:
+            self.fetcher.get_prices_batch(["AAPL"])
+            results = self.fetcher.get_prices_batch(["AAPL", "MSFT"])
+
+        mock_download.assert_called_once()
+        self.assertEqual(mock_get_price.call_count, 3)
+        self.assertTrue(results["MSFT"]["success"])
+        health = self.fetcher.provider_health()
+        self.assertEqual(health["yfinance"]["failures"], 1)
+        self.assertGreater(health["yfinance"]["paused_until"], time.time())
+
 class TestStockFetcherIntegration(unittest.TestCase):
     """整合測試（需要網路連線）"""
 
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""測試 subscriptions.py 模組"""
+import unittest
+
+from src.alert_record import AlertRecord
+from src.subscriptions import Subscription, build_subscriptions, subscription_key, with_changes
+
+
+class TestSubscriptions(unittest.TestCase):
+    """測試共用門檻索引"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.alerts = [
+            AlertRecord("a", 1, "2330.TW", 1000.0, "above"),
+            AlertRecord("b", 2, "2330.TW", 1000.0, "above", notified=True),
+            AlertRecord("c", 3, "2330.TW", 1000.0, "above"),
+            AlertRecord("d", 4, "2330.TW", 900.0, "below"),
+            AlertRecord("e", 5, "2330.TW", 900.0, "between", upper_price=1100.0),
+            AlertRecord("f", 6, "2330.TW", 5.0, "trailing", peak_price=1000.0),
+            AlertRecord("g", 7, "2330.TW", 1000.0, "above", enabled=False),
+        ]
+        self.index = build_subscriptions(self.alerts)
+
+    def test_subscription_key(self):
+        """測試區間、移動停損與停用的監控不共用評估"""
+        self.assertEqual(subscription_key(self.alerts[0]), ("2330.TW", "above", 1000.0))
+        for alert in self.alerts[4:]:
+            self.assertIsNone(subscription_key(alert))
+
+    def test_build(self):
+        """測試相同門檻合併為一組訂閱者"""
+        self.assertEqual(self.index, {"2330.TW": {
+            ("above", 1000.0): Subscription(("a", "c"), ("b",)),
+            ("below", 900.0): Subscription(("d",), ()),
+        }})
+        self.assertEqual(len(self.index["2330.TW"][("above", 1000.0)]), 3)
+
+    def test_with_changes(self):
+        """測試只重建受影響的門檻，不修改原索引"""
+        below = self.index["2330.TW"][("below", 900.0)]
+        updated = with_changes(self.index, [
+            (self.alerts[0], self.alerts[0].replace(notified=True)),
+            (self.alerts[1], None),
+        ])
+        self.assertEqual(updated["2330.TW"][("above", 1000.0)], Subscription(("c",), ("a",)))
+        self.assertIs(updated["2330.TW"][("below", 900.0)], below)
+        self.assertEqual(self.index["2330.TW"][("above", 1000.0)].pending, ("a", "c"))
+
+        # 唯一的訂閱者改變通知狀態或門檻
+        notified = self.alerts[3].with_notification(True, 1.0)
+        self.assertEqual(
+            with_changes(updated, [(self.alerts[3], notified)])["2330.TW"][("below", 900.0)],
+            Subscription((), ("d",))
+        )
+        moved = with_changes(updated, [(self.alerts[3], self.alerts[3].replace(target_price=1000.0))])
+        self.assertNotIn(("below", 900.0), moved["2330.TW"])
+        self.assertEqual(moved["2330.TW"][("below", 1000.0)], Subscription(("d",), ()))
+
+        added = with_changes(updated, [(None, AlertRecord("h", 8, "2330.TW", 900.0, "below"))])
+        self.assertEqual(added["2330.TW"][("below", 900.0)].pending, ("d", "h"))
+        self.assertIs(
+            with_changes(self.index, [(alert, alert) for alert in self.alerts[4:]]), self.index
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
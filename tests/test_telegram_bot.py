@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""測試 telegram_bot.py 模組"""
+import asyncio
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from src.alert_record import AlertRecord
+from src.ratelimit import CommandRateLimiter
+from src.stock_fetcher import StockFetcher
+from src.telegram_bot import TelegramBotHandler
+from src.tickers import Ticker, TickerIndex
+
+
+class FakeBot:
+    """記錄送出訊息的假 Bot，用戶 ID 為負數時模擬失敗"""
+
+    def __init__(self):
+        self.sent = []
+        self.threads = set()
+
+    async def send_message(self, chat_id, text, reply_markup=None):
+        self.threads.add(threading.get_ident())
+        await asyncio.sleep(0.2)
+        if chat_id < 0:
+            raise RuntimeError("blocked")
+        self.sent.append((chat_id, text, reply_markup))
+
+
+class TestAlertHandoff(unittest.TestCase):
+    """測試背景執行緒提交通知到 Bot 的事件迴圈"""
+
+    def setUp(self):
+        """測試前準備：在另一個執行緒運行事件迴圈，模擬 run_polling"""
+        self.bot = FakeBot()
+        self.handler = TelegramBotHandler("token", alert_manager=None, stock_fetcher=None)
+        self.handler.application = SimpleNamespace(bot=self.bot)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self._run(self.handler._on_started(self.handler.application))
+
+    def tearDown(self):
+        """測試後清理"""
+        self._run(self.handler._on_stopped(self.handler.application))
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+        self.loop.close()
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout=5)
+
+    def _alerts(self, user_ids):
+        return [
+            {
+                "alert": AlertRecord(f"a{i}", user_id, "AAPL", 150.0, "above"),
+                "current_price": 155.0,
+                "currency": "USD"
+            }
+            for i, user_id in enumerate(user_ids)
+        ]
+
+    def test_concurrent_delivery_status(self):
+        """測試通知在 Bot 的迴圈上同時發送，Future 返回每筆送達結果"""
+        start = time.perf_counter()
+        future = self.handler.submit_alerts(self._alerts([1, 2, -3, 4, 5]))
+        self.assertEqual(future.result(timeout=5), [True, True, False, True, True])
+        self.assertLess(time.perf_counter() - start, 0.8)  # 逐一發送需要 1 秒
+        self.assertEqual(sorted(chat_id for chat_id, _, _ in self.bot.sent), [1, 2, 4, 5])
+        self.assertEqual(self.bot.threads, {self.thread.ident})
+
+    def test_merges_alerts_per_user(self):
+        """測試同一用戶同一週期的通知合併為一則，每個監控一個移除按鈕"""
+        future = self.handler.submit_alerts(self._alerts([1, 2, 1]))
+        self.assertEqual(future.result(timeout=5), [True, True, True])
+
+        (text, reply_markup), = [(text, markup) for chat_id, text, markup in self.bot.sent
+                                 if chat_id == 1]
+        self.assertIn("（2 個）", text)
+        self.assertEqual(
+            [row[0].callback_data for row in reply_markup.inline_keyboard],
+            ["remove_alert:a0", "remove_alert:a2"]
+        )
+        remaining = TelegramBotHandler._without_button(reply_markup, "remove_alert:a0")
+        self.assertEqual(
+            [row[0].callback_data for row in remaining.inline_keyboard], ["remove_alert:a2"]
+        )
+        self.assertIsNone(TelegramBotHandler._without_button(remaining, "remove_alert:a2"))
+
+    def test_not_started(self):
+        """測試 Bot 尚未啟動或已關閉時不提交"""
+        self._run(self.handler._on_stopped(self.handler.application))
+        self.assertIsNone(self.handler.submit_alerts(self._alerts([1])))
+        self.assertEqual(self.bot.sent, [])
+
+
+class TestLifecycleHooks(unittest.TestCase):
+    """測試 Bot 啟動與關閉時的協程"""
+
+    def test_hooks_run_on_loop(self):
+        """測試啟動協程在通知佇列就緒後執行，關閉協程依相反順序且在通知佇列關閉前執行"""
+        handler = TelegramBotHandler("token", alert_manager=None, stock_fetcher=None)
+        application = SimpleNamespace(bot=FakeBot())
+        events = []
+
+        def hooks(name):
+            async def on_started():
+                events.append((f"{name} started", handler.notifications is not None))
+
+            async def on_stopped():
+                events.append((f"{name} stopped", handler.notifications is not None))
+            return on_started, on_stopped
+
+        handler.add_lifecycle_hooks(*hooks("a"))
+        handler.add_lifecycle_hooks(*hooks("b"))
+
+        async def main():
+            await handler._on_started(application)
+            await handler._on_stopped(application)
+
+        asyncio.run(main())
+        self.assertEqual(events, [
+            ("a started", True), ("b started", True), ("b stopped", True), ("a stopped", True),
+        ])
+        self.assertIsNone(handler.notifications)
+
+
+class FakeMessage:
+    """記錄回覆與編輯內容的假訊息"""
+
+    def __init__(self):
+        self.texts = []
+
+    async def reply_text(self, text, **kwargs):
+        self.texts.append(text)
+        return self
+
+    async def edit_text(self, text, **kwargs):
+        self.texts.append(text)
+
+
+class FakePriceFetcher(StockFetcher):
+    """AAPL 有快取；MSFT 在批次中立即查到，2330.TW 稍後由備援查到"""
+
+    def __init__(self):
+        super().__init__()
+        self.requested = None
+
+    def cached_prices(self, symbols, max_age):
+        return {"AAPL": {"price": 150.0, "currency": "USD", "success": True, "source": "yfinance"}}
+
+    def iter_prices_batch(self, symbols):
+        self.requested = list(symbols)
+        yield "MSFT", {"price": 300.0, "currency": "USD", "success": True, "source": "yfinance"}
+        time.sleep(0.3)
+        yield "2330.TW", {"price": 600.0, "currency": "TWD", "success": True, "source": "finmind"}
+
+
+class TestMultiPrice(unittest.TestCase):
+    """測試多股票 /price"""
+
+    def test_cache_first_then_streams_updates(self):
+        """測試先以快取回覆表格，批次查詢的結果陸續編輯到同一則回覆"""
+        fetcher = FakePriceFetcher()
+        handler = TelegramBotHandler("token", alert_manager=None, stock_fetcher=fetcher)
+        message = FakeMessage()
+        update = SimpleNamespace(effective_user=SimpleNamespace(id=1), message=message)
+        context = SimpleNamespace(args=["aapl", "MSFT", "2330", "AAPL", "bad!"])
+
+        with patch("src.telegram_bot.PRICE_EDIT_INTERVAL", 0.1):
+            asyncio.run(handler.price_command(update, context))
+
+        self.assertEqual(fetcher.requested, ["MSFT", "2330.TW"])
+        first, *edits = message.texts
+        self.assertIn("4 個股票報價（2 個查詢中）", first)
+        self.assertIn("（快取）", first)
+        self.assertIn("代碼格式無效", first)
+        self.assertGreaterEqual(len(edits), 2)  # MSFT 先顯示，不等待較慢的 2330.TW
+        self.assertIn("MSFT", edits[0])
+        self.assertIn("⏳ 查詢中", edits[0])
+        self.assertNotIn("查詢中", edits[-1])
+        self.assertIn("finmind", edits[-1])
+
+    def test_flood_control(self):
+        """測試額度不足時只顯示快取報價，單一查詢回覆稍後再試且不查詢資料來源"""
+        clock = SimpleNamespace(now=0.0)
+        fetcher = FakePriceFetcher()
+        handler = TelegramBotHandler(
+            "token", alert_manager=None, stock_fetcher=fetcher,
+            rate_limiter=CommandRateLimiter(2, shared_per_minute=None, clock=lambda: clock.now)
+        )
+        update = SimpleNamespace(effective_user=SimpleNamespace(id=1), message=FakeMessage())
+        args = SimpleNamespace(args=["AAPL", "MSFT", "2330"])
+
+        with patch("src.telegram_bot.PRICE_EDIT_INTERVAL", 0.01):
+            asyncio.run(handler.price_command(update, args))
+        self.assertEqual(fetcher.requested, ["MSFT", "2330.TW"])
+
+        # 兩次查詢的額度已用完：只回覆快取的 AAPL
+        fetcher.requested = None
+        update.message = FakeMessage()
+        asyncio.run(handler.price_command(update, args))
+        self.assertIsNone(fetcher.requested)
+        self.assertEqual(len(update.message.texts), 1)
+        self.assertIn("150.00", update.message.texts[0])
+        self.assertIn("查詢太頻繁，請 60 秒後再試", update.message.texts[0])
+
+        quote = {"symbol": "MSFT", "price": 300.0, "currency": "USD", "success": True,
+                 "source": "yfinance", "timestamp": "2026-10-19T10:00:00"}
+        clock.now = 30.0  # 補充一次查詢
+        with patch.object(fetcher, "get_price", return_value=quote) as get_price, \
+                patch.object(fetcher, "cached_price", return_value=None):
+            asyncio.run(handler.price_command(update, SimpleNamespace(args=["MSFT"])))
+            update.message = FakeMessage()
+            asyncio.run(handler.price_command(update, SimpleNamespace(args=["MSFT"])))
+        self.assertEqual(get_price.call_count, 1)
+        # 被限流時不先回覆「查詢中」
+        self.assertEqual(len(update.message.texts), 1)
+        self.assertIn("🐢 查詢太頻繁了，請 30 秒後再試", update.message.texts[0])
+
+
+    def test_command_over_shared_budget(self):
+        """測試需要的查詢數超過共用額度上限時直接拒絕，不扣額度也不查詢資料來源"""
+        fetcher = FakePriceFetcher()
+        limiter = CommandRateLimiter(10, shared_per_minute=1)
+        handler = TelegramBotHandler(
+            "token", alert_manager=None, stock_fetcher=fetcher, rate_limiter=limiter
+        )
+        update = SimpleNamespace(effective_user=SimpleNamespace(id=1), message=FakeMessage())
+
+        asyncio.run(handler.price_command(update, SimpleNamespace(args=["AAPL", "MSFT", "2330"])))
+        self.assertIsNone(fetcher.requested)
+        self.assertIn("一次最多查詢 1 個股票", update.message.texts[0])
+
+        with patch.object(handler, "safe_reply") as safe_reply:
+            self.assertFalse(asyncio.run(handler._take_quota(update, 2)))
+        self.assertIn("一次最多查詢 1 個股票（收到 2 個）", safe_reply.call_args[0][1])
+        self.assertEqual(limiter.stats()["allowed"], 0)
+
+class FakeInlineQuery:
+    """記錄回答的假 inline 查詢"""
+
+    def __init__(self, query):
+        self.query = query
+        self.answers = []
+
+    async def answer(self, results, **kwargs):
+        self.answers.append((results, kwargs))
+
+
+class TestInlineQuery(unittest.TestCase):
+    """測試 inline 查詢自動完成"""
+
+    def test_suggestions_use_cache_only(self):
+        """測試以代碼目錄建議股票，附上快取報價，不查詢資料來源"""
+        fetcher = FakePriceFetcher()
+        index = TickerIndex([
+            Ticker("AAPL", "Apple Inc.", "US"),
+            Ticker("APLE", "Apple Hospitality REIT, Inc.", "US"),
+            Ticker("2330.TW", "台積電", "TW"),
+        ])
+        handler = TelegramBotHandler(
+            "token", alert_manager=None, stock_fetcher=fetcher, ticker_index=index
+        )
+        query = FakeInlineQuery("apple")
+
+        with patch.object(fetcher, "get_price") as get_price:
+            asyncio.run(handler.inline_query(SimpleNamespace(inline_query=query), None))
+        get_price.assert_not_called()
+        self.assertIsNone(fetcher.requested)
+
+        results, kwargs = query.answers[0]
+        self.assertEqual([result.id for result in results], ["AAPL", "APLE"])
+        self.assertEqual(results[0].title, "AAPL Apple Inc.")
+        self.assertIn("150.00", results[0].description)
+        self.assertIn("150.00", results[0].input_message_content.message_text)
+        self.assertEqual(results[1].description, "尚無最近的報價")
+        self.assertIn("/price APLE", results[1].input_message_content.message_text)
+        self.assertEqual(kwargs["cache_time"], 30)
+
+        empty = FakeInlineQuery("")
+        asyncio.run(handler.inline_query(SimpleNamespace(inline_query=empty), None))
+        self.assertEqual(empty.answers[0][0], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""測試 tickers.py 模組"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.tickers import (
+    Ticker,
+    TickerIndex,
+    load_tickers,
+    parse_tw_listings,
+    parse_us_listings,
+    save_tickers,
+)
+
+TICKERS = [
+    Ticker("2330.TW", "台積電", "TW"),
+    Ticker("2303.TW", "聯電", "TW"),
+    Ticker("2454.TW", "聯發科", "TW"),
+    Ticker("6488.TWO", "環球晶", "TW"),
+    Ticker("AAPL", "Apple Inc.", "US"),
+    Ticker("AA", "Alcoa Corporation", "US"),
+    Ticker("APLE", "Apple Hospitality REIT, Inc.", "US"),
+    Ticker("DIS", "The Walt Disney Company", "US"),
+    Ticker("BRK-B", "Berkshire Hathaway Inc. Class B", "US"),
+]
+
+
+class TestTickerIndex(unittest.TestCase):
+    """測試代碼與名稱搜尋"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.index = TickerIndex(TICKERS)
+
+    def symbols(self, query, limit=10):
+        return [ticker.symbol for ticker in self.index.search(query, limit)]
+
+    def test_symbol_prefix(self):
+        """測試代碼開頭搜尋（不分大小寫），完全相同的代碼排第一，台股可以不輸入後綴"""
+        self.assertEqual(self.symbols("aa"), ["AA", "AAPL"])
+        self.assertEqual(self.symbols("23"), ["2330.TW", "2303.TW"])  # 同等級依目錄順序
+        self.assertEqual(self.symbols("6488"), ["6488.TWO"])
+        self.assertEqual(self.symbols("brk"), ["BRK-B"])
+
+    def test_name_search(self):
+        """測試名稱開頭、名稱中的單字與中文名稱片段，代碼相符的排在名稱相符之前"""
+        self.assertEqual(self.symbols("apple"), ["AAPL", "APLE"])
+        self.assertEqual(self.symbols("disney"), ["DIS"])
+        self.assertEqual(self.symbols("聯"), ["2303.TW", "2454.TW"])
+        self.assertEqual(self.symbols("積電"), ["2330.TW"])
+        self.assertEqual(self.symbols("ap"), ["APLE", "AAPL"])
+
+    def test_limit_and_lookup(self):
+        """測試筆數上限、空查詢與以完整代碼取得"""
+        self.assertEqual(len(self.index.search("a", limit=2)), 2)
+        self.assertEqual(self.index.search("   "), [])
+        self.assertEqual(self.index.search("zzz"), [])
+        self.assertEqual(self.index.get("2330.TW").name, "台積電")
+        self.assertIsNone(self.index.get("2330"))
+        self.assertEqual(len(TickerIndex(TICKERS + [Ticker("AAPL", "重複", "US")])), len(TICKERS))
+
+
+class TestTickerFiles(unittest.TestCase):
+    """測試代碼目錄的讀寫與交易所清單解析"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """測試後清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_save_and_load(self):
+        """測試寫入後載入相同的目錄，檔案不存在時為空索引"""
+        path = os.path.join(self.temp_dir, "data", "tickers.csv")
+        save_tickers(path, TICKERS)
+        index = load_tickers(path)
+        self.assertEqual(len(index), len(TICKERS))
+        self.assertEqual(index.get("APLE").name, "Apple Hospitality REIT, Inc.")
+
+        with self.assertLogs("src.tickers", level="WARNING"):
+            self.assertEqual(len(load_tickers(os.path.join(self.temp_dir, "missing.csv"))), 0)
+
+    def test_parse_listings(self):
+        """測試解析台股 OpenAPI 與 Nasdaq Trader 清單（略過測試代碼，股票類別改用 -）"""
+        tw = parse_tw_listings(
+            [{"Code": "2330", "Name": "台積電"}, {"Code": "", "Name": "無代碼"}], "Code", "Name", ".TW"
+        )
+        self.assertEqual(tw, [Ticker("2330.TW", "台積電", "TW")])
+
+        text = "\n".join([
+            "ACT Symbol|Security Name|Exchange|CQS Symbol|ETF|Round Lot Size|Test Issue|NASDAQ Symbol",
+            "BRK.B|Berkshire Hathaway Inc. - Class B|N|BRK.B|N|100|N|BRK.B",
+            "ZXZZT|NYSE Test Stock|N|ZXZZT|N|100|Y|ZXZZT",
+            "File Creation Time: 1019202600:00|||||||",
+        ])
+        self.assertEqual(
+            parse_us_listings(text, "ACT Symbol"),
+            [Ticker("BRK-B", "Berkshire Hathaway Inc.", "US")]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
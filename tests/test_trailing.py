@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""測試 trailing.py 模組"""
+import unittest
+
+from src.trailing import trailing_signals, trailing_stop
+
+
+class TestTrailing(unittest.TestCase):
+    """測試移動停損"""
+
+    def test_stop(self):
+        """測試百分比與點數的停損價格"""
+        self.assertAlmostEqual(trailing_stop("trailing_pct", 200.0, 5.0), 190.0)
+        self.assertEqual(trailing_stop("trailing", 200.0, 5.0), 195.0)
+
+    def test_peak_tracking(self):
+        """測試最高價只在創新高時更新，第一次觀察時以當前價格為起點"""
+        self.assertEqual(trailing_signals("trailing", 50.0, 3.0, None), (False, True, 50.0))
+        self.assertEqual(trailing_signals("trailing", 52.0, 3.0, 50.0), (False, True, 52.0))
+        self.assertEqual(trailing_signals("trailing", 49.5, 3.0, 52.0), (False, False, 52.0))
+        self.assertEqual(trailing_signals("trailing", 49.0, 3.0, 52.0), (True, False, 52.0))
+
+    def test_reset_buffer(self):
+        """測試觸發後需回到停損價加上緩衝區以上才重置"""
+        # 最高價 100、回落 5%：停損 95，緩衝區 1.9
+        self.assertEqual(trailing_signals("trailing_pct", 95.0, 5.0, 100.0), (True, False, 100.0))
+        self.assertEqual(trailing_signals("trailing_pct", 96.5, 5.0, 100.0), (False, False, 100.0))
+        self.assertEqual(trailing_signals("trailing_pct", 97.0, 5.0, 100.0), (False, True, 100.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""測試 updates.py 模組"""
+import asyncio
+import unittest
+
+from telegram import Update
+
+from src.telegram_bot import TelegramBotHandler
+from src.updates import ChatOrderedUpdateProcessor, update_chat, update_kind
+
+
+def make_update(update_id, chat_id, text):
+    """建立私訊文字更新"""
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1760860800,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "U"},
+            "text": text,
+        },
+    }, None)
+
+
+class TestUpdateKinds(unittest.TestCase):
+    """測試更新的種類與聊天"""
+
+    def test_kind_and_chat(self):
+        """測試指令名稱去掉 Bot 名稱與參數，按鈕回調與一般訊息分開統計"""
+        self.assertEqual(update_kind(make_update(1, 5, "/Add@stock_bot AAPL > 150")), "/add")
+        self.assertEqual(update_kind(make_update(2, 5, "hello")), "message")
+        callback = Update.de_json({
+            "update_id": 3,
+            "callback_query": {
+                "id": "q", "chat_instance": "c", "data": "delete_1",
+                "from": {"id": 5, "is_bot": False, "first_name": "U"},
+            },
+        }, None)
+        self.assertEqual(update_kind(callback), "callback")
+        self.assertEqual(update_chat(make_update(4, 7, "/list")), 7)
+        self.assertIsNone(update_chat(callback))
+
+
+class TestChatOrderedUpdateProcessor(unittest.TestCase):
+    """測試並行上限與同一聊天的順序"""
+
+    def test_concurrency_and_chat_order(self):
+        """測試不同聊天並行到上限，同一聊天依序處理且等待中的更新不佔名額"""
+        async def main():
+            processor = ChatOrderedUpdateProcessor(2)
+            events = []
+            running = set()
+            peak = 0
+            gates = {}
+
+            async def handle(name):
+                nonlocal peak
+                running.add(name)
+                peak = max(peak, len(running))
+                events.append(f"start {name}")
+                gates[name] = asyncio.Event()
+                await gates[name].wait()
+                events.append(f"end {name}")
+                running.discard(name)
+
+            updates = [
+                ("add", make_update(1, 100, "/add AAPL > 150")),  # 慢的 /add
+                ("list", make_update(2, 100, "/list")),  # 同一聊天，必須等 add
+                ("other", make_update(3, 200, "/list")),  # 另一個聊天，不被擋住
+                ("third", make_update(4, 300, "/price 2330")),  # 名額用完，等待
+            ]
+            tasks = [
+                asyncio.create_task(processor.process_update(update, handle(name)))
+                for name, update in updates
+            ]
+            await asyncio.sleep(0.01)
+            self.assertEqual(sorted(running), ["add", "other"])
+            self.assertEqual(processor.stats()["waiting"], 2)
+
+            gates["other"].set()
+            await asyncio.sleep(0.01)
+            self.assertEqual(sorted(running), ["add", "third"])
+
+            gates["add"].set()
+            await asyncio.sleep(0.01)
+            self.assertEqual(sorted(running), ["list", "third"])
+            gates["list"].set()
+            gates["third"].set()
+            await asyncio.gather(*tasks)
+
+            self.assertLess(events.index("end add"), events.index("start list"))
+            self.assertEqual(peak, 2)
+            return processor.stats()
+
+        stats = asyncio.run(main())
+        self.assertEqual(stats["processed"], 4)
+        self.assertEqual(stats["active"], 0)
+        self.assertEqual(stats["waiting"], 0)
+        self.assertEqual(stats["delays"]["/list"]["count"], 2)
+        self.assertGreater(stats["delays"]["/list"]["max"], 0)
+        self.assertEqual(stats["delays"]["/add"]["count"], 1)
+
+    def test_cancelled_before_start(self):
+        """測試排隊中被取消的更新不留下狀態，其他更新照常處理"""
+        async def main():
+            processor = ChatOrderedUpdateProcessor(1)
+            gate = asyncio.Event()
+            done = []
+
+            async def handle(name):
+                await gate.wait()
+                done.append(name)
+
+            first = asyncio.create_task(processor.process_update(make_update(1, 1, "/a"), handle("a")))
+            second = asyncio.create_task(processor.process_update(make_update(2, 1, "/b"), handle("b")))
+            third = asyncio.create_task(processor.process_update(make_update(3, 2, "/c"), handle("c")))
+            await asyncio.sleep(0.01)
+            second.cancel()
+            gate.set()
+            await asyncio.gather(first, third)
+            await asyncio.gather(second, return_exceptions=True)
+            return processor, done
+
+        processor, done = asyncio.run(main())
+        self.assertEqual(done, ["a", "c"])
+        self.assertEqual(processor.stats()["waiting"], 0)
+        self.assertEqual(processor._chats, {})
+
+    def test_application_uses_processor(self):
+        """測試 Bot 以設定的並行數量建立更新處理器"""
+        handler = TelegramBotHandler(
+            "123456:TEST", alert_manager=None, stock_fetcher=None, max_concurrent_updates=4
+        )
+        application = handler.build_application()
+        self.assertIs(application.update_processor, handler.updates)
+        self.assertEqual(application.update_processor.max_concurrent_updates, 4)
+
+        with self.assertRaises(ValueError):
+            ChatOrderedUpdateProcessor(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -85,6 +85,25 @@ class TestUtils(unittest.TestCase):
         loaded_data = load_json(test_file)
         self.assertEqual(loaded_data, test_data)
 
+    def test_save_json_atomic_replace(self):
+        """測試覆寫時不留下暫存檔"""
+        test_file = os.path.join(self.temp_dir, "atomic.json")
+
+        self.assertTrue(save_json(test_file, {"version": 1}))
+        self.assertTrue(save_json(test_file, {"version": 2}))
+
+        self.assertEqual(load_json(test_file), {"version": 2})
+        self.assertEqual(os.listdir(self.temp_dir), ["atomic.json"])
+
+    def test_save_json_unserializable_keeps_old_file(self):
+        """測試序列化失敗時保留原檔案"""
+        test_file = os.path.join(self.temp_dir, "keep.json")
+        save_json(test_file, {"ok": True})
+
+        self.assertFalse(save_json(test_file, {"bad": object()}))
+        self.assertEqual(load_json(test_file), {"ok": True})
+        self.assertEqual(os.listdir(self.temp_dir), ["keep.json"])
+
     def test_load_json_nonexistent_file(self):
         """測試載入不存在的檔案"""
         test_file = os.path.join(self.temp_dir, "nonexistent.json")
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""測試 webhook.py 模組"""
+import asyncio
+import http.client
+import json
+import socket
+import threading
+import time
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from telegram import User
+from telegram.ext import ExtBot
+
+from src.telegram_bot import ALLOWED_UPDATES, TelegramBotHandler
+from src.webhook import MAX_BODY_SIZE, SECRET_HEADER, WebhookServer
+
+SECRET = "test-secret_123"
+
+# 錄下的 Telegram 更新（私訊 /help 指令）
+RECORDED_UPDATE = {
+    "update_id": 815230001,
+    "message": {
+        "message_id": 42,
+        "from": {"id": 12345, "is_bot": False, "first_name": "Amy", "language_code": "zh-hant"},
+        "chat": {"id": 12345, "first_name": "Amy", "type": "private"},
+        "date": 1760860800,
+        "text": "/help",
+        "entities": [{"offset": 0, "length": 5, "type": "bot_command"}],
+    },
+}
+
+
+def post(port, body, secret=SECRET, path="/hook", method="POST", connection=None):
+    """以 http.client 送出請求，返回狀態碼"""
+    conn = connection or http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+    headers = {"Content-Type": "application/json"}
+    if secret is not None:
+        headers[SECRET_HEADER] = secret
+    conn.request(method, path, body=body, headers=headers)
+    response = conn.getresponse()
+    response.read()
+    if connection is None:
+        conn.close()
+    return response.status
+
+
+def oversized_request(port):
+    """只送出宣告本文超過上限的標頭，返回伺服器不讀本文直接回覆的狀態碼"""
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(
+            f"POST /hook HTTP/1.1\r\nHost: localhost\r\n{SECRET_HEADER}: {SECRET}\r\n"
+            f"Content-Length: {MAX_BODY_SIZE + 1}\r\n\r\n".encode("latin-1")
+        )
+        return int(sock.makefile("rb").readline().split()[1])
+
+
+def long_line_request(port, header=True):
+    """送出超過讀取上限（64 KiB）的標頭或請求行，返回伺服器回覆的狀態碼"""
+    filler = "a" * 70000
+    if header:
+        request = f"POST /hook HTTP/1.1\r\nX-Filler: {filler}\r\n\r\n"
+    else:
+        request = f"POST /hook?{filler} HTTP/1.1\r\n\r\n"
+    with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+        sock.sendall(request.encode("latin-1"))
+        return int(sock.makefile("rb").readline().split()[1])
+
+
+class TestWebhookServer(unittest.TestCase):
+    """測試內建 HTTP 伺服器的請求驗證"""
+
+    def run_with_server(self, scenario):
+        """啟動伺服器（系統分配埠號），在執行緒中執行 scenario(port)，返回收到的更新"""
+        received = []
+
+        async def handler(update):
+            received.append(update)
+
+        async def main():
+            server = WebhookServer(handler, SECRET, path="/hook", port=0)
+            await server.start()
+            try:
+                await asyncio.to_thread(scenario, server.port)
+            finally:
+                await server.stop()
+            return server
+
+        server = asyncio.run(main())
+        return received, server
+
+    def test_recorded_update_accepted(self):
+        """測試正確的 secret token 與路徑回覆 200 並交給 handler"""
+        statuses = []
+        received, server = self.run_with_server(
+            lambda port: statuses.append(post(port, json.dumps(RECORDED_UPDATE)))
+        )
+        self.assertEqual(statuses, [200])
+        self.assertEqual(received, [RECORDED_UPDATE])
+        self.assertEqual(server.received, 1)
+
+    def test_rejected_requests(self):
+        """測試錯誤的 secret token、路徑、方法與本文被拒絕"""
+        body = json.dumps(RECORDED_UPDATE)
+
+        def scenario(port):
+            return [
+                post(port, body, secret="wrong"),
+                post(port, body, secret=None),
+                post(port, body, path="/other"),
+                post(port, None, method="GET"),
+                post(port, "not json"),
+                post(port, "[1, 2]"),
+                oversized_request(port),
+                long_line_request(port),
+                long_line_request(port, header=False),
+            ]
+
+        statuses = []
+        received, server = self.run_with_server(lambda port: statuses.extend(scenario(port)))
+        self.assertEqual(statuses, [403, 403, 404, 405, 400, 400, 413, 431, 400])
+        self.assertEqual(received, [])
+        self.assertEqual(server.rejected, 9)
+
+    def test_keep_alive(self):
+        """測試同一條連線可以連續推送多個更新"""
+        def scenario(port):
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            try:
+                return [
+                    post(port, json.dumps({"update_id": i}), connection=conn)
+                    for i in range(3)
+                ]
+            finally:
+                conn.close()
+
+        statuses = []
+        received, _ = self.run_with_server(lambda port: statuses.extend(scenario(port)))
+        self.assertEqual(statuses, [200, 200, 200])
+        self.assertEqual([u["update_id"] for u in received], [0, 1, 2])
+
+    def test_handler_error_still_acknowledged(self):
+        """測試 handler 失敗時仍回覆 200，避免 Telegram 重送擋住之後的更新"""
+        async def handler(update):
+            raise RuntimeError("boom")
+
+        async def main():
+            server = WebhookServer(handler, SECRET, path="/hook", port=0)
+            await server.start()
+            try:
+                return await asyncio.to_thread(post, server.port, "{}")
+            finally:
+                await server.stop()
+
+        with self.assertLogs("src.webhook", level="ERROR"):
+            self.assertEqual(asyncio.run(main()), 200)
+
+    def test_secret_required(self):
+        """測試沒有 secret token 時拒絕建立伺服器"""
+        with self.assertRaises(ValueError):
+            WebhookServer(AsyncMock(), "")
+
+
+class TestWebhookMode(unittest.TestCase):
+    """測試 Bot 以 webhook 模式運行：錄下的更新送到本機端點後分派到指令處理器"""
+
+    def test_recorded_update_reaches_command(self):
+        """測試 POST 到本機端點的 /help 更新由 help_command 處理，stop() 後正常結束"""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+
+        async def get_me(bot, *args, **kwargs):
+            bot._bot_user = User(id=123456, first_name="Test", is_bot=True, username="test_bot")
+            return bot._bot_user
+
+        with patch.object(ExtBot, "get_me", get_me), \
+                patch.object(ExtBot, "set_webhook", new_callable=AsyncMock) as set_webhook, \
+                patch.object(TelegramBotHandler, "help_command", new_callable=AsyncMock) as help_command:
+            handler = TelegramBotHandler(
+                "123456:TEST", alert_manager=None, stock_fetcher=None,
+                webhook_url="https://example.com/hook", webhook_port=port, webhook_secret=SECRET
+            )
+            thread = threading.Thread(target=handler.run, daemon=True)
+            thread.start()
+            try:
+                deadline = time.monotonic() + 10
+                while True:
+                    try:
+                        status = post(port, json.dumps(RECORDED_UPDATE))
+                        break
+                    except ConnectionRefusedError:
+                        if time.monotonic() > deadline:
+                            raise
+                        time.sleep(0.05)
+                while not help_command.await_count and time.monotonic() < deadline:
+                    time.sleep(0.05)
+            finally:
+                while handler._stop_event is None and thread.is_alive():
+                    time.sleep(0.05)
+                handler.stop()
+                thread.join(timeout=10)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(status, 200)
+        set_webhook.assert_awaited_once_with(
+            url="https://example.com/hook",
+            allowed_updates=ALLOWED_UPDATES,
+            secret_token=SECRET
+        )
+        help_command.assert_awaited_once()
+        update = help_command.await_args.args[0]
+        self.assertEqual(update.update_id, RECORDED_UPDATE["update_id"])
+        self.assertEqual(update.message.text, "/help")
+        self.assertIsNone(handler.notifications)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""測試 worker.py 模組"""
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from concurrent.futures import Future
+from unittest.mock import patch
+
+from src.alert_manager import AlertManager
+from src.worker import (
+    MonitorWorkerLink,
+    MonitorWorkerProcess,
+    RemoteAlertManager,
+    RemoteStockFetcher,
+    WorkerUnavailable,
+)
+
+
+class _NotifyingFetcher:
+    """工作程序中的假查詢器：查詢時送出一則觸發通知，並返回前端回覆的送達結果"""
+
+    def __init__(self, link):
+        self.link = link
+        self.queried = []
+
+    def get_price(self, symbol):
+        if symbol == "CRASH":
+            os._exit(3)
+        future = self.link.submit_alerts([{"alert": {"user_id": 1}, "symbol": symbol}])
+        return {"symbol": symbol, "delivered": future.result(timeout=5)}
+
+    def cached_prices(self, symbols, max_age):
+        # 測試用：返回串流已查詢的股票
+        return list(self.queried)
+
+    def iter_prices_batch(self, symbols):
+        for symbol in symbols:
+            self.queried.append(symbol)
+            if symbol == "BAD":
+                raise ValueError("bad symbol")
+            if symbol == "SLOW":
+                time.sleep(0.5)
+            yield symbol, {"symbol": symbol, "success": True}
+
+
+def _worker_main(conn, watchlist_file):
+    """測試用的工作程序入口"""
+    manager = AlertManager(watchlist_file, save_latency=None)
+    link = MonitorWorkerLink(conn)
+    try:
+        link.serve({"alerts": manager, "fetcher": _NotifyingFetcher(link)})
+    finally:
+        manager.close()
+
+
+class TestMonitorWorker(unittest.TestCase):
+    """測試工作程序的呼叫轉送、通知與監督"""
+
+    def setUp(self):
+        """測試前準備"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.watchlist_file = os.path.join(self.temp_dir, "watchlist.json")
+        self.notified = []
+        self.worker = MonitorWorkerProcess(_worker_main, args=(self.watchlist_file,))
+        self.worker.start(self._notify)
+
+    def tearDown(self):
+        """測試後清理"""
+        self.worker.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _notify(self, triggered_alerts):
+        self.notified.append(triggered_alerts)
+        future = Future()
+        future.set_result([True] * len(triggered_alerts))
+        return future
+
+    def test_remote_calls(self):
+        """測試監控異動在工作程序執行並寫入監控清單，未列出的方法被拒絕"""
+        alerts = RemoteAlertManager(self.worker)
+        alert = alerts.add_alert(user_id=1, symbol="AAPL", target_price=150, condition="above")
+        self.assertEqual(alert.symbol, "AAPL")
+        self.assertEqual([a.id for a in alerts.list_alerts(1)], [alert.id])
+        self.assertEqual(alerts.clear_all_alerts(1), 1)
+        with self.assertRaises(ValueError):
+            alerts.add_alert(user_id=1, symbol="AAPL", target_price=150, condition="sideways")
+        with self.assertRaises(AttributeError):
+            self.worker.call("alerts", "save")
+
+        self.worker.stop()
+        self.assertEqual(AlertManager(self.watchlist_file).list_alerts(1), [])
+
+    def test_notification_round_trip(self):
+        """測試工作程序的觸發通知由前端發送，送達結果回傳工作程序"""
+        fetcher = RemoteStockFetcher(self.worker)
+        self.assertEqual(fetcher.normalize_symbol("2330"), "2330.TW")
+        result = fetcher.get_price("AAPL")
+        self.assertEqual(result["delivered"], [True])
+        self.assertEqual(self.notified[0][0]["symbol"], "AAPL")
+
+    def test_streamed_batch(self):
+        """測試批次查詢逐筆送回前端，不等待整批完成；工作程序的例外在前端拋出"""
+        fetcher = RemoteStockFetcher(self.worker)
+        RemoteAlertManager(self.worker).list_alerts(1)  # 等待工作程序啟動完成
+        started = time.monotonic()
+        results = fetcher.iter_prices_batch(["AAPL", "SLOW"])
+        self.assertEqual(next(results)[0], "AAPL")
+        self.assertLess(time.monotonic() - started, 0.4)
+        self.assertEqual(next(results)[0], "SLOW")
+        self.assertEqual(list(results), [])
+
+        self.assertEqual(list(fetcher.get_prices_batch(["AAPL", "MSFT"])), ["AAPL", "MSFT"])
+        results = fetcher.iter_prices_batch(["AAPL", "BAD"])
+        self.assertEqual(next(results)[0], "AAPL")
+        with self.assertRaises(ValueError):
+            next(results)
+        with self.assertRaises(AttributeError):
+            list(self.worker.stream("fetcher", "get_price", "AAPL"))
+
+    def test_stream_timeout_between_items(self):
+        """測試串流的逾時計算每一筆之間的等待，逾時後遲到的結果被忽略"""
+        with self.assertRaises(WorkerUnavailable):
+            list(self.worker.stream("fetcher", "iter_prices_batch", ["AAPL", "SLOW"], timeout=0.2))
+        time.sleep(0.5)
+        fetcher = RemoteStockFetcher(self.worker)
+        self.assertEqual(list(fetcher.get_prices_batch(["MSFT"])), ["MSFT"])
+
+    def test_cancelled_stream_stops_querying(self):
+        """測試前端提前結束或逾時後，工作程序不再查詢剩下的股票"""
+        fetcher = RemoteStockFetcher(self.worker)
+        results = fetcher.iter_prices_batch(["AAPL", "SLOW", "SLOW", "SLOW", "SLOW"])
+        self.assertEqual(next(results)[0], "AAPL")
+        results.close()
+        time.sleep(1.5)
+        self.assertLessEqual(len(fetcher.cached_prices([], 0)), 2)
+
+        with self.assertRaises(WorkerUnavailable):
+            list(self.worker.stream("fetcher", "iter_prices_batch", ["SLOW"] * 4, timeout=0.2))
+        time.sleep(1.5)
+        self.assertLessEqual(len(fetcher.cached_prices([], 0)), 4)
+
+    def test_restart_after_crash(self):
+        """測試工作程序異常結束時等待中的呼叫失敗，並自動重新啟動"""
+        fetcher = RemoteStockFetcher(self.worker)
+        first_pid = self.worker.pid
+        with patch("src.worker.RESTART_MIN_DELAY", 0.05):
+            with self.assertLogs("src.worker", level="ERROR"):
+                with self.assertRaises(WorkerUnavailable):
+                    fetcher.get_price("CRASH")
+                deadline = time.monotonic() + 30
+                while self.worker.restarts == 0 and time.monotonic() < deadline:
+                    time.sleep(0.05)
+
+        self.assertEqual(self.worker.restarts, 1)
+        self.assertNotEqual(self.worker.pid, first_pid)
+        self.assertEqual(fetcher.get_price("MSFT")["delivered"], [True])
+
+
+if __name__ == "__main__":
+    unittest.main()